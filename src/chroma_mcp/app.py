@@ -207,6 +207,10 @@ async def main_stdio():
             )
         )
         logging.info("Initialization options created. Calling server.run...")
+        from chroma_mcp.utils import get_server_config_if_set
+        from chroma_mcp.utils.retention import start_retention_task
+
+        retention_task = start_retention_task(get_server_config_if_set())
         try:
             await server.run(
                 read_stream,
@@ -219,6 +223,33 @@ async def main_stdio():
             logging.error(f"Error during server.run: {e}", exc_info=True)
             print(f"Error during server.run: {e}", file=sys.stderr)
             raise
+        finally:
+            if retention_task:
+                retention_task.cancel()
+
+
+async def main_socket(socket_path: str, idle_timeout: float = 0):
+    """Run the server as a long-lived daemon on a Unix domain socket.
+
+    Each connection is served as its own MCP session; the server exits after
+    `idle_timeout` seconds without connections (0 keeps it running).
+    """
+    from chroma_mcp.tools import collection_tools
+    from chroma_mcp.tools import document_tools
+    from chroma_mcp.tools import thinking_tools
+    import chroma_mcp.server
+    from chroma_mcp.utils import get_server_config_if_set
+    from chroma_mcp.utils.retention import start_retention_task
+    from chroma_mcp.utils.socket_transport import serve_unix_socket
+
+    logging.info(f"Entering socket mode on {socket_path}")
+    init_options = server.create_initialization_options(notification_options=NotificationOptions())
+    retention_task = start_retention_task(get_server_config_if_set())
+    try:
+        await serve_unix_socket(server, init_options, socket_path, idle_timeout=idle_timeout)
+    finally:
+        if retention_task:
+            retention_task.cancel()
 
 
 # REMOVE the _register_tool_handlers function
@@ -16,6 +16,7 @@ import importlib.metadata
 
 # Import app module to access main_stdio
 from chroma_mcp import app
+from chroma_mcp.utils.dedup import max_distance_from_env
 
 # Import server functions needed for HTTP mode at the top level
 from chroma_mcp.server import config_server, main as server_main, _initialize_chroma_client
@@ -41,10 +42,22 @@ def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
     # Change mode from positional to an optional flag
     parser.add_argument(
         "--mode",
-        choices=["stdio", "http"],
+        choices=["stdio", "http", "socket"],
         # Read default from env var, fallback to "http"
         default=os.getenv("CHROMA_SERVER_MODE", "http"),
-        help="Server mode: 'stdio' for stdio transport, 'http' for default HTTP server (or set CHROMA_SERVER_MODE).",
+        help="Server mode: 'stdio' for stdio transport, 'http' for default HTTP server, 'socket' for a long-lived "
+        "server on a Unix domain socket (or set CHROMA_SERVER_MODE).",
+    )
+    parser.add_argument(
+        "--socket-path",
+        default=os.getenv("CHROMA_SOCKET_PATH"),
+        help="Unix socket path for --mode socket (default: a per-user path derived from the server environment)",
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=float(os.getenv("CHROMA_IDLE_TIMEOUT", "0")),
+        help="In --mode socket, exit after this many seconds without connections (0 keeps the server running)",
     )
     parser.add_argument(
         "--version", action="version", version=f'%(prog)s {importlib.metadata.version("chroma-mcp-server")}'
@@ -124,6 +137,50 @@ def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
         dest="embedding_function_name",
     )
 
+    # Document filter acceleration
+    parser.add_argument(
+        "--fts-accelerator",
+        type=lambda x: x.lower() in ["true", "yes", "1", "t", "y"],
+        default=os.getenv("CHROMA_FTS_ACCELERATOR", "false").lower() in ["true", "yes", "1", "t", "y"],
+        help="Resolve $contains/$not_contains document filters through an SQLite FTS5 shadow index",
+    )
+    parser.add_argument(
+        "--exact-search-threshold",
+        type=int,
+        default=int(os.getenv("CHROMA_EXACT_SEARCH_THRESHOLD", "0")),
+        help="Answer unfiltered queries on collections up to this size with exact brute-force search (0 disables, e.g. 5000)",
+    )
+
+    parser.add_argument(
+        "--dedup-on-add",
+        type=lambda x: x.lower() in ["true", "yes", "1", "t", "y"],
+        default=os.getenv("CHROMA_DEDUP_ON_ADD", "false").lower() in ["true", "yes", "1", "t", "y"],
+        help="Do not insert documents that duplicate an existing entry (content hash or SimHash near-duplicate)",
+    )
+    parser.add_argument(
+        "--dedup-max-distance",
+        type=float,
+        default=max_distance_from_env(),
+        help="With --dedup-on-add, also require SimHash near-duplicates to be within this vector distance "
+        "(in the collection's space; unset skips the check)",
+    )
+
+    parser.add_argument(
+        "--session-embedding-mode",
+        choices=["text", "mean"],
+        default=os.getenv("CHROMA_SESSION_EMBEDDING_MODE", "text"),
+        help="Session vectors for chroma_find_similar_sessions: embed the joined thought text, "
+        "or keep the normalised mean of the thought embeddings",
+    )
+
+    # Working-memory retention
+    parser.add_argument(
+        "--retention-interval-hours",
+        type=float,
+        default=float(os.getenv("CHROMA_RETENTION_INTERVAL_HOURS", "0")),
+        help="Archive old chat history and thoughts in the background every N hours (0 disables)",
+    )
+
     return parser.parse_args(args)
 
 
@@ -150,6 +207,15 @@ def main() -> int:
             print("Stdio server finished.", file=sys.stderr)
             # stdio mode might finish normally, so return 0
             return 0
+        elif args.mode == "socket":
+            from chroma_mcp.utils.socket_transport import default_socket_path
+
+            _initialize_chroma_client(args)
+            socket_path = args.socket_path or default_socket_path()
+            print(f"Chroma client initialized. Serving on unix socket {socket_path}...", file=sys.stderr)
+            asyncio.run(app.main_socket(socket_path, idle_timeout=args.idle_timeout))
+            print("Socket server finished.", file=sys.stderr)
+            return 0
         else:  # Default HTTP mode
             # Run the default (HTTP) server
             print("Starting server in default (HTTP) mode...", file=sys.stderr)
@@ -30,12 +30,15 @@ from .types import ThoughtMetadata, ChromaClientConfig
 
 # Import config loading and tool registration
 from .utils.config import load_config
+from .utils.dedup import max_distance_from_env
+from .utils.retention import start_retention_task
 
 # Import errors and specific utils (setters/getters for globals)
 from .utils import (
     get_logger,
     set_main_logger,
     get_server_config,  # Keep getter for potential internal use
+    get_server_config_if_set,
     set_server_config,
     get_embedding_function,
     BASE_LOGGER_NAME,
@@ -53,6 +56,8 @@ from .tools.collection_tools import (
     RenameCollectionInput,
     DeleteCollectionInput,
     PeekCollectionInput,
+    CollectionStatsInput,
+    AggregateInput,
 )
 from .tools.document_tools import (
     AddDocumentInput,
@@ -62,19 +67,25 @@ from .tools.document_tools import (
     QueryDocumentsInput,
     QueryDocumentsWithWhereFilterInput,
     QueryDocumentsWithDocumentFilterInput,
+    QueryDocumentsBatchInput,
+    HybridQueryInput,
     GetDocumentsByIdsInput,
     GetDocumentsWithWhereFilterInput,
     GetDocumentsWithDocumentFilterInput,
     GetAllDocumentsInput,
     UpdateDocumentContentInput,
     UpdateDocumentMetadataInput,
+    PatchMetadataInput,
     DeleteDocumentByIdInput,
+    DeleteDocumentsInput,
     GetDocumentsByIdsEmbeddingsInput,
     GetDocumentsByIdsAllInput,
 )
 from .tools.thinking_tools import (
     SequentialThinkingInput,
     SequentialThinkingWithCustomDataInput,
+    RecordThoughtsInput,
+    GetBranchPathInput,
     FindSimilarThoughtsInput,
     GetSessionSummaryInput,
     FindSimilarSessionsInput,
@@ -92,6 +103,8 @@ from .tools.collection_tools import (
     _rename_collection_impl,
     _delete_collection_impl,
     _peek_collection_impl,
+    _get_collection_stats_impl,
+    _aggregate_impl,
 )
 from .tools.document_tools import (
     _add_document_impl,
@@ -101,19 +114,25 @@ from .tools.document_tools import (
     _query_documents_impl,
     _query_documents_with_where_filter_impl,
     _query_documents_with_document_filter_impl,
+    _query_documents_batch_impl,
+    _hybrid_query_impl,
     _get_documents_by_ids_impl,
     _get_documents_with_where_filter_impl,
     _get_documents_with_document_filter_impl,
     _get_all_documents_impl,
     _update_document_content_impl,
     _update_document_metadata_impl,
+    _patch_metadata_impl,
     _delete_document_by_id_impl,
+    _delete_documents_impl,
     _get_documents_by_ids_embeddings_impl,
     _get_documents_by_ids_all_impl,
 )
 from .tools.thinking_tools import (
     _sequential_thinking_impl,
     _sequential_thinking_with_custom_data_impl,
+    _record_thoughts_impl,
+    _get_branch_path_impl,
     _find_similar_thoughts_impl,
     _get_session_summary_impl,
     _find_similar_sessions_impl,
@@ -190,6 +209,22 @@ def _initialize_chroma_client(args: argparse.Namespace) -> None:
             embedding_function_name=getattr(
                 args, "embedding_function_name", os.getenv("CHROMA_EMBEDDING_FUNCTION", "default")
             ),
+            fts_accelerator=bool(
+                getattr(args, "fts_accelerator", os.getenv("CHROMA_FTS_ACCELERATOR", "false").lower() == "true")
+            ),
+            exact_search_threshold=int(
+                getattr(args, "exact_search_threshold", os.getenv("CHROMA_EXACT_SEARCH_THRESHOLD", "0"))
+            ),
+            retention_interval_hours=float(
+                getattr(args, "retention_interval_hours", os.getenv("CHROMA_RETENTION_INTERVAL_HOURS", "0"))
+            ),
+            dedup_on_add=bool(
+                getattr(args, "dedup_on_add", os.getenv("CHROMA_DEDUP_ON_ADD", "false").lower() == "true")
+            ),
+            dedup_max_distance=getattr(args, "dedup_max_distance", max_distance_from_env()),
+            session_embedding_mode=getattr(
+                args, "session_embedding_mode", os.getenv("CHROMA_SESSION_EMBEDDING_MODE", "text")
+            ),
         )
 
         # Store the config globally via setter
@@ -369,6 +404,8 @@ TOOL_NAMES = {
     "RENAME_COLLECTION": "chroma_rename_collection",
     "DELETE_COLLECTION": "chroma_delete_collection",
     "PEEK_COLLECTION": "chroma_peek_collection",
+    "COLLECTION_STATS": "chroma_collection_stats",
+    "AGGREGATE": "chroma_aggregate",
     "ADD_DOCS": "chroma_add_document",
     "ADD_DOCS_IDS": "chroma_add_document_with_id",
     "ADD_DOCS_META": "chroma_add_document_with_metadata",
@@ -376,6 +413,8 @@ TOOL_NAMES = {
     "QUERY_DOCS": "chroma_query_documents",
     "QUERY_DOCS_WHERE": "chroma_query_documents_with_where_filter",
     "QUERY_DOCS_DOC": "chroma_query_documents_with_document_filter",
+    "QUERY_DOCS_BATCH": "chroma_query_batch",
+    "QUERY_HYBRID": "chroma_hybrid_query",
     "GET_DOCS_IDS": "chroma_get_documents_by_ids",
     "GET_DOCS_WHERE": "chroma_get_documents_with_where_filter",
     "GET_DOCS_DOC": "chroma_get_documents_with_document_filter",
@@ -383,14 +422,18 @@ TOOL_NAMES = {
     "GET_DOCS_IDS_EMBEDDINGS": "chroma_get_documents_by_ids_embeddings",
     "GET_DOCS_IDS_ALL": "chroma_get_documents_by_ids_all",
     "DELETE_DOCS": "chroma_delete_document_by_id",
+    "DELETE_DOCS_MANY": "chroma_delete_documents",
     "SEQ_THINKING": "chroma_sequential_thinking",
     "SEQ_THINKING_CUSTOM": "chroma_sequential_thinking_with_custom_data",
+    "RECORD_THOUGHTS": "chroma_record_thoughts",
     "FIND_THOUGHTS": "chroma_find_similar_thoughts",
     "GET_SUMMARY": "chroma_get_session_summary",
+    "GET_BRANCH_PATH": "chroma_get_branch_path",
     "FIND_SESSIONS": "chroma_find_similar_sessions",
     "GET_VERSION": "chroma_get_server_version",
     "UPDATE_DOC_CONTENT": "chroma_update_document_content",
     "UPDATE_DOC_META": "chroma_update_document_metadata",
+    "PATCH_DOC_META": "chroma_patch_metadata",
     "LOG_CHAT": "chroma_log_chat",
 }
 
@@ -403,6 +446,8 @@ INPUT_MODELS = {
     TOOL_NAMES["RENAME_COLLECTION"]: RenameCollectionInput,
     TOOL_NAMES["DELETE_COLLECTION"]: DeleteCollectionInput,
     TOOL_NAMES["PEEK_COLLECTION"]: PeekCollectionInput,
+    TOOL_NAMES["COLLECTION_STATS"]: CollectionStatsInput,
+    TOOL_NAMES["AGGREGATE"]: AggregateInput,
     TOOL_NAMES["ADD_DOCS"]: AddDocumentInput,
     TOOL_NAMES["ADD_DOCS_IDS"]: AddDocumentWithIDInput,
     TOOL_NAMES["ADD_DOCS_META"]: AddDocumentWithMetadataInput,
@@ -410,6 +455,8 @@ INPUT_MODELS = {
     TOOL_NAMES["QUERY_DOCS"]: QueryDocumentsInput,
     TOOL_NAMES["QUERY_DOCS_WHERE"]: QueryDocumentsWithWhereFilterInput,
     TOOL_NAMES["QUERY_DOCS_DOC"]: QueryDocumentsWithDocumentFilterInput,
+    TOOL_NAMES["QUERY_DOCS_BATCH"]: QueryDocumentsBatchInput,
+    TOOL_NAMES["QUERY_HYBRID"]: HybridQueryInput,
     TOOL_NAMES["GET_DOCS_IDS"]: GetDocumentsByIdsInput,
     TOOL_NAMES["GET_DOCS_WHERE"]: GetDocumentsWithWhereFilterInput,
     TOOL_NAMES["GET_DOCS_DOC"]: GetDocumentsWithDocumentFilterInput,
@@ -417,13 +464,17 @@ INPUT_MODELS = {
     TOOL_NAMES["GET_DOCS_IDS_EMBEDDINGS"]: GetDocumentsByIdsEmbeddingsInput,
     TOOL_NAMES["GET_DOCS_IDS_ALL"]: GetDocumentsByIdsAllInput,
     TOOL_NAMES["DELETE_DOCS"]: DeleteDocumentByIdInput,
+    TOOL_NAMES["DELETE_DOCS_MANY"]: DeleteDocumentsInput,
     TOOL_NAMES["SEQ_THINKING"]: SequentialThinkingInput,
     TOOL_NAMES["SEQ_THINKING_CUSTOM"]: SequentialThinkingWithCustomDataInput,
+    TOOL_NAMES["RECORD_THOUGHTS"]: RecordThoughtsInput,
+    TOOL_NAMES["GET_BRANCH_PATH"]: GetBranchPathInput,
     TOOL_NAMES["FIND_THOUGHTS"]: FindSimilarThoughtsInput,
     TOOL_NAMES["GET_SUMMARY"]: GetSessionSummaryInput,
     TOOL_NAMES["FIND_SESSIONS"]: FindSimilarSessionsInput,
     TOOL_NAMES["UPDATE_DOC_CONTENT"]: UpdateDocumentContentInput,
     TOOL_NAMES["UPDATE_DOC_META"]: UpdateDocumentMetadataInput,
+    TOOL_NAMES["PATCH_DOC_META"]: PatchMetadataInput,
     TOOL_NAMES["GET_VERSION"]: None,  # GET_VERSION has no input model
     TOOL_NAMES["LOG_CHAT"]: LogChatInput,
 }
@@ -437,6 +488,8 @@ IMPL_FUNCTIONS = {
     TOOL_NAMES["RENAME_COLLECTION"]: _rename_collection_impl,
     TOOL_NAMES["DELETE_COLLECTION"]: _delete_collection_impl,
     TOOL_NAMES["PEEK_COLLECTION"]: _peek_collection_impl,
+    TOOL_NAMES["COLLECTION_STATS"]: _get_collection_stats_impl,
+    TOOL_NAMES["AGGREGATE"]: _aggregate_impl,
     TOOL_NAMES["ADD_DOCS"]: _add_document_impl,
     TOOL_NAMES["ADD_DOCS_IDS"]: _add_document_with_id_impl,
     TOOL_NAMES["ADD_DOCS_META"]: _add_document_with_metadata_impl,
@@ -444,6 +497,8 @@ IMPL_FUNCTIONS = {
     TOOL_NAMES["QUERY_DOCS"]: _query_documents_impl,
     TOOL_NAMES["QUERY_DOCS_WHERE"]: _query_documents_with_where_filter_impl,
     TOOL_NAMES["QUERY_DOCS_DOC"]: _query_documents_with_document_filter_impl,
+    TOOL_NAMES["QUERY_DOCS_BATCH"]: _query_documents_batch_impl,
+    TOOL_NAMES["QUERY_HYBRID"]: _hybrid_query_impl,
     TOOL_NAMES["GET_DOCS_IDS"]: _get_documents_by_ids_impl,
     TOOL_NAMES["GET_DOCS_WHERE"]: _get_documents_with_where_filter_impl,
     TOOL_NAMES["GET_DOCS_DOC"]: _get_documents_with_document_filter_impl,
@@ -451,13 +506,17 @@ IMPL_FUNCTIONS = {
     TOOL_NAMES["GET_DOCS_IDS_EMBEDDINGS"]: _get_documents_by_ids_embeddings_impl,
     TOOL_NAMES["GET_DOCS_IDS_ALL"]: _get_documents_by_ids_all_impl,
     TOOL_NAMES["DELETE_DOCS"]: _delete_document_by_id_impl,
+    TOOL_NAMES["DELETE_DOCS_MANY"]: _delete_documents_impl,
     TOOL_NAMES["SEQ_THINKING"]: _sequential_thinking_impl,
     TOOL_NAMES["SEQ_THINKING_CUSTOM"]: _sequential_thinking_with_custom_data_impl,
+    TOOL_NAMES["RECORD_THOUGHTS"]: _record_thoughts_impl,
+    TOOL_NAMES["GET_BRANCH_PATH"]: _get_branch_path_impl,
     TOOL_NAMES["FIND_THOUGHTS"]: _find_similar_thoughts_impl,
     TOOL_NAMES["GET_SUMMARY"]: _get_session_summary_impl,
     TOOL_NAMES["FIND_SESSIONS"]: _find_similar_sessions_impl,
     TOOL_NAMES["UPDATE_DOC_CONTENT"]: _update_document_content_impl,
     TOOL_NAMES["UPDATE_DOC_META"]: _update_document_metadata_impl,
+    TOOL_NAMES["PATCH_DOC_META"]: _patch_metadata_impl,
     TOOL_NAMES["GET_VERSION"]: None,  # GET_VERSION needs a simple handler
     TOOL_NAMES["LOG_CHAT"]: _log_chat_impl,
 }
@@ -482,7 +541,7 @@ async def list_tools() -> List[types.Tool]:
         ),
         types.Tool(
             name=TOOL_NAMES["LIST_COLLECTIONS"],
-            description="List all collections. Optional: `limit`, `offset`, `name_contains`.",
+            description="List all collections. Optional: `limit`, `offset`, `name_contains`, `name_prefix`, `with_counts`.",
             inputSchema=INPUT_MODELS[TOOL_NAMES["LIST_COLLECTIONS"]].model_json_schema(),
         ),
         types.Tool(
@@ -505,6 +564,16 @@ async def list_tools() -> List[types.Tool]:
             description="Get a sample of documents from a collection. Requires: `collection_name`. Optional: `limit`.",
             inputSchema=INPUT_MODELS[TOOL_NAMES["PEEK_COLLECTION"]].model_json_schema(),
         ),
+        types.Tool(
+            name=TOOL_NAMES["COLLECTION_STATS"],
+            description="Get size and shape statistics for a collection: count, embedding dimension, effective HNSW settings, on-disk bytes, document length percentiles, metadata key cardinalities and oldest/newest item age. Sampled values are cached. Requires: `collection_name`. Optional: `refresh`, `full_scan`.",
+            inputSchema=INPUT_MODELS[TOOL_NAMES["COLLECTION_STATS"]].model_json_schema(),
+        ),
+        types.Tool(
+            name=TOOL_NAMES["AGGREGATE"],
+            description="Aggregate a collection's metadata without returning documents: group-by counts, min/max/avg/sum of numeric fields per group and distinct-value counts, computed page by page with bounded memory. Requires: `collection_name` and at least one of `group_by`, `numeric_fields`, `distinct_fields` (lists of field names). Optional: `where` (JSON string), `limit`.",
+            inputSchema=INPUT_MODELS[TOOL_NAMES["AGGREGATE"]].model_json_schema(),
+        ),
         # Document Tools
         types.Tool(
             name=TOOL_NAMES["ADD_DOCS"],
@@ -528,19 +597,29 @@ async def list_tools() -> List[types.Tool]:
         ),
         types.Tool(
             name=TOOL_NAMES["QUERY_DOCS"],
-            description="Query documents using semantic search. Queries the specified 'collection_name' AND the 'derived_learnings_v1' collection. Results are merged, and each item's metadata includes a 'source_collection' field. Returns IDs, documents, metadatas, and distances. Requires: `collection_name`, `query_texts`. Optional: `n_results`.",
+            description="Query documents using semantic search. Queries the specified 'collection_name' AND the 'derived_learnings_v1' collection. Results are merged, and each item's metadata includes a 'source_collection' field. Returns IDs, documents, metadatas, and distances. Requires: `collection_name`, `query_texts`. Optional: `n_results`, `diversity` (MMR lambda 0-1 to diversify results).",
             inputSchema=INPUT_MODELS[TOOL_NAMES["QUERY_DOCS"]].model_json_schema(),
         ),
         types.Tool(
             name=TOOL_NAMES["QUERY_DOCS_WHERE"],
-            description="Query documents using semantic search with a metadata filter. Returns IDs and potentially distances/scores. Use `chroma_get_documents_by_ids` to fetch details. Requires: `collection_name`, `query_texts`, `where`. Optional: `n_results`.",
+            description="Query documents using semantic search with a metadata filter. Returns IDs and potentially distances/scores. Use `chroma_get_documents_by_ids` to fetch details. Requires: `collection_name`, `query_texts`, `where`. Optional: `n_results`, `diversity` (MMR lambda 0-1 to diversify results).",
             inputSchema=INPUT_MODELS[TOOL_NAMES["QUERY_DOCS_WHERE"]].model_json_schema(),
         ),
         types.Tool(
             name=TOOL_NAMES["QUERY_DOCS_DOC"],
-            description="Query documents using semantic search with a document content filter. Returns IDs and potentially distances/scores. Use `chroma_get_documents_by_ids` to fetch details. Requires: `collection_name`, `query_texts`, `where_document`. Optional: `n_results`.",
+            description="Query documents using semantic search with a document content filter. Returns IDs and potentially distances/scores. Use `chroma_get_documents_by_ids` to fetch details. Requires: `collection_name`, `query_texts`, `where_document`. Optional: `n_results`, `diversity` (MMR lambda 0-1 to diversify results).",
             inputSchema=INPUT_MODELS[TOOL_NAMES["QUERY_DOCS_DOC"]].model_json_schema(),
         ),
+        types.Tool(
+            name=TOOL_NAMES["QUERY_DOCS_BATCH"],
+            description="Run many related semantic queries in one batch: all queries are embedded in a single call and sent as one ChromaDB query. Returns per-query IDs, documents, metadatas, and distances. Requires: `collection_name`, `query_texts`. Optional: `n_results`, `where` (JSON string), `dedup`.",
+            inputSchema=INPUT_MODELS[TOOL_NAMES["QUERY_DOCS_BATCH"]].model_json_schema(),
+        ),
+        types.Tool(
+            name=TOOL_NAMES["QUERY_HYBRID"],
+            description="Hybrid search combining BM25 over exact terms/code identifiers with semantic vector search, merged via reciprocal rank fusion. Returns fused IDs, documents, metadatas, scores, and per-retriever ranks. Requires: `collection_name`, `query_text`. Optional: `n_results`, `candidate_k`, `rrf_k`.",
+            inputSchema=INPUT_MODELS[TOOL_NAMES["QUERY_HYBRID"]].model_json_schema(),
+        ),
         types.Tool(
             name=TOOL_NAMES["GET_DOCS_IDS"],
             description="Get document content and metadata from a collection using specific IDs (obtained from a query). Requires: `collection_name`, `ids`.",
@@ -578,6 +657,11 @@ async def list_tools() -> List[types.Tool]:
             description="Delete a document from a collection by its specific ID. Requires: `collection_name`, `id`.",
             inputSchema=INPUT_MODELS[TOOL_NAMES["DELETE_DOCS"]].model_json_schema(),
         ),
+        types.Tool(
+            name=TOOL_NAMES["DELETE_DOCS_MANY"],
+            description="Delete many documents by IDs and/or filters in bounded batches, with progress notifications and a dry-run count mode. Requires: `collection_name` and at least one of `ids`, `where` (JSON string), `where_document` (JSON string). Optional: `dry_run`, `batch_size`.",
+            inputSchema=INPUT_MODELS[TOOL_NAMES["DELETE_DOCS_MANY"]].model_json_schema(),
+        ),
         # Update Document Variants
         types.Tool(
             name=TOOL_NAMES["UPDATE_DOC_CONTENT"],
@@ -589,15 +673,25 @@ async def list_tools() -> List[types.Tool]:
             description="Update the metadata of an existing document by ID. Requires: `collection_name`, `id`, `metadata` (dict).",
             inputSchema=INPUT_MODELS[TOOL_NAMES["UPDATE_DOC_META"]].model_json_schema(),
         ),
+        types.Tool(
+            name=TOOL_NAMES["PATCH_DOC_META"],
+            description='Merge partial metadata into many documents with one read and one write per batch; `null` removes a field and `{"$add": [...]}`/`{"$remove": [...]}` edit comma-joined ID lists as sets. Requires: `collection_name` and either `patches` (JSON object keyed by ID) or `patch` with `where` (JSON strings).',
+            inputSchema=INPUT_MODELS[TOOL_NAMES["PATCH_DOC_META"]].model_json_schema(),
+        ),
         # Thinking Tools
         types.Tool(
             name=TOOL_NAMES["SEQ_THINKING"],
             description="Records a single thought. Requires: `thought`, `thought_number`, `total_thoughts`. Optional: `session_id`, `branch_id`, `branch_from_thought`, `next_thought_needed`.",
             inputSchema=INPUT_MODELS[TOOL_NAMES["SEQ_THINKING"]].model_json_schema(),
         ),
+        types.Tool(
+            name=TOOL_NAMES["RECORD_THOUGHTS"],
+            description="Records an ordered batch of thoughts in one write with one batched embedding. Requires: `thoughts` (list of objects with `thought`, `thought_number` and optionally `total_thoughts`, `branch_id`, `branch_from_thought`, `next_thought_needed`, `custom_data`). Optional: `session_id`.",
+            inputSchema=INPUT_MODELS[TOOL_NAMES["RECORD_THOUGHTS"]].model_json_schema(),
+        ),
         types.Tool(
             name=TOOL_NAMES["FIND_THOUGHTS"],
-            description="Finds thoughts semantically similar to a query. Requires: `query`. Optional: `session_id`, `n_results`, `threshold`, `include_branches`.",
+            description="Finds thoughts semantically similar to a query. Requires: `query`. Optional: `session_id`, `branch_id`, `since_timestamp`, `until_timestamp`, `n_results`, `threshold`, `include_branches`, `include_archive`.",
             inputSchema=INPUT_MODELS[TOOL_NAMES["FIND_THOUGHTS"]].model_json_schema(),
         ),
         types.Tool(
@@ -605,6 +699,11 @@ async def list_tools() -> List[types.Tool]:
             description="Retrieves all thoughts recorded within a specific thinking session. Requires: `session_id`. Optional: `include_branches`.",
             inputSchema=INPUT_MODELS[TOOL_NAMES["GET_SUMMARY"]].model_json_schema(),
         ),
+        types.Tool(
+            name=TOOL_NAMES["GET_BRANCH_PATH"],
+            description="Returns the thoughts leading to and including a branch (the main trunk up to the fork point, then the branch) from the session's branch tree, plus the branches forking from it. Requires: `session_id`. Optional: `branch_id` (empty for the main trunk), `include_subtree`.",
+            inputSchema=INPUT_MODELS[TOOL_NAMES["GET_BRANCH_PATH"]].model_json_schema(),
+        ),
         types.Tool(
             name=TOOL_NAMES["FIND_SESSIONS"],
             description="Finds thinking sessions similar to a query. Requires: `query`. Optional: `n_results`, `threshold`.",
@@ -738,12 +837,16 @@ def main() -> None:
             print("SERVER: Attempting to enter stdio_server context...", file=sys.stderr)
             async with stdio.stdio_server() as (read_stream, write_stream):
                 print("SERVER: Entered stdio_server context. Attempting server.run...", file=sys.stderr)
+                retention_task = start_retention_task(get_server_config_if_set())
                 try:
                     await server.run(read_stream, write_stream, options, raise_exceptions=True)
                     print("SERVER: server.run completed.", file=sys.stderr)
                 except Exception as run_err:
                     print(f"SERVER: ERROR during server.run: {run_err}", file=sys.stderr)
                     raise  # Re-raise after logging
+                finally:
+                    if retention_task:
+                        retention_task.cancel()
             print("SERVER: Exited stdio_server context.", file=sys.stderr)
 
         # Run the async server function
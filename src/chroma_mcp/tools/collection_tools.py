@@ -2,6 +2,7 @@
 Collection management tools for ChromaDB operations.
 """
 
+import asyncio
 import json
 import logging
 import chromadb
@@ -32,6 +33,14 @@ from ..utils import (
     ConfigurationError,
 )
 from ..utils.config import get_collection_settings, validate_collection_name
+from ..utils.lexical_index import drop_lexical_index
+from ..utils.fts_index import drop_fts_index
+from ..utils.exact_search import invalidate_exact_index
+from ..utils.collection_stats import get_collection_stats, persist_directory
+from ..utils.metadata_aggregate import DEFAULT_AGGREGATE_GROUP_LIMIT, aggregate_metadata
+from ..utils.collection_names import get_sorted_names, invalidate_collection_names, names_with_prefix
+from ..utils.chroma_client import resolve_collection
+from ..utils.sharding import delete_sharded_collection, sharded_collection_spec
 from ..types import ChromaClientConfig
 
 
@@ -109,6 +118,10 @@ class ListCollectionsInput(BaseModel):
     name_contains: str = Field(
         default="", description="Filter collections by name (case-insensitive contains). Empty for no filter."
     )
+    name_prefix: str = Field(
+        default="", description="Only return collections whose name starts with this (case-sensitive). Empty for all."
+    )
+    with_counts: bool = Field(default=False, description="Include the document count of each returned collection.")
 
 
 class GetCollectionInput(BaseModel):
@@ -141,6 +154,39 @@ class PeekCollectionInput(BaseModel):
     )
 
 
+class CollectionStatsInput(BaseModel):
+    """Input model for collection statistics."""
+
+    collection_name: str = Field(..., description="The name of the collection to describe.")
+    refresh: bool = Field(default=False, description="Recompute sampled statistics instead of using cached values.")
+    full_scan: bool = Field(
+        default=False, description="Aggregate over every record instead of a sample (slower on large collections)."
+    )
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class AggregateInput(BaseModel):
+    """Input model for metadata aggregation (facets)."""
+
+    collection_name: str = Field(..., description="The name of the collection to aggregate.")
+    group_by: List[str] = Field(
+        default_factory=list, description="Metadata fields to group by. Empty for one group over all records."
+    )
+    numeric_fields: List[str] = Field(
+        default_factory=list, description="Numeric metadata fields summarised with count/min/max/avg/sum per group."
+    )
+    distinct_fields: List[str] = Field(
+        default_factory=list, description="Metadata fields whose distinct values are counted."
+    )
+    where: str = Field(default="", description="Optional metadata filter as a JSON string. Empty for none.")
+    limit: int = Field(
+        default=DEFAULT_AGGREGATE_GROUP_LIMIT, ge=1, le=10000, description="Groups returned, largest first."
+    )
+
+    model_config = ConfigDict(extra="forbid")
+
+
 # --- End Pydantic Input Models ---
 
 
@@ -177,6 +223,11 @@ def _reconstruct_metadata(metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
     return reconstructed
 
 
+def _is_sharded(client, name: str) -> bool:
+    """True if `name` resolves to a sharded logical collection (no plain collection shadows it)."""
+    return name not in get_sorted_names(client) and sharded_collection_spec(client, name) is not None
+
+
 # --- Implementation Functions ---
 
 
@@ -223,6 +274,7 @@ async def _create_collection_impl(input_data: CreateCollectionInput) -> List[typ
             embedding_function=embedding_function,  # Pass the instantiated default EF
             get_or_create=False,  # Explicitly False to ensure creation error
         )
+        invalidate_collection_names()
 
         # Prepare success result data
         count = collection.count()
@@ -273,10 +325,39 @@ async def _create_collection_impl(input_data: CreateCollectionInput) -> List[typ
         )
 
 
+# Maximum concurrent count() calls when listing collections with counts
+LIST_COUNTS_CONCURRENCY = 8
+
+
+async def _fetch_counts(client, collections: List[Any]) -> Dict[str, Optional[int]]:
+    """Counts documents in each collection (objects or names) with a bounded number of concurrent calls."""
+    semaphore = asyncio.Semaphore(LIST_COUNTS_CONCURRENCY)
+
+    def _count(collection) -> Optional[int]:
+        try:
+            if isinstance(collection, str):
+                collection = client.get_collection(name=collection)
+            return collection.count()
+        except Exception as e:
+            get_logger("tools.collection").warning(f"Could not count collection {collection}: {e}")
+            return None
+
+    async def _bounded(collection) -> Optional[int]:
+        async with semaphore:
+            return await asyncio.to_thread(_count, collection)
+
+    counts = await asyncio.gather(*(_bounded(c) for c in collections))
+    return {c if isinstance(c, str) else c.name: n for c, n in zip(collections, counts)}
+
+
 # Signature changed to return List[Content]
 async def _list_collections_impl(input_data: ListCollectionsInput) -> List[types.TextContent]:
     """Lists collections, optionally filtering by name and applying pagination.
 
+    Without a name filter, limit/offset are passed to `client.list_collections`
+    so only the requested page is fetched. Name filters use the sorted name
+    index (binary search for `name_prefix`).
+
     Args:
         input_data: A ListCollectionsInput object containing validated arguments.
 
@@ -292,32 +373,33 @@ async def _list_collections_impl(input_data: ListCollectionsInput) -> List[types
     limit = input_data.limit
     offset = input_data.offset
     name_contains = input_data.name_contains
+    name_prefix = input_data.name_prefix
 
     try:
         # Pydantic handles validation for limit/offset >= 0
 
         client = get_chroma_client()
-        collections = client.list_collections()
-        # Determine list of collection names from raw collection values
-        if all(isinstance(c, str) for c in collections):
-            names_list = collections
-        else:
-            names_list = [ci["name"] for c in collections for ci in (_get_collection_info(c),) if "name" in ci]
-
-        # Apply filtering if name_contains is provided
-        if name_contains:
-            filtered_names = [n for n in names_list if name_contains.lower() in n.lower()]
+        if name_contains or name_prefix:
+            filtered_names = names_with_prefix(get_sorted_names(client), name_prefix)
+            if name_contains:
+                filtered_names = [n for n in filtered_names if name_contains.lower() in n.lower()]
+            total_matching_count = len(filtered_names)
+            page = filtered_names[offset : offset + limit] if limit > 0 else filtered_names[offset:]
         else:
-            filtered_names = names_list
-
-        total_matching_count = len(filtered_names)
+            try:
+                page = list(client.list_collections(limit=limit or None, offset=offset or None))
+                if offset == 0 and (limit == 0 or len(page) < limit):
+                    # The page holds every collection; skip the extra count call
+                    total_matching_count = len(page)
+                else:
+                    total_matching_count = client.count_collections()
+            except TypeError:
+                # Older clients without pagination support
+                all_collections = list(client.list_collections())
+                total_matching_count = len(all_collections)
+                page = all_collections[offset : offset + limit] if limit > 0 else all_collections[offset:]
 
-        # Apply pagination
-        start_index = offset if offset > 0 else 0
-        if limit > 0:
-            paginated_names = filtered_names[start_index : start_index + limit]
-        else:
-            paginated_names = filtered_names[start_index:]
+        paginated_names = [c if isinstance(c, str) else c.name for c in page]
 
         # Prepare result
         result_data = {
@@ -326,6 +408,8 @@ async def _list_collections_impl(input_data: ListCollectionsInput) -> List[types
             "limit": limit,
             "offset": offset,
         }
+        if input_data.with_counts:
+            result_data["counts"] = await _fetch_counts(client, page)
         result_json = json.dumps(result_data, indent=2)
         return [types.TextContent(type="text", text=result_json)]
 
@@ -356,8 +440,8 @@ async def _get_collection_impl(input_data: GetCollectionInput) -> List[types.Tex
         validate_collection_name(collection_name)
         # -------------------------
         client = get_chroma_client()
-        # Use get_collection which raises an error if not found
-        collection = client.get_collection(name=collection_name)
+        # Raises if not found; sharded logical collections resolve to a ShardedCollection
+        collection = resolve_collection(client, name=collection_name)
 
         count = collection.count()
         # Process peek results carefully, handle potential large embeddings
@@ -441,12 +525,30 @@ async def _rename_collection_impl(input_data: RenameCollectionInput) -> List[typ
         # -------------------------
         client = get_chroma_client()
 
+        # Shards are separate physical collections that cannot be renamed atomically
+        if _is_sharded(client, original_name):
+            raise McpError(
+                ErrorData(
+                    code=INVALID_PARAMS,
+                    message=f"Tool Error: Collection '{original_name}' is sharded; renaming sharded collections is not supported.",
+                )
+            )
+        if _is_sharded(client, new_name):
+            raise McpError(
+                ErrorData(code=INVALID_PARAMS, message=f"Tool Error: Collection name '{new_name}' already exists.")
+            )
+
         # Check if original collection exists
         logger.info(f"Attempting to rename collection '{original_name}' to '{new_name}'.")
         collection = client.get_collection(name=original_name)
 
         # Attempt to modify the name
         collection.modify(name=new_name)  # Use modify with the new name
+        invalidate_collection_names()
+        # The lexical and FTS indexes are keyed by name; they are rebuilt lazily under the new name
+        drop_lexical_index(original_name)
+        drop_fts_index(original_name)
+        invalidate_exact_index(original_name)
         logger.info(f"Collection rename attempt from '{original_name}' to '{new_name}' completed.")
 
         # Return confirmation message
@@ -454,6 +556,8 @@ async def _rename_collection_impl(input_data: RenameCollectionInput) -> List[typ
             types.TextContent(type="text", text=f"Collection '{original_name}' successfully renamed to '{new_name}'.")
         ]
 
+    except McpError:
+        raise
     except ValidationError as e:
         logger.warning(f"Validation error renaming collection '{original_name}' or '{new_name}': {e}")
         # Raise McpError for validation failure
@@ -522,7 +626,15 @@ async def _delete_collection_impl(input_data: DeleteCollectionInput) -> List[typ
 
         # Attempt to delete the collection directly
         logger.info(f"Attempting to delete collection '{collection_name}'.")
-        client.delete_collection(name=collection_name)
+        if _is_sharded(client, collection_name):
+            # Removes every shard so no orphaned `<name>__shard<N>` collections are left behind
+            delete_sharded_collection(client, collection_name)
+        else:
+            client.delete_collection(name=collection_name)
+        invalidate_collection_names()
+        drop_lexical_index(collection_name)
+        drop_fts_index(collection_name)
+        invalidate_exact_index(collection_name)
         logger.info(f"Collection '{collection_name}' deleted successfully.")
 
         # Return confirmation message
@@ -589,7 +701,7 @@ async def _peek_collection_impl(input_data: PeekCollectionInput) -> List[types.T
         validate_collection_name(collection_name)
         # -------------------------
         client = get_chroma_client()
-        collection = client.get_collection(name=collection_name)
+        collection = resolve_collection(client, name=collection_name)
 
         # Call peek with the validated limit (pass directly as it has a non-zero default)
         peek_results = collection.peek(limit=limit)
@@ -677,6 +789,53 @@ async def _peek_collection_impl(input_data: PeekCollectionInput) -> List[types.T
         )
 
 
+async def _get_collection_stats_impl(input_data: CollectionStatsInput) -> List[types.TextContent]:
+    """Reports size and shape statistics for a collection.
+
+    Count, embedding dimension, effective HNSW settings and on-disk segment bytes
+    are read on every call. Document lengths, metadata key cardinalities and item
+    ages come from a sampled (or full) scan cached per collection.
+
+    Returns:
+        List containing a single TextContent object with the statistics as JSON.
+
+    Raises:
+        McpError: If the collection is not found or another error occurs.
+    """
+    logger = get_logger("tools.collection")
+    collection_name = input_data.collection_name
+
+    try:
+        validate_collection_name(collection_name)
+        client = get_chroma_client()
+        # Sharded logical collections report totals plus per-shard figures
+        collection = resolve_collection(client, name=collection_name)
+        stats = get_collection_stats(
+            collection,
+            data_dir=persist_directory(client),
+            full_scan=input_data.full_scan,
+            refresh=input_data.refresh,
+        )
+        return [types.TextContent(type="text", text=json.dumps(stats, indent=2))]
+
+    except ValidationError as e:
+        logger.warning(f"Validation error getting stats for collection '{collection_name}': {e}")
+        raise McpError(ErrorData(code=INVALID_PARAMS, message=f"Validation Error: {str(e)}"))
+    except Exception as e:
+        if f"Collection {collection_name} does not exist" in str(e):
+            logger.warning(f"Cannot get stats: Collection '{collection_name}' not found.")
+            raise McpError(
+                ErrorData(code=INVALID_PARAMS, message=f"Tool Error: Collection '{collection_name}' not found.")
+            )
+        logger.error(f"Unexpected error getting stats for collection '{collection_name}': {e}", exc_info=True)
+        raise McpError(
+            ErrorData(
+                code=INTERNAL_ERROR,
+                message=f"Tool Error: An unexpected error occurred getting stats for collection '{collection_name}'. Details: {str(e)}",
+            )
+        )
+
+
 def _get_collection_info(collection) -> dict:
     """Helper to get basic info (name, id, metadata) about a collection object."""
     # ADD logger assignment inside the function
@@ -744,6 +903,7 @@ async def _create_collection_with_metadata_impl(
             embedding_function=embedding_function,
             get_or_create=False,  # Explicitly create only
         )
+        invalidate_collection_names()
 
         logger.info(f"Successfully created collection '{collection_name}' with ID: {collection.id}")
 
@@ -782,3 +942,69 @@ async def _create_collection_with_metadata_impl(
                 message=f"Tool Error: An unexpected error occurred while creating collection '{collection_name}'. Details: {str(e)}",
             )
         )
+
+
+async def _aggregate_impl(input_data: AggregateInput) -> List[types.TextContent]:
+    """Computes group-by counts, numeric summaries and distinct counts over a collection's metadata.
+
+    Metadatas are paged through `collection.get(include=["metadatas"])` and folded
+    into the aggregates as they arrive; documents and embeddings are never read.
+
+    Returns:
+        List containing a single TextContent object with the aggregates as JSON.
+
+    Raises:
+        McpError: If the input is invalid, the collection is not found or another error occurs.
+    """
+    logger = get_logger("tools.collection")
+    collection_name = input_data.collection_name
+
+    where = None
+    if input_data.where:
+        try:
+            where = json.loads(input_data.where)
+            if not isinstance(where, dict):
+                raise ValueError("Where filter must be a JSON object (dict).")
+        except (json.JSONDecodeError, ValueError) as e:
+            raise McpError(ErrorData(code=INVALID_PARAMS, message=f"Invalid JSON format or type for 'where': {e}"))
+    if not (input_data.group_by or input_data.numeric_fields or input_data.distinct_fields):
+        raise McpError(
+            ErrorData(
+                code=INVALID_PARAMS,
+                message="Provide at least one of `group_by`, `numeric_fields` or `distinct_fields`.",
+            )
+        )
+
+    try:
+        validate_collection_name(collection_name)
+        client = get_chroma_client()
+        collection = resolve_collection(client, name=collection_name)
+        start = time.perf_counter()
+        result = await asyncio.to_thread(
+            aggregate_metadata,
+            collection,
+            group_by=input_data.group_by,
+            numeric_fields=input_data.numeric_fields,
+            distinct_fields=input_data.distinct_fields,
+            where=where,
+            limit=input_data.limit,
+        )
+        result = {"collection_name": collection_name, **result, "seconds": round(time.perf_counter() - start, 3)}
+        return [types.TextContent(type="text", text=json.dumps(result, indent=2))]
+
+    except ValidationError as e:
+        logger.warning(f"Validation error aggregating collection '{collection_name}': {e}")
+        raise McpError(ErrorData(code=INVALID_PARAMS, message=f"Validation Error: {str(e)}"))
+    except Exception as e:
+        if "does not exist" in str(e):
+            logger.warning(f"Cannot aggregate: Collection '{collection_name}' not found.")
+            raise McpError(
+                ErrorData(code=INVALID_PARAMS, message=f"Tool Error: Collection '{collection_name}' not found.")
+            )
+        logger.error(f"Unexpected error aggregating collection '{collection_name}': {e}", exc_info=True)
+        raise McpError(
+            ErrorData(
+                code=INTERNAL_ERROR,
+                message=f"Tool Error: An unexpected error occurred aggregating collection '{collection_name}'. Details: {str(e)}",
+            )
+        )
@@ -4,18 +4,20 @@ Document management tools for ChromaDB operations.
 
 import time
 import json
+import asyncio
 import logging
 import uuid
 import numpy as np  # Needed for NumpyEncoder usage
 import datetime  # Add for ISO format date handling
 
-from typing import Dict, List, Optional, Any, Union, cast
+from typing import Dict, List, Optional, Any, Tuple, Union, cast
 from dataclasses import dataclass
 
 # Import ChromaDB result types
 from chromadb.api.types import QueryResult, GetResult
 
 from mcp import types
+from mcp.server.lowlevel.server import request_ctx
 from mcp.shared.exceptions import McpError
 from mcp.types import ErrorData, INVALID_PARAMS, INTERNAL_ERROR
 from pydantic import BaseModel, Field, field_validator, ConfigDict  # Import Pydantic
@@ -32,14 +34,111 @@ from ..utils import (
     get_logger,
     get_chroma_client,
     get_embedding_function,
+    get_server_config,
+    get_server_config_if_set,
     ValidationError,
     NumpyEncoder,  # Now defined and exported from utils.__init__
 )
 from ..utils.config import validate_collection_name
+from ..utils.collection_version import CollectionVersion, collection_version
+from ..utils.lexical_index import (
+    ensure_lexical_index,
+    get_lexical_index,
+    sync_lexical_index_add,
+    sync_lexical_index_delete,
+)
+from ..utils.fts_index import is_fts_tracked, resolve_document_filter, sync_fts_add, sync_fts_delete
+from ..utils.exact_search import exact_query, invalidate_exact_index
+from ..utils.chroma_client import resolve_collection
+from ..utils.dedup import dedup_metadata, find_duplicate, record_duplicate
+from ..utils.metadata_patch import patch_metadata, validate_patch
+from ..utils.sharding import get_pages
+from ..utils.mmr import DEFAULT_MMR_FETCH_MULTIPLIER, mmr_select
 
 # --- Constants ---
 DEFAULT_QUERY_N_RESULTS = 10
 LEARNINGS_COLLECTION_NAME = "derived_learnings_v1"  # Define the learnings collection name
+DEFAULT_RRF_K = 60  # Standard reciprocal-rank-fusion constant
+DEFAULT_DELETE_BATCH_SIZE = 500  # IDs per collection.delete call in chroma_delete_documents
+MAX_DELETE_BATCH_SIZE = 5000
+DELETE_SCAN_PAGE_SIZE = 1000  # IDs read per page while resolving delete filters
+
+
+# --- Helpers keeping derived indexes in sync with document writes ---
+def _version_before_write(collection_name: str, collection) -> Optional[CollectionVersion]:
+    """Collection version before a write, taken only when a sidecar index has to be kept current."""
+    if get_lexical_index(collection_name) is None and not is_fts_tracked(collection_name):
+        return None
+    return collection_version(collection)
+
+
+def _on_documents_written(
+    collection_name: str,
+    ids: List[str],
+    documents: List[Optional[str]],
+    collection=None,
+    version_before: Optional[CollectionVersion] = None,
+) -> None:
+    """Propagates added or re-embedded documents to the sidecar indexes and search caches."""
+    version_after = collection_version(collection) if version_before is not None else None
+    sync_lexical_index_add(collection_name, ids, documents, version_before=version_before, version_after=version_after)
+    sync_fts_add(collection_name, ids, documents, version_before=version_before, version_after=version_after)
+    invalidate_exact_index(collection_name)
+
+
+def _on_documents_deleted(
+    collection_name: str,
+    ids: List[str],
+    collection=None,
+    version_before: Optional[CollectionVersion] = None,
+) -> None:
+    """Removes deleted documents from the sidecar indexes and search caches."""
+    version_after = collection_version(collection) if version_before is not None else None
+    sync_lexical_index_delete(collection_name, ids, version_before=version_before, version_after=version_after)
+    sync_fts_delete(collection_name, ids, version_before=version_before, version_after=version_after)
+    invalidate_exact_index(collection_name)
+
+
+def _on_metadata_written(
+    collection_name: str, collection=None, version_before: Optional[CollectionVersion] = None
+) -> None:
+    """Metadata-only writes leave indexed documents unchanged; only the sidecar versions advance."""
+    version_after = collection_version(collection) if version_before is not None else None
+    sync_lexical_index_delete(collection_name, [], version_before=version_before, version_after=version_after)
+    sync_fts_delete(collection_name, [], version_before=version_before, version_after=version_after)
+    invalidate_exact_index(collection_name)
+
+
+def _insert_document(
+    collection_name: str,
+    collection,
+    document: str,
+    doc_id: str,
+    metadata: Optional[Dict[str, Any]],
+    id_given: bool = False,
+) -> Dict[str, Any]:
+    """Adds one document, or with `dedup_on_add` records it on the entry it duplicates.
+
+    Returns:
+        The tool result: `{"added_id": ...}`, or `{"duplicate_of": ..., "match": "exact"|"near"}`
+        when nothing was inserted.
+    """
+    config = get_server_config_if_set()
+    if config is not None and config.dedup_on_add:
+        match = find_duplicate(collection, document, max_distance=config.dedup_max_distance)
+        if match is not None:
+            version_before = _version_before_write(collection_name, collection)
+            record_duplicate(collection, match, duplicate_id=doc_id if id_given else None)
+            _on_metadata_written(collection_name, collection=collection, version_before=version_before)
+            get_logger("tools.document.add").info(
+                f"Skipped {match.kind} duplicate of '{match.id}' in '{collection_name}' (hamming={match.hamming})."
+            )
+            return {"duplicate_of": match.id, "match": match.kind}
+        metadata = {**(metadata or {}), **dedup_metadata(document)}
+    version_before = _version_before_write(collection_name, collection)
+    collection.add(documents=[document], ids=[doc_id], metadatas=[metadata] if metadata is not None else None)
+    _on_documents_written(collection_name, [doc_id], [document], collection=collection, version_before=version_before)
+    return {"added_id": doc_id}
 
 
 # --- Helper for server-side timestamps ---
@@ -138,6 +237,12 @@ class QueryDocumentsInput(BaseModel):
     collection_name: str = Field(..., description="Name of the collection to query.")
     query_texts: List[str] = Field(..., description="List of query strings for semantic search.")
     n_results: int = Field(10, ge=1, description="Maximum number of results per query.")
+    diversity: Optional[float] = Field(
+        None,
+        ge=0.0,
+        le=1.0,
+        description="Optional MMR lambda for diversified results (1.0 = pure relevance, lower = more diverse).",
+    )
 
     model_config = ConfigDict(extra="forbid")
 
@@ -150,6 +255,12 @@ class QueryDocumentsWithWhereFilterInput(BaseModel):
     query_texts: List[str] = Field(..., description="List of query strings for semantic search.")
     where: str = Field(..., description='Metadata filter as a JSON string (e.g., \'{"source": "pdf"}\').')
     n_results: int = Field(10, ge=1, description="Maximum number of results per query.")
+    diversity: Optional[float] = Field(
+        None,
+        ge=0.0,
+        le=1.0,
+        description="Optional MMR lambda for diversified results (1.0 = pure relevance, lower = more diverse).",
+    )
 
     model_config = ConfigDict(extra="forbid")
 
@@ -163,6 +274,41 @@ class QueryDocumentsWithDocumentFilterInput(BaseModel):
         ..., description='Document content filter as a JSON string (e.g., \'{"$contains": "keyword"}\').'
     )
     n_results: int = Field(10, ge=1, description="Maximum number of results per query.")
+    diversity: Optional[float] = Field(
+        None,
+        ge=0.0,
+        le=1.0,
+        description="Optional MMR lambda for diversified results (1.0 = pure relevance, lower = more diverse).",
+    )
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class QueryDocumentsBatchInput(BaseModel):
+    """Input model for running many related queries as a single batched query."""
+
+    collection_name: str = Field(..., description="Name of the collection to query.")
+    query_texts: List[str] = Field(..., description="List of query strings, embedded together in one batch.")
+    n_results: int = Field(10, ge=1, description="Maximum number of results per query.")
+    where: str = Field(
+        default="", description="Optional metadata filter as a JSON string applied to every query. Empty for none."
+    )
+    dedup: bool = Field(
+        False,
+        description="If true, each document ID is returned only once across all queries (for its closest query).",
+    )
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class HybridQueryInput(BaseModel):
+    """Input model for hybrid lexical (BM25) + vector search fused with reciprocal rank fusion."""
+
+    collection_name: str = Field(..., description="Name of the collection to query.")
+    query_text: str = Field(..., description="Query string, used for both BM25 and semantic retrieval.")
+    n_results: int = Field(10, ge=1, description="Maximum number of fused results to return.")
+    candidate_k: int = Field(50, ge=1, description="Number of candidates fetched from each retriever before fusion.")
+    rrf_k: int = Field(DEFAULT_RRF_K, ge=1, description="Reciprocal rank fusion constant (higher flattens ranks).")
 
     model_config = ConfigDict(extra="forbid")
 
@@ -239,6 +385,23 @@ class UpdateDocumentMetadataInput(BaseModel):
     model_config = ConfigDict(extra="forbid")
 
 
+class PatchMetadataInput(BaseModel):
+    """Input model for merging partial metadata into many documents at once."""
+
+    collection_name: str = Field(..., description="Name of the collection containing the documents.")
+    patches: str = Field(
+        default="",
+        description='Per-document patches as a JSON object keyed by ID (e.g., \'{"id1": {"status": "done"}}\'). '
+        "Empty when using `patch` with `where`.",
+    )
+    patch: str = Field(
+        default="", description="One patch as a JSON object, applied to every document matching `where`."
+    )
+    where: str = Field(default="", description="Metadata filter as a JSON string selecting the documents for `patch`.")
+
+    model_config = ConfigDict(extra="forbid")
+
+
 # --- Delete Document Variant (Singular ID) --- #
 
 
@@ -251,6 +414,25 @@ class DeleteDocumentByIdInput(BaseModel):
     model_config = ConfigDict(extra="forbid")
 
 
+class DeleteDocumentsInput(BaseModel):
+    """Input model for deleting many documents by IDs and/or filters in bounded batches."""
+
+    collection_name: str = Field(..., description="Name of the collection to delete documents from.")
+    ids: List[str] = Field(
+        default_factory=list, description="Document IDs to delete. Combined with the filters when both are given."
+    )
+    where: str = Field(default="", description="Optional metadata filter as a JSON string. Empty for none.")
+    where_document: str = Field(
+        default="", description="Optional document content filter as a JSON string. Empty for none."
+    )
+    dry_run: bool = Field(False, description="Only count (and sample) the matching documents; delete nothing.")
+    batch_size: int = Field(
+        DEFAULT_DELETE_BATCH_SIZE, ge=1, le=MAX_DELETE_BATCH_SIZE, description="Documents deleted per batch."
+    )
+
+    model_config = ConfigDict(extra="forbid")
+
+
 # --- End Pydantic Input Models --- #
 
 # --- Start: New Include Variants ---
@@ -302,7 +484,7 @@ async def _add_document_impl(input_data: AddDocumentInput) -> List[types.TextCon
     logger.info(f"Adding 1 document to '{collection_name}' (generating ID). Increment index: {increment_index}")
     try:
         client = get_chroma_client()
-        collection = client.get_collection(name=collection_name)
+        collection = resolve_collection(client, name=collection_name)
 
         # Generate unique ID for the document
         generated_id = str(uuid.uuid4())  # Singular
@@ -312,14 +494,10 @@ async def _add_document_impl(input_data: AddDocumentInput) -> List[types.TextCon
         logger.info(
             f"Adding 1 document to '{collection_name}' (auto-ID, no metadata). Increment index: {increment_index}"
         )
-        collection.add(
-            documents=[document],  # Pass as list
-            ids=[generated_id],  # Pass as list
-            metadatas=None,  # Explicitly None
-            # increment_index=increment_index # Chroma client seems to not have this yet
-        )
-        # Return the generated ID
-        return [types.TextContent(type="text", text=json.dumps({"added_id": generated_id}))]
+        # increment_index is not supported by the Chroma client yet
+        result = _insert_document(collection_name, collection, document, generated_id, None)
+        # Return the generated ID (or the entry it duplicates)
+        return [types.TextContent(type="text", text=json.dumps(result))]
     except ValueError as e:
         # Handle collection not found
         if f"Collection {collection_name} does not exist" in str(e):
@@ -358,19 +536,14 @@ async def _add_document_with_id_impl(input_data: AddDocumentWithIDInput) -> List
     logger.info(f"Adding 1 document with ID '{id}' to '{collection_name}'. Increment index: {increment_index}")
     try:
         client = get_chroma_client()
-        collection = client.get_collection(name=collection_name)
+        collection = resolve_collection(client, name=collection_name)
 
         logger.info(
             f"Adding 1 document with specified ID '{id}' to '{collection_name}' (no metadata). Increment index: {increment_index}"
         )
-        collection.add(
-            documents=[document],  # Pass as list
-            ids=[id],  # Pass as list
-            metadatas=None,  # Explicitly None
-            # increment_index=increment_index
-        )
+        result = _insert_document(collection_name, collection, document, id, None, id_given=True)
         # Confirm the ID used
-        return [types.TextContent(type="text", text=json.dumps({"added_id": id}))]
+        return [types.TextContent(type="text", text=json.dumps(result))]
     except ValueError as e:
         if f"Collection {collection_name} does not exist" in str(e):
             logger.warning(f"Collection '{collection_name}' not found.")
@@ -430,19 +603,14 @@ async def _add_document_with_metadata_impl(input_data: AddDocumentWithMetadataIn
     )
     try:
         client = get_chroma_client()
-        collection = client.get_collection(name=collection_name)
+        collection = resolve_collection(client, name=collection_name)
 
         logger.info(
             f"Adding 1 document with specified metadata to '{collection_name}' (generated ID). Increment index: {increment_index}"
         )
-        collection.add(
-            documents=[document],  # Pass as list
-            ids=[generated_id],  # Pass as list
-            metadatas=[parsed_metadata],  # Pass as list
-            # increment_index=increment_index
-        )
-        # Return the generated ID
-        return [types.TextContent(type="text", text=json.dumps({"added_id": generated_id}))]
+        result = _insert_document(collection_name, collection, document, generated_id, parsed_metadata)
+        # Return the generated ID (or the entry it duplicates)
+        return [types.TextContent(type="text", text=json.dumps(result))]
     except ValueError as e:
         if f"Collection {collection_name} does not exist" in str(e):
             logger.warning(f"Collection '{collection_name}' not found.")
@@ -504,19 +672,14 @@ async def _add_document_with_id_and_metadata_impl(
     )
     try:
         client = get_chroma_client()
-        collection = client.get_collection(name=collection_name)
+        collection = resolve_collection(client, name=collection_name)
 
         logger.info(
             f"Adding 1 document with specified ID '{id}' and metadata to '{collection_name}'. Increment index: {increment_index}"
         )
-        collection.add(
-            documents=[document],  # Pass as list
-            ids=[id],  # Pass as list
-            metadatas=[parsed_metadata],  # Pass as list
-            # increment_index=increment_index
-        )
+        result = _insert_document(collection_name, collection, document, id, parsed_metadata, id_given=True)
         # Confirm the ID used
-        return [types.TextContent(type="text", text=json.dumps({"added_id": id}))]
+        return [types.TextContent(type="text", text=json.dumps(result))]
     except ValueError as e:
         if f"Collection {collection_name} does not exist" in str(e):
             logger.warning(f"Collection '{collection_name}' not found.")
@@ -554,7 +717,7 @@ async def _get_documents_by_ids_impl(input_data: GetDocumentsByIdsInput) -> List
 
     try:
         client = get_chroma_client()
-        collection = client.get_collection(collection_name)
+        collection = resolve_collection(client, collection_name)
         # Pass include=None to use ChromaDB defaults
         get_result: GetResult = collection.get(ids=ids)
         logger.debug(f"ChromaDB get result: {get_result}")
@@ -615,7 +778,7 @@ async def _get_documents_with_where_filter_impl(
 
     try:
         client = get_chroma_client()
-        collection = client.get_collection(collection_name)
+        collection = resolve_collection(client, collection_name)
         # Pass limit/offset directly, Chroma client handles 0 or None appropriately if needed
         # If 0 means "not set", we need to convert it to None for the client call
         effective_limit = limit if limit > 0 else None
@@ -689,14 +852,21 @@ async def _get_documents_with_document_filter_impl(
 
     try:
         client = get_chroma_client()
-        collection = client.get_collection(collection_name)
+        collection = resolve_collection(client, collection_name)
         # Pass limit/offset directly, converting 0 to None if needed by client
         effective_limit = limit if limit > 0 else None
         effective_offset = offset if offset > 0 else None
 
-        get_result: GetResult = collection.get(
-            where_document=where_document_filter, limit=effective_limit, offset=effective_offset
-        )
+        # With the FTS accelerator the filter is pre-resolved to an ID restriction
+        matched_ids = resolve_document_filter(collection_name, collection, where_document_filter)
+        if matched_ids is None:
+            get_result: GetResult = collection.get(
+                where_document=where_document_filter, limit=effective_limit, offset=effective_offset
+            )
+        elif matched_ids:
+            get_result = collection.get(ids=sorted(matched_ids), limit=effective_limit, offset=effective_offset)
+        else:
+            get_result = {"ids": [], "documents": [], "metadatas": []}
         logger.debug(f"ChromaDB get result: {get_result}")
 
         result_json = json.dumps(get_result, cls=NumpyEncoder)
@@ -747,7 +917,7 @@ async def _get_all_documents_impl(input_data: GetAllDocumentsInput) -> List[type
 
     try:
         client = get_chroma_client()
-        collection = client.get_collection(collection_name)
+        collection = resolve_collection(client, collection_name)
         # Pass limit/offset directly, converting 0 to None if needed by client
         effective_limit = limit if limit > 0 else None
         effective_offset = offset if offset > 0 else None
@@ -804,11 +974,13 @@ async def _update_document_content_impl(input_data: UpdateDocumentContentInput)
     logger.info(f"Updating content for document ID '{id}' in '{collection_name}'.")
     try:
         client = get_chroma_client()
-        collection = client.get_collection(name=collection_name)
+        collection = resolve_collection(client, name=collection_name)
 
         logger.info(f"Updating content for document ID '{id}' in '{collection_name}'.")
         # Update takes lists, even for single items
+        version_before = _version_before_write(collection_name, collection)
         collection.update(ids=[id], documents=[document], metadatas=None)
+        _on_documents_written(collection_name, [id], [document], collection=collection, version_before=version_before)
 
         return [types.TextContent(type="text", text=json.dumps({"updated_id": id}))]
 
@@ -859,7 +1031,7 @@ async def _update_document_metadata_impl(input_data: UpdateDocumentMetadataInput
     logger.info(f"Updating metadata for document '{document_id}' in '{collection_name}' with: {metadata_dict}")
     try:
         client = get_chroma_client()
-        collection = client.get_collection(name=collection_name)
+        collection = resolve_collection(client, name=collection_name)
 
         # Update the metadata
         collection.update(
@@ -888,6 +1060,67 @@ async def _update_document_metadata_impl(input_data: UpdateDocumentMetadataInput
         raise McpError(ErrorData(code=INTERNAL_ERROR, message=f"An unexpected error occurred during update: {str(e)}"))
 
 
+async def _patch_metadata_impl(input_data: PatchMetadataInput) -> List[types.TextContent]:
+    """Implementation for merging partial metadata into many documents.
+
+    Current metadata is read in one `get` per batch, patches are merged in memory and
+    only changed fields are written back in one `update`. `null` removes a field and
+    `{"$add": [...]}`/`{"$remove": [...]}` edit comma-joined ID list fields as sets.
+    """
+    logger = get_logger("tools.document.patch_metadata")
+    collection_name = input_data.collection_name
+
+    # --- Validation ---
+    validate_collection_name(collection_name)
+    patches = _parse_optional_filter(input_data.patches, "patches")
+    patch = _parse_optional_filter(input_data.patch, "patch")
+    where_filter = _parse_optional_filter(input_data.where, "where")
+    if (patches is None) == (patch is None) or (patch is not None and where_filter is None):
+        raise McpError(
+            ErrorData(code=INVALID_PARAMS, message="Provide either `patches`, or `patch` together with `where`.")
+        )
+    try:
+        for entry_patch in patches.values() if patches is not None else [patch]:
+            validate_patch(entry_patch)
+    except ValueError as e:
+        raise McpError(ErrorData(code=INVALID_PARAMS, message=f"Invalid metadata patch: {e}"))
+    if patches is not None:
+        patches = {doc_id: _ensure_server_timestamp(entry_patch) for doc_id, entry_patch in patches.items()}
+    else:
+        patch = _ensure_server_timestamp(patch)
+    # --- End Validation ---
+
+    try:
+        client = get_chroma_client()
+        collection = resolve_collection(client, name=collection_name)
+        version_before = _version_before_write(collection_name, collection)
+        result = patch_metadata(collection, patches=patches, patch=patch, where=where_filter)
+        if result.updated:
+            _on_metadata_written(collection_name, collection=collection, version_before=version_before)
+        logger.info(f"Patched metadata of {result.updated}/{result.matched} documents in '{collection_name}'.")
+        return [
+            types.TextContent(
+                type="text",
+                text=json.dumps(
+                    {
+                        "collection_name": collection_name,
+                        "matched": result.matched,
+                        "updated": result.updated,
+                        "missing_ids": result.missing_ids,
+                    }
+                ),
+            )
+        ]
+    except McpError:
+        raise
+    except Exception as e:
+        if "does not exist" in str(e):
+            logger.warning(f"Collection '{collection_name}' not found for patch_metadata.")
+            raise McpError(ErrorData(code=INVALID_PARAMS, message=f"Collection '{collection_name}' not found."))
+        logger.exception(f"Unexpected error patching metadata in '{collection_name}': {e}")
+        raise McpError(ErrorData(code=INTERNAL_ERROR, message=f"ChromaDB Error: Failed to patch metadata. {str(e)}"))
+
+
 # --- Delete Document Impl Variant (Singular ID) --- #
 
 
@@ -906,12 +1139,14 @@ async def _delete_document_by_id_impl(input_data: DeleteDocumentByIdInput) -> Li
     logger.info(f"Deleting document by ID '{id}' from '{collection_name}'.")
     try:
         client = get_chroma_client()
-        collection = client.get_collection(name=collection_name)
+        collection = resolve_collection(client, name=collection_name)
 
         # Delete the document by its ID
         logger.debug(f"Attempting to delete document with ID: {id}")
         # Ensure the ID is passed as a list, even if it's a single ID
+        version_before = _version_before_write(collection_name, collection)
         collection.delete(ids=[id])
+        _on_documents_deleted(collection_name, [id], collection=collection, version_before=version_before)
         logger.info(f"Successfully requested deletion of document with ID: {id} from '{collection_name}'")
 
         # Fix: Revert to plain text success message
@@ -937,9 +1172,177 @@ async def _delete_document_by_id_impl(input_data: DeleteDocumentByIdInput) -> Li
         raise McpError(ErrorData(code=INTERNAL_ERROR, message=error_message))
 
 
+def _parse_optional_filter(value: str, field_name: str) -> Optional[Dict[str, Any]]:
+    """Parses an optional JSON object argument (a filter or patch); empty means none."""
+    if not value:
+        return None
+    try:
+        parsed = json.loads(value)
+        if not isinstance(parsed, dict):
+            raise ValueError(f"{field_name} must be a JSON object (dict).")
+    except (json.JSONDecodeError, ValueError) as e:
+        raise McpError(ErrorData(code=INVALID_PARAMS, message=f"Invalid JSON format or type for '{field_name}': {e}"))
+    return parsed
+
+
+def _matching_ids(
+    collection,
+    ids: List[str],
+    where: Optional[Dict[str, Any]],
+    where_document: Optional[Dict[str, Any]],
+) -> List[str]:
+    """Resolves IDs and/or filters to the IDs that currently exist, reading IDs only."""
+    if ids:
+        matched: List[str] = []
+        # Chunk long ID lists so each get stays bounded
+        for start in range(0, len(ids), DELETE_SCAN_PAGE_SIZE):
+            chunk = ids[start : start + DELETE_SCAN_PAGE_SIZE]
+            matched.extend(collection.get(ids=chunk, where=where, where_document=where_document, include=[])["ids"])
+        return matched
+    matched = []
+    for page in get_pages(collection, DELETE_SCAN_PAGE_SIZE, where=where, where_document=where_document, include=[]):
+        matched.extend(page["ids"])
+    return matched
+
+
+async def _report_progress(progress: float, total: float, message: str) -> None:
+    """Sends an MCP progress notification if the caller asked for progress; never fails the tool."""
+    try:
+        ctx = request_ctx.get()
+    except LookupError:
+        return
+    token = getattr(ctx.meta, "progressToken", None) if ctx.meta else None
+    if token is None:
+        return
+    try:
+        await ctx.session.send_progress_notification(token, progress, total=total, message=message)
+    except Exception as e:
+        get_logger("tools.document.delete_documents").debug(f"Could not send progress notification: {e}")
+
+
+async def _delete_documents_impl(input_data: DeleteDocumentsInput) -> List[types.TextContent]:
+    """Implementation for deleting many documents by IDs and/or `where`/`where_document` filters.
+
+    Matching IDs are resolved first (IDs only, paged), then deleted in batches of
+    `batch_size`. The sidecar indexes and search caches are updated once per batch,
+    and a progress notification is sent after each batch when the caller provided a
+    progress token. With `dry_run`, only the match count and a sample of IDs are returned.
+    """
+    logger = get_logger("tools.document.delete_documents")
+    collection_name = input_data.collection_name
+
+    # --- Validation ---
+    validate_collection_name(collection_name)
+    where_filter = _parse_optional_filter(input_data.where, "where")
+    where_document_filter = _parse_optional_filter(input_data.where_document, "where_document")
+    if not input_data.ids and where_filter is None and where_document_filter is None:
+        raise McpError(
+            ErrorData(
+                code=INVALID_PARAMS,
+                message="Provide `ids`, `where` or `where_document`; deleting every document requires a filter.",
+            )
+        )
+    # --- End Validation ---
+
+    start = time.perf_counter()
+    try:
+        client = get_chroma_client()
+        collection = resolve_collection(client, name=collection_name)
+        matched = _matching_ids(collection, list(dict.fromkeys(input_data.ids)), where_filter, where_document_filter)
+        result: Dict[str, Any] = {
+            "collection_name": collection_name,
+            "matched": len(matched),
+            "dry_run": input_data.dry_run,
+        }
+        if input_data.dry_run:
+            result["sample_ids"] = matched[:10]
+            logger.info(f"Dry run: {len(matched)} documents in '{collection_name}' match the delete request.")
+            return [types.TextContent(type="text", text=json.dumps(result))]
+
+        deleted = 0
+        batches = 0
+        for offset in range(0, len(matched), input_data.batch_size):
+            batch = matched[offset : offset + input_data.batch_size]
+            version_before = _version_before_write(collection_name, collection)
+            collection.delete(ids=batch)
+            _on_documents_deleted(collection_name, batch, collection=collection, version_before=version_before)
+            deleted += len(batch)
+            batches += 1
+            logger.info(f"Deleted {deleted}/{len(matched)} documents from '{collection_name}' (batch {batches}).")
+            await _report_progress(deleted, len(matched), f"Deleted {deleted}/{len(matched)} documents")
+
+        result.update({"deleted": deleted, "batches": batches, "seconds": round(time.perf_counter() - start, 3)})
+        return [types.TextContent(type="text", text=json.dumps(result))]
+    except McpError:
+        raise
+    except Exception as e:
+        if "does not exist" in str(e):
+            logger.warning(f"Collection '{collection_name}' not found for delete_documents.")
+            raise McpError(ErrorData(code=INVALID_PARAMS, message=f"Collection '{collection_name}' not found."))
+        logger.exception(f"Unexpected error deleting documents from '{collection_name}': {e}")
+        raise McpError(ErrorData(code=INTERNAL_ERROR, message=f"ChromaDB Error: Failed to delete documents. {str(e)}"))
+
+
 # --- Query Documents Impl Variants --- #
 
 
+def _query_embedding_function(collection):
+    """The embedding function for query texts: the collection's own, else the server default."""
+    return getattr(collection, "_embedding_function", None) or get_embedding_function(
+        get_server_config().embedding_function_name
+    )
+
+
+def _query_with_mmr(
+    collection,
+    query_texts: List[str],
+    n_results: int,
+    lambda_mult: float,
+    **query_kwargs: Any,
+) -> Tuple[Dict[str, List[Any]], Dict[str, Any]]:
+    """Over-fetches candidates with embeddings and re-ranks them with MMR.
+
+    Fetches `n_results * DEFAULT_MMR_FETCH_MULTIPLIER` candidates per query and keeps the
+    `n_results` selected by `mmr_select`. Returns the trimmed per-query result lists and
+    stats with the fetch (embed + query) and re-rank times reported separately.
+
+    Query texts are embedded with the collection's own embedding function so they
+    share a space with the stored vectors; the server default is only used when
+    the collection has none attached.
+    """
+    fetch_start = time.perf_counter()
+    query_embeddings = _query_embedding_function(collection)(query_texts)
+    candidates: QueryResult = collection.query(
+        query_embeddings=query_embeddings,
+        n_results=n_results * DEFAULT_MMR_FETCH_MULTIPLIER,
+        include=["documents", "metadatas", "distances", "embeddings"],
+        **query_kwargs,
+    )
+    fetch_ms = (time.perf_counter() - fetch_start) * 1000
+
+    rerank_start = time.perf_counter()
+    result: Dict[str, List[Any]] = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+    num_candidates = 0
+    for i, query_embedding in enumerate(query_embeddings):
+        all_embeddings = candidates.get("embeddings")
+        embeddings = all_embeddings[i] if all_embeddings is not None and i < len(all_embeddings) else []
+        num_candidates += len(embeddings)
+        order = mmr_select(query_embedding, embeddings, n_results, lambda_mult) if len(embeddings) else []
+        for key in result:
+            rows = candidates.get(key)
+            row = rows[i] if rows is not None and i < len(rows) and rows[i] is not None else []
+            result[key].append([row[j] for j in order] if len(row) else [])
+    rerank_ms = (time.perf_counter() - rerank_start) * 1000
+
+    stats = {
+        "diversity": lambda_mult,
+        "candidates_fetched": num_candidates,
+        "fetch_ms": round(fetch_ms, 3),
+        "rerank_ms": round(rerank_ms, 3),
+    }
+    return result, stats
+
+
 async def _query_documents_impl(input_data: QueryDocumentsInput) -> List[types.TextContent]:
     """Implementation for querying documents (no filters). Queries primary collection and derived learnings."""
     logger = get_logger("tools.document.query")
@@ -952,18 +1355,33 @@ async def _query_documents_impl(input_data: QueryDocumentsInput) -> List[types.T
 
     primary_results: Optional[QueryResult] = None
     learnings_results: Optional[QueryResult] = None
+    mmr_stats: Optional[Dict[str, Any]] = None
 
     # 1. Query Primary Collection
     try:
         logger.debug(f"Querying primary collection: {primary_collection_name}")
-        primary_collection = client.get_collection(primary_collection_name)
-        primary_results = primary_collection.query(
-            query_texts=query_texts,
-            n_results=n_results,
-            # where=None, # No filters for this tool variant
-            # where_document=None,
-            include=include,
-        )
+        primary_collection = resolve_collection(client, primary_collection_name)
+        if input_data.diversity is not None:
+            primary_results, mmr_stats = _query_with_mmr(
+                primary_collection, query_texts, n_results, input_data.diversity
+            )
+        else:
+            # Small collections are answered by exact search; None means fall back to HNSW
+            primary_results = exact_query(
+                primary_collection_name,
+                primary_collection,
+                query_texts=query_texts,
+                n_results=n_results,
+                include=include,
+            )
+            if primary_results is None:
+                primary_results = primary_collection.query(
+                    query_texts=query_texts,
+                    n_results=n_results,
+                    # where=None, # No filters for this tool variant
+                    # where_document=None,
+                    include=include,
+                )
         logger.debug(f"Primary query successful for {primary_collection_name}")
     except InvalidDimensionException as e:
         logger.error(
@@ -983,12 +1401,20 @@ async def _query_documents_impl(input_data: QueryDocumentsInput) -> List[types.T
     # 2. Query Learnings Collection
     try:
         logger.debug(f"Querying learnings collection: {LEARNINGS_COLLECTION_NAME}")
-        learnings_collection = client.get_collection(LEARNINGS_COLLECTION_NAME)
-        learnings_results = learnings_collection.query(
+        learnings_collection = resolve_collection(client, LEARNINGS_COLLECTION_NAME)
+        learnings_results = exact_query(
+            LEARNINGS_COLLECTION_NAME,
+            learnings_collection,
             query_texts=query_texts,
-            n_results=n_results,  # Request same number for now
+            n_results=n_results,
             include=include,
         )
+        if learnings_results is None:
+            learnings_results = learnings_collection.query(
+                query_texts=query_texts,
+                n_results=n_results,  # Request same number for now
+                include=include,
+            )
         logger.debug(f"Learnings query successful for {LEARNINGS_COLLECTION_NAME}")
     except InvalidDimensionException as e:
         logger.error(
@@ -1124,6 +1550,8 @@ async def _query_documents_impl(input_data: QueryDocumentsInput) -> List[types.T
         "metadatas": cast(Optional[List[List[Dict[str, Any]]]], final_results["metadatas"]),
         "distances": cast(Optional[List[List[float]]], final_results["distances"]),
     }
+    if mmr_stats is not None:
+        final_query_result["stats"] = mmr_stats  # type: ignore[typeddict-unknown-key]
 
     result_json = json.dumps(final_query_result, cls=NumpyEncoder)
     return [types.TextContent(type="text", text=result_json)]
@@ -1156,13 +1584,19 @@ async def _query_documents_with_where_filter_impl(
 
     try:
         client = get_chroma_client()
-        collection = client.get_collection(collection_name)
-        query_result: QueryResult = collection.query(
-            query_texts=query_texts,
-            where=where_filter,
-            n_results=n_results,
-            include=[],  # Default include (empty list passes validation)
-        )
+        collection = resolve_collection(client, collection_name)
+        if input_data.diversity is not None:
+            query_result, mmr_stats = _query_with_mmr(
+                collection, query_texts, n_results, input_data.diversity, where=where_filter
+            )
+            query_result["stats"] = mmr_stats
+        else:
+            query_result: QueryResult = collection.query(
+                query_texts=query_texts,
+                where=where_filter,
+                n_results=n_results,
+                include=[],  # Default include (empty list passes validation)
+            )
         logger.debug(f"ChromaDB query result: {query_result}")
 
         result_json = json.dumps(query_result, cls=NumpyEncoder)
@@ -1227,12 +1661,29 @@ async def _query_documents_with_document_filter_impl(
 
     try:
         client = get_chroma_client()
-        collection = client.get_collection(collection_name)
-        query_result: QueryResult = collection.query(
-            query_texts=query_texts,
-            where_document=where_document_filter,
-            n_results=n_results,
-        )
+        collection = resolve_collection(client, collection_name)
+        # With the FTS accelerator the filter is pre-resolved to an ID restriction
+        matched_ids = resolve_document_filter(collection_name, collection, where_document_filter)
+        if matched_ids is not None and not matched_ids:
+            query_result = {key: [[] for _ in query_texts] for key in ("ids", "documents", "metadatas", "distances")}
+        elif input_data.diversity is not None:
+            restriction = {"ids": sorted(matched_ids)} if matched_ids else {"where_document": where_document_filter}
+            query_result, mmr_stats = _query_with_mmr(
+                collection, query_texts, n_results, input_data.diversity, **restriction
+            )
+            query_result["stats"] = mmr_stats
+        elif matched_ids is None:
+            query_result: QueryResult = collection.query(
+                query_texts=query_texts,
+                where_document=where_document_filter,
+                n_results=n_results,
+            )
+        else:
+            query_result = collection.query(
+                query_texts=query_texts,
+                ids=sorted(matched_ids),
+                n_results=min(n_results, len(matched_ids)),
+            )
         logger.debug(f"ChromaDB query result: {query_result}")
 
         result_json = json.dumps(query_result, cls=NumpyEncoder)
@@ -1266,6 +1717,224 @@ async def _query_documents_with_document_filter_impl(
         )
 
 
+def _dedup_batch_results(per_query: List[Dict[str, List[Any]]]) -> List[Dict[str, List[Any]]]:
+    """Keeps each ID only in the result set of the query it is closest to.
+
+    Args:
+        per_query: One dict per query with parallel 'ids', 'documents', 'metadatas' and 'distances' lists.
+
+    Returns:
+        The same structure with duplicate IDs removed from every query except the best-matching one.
+    """
+    best: Dict[str, tuple] = {}
+    for q_idx, result in enumerate(per_query):
+        for pos, (doc_id, distance) in enumerate(zip(result["ids"], result["distances"])):
+            if doc_id not in best or distance < best[doc_id][0]:
+                best[doc_id] = (distance, q_idx, pos)
+
+    keep = {(q_idx, pos) for _, q_idx, pos in best.values()}
+    deduped = []
+    for q_idx, result in enumerate(per_query):
+        positions = [pos for pos in range(len(result["ids"])) if (q_idx, pos) in keep]
+        deduped.append({key: [values[pos] for pos in positions] for key, values in result.items()})
+    return deduped
+
+
+async def _query_documents_batch_impl(input_data: QueryDocumentsBatchInput) -> List[types.TextContent]:
+    """Implementation for batched querying.
+
+    All query texts are embedded with a single embedding function call and sent to ChromaDB
+    as one `collection.query` with the precomputed embeddings, instead of N separate round trips.
+    """
+    logger = get_logger("tools.document.query_batch")
+    collection_name = input_data.collection_name
+    query_texts = input_data.query_texts
+    n_results = input_data.n_results
+    where_str = input_data.where
+    dedup = input_data.dedup
+
+    # --- Validation ---
+    validate_collection_name(collection_name)
+    if not query_texts:
+        raise McpError(ErrorData(code=INVALID_PARAMS, message="Query texts cannot be empty."))
+    where_filter = None
+    if where_str:
+        try:
+            where_filter = json.loads(where_str)
+            if not isinstance(where_filter, dict):
+                raise ValueError("Where filter must be a JSON object (dict).")
+        except (json.JSONDecodeError, ValueError) as e:
+            raise McpError(
+                ErrorData(code=INVALID_PARAMS, message=f"Invalid JSON format or type for 'where' filter: {e}")
+            )
+    # --- End Validation ---
+
+    logger.info(f"Batch querying '{collection_name}' with {len(query_texts)} queries. N_results: {n_results}.")
+
+    try:
+        client = get_chroma_client()
+        collection = resolve_collection(client, name=collection_name)
+
+        # One embedding call for the whole batch, in the collection's embedding space
+        query_embeddings = _query_embedding_function(collection)(query_texts)
+
+        include = ["documents", "metadatas", "distances"]
+        query_result = None
+        if where_filter is None:
+            query_result = exact_query(
+                collection_name, collection, query_embeddings=query_embeddings, n_results=n_results, include=include
+            )
+        if query_result is None:
+            query_result = collection.query(
+                query_embeddings=query_embeddings,
+                n_results=n_results,
+                where=where_filter,
+                include=include,
+            )
+    except ValueError as e:
+        if f"Collection {collection_name} does not exist" in str(e):
+            logger.warning(f"Collection '{collection_name}' not found for batch query.")
+            raise McpError(ErrorData(code=INVALID_PARAMS, message=f"Collection '{collection_name}' not found."))
+        logger.error(f"Error batch querying collection '{collection_name}': {e}", exc_info=True)
+        raise McpError(
+            ErrorData(code=INTERNAL_ERROR, message=f"An unexpected error occurred during batch query: {str(e)}")
+        )
+    except McpError:
+        raise
+    except Exception as e:
+        logger.error(f"Error batch querying collection '{collection_name}': {e}", exc_info=True)
+        raise McpError(
+            ErrorData(code=INTERNAL_ERROR, message=f"An unexpected error occurred during batch query: {str(e)}")
+        )
+
+    # Split the batched result into one entry per query
+    per_query: List[Dict[str, List[Any]]] = []
+    for i in range(len(query_texts)):
+        per_query.append(
+            {
+                key: list((query_result.get(key) or [[]] * len(query_texts))[i] or [])
+                for key in ("ids", "documents", "metadatas", "distances")
+            }
+        )
+
+    if dedup:
+        per_query = _dedup_batch_results(per_query)
+
+    results = [{"query": query_text, **result} for query_text, result in zip(query_texts, per_query)]
+    logger.info(f"Batch query on '{collection_name}' returned {sum(len(r['ids']) for r in results)} results.")
+
+    result_json = json.dumps(
+        {"results": results, "num_queries": len(query_texts), "deduplicated": dedup}, cls=NumpyEncoder
+    )
+    return [types.TextContent(type="text", text=result_json)]
+
+
+def _reciprocal_rank_fusion(rankings: Dict[str, List[str]], rrf_k: int = DEFAULT_RRF_K) -> List[Tuple[str, float]]:
+    """Fuses several ranked ID lists into one, scoring each ID by sum(1 / (rrf_k + rank)).
+
+    Args:
+        rankings: Mapping of retriever name to its ranked list of IDs (best first).
+        rrf_k: Fusion constant.
+
+    Returns:
+        (id, score) pairs ordered by descending fused score.
+    """
+    scores: Dict[str, float] = {}
+    for ranked_ids in rankings.values():
+        for rank, doc_id in enumerate(ranked_ids, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+async def _hybrid_query_impl(input_data: HybridQueryInput) -> List[types.TextContent]:
+    """Implementation for hybrid search.
+
+    Runs BM25 over the collection's sidecar lexical index and a vector query in parallel,
+    then merges both rankings with reciprocal rank fusion. The lexical index is built
+    from the stored documents on first use.
+    """
+    logger = get_logger("tools.document.hybrid_query")
+    collection_name = input_data.collection_name
+    query_text = input_data.query_text
+    n_results = input_data.n_results
+    candidate_k = max(input_data.candidate_k, n_results)
+
+    # --- Validation ---
+    validate_collection_name(collection_name)
+    if not query_text:
+        raise McpError(ErrorData(code=INVALID_PARAMS, message="Query text cannot be empty."))
+    # --- End Validation ---
+
+    logger.info(f"Hybrid querying '{collection_name}'. N_results: {n_results}, candidates: {candidate_k}.")
+
+    try:
+        client = get_chroma_client()
+        collection = resolve_collection(client, name=collection_name)
+
+        def _vector_search() -> QueryResult:
+            # Embedded with the collection's own embedding function, so the vector leg searches its space
+            return collection.query(
+                query_embeddings=_query_embedding_function(collection)([query_text]),
+                n_results=candidate_k,
+                include=["documents", "metadatas", "distances"],
+            )
+
+        def _lexical_search() -> List[Tuple[str, float]]:
+            index = ensure_lexical_index(collection_name, collection)
+            return index.search(query_text, candidate_k)
+
+        vector_result, lexical_hits = await asyncio.gather(
+            asyncio.to_thread(_vector_search), asyncio.to_thread(_lexical_search)
+        )
+
+        vector_ids = list((vector_result.get("ids") or [[]])[0])
+        lexical_ids = [doc_id for doc_id, _ in lexical_hits]
+        fused = _reciprocal_rank_fusion({"vector": vector_ids, "lexical": lexical_ids}, input_data.rrf_k)[:n_results]
+
+        # Documents/metadatas come from the vector result where possible; fetch lexical-only hits in one get
+        details: Dict[str, Tuple[Any, Any]] = {}
+        vector_docs = (vector_result.get("documents") or [[]])[0] or []
+        vector_metas = (vector_result.get("metadatas") or [[]])[0] or []
+        for i, doc_id in enumerate(vector_ids):
+            details[doc_id] = (
+                vector_docs[i] if i < len(vector_docs) else None,
+                vector_metas[i] if i < len(vector_metas) else None,
+            )
+        missing_ids = [doc_id for doc_id, _ in fused if doc_id not in details]
+        if missing_ids:
+            fetched = collection.get(ids=missing_ids, include=["documents", "metadatas"])
+            for i, doc_id in enumerate(fetched.get("ids") or []):
+                details[doc_id] = ((fetched.get("documents") or [])[i], (fetched.get("metadatas") or [])[i])
+    except ValueError as e:
+        if f"Collection {collection_name} does not exist" in str(e):
+            logger.warning(f"Collection '{collection_name}' not found for hybrid query.")
+            raise McpError(ErrorData(code=INVALID_PARAMS, message=f"Collection '{collection_name}' not found."))
+        logger.error(f"Error hybrid querying collection '{collection_name}': {e}", exc_info=True)
+        raise McpError(
+            ErrorData(code=INTERNAL_ERROR, message=f"An unexpected error occurred during hybrid query: {str(e)}")
+        )
+    except McpError:
+        raise
+    except Exception as e:
+        logger.error(f"Error hybrid querying collection '{collection_name}': {e}", exc_info=True)
+        raise McpError(
+            ErrorData(code=INTERNAL_ERROR, message=f"An unexpected error occurred during hybrid query: {str(e)}")
+        )
+
+    vector_rank = {doc_id: rank for rank, doc_id in enumerate(vector_ids, start=1)}
+    lexical_rank = {doc_id: rank for rank, doc_id in enumerate(lexical_ids, start=1)}
+    result_data = {
+        "ids": [doc_id for doc_id, _ in fused],
+        "documents": [details.get(doc_id, (None, None))[0] for doc_id, _ in fused],
+        "metadatas": [details.get(doc_id, (None, None))[1] for doc_id, _ in fused],
+        "scores": [score for _, score in fused],
+        "vector_ranks": [vector_rank.get(doc_id) for doc_id, _ in fused],
+        "lexical_ranks": [lexical_rank.get(doc_id) for doc_id, _ in fused],
+    }
+    logger.info(f"Hybrid query on '{collection_name}' returned {len(fused)} fused results.")
+    return [types.TextContent(type="text", text=json.dumps(result_data, cls=NumpyEncoder))]
+
+
 # --- Start: New Include Variant Implementations ---
 
 
@@ -1285,7 +1954,7 @@ async def _get_documents_by_ids_include_impl(
 
     try:
         client = get_chroma_client()
-        collection = client.get_collection(collection_name)
+        collection = resolve_collection(client, collection_name)
         get_result: GetResult = collection.get(ids=ids, include=include_fields)
         logger.debug(f"ChromaDB get result: {get_result}")
 
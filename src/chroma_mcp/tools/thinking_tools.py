@@ -7,9 +7,10 @@ import uuid
 import json
 import logging
 
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Sequence, Tuple
 from dataclasses import dataclass, asdict
 
+import numpy as np
 from mcp import types
 from mcp.shared.exceptions import McpError
 from mcp.types import ErrorData, INVALID_PARAMS, INTERNAL_ERROR
@@ -26,11 +27,37 @@ from ..utils import (
     ValidationError,
     get_server_config,
 )
+from ..utils.exact_search import exact_query
+from ..utils.collection_stats import distance_space
+from ..utils.retention import get_archive_collection
+from ..utils.collection_version import collection_version
+from ..utils.branch_tree import ThoughtPosition, branch_path, child_branches, thought_id as stored_thought_id
+from ..utils.session_index import (
+    get_session_thoughts,
+    is_session_index_tracked,
+    previous_path_thoughts,
+    sync_session_thought,
+)
+from ..utils.session_embeddings import (
+    SESSION_EMBEDDING_MEAN,
+    add_to_session_mean,
+    count_session_thoughts,
+    get_branch_tree,
+    mark_reconciled,
+    mark_session_dirty,
+    needs_reconcile,
+    refresh_sessions,
+    stale_sessions,
+)
 
 # Constants
 THOUGHTS_COLLECTION = "sequential_thoughts_v1"
 SESSIONS_COLLECTION = "thinking_sessions"
 DEFAULT_SIMILARITY_THRESHOLD = 0.6
+# Candidates fetched per query grow by this factor while post-query filters leave too few results
+OVERFETCH_FACTOR = 4
+# Upper bound on the candidates fetched by one similar-thoughts query
+MAX_THOUGHT_CANDIDATES = 1000
 
 
 @dataclass
@@ -78,6 +105,31 @@ class SequentialThinkingWithCustomDataInput(SequentialThinkingInput):
     model_config = ConfigDict(extra="forbid")
 
 
+class ThoughtBatchItem(BaseModel):
+    thought: str = Field(..., description="Content of the thought.")
+    thought_number: int = Field(..., gt=0, description="Sequential number of this thought (must be > 0).")
+    total_thoughts: int = Field(
+        default=0, ge=0, description="Total anticipated thoughts. 0 uses the number of thoughts in the batch."
+    )
+    branch_id: str = Field(default="", description="Optional branch identifier. Empty for the main trunk.")
+    branch_from_thought: int = Field(
+        default=0, description="Parent thought number (> 0) a new branch originates from. 0 if not branching."
+    )
+    next_thought_needed: bool = Field(False, description="Flag indicating if a subsequent thought is expected.")
+    custom_data: str = Field(default="", description="Optional metadata as a JSON object string.")
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class RecordThoughtsInput(BaseModel):
+    thoughts: List[ThoughtBatchItem] = Field(
+        ..., min_length=1, description="Thoughts to record, in order, with optional branch information."
+    )
+    session_id: str = Field(default="", description="Unique session ID. If empty, a new session ID is generated.")
+
+    model_config = ConfigDict(extra="forbid")
+
+
 class FindSimilarThoughtsInput(BaseModel):
     query: str = Field(..., description="Text to search for similar thoughts.")
     session_id: str = Field(
@@ -89,6 +141,16 @@ class FindSimilarThoughtsInput(BaseModel):
         description="Similarity score threshold (0.0 to 1.0). Lower distance is more similar. -1.0 to use default.",
     )
     include_branches: bool = Field(True, description="Whether to include thoughts from branches in the search.")
+    include_archive: bool = Field(
+        False, description="Also search thoughts moved to the archive collection by retention policies."
+    )
+    branch_id: str = Field(default="", description="If provided, limits search to this branch. Empty for all.")
+    since_timestamp: int = Field(
+        default=0, ge=0, description="Only thoughts recorded at or after this Unix timestamp. 0 for no lower bound."
+    )
+    until_timestamp: int = Field(
+        default=0, ge=0, description="Only thoughts recorded at or before this Unix timestamp. 0 for no upper bound."
+    )
 
     model_config = ConfigDict(extra="forbid")
 
@@ -100,6 +162,16 @@ class GetSessionSummaryInput(BaseModel):
     model_config = ConfigDict(extra="forbid")
 
 
+class GetBranchPathInput(BaseModel):
+    session_id: str = Field(..., description="The thinking session containing the branch.")
+    branch_id: str = Field(default="", description="Branch whose path is returned. Empty for the main trunk.")
+    include_subtree: bool = Field(
+        False, description="Also return the thoughts of the branches forking from this branch."
+    )
+
+    model_config = ConfigDict(extra="forbid")
+
+
 class FindSimilarSessionsInput(BaseModel):
     query: str = Field(..., description="Text to search for similar thinking sessions based on overall content.")
     n_results: int = Field(5, ge=1, description="Maximum number of similar sessions to return (must be >= 1).")
@@ -116,6 +188,91 @@ class FindSimilarSessionsInput(BaseModel):
 # --- Implementation Functions ---
 
 
+def _parse_custom_data(custom_data_json: Optional[str], logger) -> Optional[Dict[str, Any]]:
+    """Parses a thought's `custom_data` JSON string, raising INVALID_PARAMS if it is not a JSON object."""
+    if not custom_data_json:
+        return None
+    try:
+        parsed_custom_data = json.loads(custom_data_json)
+        if not isinstance(parsed_custom_data, dict):
+            raise ValueError("Custom data string must decode to a JSON object (dictionary).")
+    except json.JSONDecodeError as e:
+        logger.warning(f"Failed to parse custom_data JSON string: {e}")
+        raise McpError(ErrorData(code=INVALID_PARAMS, message=f"Invalid JSON format for custom_data string: {str(e)}"))
+    except ValueError as e:  # Catch the isinstance check
+        logger.warning(f"Custom data did not decode to a dictionary: {e}")
+        raise McpError(ErrorData(code=INVALID_PARAMS, message=str(e)))
+    return parsed_custom_data
+
+
+def _thought_id_and_metadata(metadata: ThoughtMetadata) -> Tuple[str, Dict[str, Any]]:
+    """Returns a thought's ID and its metadata as stored in Chroma.
+
+    None values are dropped and `custom_data` is flattened into `custom:<key>` fields.
+    """
+    thought_id = stored_thought_id(metadata.session_id, metadata.thought_number, metadata.branch_id)
+
+    metadata_dict = {k: v for k, v in asdict(metadata).items() if v is not None}
+    custom_data = metadata_dict.pop("custom_data", None)
+    if isinstance(custom_data, dict):
+        for ck, cv in custom_data.items():
+            metadata_dict[f"custom:{ck}"] = cv
+    return thought_id, metadata_dict
+
+
+def _thought_result(thought_id: str, content: Optional[str], raw_meta: Dict[str, Any]) -> Dict[str, Any]:
+    """A stored thought as returned by the tools, with `custom:` fields folded back into `custom_data`."""
+    reconstructed_custom = {k[len("custom:") :]: v for k, v in raw_meta.items() if k.startswith("custom:")}
+    base_meta = {k: v for k, v in raw_meta.items() if not k.startswith("custom:")}
+    if reconstructed_custom:
+        base_meta["custom_data"] = reconstructed_custom
+    return {"id": thought_id, "content": content, "metadata": base_meta}
+
+
+def _update_session_entry(
+    client,
+    embedding_function,
+    session_id: str,
+    text: str,
+    embedding: Any,
+    first_thought: bool = False,
+    thought_count: int = 1,
+    positions: Sequence[ThoughtPosition] = (),
+) -> None:
+    """Records new thoughts in the session's entry in the sessions collection.
+
+    Best effort: a failure is logged and must not lose the thoughts already recorded.
+    For `thought_count` > 1, `embedding` is the sum of the thoughts' embeddings.
+    `positions` extend the session's branch tree.
+    """
+    try:
+        sessions_collection = client.get_or_create_collection(
+            name=SESSIONS_COLLECTION, embedding_function=embedding_function
+        )
+        if get_server_config().session_embedding_mode == SESSION_EMBEDDING_MEAN:
+            add_to_session_mean(
+                sessions_collection,
+                session_id,
+                text,
+                embedding=embedding,
+                first_thought=first_thought,
+                thought_count=thought_count,
+                positions=positions,
+            )
+        else:
+            mark_session_dirty(
+                sessions_collection,
+                session_id,
+                text,
+                embedding=embedding,
+                first_thought=first_thought,
+                thought_count=thought_count,
+                positions=positions,
+            )
+    except Exception as e:
+        get_logger("tools.thinking").warning(f"Could not update session entry for {session_id}: {e}", exc_info=True)
+
+
 # Wrapper for the base variant (no custom_data)
 async def _sequential_thinking_impl(input_data: SequentialThinkingInput) -> List[types.TextContent]:
     """Records a thought within a thinking session (without custom data).
@@ -174,22 +331,7 @@ async def _base_sequential_thinking_impl(
         next_thought_needed = input_data.next_thought_needed  # Has default
         # custom_data_json is passed as an argument (remains Optional[str])
 
-        # --- Parse Custom Data JSON --- #
-        parsed_custom_data: Optional[Dict[str, Any]] = None
-        if custom_data_json:
-            try:
-                parsed_custom_data = json.loads(custom_data_json)
-                if not isinstance(parsed_custom_data, dict):
-                    raise ValueError("Custom data string must decode to a JSON object (dictionary).")
-            except json.JSONDecodeError as e:
-                logger.warning(f"Failed to parse custom_data JSON string: {e}")
-                raise McpError(
-                    ErrorData(code=INVALID_PARAMS, message=f"Invalid JSON format for custom_data string: {str(e)}")
-                )
-            except ValueError as e:  # Catch the isinstance check
-                logger.warning(f"Custom data did not decode to a dictionary: {e}")
-                raise McpError(ErrorData(code=INVALID_PARAMS, message=str(e)))
-        # --- End Parsing --- #
+        parsed_custom_data = _parse_custom_data(custom_data_json, logger)
 
         # Use root logger before client calls
         logging.info("--- Getting Chroma client... ---")
@@ -218,44 +360,33 @@ async def _base_sequential_thinking_impl(
         effective_branch_id = branch_id if branch_id else None
         # IMPORTANT: Server-side timestamp generation - no reliance on AI model's perception
         timestamp = int(time.time())  # ← Using server-side timestamp
-        metadata = ThoughtMetadata(
-            session_id=effective_session_id,
-            thought_number=thought_number,
-            total_thoughts=total_thoughts,
-            timestamp=timestamp,  # ← Using server-side timestamp from above
-            branch_from_thought=effective_branch_from_thought,  # Use effective value
-            branch_id=effective_branch_id,  # Use effective value
-            next_thought_needed=next_thought_needed,
-            custom_data=parsed_custom_data,
+        thought_id, metadata_dict_for_chroma = _thought_id_and_metadata(
+            ThoughtMetadata(
+                session_id=effective_session_id,
+                thought_number=thought_number,
+                total_thoughts=total_thoughts,
+                timestamp=timestamp,  # ← Using server-side timestamp from above
+                branch_from_thought=effective_branch_from_thought,  # Use effective value
+                branch_id=effective_branch_id,  # Use effective value
+                next_thought_needed=next_thought_needed,
+                custom_data=parsed_custom_data,
+            )
         )
 
-        thought_id = f"thought_{effective_session_id}_{thought_number}"
-        if effective_branch_id:  # Check effective value
-            thought_id += f"_branch_{effective_branch_id}"
-
-        # FIX: Construct metadata dictionary correctly using asdict for dataclass
-        # Convert dataclass instance to dictionary
-        base_metadata_dict = asdict(metadata)
-
-        # Manually filter out None values
-        filtered_metadata_dict = {k: v for k, v in base_metadata_dict.items() if v is not None}
-
-        # Extract custom_data if it exists (and remove it from the main dict)
-        # Use .pop on the filtered dict to get custom_data and remove it in one step
-        custom_data_to_flatten = filtered_metadata_dict.pop("custom_data", None)
-
-        # If custom_data was present and is a dict, flatten it with prefix
-        if isinstance(custom_data_to_flatten, dict):
-            for ck, cv in custom_data_to_flatten.items():
-                filtered_metadata_dict[f"custom:{ck}"] = cv
-
-        # The filtered_metadata_dict now contains the correct structure for Chroma
-        metadata_dict_for_chroma = filtered_metadata_dict
-
         try:
             # Use root logger around add
             logging.info(f"--- Attempting collection.add for ID: {thought_id} ---")
-            collection.add(documents=[thought], metadatas=[metadata_dict_for_chroma], ids=[thought_id])
+            version_before = collection_version(collection) if is_session_index_tracked(THOUGHTS_COLLECTION) else None
+            # Embed once; the vector is reused for a new session's entry in the sessions collection
+            embeddings = default_ef([thought])
+            collection.add(
+                documents=[thought], embeddings=embeddings, metadatas=[metadata_dict_for_chroma], ids=[thought_id]
+            )
+            thought_record = {"id": thought_id, "content": thought, "metadata": metadata_dict_for_chroma}
+            version_after = collection_version(collection) if version_before is not None or thought_number > 1 else None
+            sync_session_thought(
+                THOUGHTS_COLLECTION, thought_record, version_before=version_before, version_after=version_after
+            )
             logging.info(f"--- Successfully added thought ID: {thought_id} ---")
         except (ValueError, InvalidDimensionException) as e:
             # Use root logger for error
@@ -267,73 +398,25 @@ async def _base_sequential_thinking_impl(
                 )
             )
 
-        # --- KEEPING Previous Thoughts Logic ---
+        # Keep the session's vector current; a failure here must not lose the recorded thought
+        _update_session_entry(
+            client,
+            default_ef,
+            effective_session_id,
+            thought,
+            embeddings[0],
+            first_thought=thought_number == 1 and effective_branch_id is None,
+            positions=[(thought_number, effective_branch_id, effective_branch_from_thought)],
+        )
+
+        # --- Previous Thoughts Logic ---
+        # Thoughts before this one on its branch path: read once with a `thought_number < N`
+        # filter, then served from the per-path cache that the write above appended to.
         previous_thoughts = []
         if thought_number > 1:
-            # Fetch ALL thoughts for the session first
-            where_clause_get = {"session_id": effective_session_id}
-
             try:
-                # Simpler get call, fetch all thoughts for the session
-                results = collection.get(
-                    where=where_clause_get,
-                    include=["documents", "metadatas"],
-                )
-
-                thought_data = []
-                if results and results.get("ids"):
-                    for i in range(len(results["ids"])):
-                        raw_meta = results["metadatas"][i] or {}
-                        thought_num = raw_meta.get("thought_number")
-
-                        # Filter for previous thoughts ONLY
-                        if thought_num is None or thought_num >= thought_number:
-                            continue  # Skip current/future thoughts
-
-                        # --- Python-based branch filtering ---
-                        thought_branch_id = raw_meta.get("branch_id")
-
-                        if effective_branch_id:
-                            # If we are IN a branch, include thoughts from this branch
-                            # OR from the main trunk before the branch point
-                            thought_branch_from = raw_meta.get("branch_from_thought")
-                            is_in_correct_branch = thought_branch_id == effective_branch_id
-                            is_on_main_trunk_before_branch = thought_branch_id is None and (
-                                effective_branch_from_thought is None or thought_num < effective_branch_from_thought
-                            )
-                            if not (is_in_correct_branch or is_on_main_trunk_before_branch):
-                                continue  # Skip thoughts not relevant to this branch history
-                        else:
-                            # If we are NOT in a branch, skip any thought that has a branch_id
-                            if thought_branch_id is not None:
-                                continue
-                        # --- End Python-based branch filtering ---
-
-                        # Reconstruct custom data (if any)
-                        reconstructed_custom = {
-                            k[len("custom:") :]: v for k, v in raw_meta.items() if k.startswith("custom:")
-                        }
-                        base_meta = {k: v for k, v in raw_meta.items() if not k.startswith("custom:")}
-                        if reconstructed_custom:
-                            base_meta["custom_data"] = reconstructed_custom
-
-                        thought_data.append(
-                            {
-                                "id": results["ids"][i],
-                                "content": results["documents"][i],
-                                "metadata": base_meta,
-                                "thought_number_sort_key": thought_num,  # Use the already retrieved thought_number
-                            }
-                        )
-
-                # Sort based on thought_number
-                sorted_thoughts = sorted(thought_data, key=lambda x: x["thought_number_sort_key"])
-
-                # Final list without the sort key
-                previous_thoughts = [
-                    {k: v for k, v in thought.items() if k != "thought_number_sort_key"} for thought in sorted_thoughts
-                ]
-
+                for previous in previous_path_thoughts(THOUGHTS_COLLECTION, collection, thought_record, version_after):
+                    previous_thoughts.append(_thought_result(previous["id"], previous["content"], previous["metadata"]))
             except Exception as e:
                 logger.warning(
                     f"Could not retrieve previous thoughts for session {effective_session_id}: {e}",
@@ -372,6 +455,162 @@ async def _base_sequential_thinking_impl(
         raise McpError(ErrorData(code=INTERNAL_ERROR, message=f"An unexpected error occurred: {str(e)}"))
 
 
+async def _record_thoughts_impl(input_data: RecordThoughtsInput) -> List[types.TextContent]:
+    """Records an ordered batch of thoughts with one batched embedding and one `collection.add`.
+
+    Args:
+        input_data: A RecordThoughtsInput object containing validated arguments.
+
+    Returns:
+        A list containing a single TextContent object with the session ID and the thought IDs.
+
+    Raises:
+        McpError: If the batch is invalid (custom data, duplicate thought IDs) or the write fails.
+    """
+    logger = get_logger("tools.thinking")
+    try:
+        effective_session_id = input_data.session_id or str(uuid.uuid4())
+        timestamp = int(time.time())
+        batch_size = len(input_data.thoughts)
+
+        ids: List[str] = []
+        documents: List[str] = []
+        metadatas: List[Dict[str, Any]] = []
+        for item in input_data.thoughts:
+            thought_id, metadata = _thought_id_and_metadata(
+                ThoughtMetadata(
+                    session_id=effective_session_id,
+                    thought_number=item.thought_number,
+                    total_thoughts=item.total_thoughts or batch_size,
+                    timestamp=timestamp,
+                    branch_from_thought=item.branch_from_thought if item.branch_from_thought > 0 else None,
+                    branch_id=item.branch_id or None,
+                    next_thought_needed=item.next_thought_needed,
+                    custom_data=_parse_custom_data(item.custom_data, logger),
+                )
+            )
+            if thought_id in ids:
+                raise McpError(ErrorData(code=INVALID_PARAMS, message=f"Duplicate thought in batch: {thought_id}"))
+            ids.append(thought_id)
+            documents.append(item.thought)
+            metadatas.append(metadata)
+
+        client = get_chroma_client()
+        default_ef = get_embedding_function(get_server_config().embedding_function_name)
+        try:
+            collection = client.get_or_create_collection(name=THOUGHTS_COLLECTION, embedding_function=default_ef)
+        except Exception as e:
+            raise McpError(ErrorData(code=INTERNAL_ERROR, message=f"Could not access thinking collection: {str(e)}"))
+
+        try:
+            version_before = collection_version(collection) if is_session_index_tracked(THOUGHTS_COLLECTION) else None
+            embeddings = default_ef(documents)
+            collection.add(ids=ids, documents=documents, embeddings=embeddings, metadatas=metadatas)
+            version_after = collection_version(collection) if version_before is not None else None
+            for thought_id, document, metadata in zip(ids, documents, metadatas):
+                sync_session_thought(
+                    THOUGHTS_COLLECTION,
+                    {"id": thought_id, "content": document, "metadata": metadata},
+                    version_before=version_before,
+                    version_after=version_after,
+                )
+                # Later thoughts of the batch apply on top of the state the first one advanced to
+                version_before = version_after
+        except (ValueError, InvalidDimensionException) as e:
+            logger.error(f"Error adding thought batch: {e}", exc_info=True)
+            raise McpError(ErrorData(code=INTERNAL_ERROR, message=f"ChromaDB Error adding thoughts: {str(e)}"))
+
+        _update_session_entry(
+            client,
+            default_ef,
+            effective_session_id,
+            " ".join(documents),
+            np.asarray(embeddings, dtype=np.float64).sum(axis=0) if batch_size > 1 else embeddings[0],
+            first_thought=any(item.thought_number == 1 and not item.branch_id for item in input_data.thoughts),
+            thought_count=batch_size,
+            positions=[
+                (metadata["thought_number"], metadata.get("branch_id"), metadata.get("branch_from_thought"))
+                for metadata in metadatas
+            ],
+        )
+
+        result_data = {"session_id": effective_session_id, "thought_ids": ids, "recorded": batch_size}
+        return [types.TextContent(type="text", text=json.dumps(result_data, indent=2))]
+
+    except McpError:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error recording thought batch: {e}", exc_info=True)
+        raise McpError(ErrorData(code=INTERNAL_ERROR, message=f"An unexpected error occurred: {str(e)}"))
+
+
+ThoughtRow = Tuple[str, Optional[str], Dict[str, Any], float]  # (id, document, metadata, distance)
+
+
+def _similar_thoughts_where(
+    session_id: str, branch_id: str, since_timestamp: int, until_timestamp: int
+) -> Optional[Dict[str, Any]]:
+    """`where` filter for the session, branch and timestamp restrictions of a similar-thoughts query."""
+    clauses: List[Dict[str, Any]] = []
+    if session_id:
+        clauses.append({"session_id": session_id})
+    if branch_id:
+        clauses.append({"branch_id": branch_id})
+    if since_timestamp:
+        clauses.append({"timestamp": {"$gte": since_timestamp}})
+    if until_timestamp:
+        clauses.append({"timestamp": {"$lte": until_timestamp}})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def _query_similar_thoughts(
+    collection,
+    query_embeddings: Any,
+    where: Optional[Dict[str, Any]],
+    n_results: int,
+    threshold: float,
+    trunk_only: bool = False,
+) -> List[ThoughtRow]:
+    """Returns up to `n_results` thoughts with `1 - distance >= threshold`, nearest first.
+
+    Trunk-only search cannot be pushed into `where` (Chroma has no filter for a missing
+    `branch_id`), so branch thoughts are dropped after the query. While that leaves fewer
+    than `n_results` matches, the query is repeated with `OVERFETCH_FACTOR` times as many
+    candidates, until a candidate falls below the threshold (all later ones would too),
+    the collection runs out of matches or `MAX_THOUGHT_CANDIDATES` is reached.
+    """
+    keys = ("ids", "documents", "metadatas", "distances")
+    n_candidates = n_results
+    while True:
+        results = collection.query(
+            query_embeddings=query_embeddings,
+            n_results=n_candidates,
+            where=where,
+            include=["documents", "metadatas", "distances"],
+        )
+        rows: List[ThoughtRow] = []
+        if results and results.get("ids") and results["ids"][0]:
+            rows = [(i, d, m or {}, dist) for i, d, m, dist in zip(*(results[key][0] for key in keys))]
+        matches: List[ThoughtRow] = []
+        crossed_threshold = False
+        for row in rows:
+            if 1.0 - row[3] < threshold:
+                crossed_threshold = True
+                break
+            if not trunk_only or row[2].get("branch_id") is None:
+                matches.append(row)
+        if (
+            len(matches) >= n_results
+            or crossed_threshold
+            or len(rows) < n_candidates
+            or n_candidates >= MAX_THOUGHT_CANDIDATES
+        ):
+            return matches[:n_results]
+        n_candidates = min(n_candidates * OVERFETCH_FACTOR, MAX_THOUGHT_CANDIDATES)
+
+
 async def _find_similar_thoughts_impl(input_data: FindSimilarThoughtsInput) -> List[types.TextContent]:
     """Performs a semantic search for similar thoughts.
 
@@ -394,6 +633,7 @@ async def _find_similar_thoughts_impl(input_data: FindSimilarThoughtsInput) -> L
         n_results = input_data.n_results  # Has default
         threshold = input_data.threshold
         include_branches = input_data.include_branches  # Has default
+        branch_id = input_data.branch_id
 
         # Use default threshold if -1.0 is passed
         effective_threshold = DEFAULT_SIMILARITY_THRESHOLD if threshold == -1.0 else threshold
@@ -404,6 +644,16 @@ async def _find_similar_thoughts_impl(input_data: FindSimilarThoughtsInput) -> L
                     code=INVALID_PARAMS, message=f"Threshold must be between 0.0 and 1.0, got {effective_threshold}"
                 )
             )
+        if branch_id and not include_branches:
+            raise McpError(
+                ErrorData(code=INVALID_PARAMS, message="branch_id cannot be combined with include_branches=false")
+            )
+        if (
+            input_data.since_timestamp
+            and input_data.until_timestamp
+            and input_data.since_timestamp > input_data.until_timestamp
+        ):
+            raise McpError(ErrorData(code=INVALID_PARAMS, message="since_timestamp must not be after until_timestamp"))
 
         client = get_chroma_client()
 
@@ -445,20 +695,32 @@ async def _find_similar_thoughts_impl(input_data: FindSimilarThoughtsInput) -> L
                 )
             )
 
-        # Prepare where clause if session_id is provided
-        where_clause = None
-        if session_id:
-            where_clause = {"session_id": session_id}
-            # TODO: Add branch filtering logic if needed based on include_branches
+        # Session, branch and time window are pushed into `where`; trunk-only is applied after the query
+        where_clause = _similar_thoughts_where(
+            session_id, branch_id, input_data.since_timestamp, input_data.until_timestamp
+        )
 
         # Perform query, handle errors
         try:
-            results = collection.query(
-                query_texts=[query],
-                n_results=n_results,
-                where=where_clause,
-                include=["documents", "metadatas", "distances"],
+            # Embedded once: over-fetching and the archive query reuse the vector
+            query_embeddings = default_ef([query])
+            rows = _query_similar_thoughts(
+                collection, query_embeddings, where_clause, n_results, effective_threshold, not include_branches
             )
+            if input_data.include_archive:
+                # Archived entries keep the embeddings they were stored with, so distances are only
+                # comparable while both collections use the same distance space
+                archive = get_archive_collection(client, THOUGHTS_COLLECTION, embedding_function=default_ef)
+                if archive is not None and distance_space(archive) != distance_space(collection):
+                    logger.warning(
+                        f"Not merging '{archive.name}': its distance space differs from '{THOUGHTS_COLLECTION}'."
+                    )
+                    archive = None
+                if archive is not None:
+                    archived = _query_similar_thoughts(
+                        archive, query_embeddings, where_clause, n_results, effective_threshold, not include_branches
+                    )
+                    rows = sorted(rows + archived, key=lambda row: row[3])[:n_results]
         except ValueError as e:  # Catch query-specific errors
             logger.error(f"Error querying thoughts collection '{THOUGHTS_COLLECTION}': {e}", exc_info=True)
             # Raise McpError instead of returning CallToolResult
@@ -469,30 +731,12 @@ async def _find_similar_thoughts_impl(input_data: FindSimilarThoughtsInput) -> L
                 )
             )
 
-        # Process results and filter by threshold
+        # Rows are already within the threshold and filters, nearest first
         similar_thoughts = []
-        if results and results.get("ids") and results["ids"][0]:
-            for i in range(len(results["ids"][0])):
-                distance = results["distances"][0][i]
-                similarity = 1.0 - distance  # Ensure float calculation
-
-                if similarity >= effective_threshold:
-                    raw_meta = results["metadatas"][0][i] or {}
-                    # Reconstruct custom data
-                    reconstructed_custom = {
-                        k[len("custom:") :]: v for k, v in raw_meta.items() if k.startswith("custom:")
-                    }
-                    base_meta = {k: v for k, v in raw_meta.items() if not k.startswith("custom:")}
-                    if reconstructed_custom:
-                        base_meta["custom_data"] = reconstructed_custom
-
-                    thought = {
-                        "id": results["ids"][0][i],  # Include ID
-                        "content": results["documents"][0][i],
-                        "metadata": base_meta,
-                        "similarity": similarity,
-                    }
-                    similar_thoughts.append(thought)
+        for thought_id, document, raw_meta, distance in rows:
+            thought = _thought_result(thought_id, document, raw_meta)
+            thought["similarity"] = 1.0 - distance
+            similar_thoughts.append(thought)
 
         # Success result
         result_data = {
@@ -561,10 +805,11 @@ async def _get_session_summary_impl(input_data: GetSessionSummaryInput) -> List[
 
         # Get thoughts, handle errors
         try:
-            # Fetch ALL documents first
-            logger.debug(f"Fetching all documents from {THOUGHTS_COLLECTION}...")
-            results = collection.get(include=["documents", "metadatas"])  # Fetch all
-            logger.debug(f"Fetched {len(results.get('ids', []))} documents in total.")
+            # Only this session's thoughts: by indexed IDs, or a session_id filter on first use
+            results = get_session_thoughts(
+                THOUGHTS_COLLECTION, collection, session_id, include_branches=include_branches
+            )
+            logger.debug(f"Fetched {len(results.get('ids', []))} thoughts for session '{session_id}'.")
         except ValueError as e:  # Catch errors from get (e.g., bad filter)
             logger.error(f"Error getting thoughts for session '{session_id}': {e}", exc_info=True)
             # Raise McpError instead of returning CallToolResult
@@ -577,28 +822,9 @@ async def _get_session_summary_impl(input_data: GetSessionSummaryInput) -> List[
         if results and results.get("ids"):
             thought_data = []
             for i in range(len(results["ids"])):
-                raw_meta = results["metadatas"][i] or {}
-                # --- Filter by session_id in Python ---
-                if raw_meta.get("session_id") != session_id:
-                    continue
-                # --- Filter by branch_id if needed ---
-                if not include_branches and raw_meta.get("branch_id") is not None:
-                    continue
-
-                # Reconstruct custom data (Corrected logic)
-                reconstructed_custom = {k[len("custom:") :]: v for k, v in raw_meta.items() if k.startswith("custom:")}
-                base_meta = {k: v for k, v in raw_meta.items() if not k.startswith("custom:")}
-                if reconstructed_custom:
-                    base_meta["custom_data"] = reconstructed_custom
-
-                thought_data.append(
-                    {
-                        "id": results["ids"][i],  # Include ID
-                        "content": results["documents"][i],
-                        "metadata": base_meta,  # Use the fully reconstructed base_meta
-                        "thought_number_sort_key": base_meta.get("thought_number", 999999),  # Get from base_meta
-                    }
-                )
+                thought = _thought_result(results["ids"][i], results["documents"][i], results["metadatas"][i] or {})
+                thought["thought_number_sort_key"] = thought["metadata"].get("thought_number", 999999)
+                thought_data.append(thought)
 
             # Sort based on thought_number
             sorted_thoughts = sorted(thought_data, key=lambda x: x["thought_number_sort_key"])
@@ -639,11 +865,96 @@ async def _get_session_summary_impl(input_data: GetSessionSummaryInput) -> List[
         )
 
 
+async def _get_branch_path_impl(input_data: GetBranchPathInput) -> List[types.TextContent]:
+    """Returns the thoughts leading to and including a branch, resolved from the session's branch tree.
+
+    The tree (see `utils.branch_tree`) gives the thought IDs of every segment of the
+    path, so the thoughts are read with a single `get(ids=...)` instead of a session scan.
+
+    Args:
+        input_data: A GetBranchPathInput object containing validated arguments.
+
+    Returns:
+        A list containing a single TextContent object with the ordered `path`, its
+        `segments`, the `child_branches` forking from the branch and, with
+        `include_subtree`, their thoughts in `subtree`.
+
+    Raises:
+        McpError: If the branch does not exist in the session, or on a database error.
+    """
+    logger = get_logger("tools.thinking")
+    session_id = input_data.session_id
+    branch_id = input_data.branch_id
+    try:
+        client = get_chroma_client()
+        default_ef = get_embedding_function(get_server_config().embedding_function_name)
+        try:
+            collection = client.get_or_create_collection(name=THOUGHTS_COLLECTION, embedding_function=default_ef)
+            sessions_collection = client.get_or_create_collection(
+                name=SESSIONS_COLLECTION, embedding_function=default_ef
+            )
+        except Exception as e:
+            raise McpError(ErrorData(code=INTERNAL_ERROR, message=f"Could not access thinking collection: {str(e)}"))
+
+        tree = get_branch_tree(THOUGHTS_COLLECTION, collection, sessions_collection, session_id)
+        segments = branch_path(tree, branch_id)
+        if segments is None:
+            raise McpError(
+                ErrorData(code=INVALID_PARAMS, message=f"Branch '{branch_id}' not found in session '{session_id}'")
+            )
+        children = child_branches(tree, branch_id)
+        fetched = segments + children if input_data.include_subtree else segments
+        ids = [
+            stored_thought_id(session_id, number, segment_branch or None)
+            for segment_branch, _, numbers in fetched
+            for number in numbers
+        ]
+        thoughts: Dict[str, Dict[str, Any]] = {}
+        if ids:
+            results = collection.get(ids=ids, include=["documents", "metadatas"])
+            for i, result_id in enumerate(results.get("ids") or []):
+                thoughts[result_id] = _thought_result(
+                    result_id, results["documents"][i], (results.get("metadatas") or [None])[i] or {}
+                )
+
+        def segment_thoughts(segment_branch: str, numbers: List[int]) -> List[Dict[str, Any]]:
+            # Thoughts archived since the tree was built are skipped
+            segment_ids = (stored_thought_id(session_id, number, segment_branch or None) for number in numbers)
+            return [thoughts[segment_id] for segment_id in segment_ids if segment_id in thoughts]
+
+        result_data: Dict[str, Any] = {
+            "session_id": session_id,
+            "branch_id": branch_id,
+            "path": [
+                thought
+                for segment_branch, _, numbers in segments
+                for thought in segment_thoughts(segment_branch, numbers)
+            ],
+            "segments": [
+                {"branch_id": segment_branch, "branch_from_thought": branch_from, "thought_numbers": numbers}
+                for segment_branch, branch_from, numbers in segments
+            ],
+            "child_branches": [
+                {"branch_id": child, "branch_from_thought": branch_from, "thought_count": len(numbers)}
+                for child, branch_from, numbers in children
+            ],
+        }
+        if input_data.include_subtree:
+            result_data["subtree"] = {child: segment_thoughts(child, numbers) for child, _, numbers in children}
+        return [types.TextContent(type="text", text=json.dumps(result_data, indent=2))]
+
+    except McpError:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error getting branch path for '{session_id}': {e}", exc_info=True)
+        raise McpError(ErrorData(code=INTERNAL_ERROR, message=f"An unexpected error occurred: {str(e)}"))
+
+
 async def _find_similar_sessions_impl(input_data: FindSimilarSessionsInput) -> List[types.TextContent]:
     """Performs a semantic search for sessions similar to the query.
 
-    (Note: This functionality might require pre-calculating session embeddings
-     or performing aggregation queries, depending on the implementation.)
+    Session vectors are maintained incrementally (see `utils.session_embeddings`):
+    sessions marked dirty by new thoughts are re-embedded in one batch before the query.
 
     Args:
         input_data: A FindSimilarSessionsInput object containing validated arguments.
@@ -679,18 +990,14 @@ async def _find_similar_sessions_impl(input_data: FindSimilarSessionsInput) -> L
         default_ef = get_embedding_function(server_ef_name)
         logger.debug(f"Using embedding function '{server_ef_name}' for thinking collections.")
 
-        # --- Step 1: Get all unique session IDs from the thoughts collection ---
+        # --- Step 1: Access the thoughts collection ---
         thoughts_collection = None
-        all_session_ids = set()
+        thought_counts = None
         try:
             thoughts_collection = client.get_collection(name=THOUGHTS_COLLECTION, embedding_function=default_ef)
-            # Efficiently get all unique session_ids from metadata
-            # This might be slow for very large collections, consider optimization if needed
-            all_metadata = thoughts_collection.get(include=["metadatas"])
-            if all_metadata and all_metadata.get("metadatas"):
-                for meta in all_metadata["metadatas"]:
-                    if meta and "session_id" in meta:
-                        all_session_ids.add(meta["session_id"])
+            if needs_reconcile(THOUGHTS_COLLECTION):
+                # Once per process: find sessions recorded before their entries were maintained
+                thought_counts = count_session_thoughts(thoughts_collection)
         except ValueError as e:
             if f"Collection {THOUGHTS_COLLECTION} does not exist." in str(e):
                 logger.warning(f"Cannot find similar sessions: Collection '{THOUGHTS_COLLECTION}' not found.")
@@ -712,18 +1019,7 @@ async def _find_similar_sessions_impl(input_data: FindSimilarSessionsInput) -> L
                 ErrorData(code=INTERNAL_ERROR, message=f"ChromaDB Error accessing thoughts collection: {str(e)}")
             )
 
-        if not all_session_ids:
-            logger.info("No sessions found in the thoughts collection.")
-            return [  # Return list
-                types.TextContent(
-                    type="text",
-                    text=json.dumps(
-                        {"similar_sessions": [], "total_found": 0, "threshold_used": effective_threshold}, indent=2
-                    ),
-                )
-            ]
-
-        # --- Step 2: Create/Get Sessions Collection and Embed Session Summaries ---
+        # --- Step 2: Create/Get Sessions Collection and refresh dirty session vectors ---
         sessions_collection = None
         try:
             # Try getting the sessions collection
@@ -752,45 +1048,20 @@ async def _find_similar_sessions_impl(input_data: FindSimilarSessionsInput) -> L
                 ErrorData(code=INTERNAL_ERROR, message=f"ChromaDB Error accessing sessions collection: {str(e)}")
             )
 
-        # If collection exists, proceed with embedding and adding summaries
         try:
-            # Embed summaries for sessions not already in the sessions collection
-            existing_session_ids = set(sessions_collection.get().get("ids", []))
-            sessions_to_embed = []
-            ids_to_embed = []
-
-            for session_id in all_session_ids:
-                if session_id not in existing_session_ids:
-                    try:
-                        # Get session summary (returns List[TextContent] on success)
-                        summary_result_list = await _get_session_summary_impl(
-                            GetSessionSummaryInput(session_id=session_id)
-                        )
-                        # Safely parse the JSON content from the first TextContent item
-                        summary_data = json.loads(summary_result_list[0].text)
-                        summary_text = " ".join(
-                            [t.get("content", "") for t in summary_data.get("session_thoughts", [])]
-                        )
-                        if summary_text:  # Only embed if there's content
-                            logger.debug(
-                                f"Generated summary for session '{session_id}': '{summary_text[:100]}...'"
-                            )  # Log summary
-                            sessions_to_embed.append(summary_text)
-                            ids_to_embed.append(session_id)
-                    except McpError as summary_error:
-                        logger.warning(
-                            f"Failed to get summary for session '{session_id}' to embed: {summary_error.message}"
-                        )
-                    except (json.JSONDecodeError, IndexError, AttributeError) as parse_error:
-                        logger.warning(f"Could not parse summary result for session '{session_id}': {parse_error}")
-
-            if sessions_to_embed:
-                logger.info(f"Embedding summaries for {len(sessions_to_embed)} new/updated sessions.")
-                logger.debug(f"IDs to embed: {ids_to_embed}")  # Log IDs before add
-                logger.debug(f"Summaries to embed: {sessions_to_embed}")  # Log summaries before add
-                sessions_collection.add(documents=sessions_to_embed, ids=ids_to_embed)
-                logger.info(f"Finished adding/embedding summaries to '{SESSIONS_COLLECTION}'.")  # Log after add
-
+            stale = stale_sessions(sessions_collection, thought_counts) if thought_counts is not None else []
+            # Sessions whose thoughts changed are re-embedded here, in batches, instead of on every query
+            refreshed = refresh_sessions(
+                THOUGHTS_COLLECTION,
+                thoughts_collection,
+                sessions_collection,
+                stale,
+                mode=get_server_config().session_embedding_mode,
+            )
+            if thought_counts is not None:
+                mark_reconciled(THOUGHTS_COLLECTION)
+            if refreshed:
+                logger.info(f"Re-embedded {refreshed} session(s) in '{SESSIONS_COLLECTION}'.")
         except Exception as e:
             # Catch errors during the embedding/adding process
             logger.error(f"Error embedding/adding to sessions collection '{SESSIONS_COLLECTION}': {e}", exc_info=True)
@@ -801,11 +1072,20 @@ async def _find_similar_sessions_impl(input_data: FindSimilarSessionsInput) -> L
         similar_sessions = []
         if sessions_collection:  # Ensure collection was accessed successfully
             try:
-                query_results = sessions_collection.query(
+                # The sessions collection stays small, so exact search usually applies
+                query_results = exact_query(
+                    SESSIONS_COLLECTION,
+                    sessions_collection,
                     query_texts=[query],
                     n_results=n_results,
-                    include=["metadatas", "distances"],  # Only need distance and ID (implicit)
+                    include=["metadatas", "distances"],
                 )
+                if query_results is None:
+                    query_results = sessions_collection.query(
+                        query_texts=[query],
+                        n_results=n_results,
+                        include=["metadatas", "distances"],  # Only need distance and ID (implicit)
+                    )
 
                 if query_results and query_results.get("ids") and query_results["ids"][0]:
                     for i in range(len(query_results["ids"][0])):
@@ -32,6 +32,12 @@ class ChromaClientConfig:
     database: Optional[str] = None
     api_key: Optional[str] = None
     use_cpu_provider: Optional[bool] = None  # None means auto-detect
+    fts_accelerator: bool = False  # Resolve where_document filters via an SQLite FTS5 shadow index
+    exact_search_threshold: int = 0  # Collections up to this size are searched exactly (0 disables)
+    retention_interval_hours: float = 0  # Run archival retention policies in the background (0 disables)
+    dedup_on_add: bool = False  # Skip documents that duplicate an existing entry (content hash / SimHash)
+    dedup_max_distance: Optional[float] = None  # Near duplicates must also be within this vector distance
+    session_embedding_mode: str = "text"  # "text" (embed joined thoughts) or "mean" (mean of thought vectors)
 
 
 @dataclass
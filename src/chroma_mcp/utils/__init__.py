@@ -73,6 +73,11 @@ def get_server_config() -> ChromaClientConfig:
     return _global_client_config
 
 
+def get_server_config_if_set() -> Optional[ChromaClientConfig]:
+    """Return the server configuration, or None if it has not been set yet (never raises)."""
+    return _global_client_config
+
+
 # --- JSON Encoder for NumPy types ---
 import json
 import numpy as np
@@ -139,6 +144,7 @@ __all__ = [
     # Global Accessors
     "get_logger",
     "get_server_config",
+    "get_server_config_if_set",
     # Client functions
     "get_chroma_client",
     "get_embedding_function",
@@ -0,0 +1,124 @@
+"""
+Materialised branch trees for thinking sessions.
+
+Thoughts only carry flat branch metadata (`branch_id`, `branch_from_thought`),
+so finding the thoughts that lead up to a branch from the collection means
+reading the whole session. Each session's entry in `thinking_sessions` instead
+keeps the session's branch tree as a compact JSON adjacency structure in its
+`branch_tree` metadata field:
+
+    {"n": 5, "b": {"": [0, [1, 2, 3]], "alt": [2, [2, 3]]}}
+
+`b` maps each branch (`""` is the main trunk) to the thought number it forks
+from (0 if unknown) and its sorted thought numbers; `n` is the number of
+thoughts the tree was built from. Thought IDs follow from the session, branch
+and thought number (`thought_id`), so a branch's ancestry is resolved from the
+tree without a scan and fetched with one `get(ids=...)`.
+
+The path of a branch is the main trunk before its fork point followed by the
+branch's own thoughts, as in `session_index.on_branch_path`. Thought metadata
+has no parent-branch field, so every branch forks from the main trunk.
+
+Trees are extended by the write hooks in `session_embeddings`, which read and
+update the session entry for every recorded thought anyway, and are trusted
+only while `n` matches the entry's `thought_count`.
+"""
+
+import json
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+BRANCH_TREE_FIELD = "branch_tree"
+TRUNK = ""
+
+BranchTree = Dict[str, Any]
+ThoughtPosition = Tuple[int, Optional[str], Optional[int]]  # (thought_number, branch_id, branch_from_thought)
+PathSegment = Tuple[str, int, List[int]]  # (branch_id, branch_from_thought, thought_numbers)
+
+
+def thought_id(session_id: str, thought_number: int, branch_id: Optional[str] = None) -> str:
+    """The ID a thought is stored under."""
+    if branch_id:
+        return f"thought_{session_id}_{thought_number}_branch_{branch_id}"
+    return f"thought_{session_id}_{thought_number}"
+
+
+def empty_tree() -> BranchTree:
+    return {"n": 0, "b": {}}
+
+
+def add_thoughts(tree: BranchTree, positions: Iterable[ThoughtPosition]) -> BranchTree:
+    """Adds thoughts to `tree` in place and returns it."""
+    for thought_number, branch_id, branch_from_thought in positions:
+        node = tree["b"].setdefault(branch_id or TRUNK, [0, []])
+        if branch_id and branch_from_thought and not node[0]:
+            node[0] = branch_from_thought
+        if thought_number not in node[1]:
+            insort(node[1], thought_number)
+        tree["n"] += 1
+    return tree
+
+
+def build_tree(metadatas: Sequence[Optional[Mapping[str, Any]]]) -> BranchTree:
+    """Builds a session's tree from its thoughts' metadata."""
+    positions = [
+        (metadata["thought_number"], metadata.get("branch_id"), metadata.get("branch_from_thought"))
+        for metadata in metadatas
+        if metadata and metadata.get("thought_number") is not None
+    ]
+    return add_thoughts(empty_tree(), positions)
+
+
+def encode_tree(tree: BranchTree) -> str:
+    return json.dumps(tree, separators=(",", ":"), sort_keys=True)
+
+
+def decode_tree(value: Any, thought_count: int) -> Optional[BranchTree]:
+    """The stored tree, or None if it is missing, unreadable or not built from `thought_count` thoughts."""
+    if not isinstance(value, str):
+        return None
+    try:
+        tree = json.loads(value)
+    except ValueError:
+        return None
+    if not isinstance(tree, dict) or tree.get("n") != thought_count or not isinstance(tree.get("b"), dict):
+        return None
+    return tree
+
+
+def extended_tree_field(
+    metadata: Mapping[str, Any], thought_count: int, positions: Sequence[ThoughtPosition], added: int
+) -> Dict[str, Any]:
+    """Metadata update for a session entry with `thought_count` thoughts gaining `added` more.
+
+    Entries without a tree are left alone. A tree that is stale, or cannot be extended
+    because the positions of the new thoughts are unknown, is removed and rebuilt on
+    next use.
+    """
+    if metadata.get(BRANCH_TREE_FIELD) is None:
+        return {}
+    tree = decode_tree(metadata[BRANCH_TREE_FIELD], thought_count)
+    if tree is None or len(positions) != added:
+        return {BRANCH_TREE_FIELD: None}
+    return {BRANCH_TREE_FIELD: encode_tree(add_thoughts(tree, positions))}
+
+
+def branch_path(tree: BranchTree, branch_id: str = TRUNK) -> Optional[List[PathSegment]]:
+    """The segments leading to and including `branch_id`, root first; None for an unknown branch."""
+    trunk = tree["b"].get(TRUNK, [0, []])[1]
+    if not branch_id:
+        return [(TRUNK, 0, list(trunk))]
+    node = tree["b"].get(branch_id)
+    if node is None:
+        return None
+    branch_from_thought, numbers = node
+    before_fork = trunk[: bisect_left(trunk, branch_from_thought)] if branch_from_thought else list(trunk)
+    return [(TRUNK, 0, before_fork), (branch_id, branch_from_thought, list(numbers))]
+
+
+def child_branches(tree: BranchTree, branch_id: str = TRUNK) -> List[PathSegment]:
+    """Branches forking from `branch_id`, ordered by fork point."""
+    if branch_id:
+        return []
+    children = [(child, node[0], list(node[1])) for child, node in tree["b"].items() if child != TRUNK]
+    return sorted(children, key=lambda child: (child[1], child[0]))
@@ -102,6 +102,7 @@ from mcp.types import ErrorData, INTERNAL_ERROR, INVALID_PARAMS
 from ..types import ChromaClientConfig
 from .errors import EmbeddingError, ConfigurationError
 from . import get_logger, get_server_config
+from .sharding import open_sharded_collection
 
 # --- Constants ---
 
@@ -377,3 +378,27 @@ def reset_client() -> None:
         logger.info("Chroma client instance reset.")
     else:
         logger.info("No active Chroma client instance to reset.")
+
+
+def resolve_collection(client, *args, **kwargs):
+    """Gets a collection, falling back to a sharded logical collection of that name.
+
+    Takes the same arguments as `client.get_collection` and forwards them
+    unchanged, so plain collections cost a single call. Only when the name does
+    not exist is it looked up as a sharded collection (see `utils/sharding.py`);
+    if it is not one either, the original not-found error is re-raised.
+    """
+    try:
+        return client.get_collection(*args, **kwargs)
+    except Exception as e:
+        if "does not exist" not in str(e):
+            raise
+        name = kwargs.get("name", args[0] if args else None)
+        try:
+            sharded = open_sharded_collection(client, name, kwargs.get("embedding_function"))
+        except Exception as shard_error:
+            get_logger("utils.chroma_client").debug(f"Sharded lookup for '{name}' failed: {shard_error}")
+            sharded = None
+        if sharded is None:
+            raise
+        return sharded
@@ -0,0 +1,63 @@
+"""
+Sorted index of collection names for prefix and substring listing.
+
+Filtering collections by name needs every name, and `client.list_collections()`
+also builds a Collection object per entry, which is slow with hundreds of
+per-branch collections over HTTP. This module keeps a sorted name list per
+client so prefix lookups are a binary search. The list is reloaded when the
+server's own create/rename/delete tools invalidate it, when
+`client.count_collections()` no longer matches (collections created or deleted
+by another process), or after `NAME_INDEX_TTL_SECONDS` (renames elsewhere).
+"""
+
+import bisect
+import threading
+import time
+from typing import List, Optional, Tuple
+
+NAME_INDEX_TTL_SECONDS = 60
+
+# (id(client), loaded_at, sorted names)
+_index: Optional[Tuple[int, float, List[str]]] = None
+_lock = threading.Lock()
+
+
+def _collection_name(collection) -> str:
+    return collection if isinstance(collection, str) else collection.name
+
+
+def _load(client) -> List[str]:
+    return sorted(_collection_name(c) for c in client.list_collections())
+
+
+def get_sorted_names(client) -> List[str]:
+    """Returns all collection names in sorted order, reloading the index when it is stale."""
+    global _index
+    with _lock:
+        if _index is not None and _index[0] == id(client) and time.time() - _index[1] < NAME_INDEX_TTL_SECONDS:
+            names = _index[2]
+            try:
+                if client.count_collections() == len(names):
+                    return names
+            except Exception:
+                # Clients without count_collections fall back to reloading
+                pass
+        names = _load(client)
+        _index = (id(client), time.time(), names)
+        return names
+
+
+def names_with_prefix(sorted_names: List[str], prefix: str) -> List[str]:
+    """Returns the names starting with `prefix` from a sorted list via binary search."""
+    if not prefix:
+        return list(sorted_names)
+    start = bisect.bisect_left(sorted_names, prefix)
+    end = bisect.bisect_left(sorted_names, prefix + "\U0010ffff", lo=start)
+    return sorted_names[start:end]
+
+
+def invalidate_collection_names() -> None:
+    """Drops the name index; it is reloaded on the next filtered listing."""
+    global _index
+    with _lock:
+        _index = None
@@ -0,0 +1,260 @@
+"""
+Size and shape statistics for ChromaDB collections.
+
+Used by the `chroma_collection_stats` tool and `chroma-mcp-client stats`.
+Cheap values (count, dimension, HNSW settings, on-disk bytes) are read on every
+call. Document lengths, metadata key cardinalities and item ages are
+aggregated page by page over a sample spread evenly across the collection, or over
+every record with `full_scan`. These values are cached per collection and reused
+until the TTL expires or the collection changes (see `collection_version`); a
+change triggers a full rescan of the sample, not a delta update. Distinct values
+per metadata key are counted up to `MAX_DISTINCT_VALUES` and reported as
+`">1000"` beyond that, so high-cardinality keys do not grow memory unboundedly.
+"""
+
+import datetime
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from . import get_logger
+from .collection_version import CollectionVersion, collection_version
+
+STATS_CACHE_TTL_SECONDS = 300
+DEFAULT_STATS_SAMPLE_SIZE = 2000
+STATS_PAGE_SIZE = 200
+# Distinct values tracked per metadata key before reporting f">{MAX_DISTINCT_VALUES}"
+MAX_DISTINCT_VALUES = 1000
+# Metadata fields holding item creation/update times (see _ensure_server_timestamp)
+TIMESTAMP_FIELDS = ("timestamp", "last_indexed_utc", "created_at", "updated_at", "last_modified")
+
+_cache: Dict[str, Tuple[float, CollectionVersion, Dict[str, Any]]] = {}
+_cache_lock = threading.Lock()
+
+
+def persist_directory(client) -> Optional[str]:
+    """Returns the client's data directory if it is a persistent client, else None."""
+    try:
+        settings = client.get_settings()
+    except Exception:
+        return None
+    if not getattr(settings, "is_persistent", False):
+        return None
+    return getattr(settings, "persist_directory", None)
+
+
+def segment_bytes(data_dir: str, collection_id: str) -> Optional[int]:
+    """Sums the on-disk size of a collection's segment directories in a persistent data dir."""
+    db_path = os.path.join(data_dir, "chroma.sqlite3")
+    if not os.path.exists(db_path):
+        return None
+    try:
+        with closing(sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)) as conn:
+            segment_ids = [
+                row[0] for row in conn.execute("SELECT id FROM segments WHERE collection = ?", (collection_id,))
+            ]
+    except sqlite3.Error as e:
+        get_logger("utils.collection_stats").warning(f"Could not read segments from {db_path}: {e}")
+        return None
+    total = 0
+    for segment_id in segment_ids:
+        segment_dir = os.path.join(data_dir, segment_id)
+        for root, _, files in os.walk(segment_dir):
+            total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return total
+
+
+def hnsw_settings(collection) -> Dict[str, Any]:
+    """Returns the HNSW settings Chroma is actually using for a collection."""
+    configuration = getattr(collection, "configuration_json", None)
+    if isinstance(configuration, dict) and isinstance(configuration.get("hnsw"), dict):
+        return dict(configuration["hnsw"])
+    return {k: v for k, v in (collection.metadata or {}).items() if k.startswith("hnsw:")}
+
+
+def distance_space(collection) -> str:
+    """Returns a collection's distance space (`l2`, `cosine` or `ip`), preferring its configuration."""
+    settings = hnsw_settings(collection)
+    return settings.get("space") or settings.get("hnsw:space") or "l2"
+
+
+def _embedding_dimension(collection) -> Optional[int]:
+    result = collection.get(limit=1, include=["embeddings"])
+    embeddings = result.get("embeddings")
+    if embeddings is None or len(embeddings) == 0:
+        return None
+    return len(embeddings[0])
+
+
+def _to_epoch(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            parsed = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+        return parsed.timestamp()
+    return None
+
+
+def _page_offsets(count: int, sample_size: int, full_scan: bool) -> List[int]:
+    """Offsets of the pages to read: every page, or pages spread evenly over the collection."""
+    if full_scan or count <= sample_size:
+        return list(range(0, count, STATS_PAGE_SIZE))
+    num_pages = max(1, sample_size // STATS_PAGE_SIZE)
+    return sorted({int(o) for o in np.linspace(0, max(0, count - STATS_PAGE_SIZE), num_pages)})
+
+
+def _scan(collection, count: int, sample_size: int, full_scan: bool) -> Dict[str, Any]:
+    """Aggregates document lengths, metadata key cardinalities and item ages page by page."""
+    lengths: List[int] = []
+    # None once a key has more than MAX_DISTINCT_VALUES distinct values
+    key_values: Dict[str, Optional[set]] = {}
+    key_present: Dict[str, int] = {}
+    oldest: Optional[float] = None
+    newest: Optional[float] = None
+
+    for offset in _page_offsets(count, sample_size, full_scan):
+        page = collection.get(include=["documents", "metadatas"], limit=STATS_PAGE_SIZE, offset=offset)
+        lengths.extend(len(doc or "") for doc in page.get("documents") or [])
+        for metadata in page.get("metadatas") or []:
+            for key, value in (metadata or {}).items():
+                key_present[key] = key_present.get(key, 0) + 1
+                values = key_values.setdefault(key, set())
+                if values is not None:
+                    values.add(value if isinstance(value, (str, int, float)) else str(value))
+                    if len(values) > MAX_DISTINCT_VALUES:
+                        key_values[key] = None
+                if key in TIMESTAMP_FIELDS and (ts := _to_epoch(value)) is not None:
+                    oldest = ts if oldest is None else min(oldest, ts)
+                    newest = ts if newest is None else max(newest, ts)
+
+    scanned = len(lengths)
+    doc_lengths: Optional[Dict[str, float]] = None
+    if lengths:
+        arr = np.asarray(lengths)
+        p50, p90, p99 = np.percentile(arr, [50, 90, 99])
+        doc_lengths = {
+            "avg": round(float(arr.mean()), 1),
+            "min": int(arr.min()),
+            "p50": float(p50),
+            "p90": float(p90),
+            "p99": float(p99),
+            "max": int(arr.max()),
+        }
+    now = time.time()
+    return {
+        "records_scanned": scanned,
+        "sampled": scanned < count,
+        "document_length_chars": doc_lengths,
+        "metadata_keys": {
+            key: {
+                "distinct_values": (len(key_values[key]) if key_values[key] is not None else f">{MAX_DISTINCT_VALUES}"),
+                "present_in": key_present[key],
+            }
+            for key in sorted(key_present)
+        },
+        "oldest_item": _age_entry(oldest, now),
+        "newest_item": _age_entry(newest, now),
+    }
+
+
+def _age_entry(epoch: Optional[float], now: float) -> Optional[Dict[str, Any]]:
+    if epoch is None:
+        return None
+    return {
+        "timestamp": datetime.datetime.fromtimestamp(epoch, tz=datetime.timezone.utc).isoformat(),
+        "age_seconds": round(now - epoch, 1),
+    }
+
+
+def get_collection_stats(
+    collection,
+    data_dir: Optional[str] = None,
+    sample_size: int = DEFAULT_STATS_SAMPLE_SIZE,
+    full_scan: bool = False,
+    refresh: bool = False,
+    ttl: float = STATS_CACHE_TTL_SECONDS,
+) -> Dict[str, Any]:
+    """Returns statistics for a collection, reusing cached scan results within the TTL.
+
+    Cached scan results are discarded when the collection's version changes; the
+    next call then rescans the sample (or every record with `full_scan`) in full.
+    Sharded logical collections are scanned as a whole; their result also lists
+    each shard's count and segment bytes, and `segment_bytes` is the total.
+
+    Args:
+        collection: The Chroma collection.
+        data_dir: Persistent data directory, used to measure on-disk size (None to skip).
+        sample_size: Records read for the sampled statistics.
+        full_scan: Read every record instead of a sample.
+        refresh: Ignore cached scan results.
+        ttl: Seconds cached scan results stay valid.
+    """
+    collection_id = str(collection.id)
+    version = collection_version(collection, data_dir) if data_dir else collection_version(collection)
+    count = version[0]
+    stats: Dict[str, Any] = {
+        "name": collection.name,
+        "id": collection_id,
+        "count": count,
+        "embedding_dimension": _embedding_dimension(collection) if count else None,
+    }
+    shards = getattr(collection, "shards", None)
+    if shards is None:
+        stats["hnsw"] = hnsw_settings(collection)
+        stats["segment_bytes"] = segment_bytes(data_dir, collection_id) if data_dir else None
+    else:
+        # Sharded logical collection: shards share their settings; sizes are summed
+        shard_stats = [
+            {
+                "name": shard.name,
+                "id": str(shard.id),
+                "count": shard.count(),
+                "segment_bytes": segment_bytes(data_dir, str(shard.id)) if data_dir else None,
+            }
+            for shard in shards
+        ]
+        sizes = [entry["segment_bytes"] for entry in shard_stats]
+        stats["hnsw"] = hnsw_settings(shards[0])
+        stats["segment_bytes"] = None if None in sizes else sum(sizes)
+        stats["shards"] = shard_stats
+
+    now = time.time()
+    with _cache_lock:
+        cached = _cache.get(collection_id)
+    reusable = (
+        cached is not None
+        and not refresh
+        and cached[1] == version
+        and now - cached[0] < ttl
+        and (not full_scan or not cached[2]["sampled"])
+    )
+    if reusable:
+        computed_at, _, scan = cached
+    else:
+        scan = _scan(collection, count, sample_size, full_scan)
+        computed_at = now
+        with _cache_lock:
+            _cache[collection_id] = (computed_at, version, scan)
+
+    stats.update(scan)
+    stats["computed_at"] = datetime.datetime.fromtimestamp(computed_at, tz=datetime.timezone.utc).isoformat()
+    stats["cache_age_seconds"] = round(now - computed_at, 1)
+    return stats
+
+
+def clear_collection_stats_cache() -> None:
+    """Drops all cached scan results."""
+    with _cache_lock:
+        _cache.clear()
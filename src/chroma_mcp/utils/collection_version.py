@@ -0,0 +1,60 @@
+"""
+Change markers for ChromaDB collections.
+
+Sidecar indexes (BM25, FTS5, exact-search matrices) are derived from a
+collection's contents and must notice writes made by other processes, such as
+`chroma-mcp-client index`. A collection's version is its record count plus, for
+persistent clients, the highest write sequence number Chroma has applied to the
+collection's segments. Chroma bumps that sequence on every add, update, upsert
+and delete, so it also changes when the count does not. For HTTP and ephemeral
+clients only the count is available.
+"""
+
+import os
+import sqlite3
+from contextlib import closing
+from typing import Optional, Tuple
+
+from . import get_logger, get_server_config
+
+CollectionVersion = Tuple[int, Optional[int]]
+
+
+def _data_dir() -> Optional[str]:
+    try:
+        config = get_server_config()
+    except Exception:
+        return None
+    if config.client_type != "persistent" or not config.data_dir:
+        return None
+    return config.data_dir
+
+
+def write_sequence(data_dir: str, collection_id: str) -> Optional[int]:
+    """Returns the highest write sequence number applied to a collection in a persistent data dir."""
+    db_path = os.path.join(data_dir, "chroma.sqlite3")
+    if not os.path.exists(db_path):
+        return None
+    try:
+        with closing(sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)) as conn:
+            row = conn.execute(
+                "SELECT MAX(m.seq_id) FROM max_seq_id m JOIN segments s ON s.id = m.segment_id WHERE s.collection = ?",
+                (collection_id,),
+            ).fetchone()
+    except sqlite3.Error as e:
+        get_logger("utils.collection_version").debug(f"Could not read write sequence from {db_path}: {e}")
+        return None
+    return None if row is None or row[0] is None else int(row[0])
+
+
+def collection_version(collection, data_dir: Optional[str] = None) -> CollectionVersion:
+    """Returns `(count, write sequence or None)` for a collection (sharded collections sum their shards)."""
+    data_dir = data_dir if data_dir is not None else _data_dir()
+    shards = getattr(collection, "shards", None)
+    if shards is not None:
+        versions = [collection_version(shard, data_dir) for shard in shards]
+        sequences = [seq for _, seq in versions]
+        total_seq = None if any(seq is None for seq in sequences) else sum(sequences)
+        return sum(count for count, _ in versions), total_seq
+    seq = write_sequence(data_dir, str(collection.id)) if data_dir else None
+    return collection.count(), seq
@@ -0,0 +1,156 @@
+"""
+Near-duplicate suppression at insert time.
+
+Auto-logged chat summaries and collected runtime errors often repeat almost
+verbatim; every copy costs an embedding and an HNSW node. With dedup enabled
+(`--dedup-on-add` / `CHROMA_DEDUP_ON_ADD`), new documents are checked before
+they are embedded:
+
+- exact duplicates by a SHA-256 of the whitespace-normalised text (`dedup_hash`);
+- near duplicates by a 64-bit SimHash over the lower-cased words, with digit runs
+  normalised so line numbers and timestamps do not count (`dedup_simhash`). The
+  SimHash is also stored as four 16-bit bands (`dedup_band0..3`); two hashes
+  within `DEFAULT_SIMHASH_DISTANCE` (3) bits share at least one band, so
+  candidates are found with a `$or` equality filter and checked by Hamming
+  distance in Python;
+- optionally (`--dedup-max-distance` / `CHROMA_DEDUP_MAX_DISTANCE`), near
+  duplicates are confirmed by a vector distance check, which embeds the new
+  text once and compares it with the candidates only.
+
+A duplicate is not inserted. The existing entry records it instead
+(`duplicate_count`, `last_duplicate_at` and the new ID in `duplicate_ids`).
+Only entries written with dedup enabled carry the fields above, so earlier
+entries are never matched.
+"""
+
+import datetime
+import hashlib
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional
+
+from .metadata_patch import SET_ADD, resolve_patch
+
+HASH_FIELD = "dedup_hash"
+SIMHASH_FIELD = "dedup_simhash"
+BAND_FIELDS = tuple(f"dedup_band{i}" for i in range(4))
+DEFAULT_SIMHASH_DISTANCE = 3
+MAX_DEDUP_CANDIDATES = 50
+
+_TOKEN_RE = re.compile(r"\w+")
+_DIGITS_RE = re.compile(r"\d+")
+
+
+@dataclass
+class DuplicateMatch:
+    """An existing entry a new document duplicates."""
+
+    id: str
+    kind: str  # "exact" or "near"
+    hamming: int = 0
+    distance: Optional[float] = None
+    metadata: Optional[Dict[str, Any]] = None
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 of the text with runs of whitespace collapsed."""
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+def simhash(text: str) -> Optional[int]:
+    """64-bit SimHash over lower-cased words (digit runs normalised), or None for text without words."""
+    tokens = _TOKEN_RE.findall(_DIGITS_RE.sub("0", text.lower()))
+    if not tokens:
+        return None
+    weights = [0] * 64
+    for token, count in Counter(tokens).items():
+        value = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += count if value >> bit & 1 else -count
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+def _bands(value: int) -> List[str]:
+    return [f"{value >> (16 * i) & 0xFFFF:04x}" for i in range(len(BAND_FIELDS))]
+
+
+def dedup_metadata(text: str) -> Dict[str, str]:
+    """Metadata fields that let later inserts find `text` as a duplicate."""
+    fields = {HASH_FIELD: content_hash(text)}
+    value = simhash(text)
+    if value is not None:
+        fields[SIMHASH_FIELD] = f"{value:016x}"
+        fields.update(zip(BAND_FIELDS, _bands(value)))
+    return fields
+
+
+def max_distance_from_env() -> Optional[float]:
+    """The vector distance near duplicates must be within (`CHROMA_DEDUP_MAX_DISTANCE`), or None if unset."""
+    value = os.getenv("CHROMA_DEDUP_MAX_DISTANCE", "").strip()
+    return float(value) if value else None
+
+
+def _confirm_by_distance(collection, text: str, ids: List[str], max_distance: float) -> Dict[str, float]:
+    """Distances from `text` to the candidates, keeping those within `max_distance`."""
+    result = collection.query(query_texts=[text], ids=ids, n_results=len(ids), include=["distances"])
+    pairs = zip(result["ids"][0], result["distances"][0]) if result.get("ids") else []
+    return {doc_id: float(distance) for doc_id, distance in pairs if distance <= max_distance}
+
+
+def find_duplicate(
+    collection,
+    text: str,
+    max_hamming: int = DEFAULT_SIMHASH_DISTANCE,
+    max_distance: Optional[float] = None,
+) -> Optional[DuplicateMatch]:
+    """Returns the existing entry `text` duplicates, or None.
+
+    Args:
+        collection: The Chroma collection (or sharded collection).
+        text: The document about to be inserted.
+        max_hamming: SimHash bits two near duplicates may differ in (at most 3, see bands).
+        max_distance: If set, near duplicates must also be within this vector distance,
+            measured in the collection's space with its embedding function.
+    """
+    exact = collection.get(where={HASH_FIELD: content_hash(text)}, include=["metadatas"], limit=1)
+    if exact.get("ids"):
+        return DuplicateMatch(exact["ids"][0], "exact", metadata=(exact.get("metadatas") or [None])[0])
+
+    value = simhash(text)
+    if value is None:
+        return None
+    candidates = collection.get(
+        where={"$or": [{field: band} for field, band in zip(BAND_FIELDS, _bands(value))]},
+        include=["metadatas"],
+        limit=MAX_DEDUP_CANDIDATES,
+    )
+    near = []
+    for doc_id, metadata in zip(candidates.get("ids") or [], candidates.get("metadatas") or []):
+        stored = (metadata or {}).get(SIMHASH_FIELD)
+        if stored is None:
+            continue
+        hamming = bin(value ^ int(stored, 16)).count("1")
+        if hamming <= max_hamming:
+            near.append(DuplicateMatch(doc_id, "near", hamming=hamming, metadata=metadata))
+    if not near:
+        return None
+    if max_distance is not None:
+        distances = _confirm_by_distance(collection, text, [match.id for match in near], max_distance)
+        near = [match for match in near if match.id in distances]
+        for match in near:
+            match.distance = distances[match.id]
+    return min(near, key=lambda match: (match.hamming, match.distance or 0.0), default=None)
+
+
+def record_duplicate(collection, match: DuplicateMatch, duplicate_id: Optional[str] = None) -> None:
+    """Marks `match` as seen again instead of inserting a new entry."""
+    current: Mapping[str, Any] = match.metadata or {}
+    patch: Dict[str, Any] = {
+        "duplicate_count": int(current.get("duplicate_count", 0)) + 1,
+        "last_duplicate_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
+    if duplicate_id:
+        patch["duplicate_ids"] = {SET_ADD: [duplicate_id]}
+    collection.update(ids=[match.id], metadatas=[resolve_patch(current, patch)])
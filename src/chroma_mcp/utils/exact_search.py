@@ -0,0 +1,199 @@
+"""
+Exact (brute-force) vector search for small collections.
+
+For collections of a few thousand vectors HNSW's approximate recall and per-query
+overhead buy nothing: a single matrix multiply over all embeddings is exact and
+fast. Exact search is opt-in: when `exact_search_threshold` is set
+(`--exact-search-threshold` / `CHROMA_EXACT_SEARCH_THRESHOLD`, default 0 = off),
+the query tools answer unfiltered queries on collections up to that size from a
+contiguous float32 matrix of the collection's embeddings instead of the HNSW index.
+
+Only IDs and embeddings are cached. Documents and metadatas for the top-k are
+fetched from Chroma on each query, so they are never stale. Writes that go
+through `invalidate_exact_index` (the document tools, collection renames and
+deletes, retention, the session vector hooks in `session_embeddings`) drop the
+matrix at once. Otherwise it is reloaded when the collection's version (see
+`collection_version`) no longer matches the one it was loaded at. On persistent
+clients that catches every write, including same-count updates from other
+processes; on HTTP and ephemeral clients the version is the count only, so an
+update or upsert that bypasses `invalidate_exact_index` is not seen until the
+count changes.
+"""
+
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from . import get_embedding_function, get_logger, get_server_config
+from .collection_stats import distance_space
+from .collection_version import CollectionVersion, collection_version
+
+DEFAULT_EXACT_SEARCH_THRESHOLD = 0
+
+
+class ExactIndex:
+    """Contiguous float32 embedding matrix answering top-k queries exactly."""
+
+    def __init__(self, ids: List[str], embeddings: Any, space: str = "l2", version: Optional[CollectionVersion] = None):
+        self.ids = list(ids)
+        self.space = space
+        # Collection version the matrix was loaded at
+        self.version = version
+        matrix = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32).reshape(len(self.ids), -1))
+        if space == "cosine":
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            matrix = matrix / norms
+        self.matrix = matrix
+        self.sq_norms = np.einsum("ij,ij->i", matrix, matrix) if space == "l2" else None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def distances(self, query_embeddings: Any) -> np.ndarray:
+        """Returns a (num_queries, num_docs) distance matrix using Chroma's distance definitions."""
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(-1, self.matrix.shape[1])
+        if self.space == "cosine":
+            norms = np.linalg.norm(queries, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            return 1.0 - (queries / norms) @ self.matrix.T
+        dots = queries @ self.matrix.T
+        if self.space == "ip":
+            return 1.0 - dots
+        # Squared L2, as reported by Chroma: |q|^2 - 2 q.x + |x|^2
+        return np.maximum(np.einsum("ij,ij->i", queries, queries)[:, None] - 2.0 * dots + self.sq_norms, 0.0)
+
+    def search(self, query_embeddings: Any, n_results: int) -> List[List[tuple]]:
+        """Returns, per query, up to `n_results` (id, distance) pairs in ascending distance."""
+        if not self.ids:
+            return [[] for _ in range(len(query_embeddings))]
+        dist = self.distances(query_embeddings)
+        k = min(n_results, dist.shape[1])
+        if k < dist.shape[1]:
+            # argpartition finds the k smallest in O(n); only those k are then sorted
+            top = np.argpartition(dist, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(k), dist.shape)
+        results = []
+        for row, candidates in zip(dist, top):
+            order = candidates[np.argsort(row[candidates], kind="stable")]
+            results.append([(self.ids[j], float(row[j])) for j in order])
+        return results
+
+
+# --- Registry --- #
+
+_indexes: Dict[str, ExactIndex] = {}
+# Bumped by invalidate_exact_index, so a load that raced with a write is not cached
+_generations: Dict[str, int] = {}
+# One per collection, so loading one collection does not block queries on the others
+_load_locks: Dict[str, threading.Lock] = {}
+_lock = threading.Lock()  # Guards the dicts above; never held while reading a collection
+
+
+def get_exact_search_threshold() -> int:
+    """Returns the configured size threshold (0 when exact search is disabled or unconfigured)."""
+    try:
+        return int(getattr(get_server_config(), "exact_search_threshold", 0) or 0)
+    except Exception:
+        return 0
+
+
+def _load(collection, version: CollectionVersion, batch_size: int = 1000) -> ExactIndex:
+    ids: List[str] = []
+    chunks: List[Any] = []
+    offset = 0
+    while True:
+        batch = collection.get(include=["embeddings"], limit=batch_size, offset=offset)
+        batch_ids = batch.get("ids") or []
+        if not batch_ids:
+            break
+        ids.extend(batch_ids)
+        chunks.append(np.asarray(batch["embeddings"], dtype=np.float32))
+        offset += len(batch_ids)
+        if len(batch_ids) < batch_size:
+            break
+    embeddings = np.concatenate(chunks) if chunks else np.zeros((0, 0), dtype=np.float32)
+    return ExactIndex(ids, embeddings, distance_space(collection), version)
+
+
+def _cached_index(collection_name: str, collection, version: CollectionVersion) -> ExactIndex:
+    """The collection's matrix at `version`, loading it if the cached one is missing or stale."""
+    with _lock:
+        index = _indexes.get(collection_name)
+        if index is not None and index.version == version:
+            return index
+        load_lock = _load_locks.setdefault(collection_name, threading.Lock())
+
+    with load_lock:
+        with _lock:
+            index = _indexes.get(collection_name)
+            generation = _generations.get(collection_name, 0)
+        if index is not None and index.version == version:
+            return index  # Loaded by a concurrent query
+        # The version is taken before reading, so a concurrent write forces another reload
+        index = _load(collection, version)
+        with _lock:
+            if _generations.get(collection_name, 0) == generation:
+                _indexes[collection_name] = index
+        get_logger("utils.exact_search").debug(
+            f"Loaded {len(index)} embeddings of '{collection_name}' for exact search."
+        )
+    return index
+
+
+def exact_query(
+    collection_name: str,
+    collection,
+    query_texts: Optional[List[str]] = None,
+    query_embeddings: Optional[Sequence[Sequence[float]]] = None,
+    n_results: int = 10,
+    include: Sequence[str] = ("documents", "metadatas", "distances"),
+) -> Optional[Dict[str, Any]]:
+    """Answers an unfiltered query exactly if the collection is below the size threshold.
+
+    Returns a QueryResult-shaped dict, or None when exact search does not apply
+    (disabled, collection too large or empty) and the caller should use `collection.query`.
+    """
+    threshold = get_exact_search_threshold()
+    if threshold <= 0:
+        return None
+    version = collection_version(collection)
+    count = version[0]
+    if count == 0 or count > threshold:
+        return None
+
+    index = _cached_index(collection_name, collection, version)
+
+    if query_embeddings is None:
+        embedding_function = getattr(collection, "_embedding_function", None) or get_embedding_function(
+            get_server_config().embedding_function_name
+        )
+        query_embeddings = embedding_function(query_texts)
+    hits = index.search(query_embeddings, n_results)
+
+    result: Dict[str, Any] = {"ids": [[doc_id for doc_id, _ in row] for row in hits]}
+    if "distances" in include:
+        result["distances"] = [[dist for _, dist in row] for row in hits]
+    fields = [key for key in ("documents", "metadatas") if key in include]
+    if fields:
+        hit_ids = sorted({doc_id for row in hits for doc_id, _ in row})
+        fetched = collection.get(ids=hit_ids, include=fields) if hit_ids else {"ids": []}
+        position = {doc_id: i for i, doc_id in enumerate(fetched.get("ids") or [])}
+        # Drop IDs deleted since the matrix was loaded
+        keep = [[i for i, doc_id in enumerate(row) if doc_id in position] for row in result["ids"]]
+        for key in ("ids", "distances"):
+            if key in result:
+                result[key] = [[values[i] for i in row_keep] for values, row_keep in zip(result[key], keep)]
+        for key in fields:
+            values = fetched.get(key) or []
+            result[key] = [[values[position[doc_id]] for doc_id in row] for row in result["ids"]]
+    return result
+
+
+def invalidate_exact_index(collection_name: str) -> None:
+    """Drops the cached matrix for a collection; it is reloaded on the next query."""
+    with _lock:
+        _indexes.pop(collection_name, None)
+        _generations[collection_name] = _generations.get(collection_name, 0) + 1
@@ -0,0 +1,375 @@
+"""
+Optional SQLite FTS5 shadow index for `where_document` filters.
+
+Chroma evaluates `$contains` / `$not_contains` document filters by scanning
+document text, which gets slower as collections grow. When the accelerator is
+enabled (`--fts-accelerator` / `CHROMA_FTS_ACCELERATOR=true`) this module keeps
+a shadow copy of each filtered collection's documents in an FTS5 table using
+the case-sensitive trigram tokenizer, so substring filters can be resolved to an
+ID set up front and passed to Chroma as an ID restriction instead.
+
+A collection's shadow table is built in the background on the first filtered
+call and then kept in sync by the server's document write paths. Each table
+records the collection version it reflects (see `collection_version`); when
+another process writes to the collection the versions diverge and the table is
+rebuilt in the background. Until a table is current, and for filters the index
+cannot answer (e.g. `$regex`), None is returned so callers fall back to
+Chroma's own filtering. Matched IDs are checked against the collection before
+they are returned, so a stale table never hands out IDs that no longer exist.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from . import get_logger, get_server_config
+from .collection_version import CollectionVersion, collection_version
+
+FTS_DB_FILENAME = "fts_index.sqlite3"
+# Trigram MATCH needs at least 3 characters; shorter needles use a plain scan
+MIN_TRIGRAM_LENGTH = 3
+# Above this many IDs an ID restriction stops paying off; defer to Chroma instead
+MAX_ID_RESTRICTION = 10000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fts_collections (name TEXT PRIMARY KEY, doc_count INTEGER NOT NULL, version TEXT);
+CREATE TABLE IF NOT EXISTS fts_content (
+    rowid INTEGER PRIMARY KEY,
+    collection TEXT NOT NULL,
+    doc_id TEXT NOT NULL,
+    content TEXT NOT NULL,
+    UNIQUE(collection, doc_id)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS fts_docs USING fts5(
+    content, content='fts_content', content_rowid='rowid', tokenize='trigram case_sensitive 1'
+);
+CREATE TRIGGER IF NOT EXISTS fts_content_ai AFTER INSERT ON fts_content BEGIN
+    INSERT INTO fts_docs(rowid, content) VALUES (new.rowid, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS fts_content_ad AFTER DELETE ON fts_content BEGIN
+    INSERT INTO fts_docs(fts_docs, rowid, content) VALUES ('delete', old.rowid, old.content);
+END;
+"""
+
+_connection: Optional[sqlite3.Connection] = None
+_lock = threading.RLock()
+_unavailable = False
+# Background rebuilds in progress, by collection name
+_rebuilds: Dict[str, threading.Thread] = {}
+# Bumped by drop_fts_index so a rebuild that started earlier does not resurrect the table
+_generations: Dict[str, int] = {}
+
+
+def fts_enabled() -> bool:
+    """Returns True if the accelerator is switched on in the server config."""
+    try:
+        return bool(getattr(get_server_config(), "fts_accelerator", False))
+    except Exception:
+        return False
+
+
+def _db_path() -> str:
+    config = get_server_config()
+    if config.client_type == "persistent" and config.data_dir:
+        return os.path.join(config.data_dir, FTS_DB_FILENAME)
+    return ":memory:"
+
+
+def _get_connection() -> Optional[sqlite3.Connection]:
+    """Opens (once) the shadow database. Returns None if SQLite lacks FTS5 trigram support."""
+    global _connection, _unavailable
+    if _connection is not None or _unavailable:
+        return _connection
+    try:
+        conn = sqlite3.connect(_db_path(), check_same_thread=False)
+        conn.executescript(_SCHEMA)
+        try:
+            # Shadow databases created before versions were tracked
+            conn.execute("ALTER TABLE fts_collections ADD COLUMN version TEXT")
+        except sqlite3.OperationalError:
+            pass
+        _connection = conn
+    except sqlite3.Error as e:
+        _unavailable = True
+        get_logger("utils.fts_index").warning(f"FTS5 accelerator unavailable, using Chroma filtering: {e}")
+    return _connection
+
+
+def _replace_rows(conn: sqlite3.Connection, collection_name: str, ids: List[str], documents: List[Any]) -> None:
+    conn.executemany("DELETE FROM fts_content WHERE collection = ? AND doc_id = ?", [(collection_name, i) for i in ids])
+    conn.executemany(
+        "INSERT INTO fts_content(collection, doc_id, content) VALUES (?, ?, ?)",
+        [(collection_name, i, d or "") for i, d in zip(ids, documents)],
+    )
+
+
+def _update_count(conn: sqlite3.Connection, collection_name: str) -> None:
+    conn.execute(
+        "UPDATE fts_collections SET doc_count = (SELECT COUNT(*) FROM fts_content WHERE collection = ?) "
+        "WHERE name = ?",
+        (collection_name, collection_name),
+    )
+
+
+def _is_tracked(conn: sqlite3.Connection, collection_name: str) -> bool:
+    return conn.execute("SELECT 1 FROM fts_collections WHERE name = ?", (collection_name,)).fetchone() is not None
+
+
+def _stored_version(conn: sqlite3.Connection, collection_name: str) -> Optional[CollectionVersion]:
+    row = conn.execute("SELECT version FROM fts_collections WHERE name = ?", (collection_name,)).fetchone()
+    if row is None or row[0] is None:
+        return None
+    count, seq = json.loads(row[0])
+    return count, seq
+
+
+def _set_version(conn: sqlite3.Connection, collection_name: str, version: Optional[CollectionVersion]) -> None:
+    value = json.dumps(list(version)) if version is not None else None
+    conn.execute("UPDATE fts_collections SET version = ? WHERE name = ?", (value, collection_name))
+
+
+def is_fts_tracked(collection_name: str) -> bool:
+    """Returns True if a collection has a shadow table the write hooks keep in sync."""
+    if _connection is None:
+        return False
+    with _lock:
+        try:
+            return _is_tracked(_connection, collection_name)
+        except sqlite3.Error:
+            return False
+
+
+def rebuild_fts_index(collection_name: str, collection, batch_size: int = 1000) -> None:
+    """Reloads a collection's documents into its shadow table.
+
+    Documents are read from Chroma without holding the module lock, so lookups on
+    other collections and the write hooks are not blocked by a long rebuild. The
+    version is taken before reading; a write that lands during the read leaves
+    the table behind, and it is rebuilt again on next use.
+    """
+    with _lock:
+        generation = _generations.get(collection_name, 0)
+    version = collection_version(collection)
+    ids: List[str] = []
+    documents: List[Any] = []
+    offset = 0
+    while True:
+        batch = collection.get(include=["documents"], limit=batch_size, offset=offset)
+        batch_ids = batch.get("ids") or []
+        if not batch_ids:
+            break
+        ids.extend(batch_ids)
+        documents.extend(batch.get("documents") or [None] * len(batch_ids))
+        offset += len(batch_ids)
+        if len(batch_ids) < batch_size:
+            break
+    with _lock:
+        conn = _get_connection()
+        if conn is None or _generations.get(collection_name, 0) != generation:
+            return
+        with conn:
+            conn.execute("DELETE FROM fts_content WHERE collection = ?", (collection_name,))
+            _replace_rows(conn, collection_name, ids, documents)
+            conn.execute("INSERT OR REPLACE INTO fts_collections(name, doc_count) VALUES (?, 0)", (collection_name,))
+            _update_count(conn, collection_name)
+            _set_version(conn, collection_name, version)
+    get_logger("utils.fts_index").info(f"Built FTS shadow table for '{collection_name}' ({len(ids)} documents).")
+
+
+def _rebuild_in_background(collection_name: str, collection) -> None:
+    """Starts a rebuild thread for a collection unless one is already running."""
+
+    def run():
+        try:
+            rebuild_fts_index(collection_name, collection)
+        except Exception as e:
+            get_logger("utils.fts_index").warning(f"FTS rebuild failed for '{collection_name}': {e}")
+        finally:
+            with _lock:
+                _rebuilds.pop(collection_name, None)
+
+    with _lock:
+        if collection_name in _rebuilds:
+            return
+        thread = threading.Thread(target=run, name=f"fts-rebuild-{collection_name}", daemon=True)
+        _rebuilds[collection_name] = thread
+    thread.start()
+
+
+def _contains(conn: sqlite3.Connection, collection_name: str, needle: str) -> Set[str]:
+    if len(needle) < MIN_TRIGRAM_LENGTH:
+        rows = conn.execute(
+            "SELECT doc_id FROM fts_content WHERE collection = ? AND instr(content, ?) > 0",
+            (collection_name, needle),
+        )
+    else:
+        phrase = '"' + needle.replace('"', '""') + '"'
+        rows = conn.execute(
+            "SELECT c.doc_id FROM fts_docs JOIN fts_content c ON c.rowid = fts_docs.rowid "
+            "WHERE fts_docs MATCH ? AND c.collection = ?",
+            (phrase, collection_name),
+        )
+    return {row[0] for row in rows}
+
+
+def _all_ids(conn: sqlite3.Connection, collection_name: str) -> Set[str]:
+    rows = conn.execute("SELECT doc_id FROM fts_content WHERE collection = ?", (collection_name,))
+    return {row[0] for row in rows}
+
+
+def _is_supported(where_document: Any) -> bool:
+    """Checks that a filter only uses operators the shadow index can evaluate exactly."""
+    if not isinstance(where_document, dict) or len(where_document) != 1:
+        return False
+    op, value = next(iter(where_document.items()))
+    if op in ("$contains", "$not_contains"):
+        return isinstance(value, str)
+    if op in ("$and", "$or"):
+        return isinstance(value, list) and bool(value) and all(_is_supported(v) for v in value)
+    return False
+
+
+def _evaluate(conn: sqlite3.Connection, collection_name: str, where_document: Dict[str, Any]) -> Set[str]:
+    op, value = next(iter(where_document.items()))
+    if op == "$contains":
+        return _contains(conn, collection_name, value)
+    if op == "$not_contains":
+        return _all_ids(conn, collection_name) - _contains(conn, collection_name, value)
+    sets = [_evaluate(conn, collection_name, clause) for clause in value]
+    if op == "$and":
+        return set.intersection(*sets)
+    return set.union(*sets)
+
+
+def resolve_document_filter(collection_name: str, collection, where_document: Any) -> Optional[Set[str]]:
+    """Resolves a `where_document` filter to the set of matching document IDs.
+
+    Returns None when the accelerator is disabled or unavailable, the filter uses
+    unsupported operators, the shadow table is missing or behind the collection
+    (a rebuild is then started in the background), or the result is too large to
+    pass as an ID restriction. In those cases the caller should let Chroma
+    evaluate the filter itself.
+    """
+    if not fts_enabled() or not _is_supported(where_document):
+        return None
+    logger = get_logger("utils.fts_index")
+    current = collection_version(collection)
+    with _lock:
+        conn = _get_connection()
+        if conn is None:
+            return None
+        try:
+            stale = _stored_version(conn, collection_name) != current
+            if not stale:
+                matched = _evaluate(conn, collection_name, where_document)
+        except sqlite3.Error as e:
+            logger.warning(f"FTS lookup failed for '{collection_name}', falling back to Chroma filtering: {e}")
+            return None
+    if stale:
+        logger.info(f"FTS shadow table for '{collection_name}' is missing or stale; rebuilding in the background.")
+        _rebuild_in_background(collection_name, collection)
+        return None
+    if len(matched) > MAX_ID_RESTRICTION:
+        logger.debug(f"FTS filter matched {len(matched)} documents in '{collection_name}'; deferring to Chroma.")
+        return None
+    if matched:
+        # Versions of ephemeral/HTTP collections are count-only; drop IDs deleted since the table was built
+        matched &= set(collection.get(ids=sorted(matched), include=[]).get("ids") or [])
+    return matched
+
+
+def sync_fts_add(
+    collection_name: str,
+    ids: List[str],
+    documents: List[Optional[str]],
+    version_before: Optional[CollectionVersion] = None,
+    version_after: Optional[CollectionVersion] = None,
+) -> None:
+    """Write-path hook: mirrors added or updated documents if the collection is shadowed.
+
+    `version_before`/`version_after` are the collection versions around the write; without
+    them the table is marked unverified and rebuilt on next use.
+    """
+    _sync(
+        collection_name,
+        lambda conn: _replace_rows(conn, collection_name, ids, documents),
+        version_before,
+        version_after,
+    )
+
+
+def sync_fts_delete(
+    collection_name: str,
+    ids: Iterable[str],
+    version_before: Optional[CollectionVersion] = None,
+    version_after: Optional[CollectionVersion] = None,
+) -> None:
+    """Write-path hook: removes deleted documents if the collection is shadowed."""
+    id_list = list(ids)
+    _sync(
+        collection_name,
+        lambda conn: conn.executemany(
+            "DELETE FROM fts_content WHERE collection = ? AND doc_id = ?", [(collection_name, i) for i in id_list]
+        ),
+        version_before,
+        version_after,
+    )
+
+
+def _sync(
+    collection_name: str,
+    apply,
+    version_before: Optional[CollectionVersion],
+    version_after: Optional[CollectionVersion],
+) -> None:
+    if _connection is None:
+        return
+    with _lock:
+        try:
+            with _connection:
+                if not _is_tracked(_connection, collection_name):
+                    return
+                apply(_connection)
+                _update_count(_connection, collection_name)
+                # Only a table that was current before the write is current after it
+                current = version_before is not None and _stored_version(_connection, collection_name) == version_before
+                _set_version(_connection, collection_name, version_after if current else None)
+        except sqlite3.Error as e:
+            # A failed sync must not fail the write itself; untrack so the next read rebuilds
+            get_logger("utils.fts_index").warning(f"FTS sync failed for '{collection_name}': {e}")
+            drop_fts_index(collection_name)
+
+
+def drop_fts_index(collection_name: str) -> None:
+    """Removes a collection's shadow rows (e.g. after the collection is renamed or deleted)."""
+    with _lock:
+        _generations[collection_name] = _generations.get(collection_name, 0) + 1
+        if _connection is None:
+            return
+        try:
+            with _connection:
+                _connection.execute("DELETE FROM fts_collections WHERE name = ?", (collection_name,))
+                _connection.execute("DELETE FROM fts_content WHERE collection = ?", (collection_name,))
+        except sqlite3.Error as e:
+            get_logger("utils.fts_index").warning(f"Could not drop FTS shadow table for '{collection_name}': {e}")
+
+
+def wait_for_fts_rebuilds(timeout: Optional[float] = None) -> None:
+    """Blocks until background rebuilds started so far have finished."""
+    with _lock:
+        threads = list(_rebuilds.values())
+    for thread in threads:
+        thread.join(timeout)
+
+
+def reset_fts_index() -> None:
+    """Closes the shadow database so the next use reopens it (used when the config changes and in tests)."""
+    global _connection, _unavailable
+    wait_for_fts_rebuilds()
+    with _lock:
+        if _connection is not None:
+            _connection.close()
+        _connection = None
+        _unavailable = False
@@ -0,0 +1,335 @@
+"""
+Sidecar BM25 lexical index for ChromaDB collections.
+
+Embedding models are weak at matching exact code identifiers, and Chroma's
+`$contains` document filter is an unranked substring scan. This module keeps a
+small per-collection inverted index, tokenised for code identifiers, that can
+be queried with BM25 and fused with vector results.
+
+Indexes are created lazily: the first hybrid query against a collection builds
+its index from the stored documents. From then on the document write paths keep
+it in sync. Each index records the collection version (see
+`collection_version.py`) it reflects; `ensure_lexical_index` rebuilds it when
+the collection changed behind the server's back, e.g. through
+`chroma-mcp-client index` or after a crash lost unsaved changes. For persistent
+clients the index is saved as JSON in a `lexical_index` directory next to the
+Chroma data, at most `FLUSH_INTERVAL_SECONDS` after a change.
+"""
+
+import atexit
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from . import get_logger, get_server_config
+from .collection_version import CollectionVersion, collection_version
+
+LEXICAL_INDEX_DIRNAME = "lexical_index"
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Seconds between a change and the index being written back to disk
+FLUSH_INTERVAL_SECONDS = 2.0
+
+_IDENTIFIER_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+_CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Splits text into lowercase tokens suitable for code search.
+
+    Every identifier is emitted as a whole (e.g. `get_chroma_client`) and also
+    split into its snake_case and camelCase parts (`get`, `chroma`, `client`),
+    so both exact identifiers and their components are searchable.
+    """
+    tokens: List[str] = []
+    for match in _IDENTIFIER_RE.finditer(text or ""):
+        word = match.group(0)
+        tokens.append(word.lower())
+        parts = [p for chunk in word.split("_") if chunk for p in _CAMEL_RE.findall(chunk)]
+        if len(parts) > 1:
+            tokens.extend(p.lower() for p in parts)
+    return tokens
+
+
+class BM25Index:
+    """In-memory inverted index with BM25 scoring and optional JSON persistence."""
+
+    def __init__(self, collection_name: str, path: Optional[str] = None):
+        self.collection_name = collection_name
+        self.path = path
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        # Forward index (doc -> terms) so removals only touch that document's postings
+        self.doc_terms: Dict[str, List[str]] = {}
+        self.total_length = 0
+        # Collection version the contents reflect; None means unknown (always rebuilt when checked)
+        self.version: Optional[CollectionVersion] = None
+        self._pending_writes = 0
+        self._flush_timer: Optional[threading.Timer] = None
+        self._lock = threading.RLock()
+
+    # --- Mutation ---
+
+    def add(self, ids: Iterable[str], documents: Iterable[Optional[str]]) -> None:
+        """Adds or replaces documents in the index."""
+        with self._lock:
+            for doc_id, document in zip(ids, documents):
+                self._remove_one(doc_id)
+                term_counts = Counter(tokenize(document or ""))
+                for term, count in term_counts.items():
+                    self.postings.setdefault(term, {})[doc_id] = count
+                self.doc_terms[doc_id] = list(term_counts)
+                length = sum(term_counts.values())
+                self.doc_lengths[doc_id] = length
+                self.total_length += length
+                self._pending_writes += 1
+            self._maybe_flush()
+
+    def remove(self, ids: Iterable[str]) -> None:
+        """Removes documents from the index. Unknown IDs are ignored."""
+        with self._lock:
+            for doc_id in ids:
+                if self._remove_one(doc_id):
+                    self._pending_writes += 1
+            self._maybe_flush()
+
+    def _remove_one(self, doc_id: str) -> bool:
+        if doc_id not in self.doc_lengths:
+            return False
+        self.total_length -= self.doc_lengths.pop(doc_id)
+        for term in self.doc_terms.pop(doc_id, []):
+            docs = self.postings.get(term)
+            if docs is None:
+                continue
+            docs.pop(doc_id, None)
+            if not docs:
+                del self.postings[term]
+        return True
+
+    # --- Query ---
+
+    def search(self, query: str, n_results: int = 10) -> List[Tuple[str, float]]:
+        """Returns up to `n_results` (id, score) pairs ordered by descending BM25 score."""
+        with self._lock:
+            num_docs = len(self.doc_lengths)
+            if num_docs == 0:
+                return []
+            avg_length = self.total_length / num_docs or 1.0
+            scores: Dict[str, float] = {}
+            for term in set(tokenize(query)):
+                docs = self.postings.get(term)
+                if not docs:
+                    continue
+                idf = math.log(1.0 + (num_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                for doc_id, tf in docs.items():
+                    norm = BM25_K1 * (1.0 - BM25_B + BM25_B * self.doc_lengths[doc_id] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1.0) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:n_results]
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    # --- Persistence ---
+
+    def advance_version(self, before: Optional[CollectionVersion], after: Optional[CollectionVersion]) -> None:
+        """Records `after` as the current version if the index was current at `before`.
+
+        Used by the write hooks: a change applied to an index that had already
+        missed an external write must not make it look current.
+        """
+        with self._lock:
+            if before is not None and self.version == before:
+                self.version = after
+            else:
+                self.version = None
+            self._pending_writes += 1
+            self._maybe_flush()
+
+    def _maybe_flush(self) -> None:
+        if not self.path or not self._pending_writes or self._flush_timer is not None:
+            return
+        self._flush_timer = threading.Timer(FLUSH_INTERVAL_SECONDS, self._timed_flush)
+        self._flush_timer.daemon = True
+        self._flush_timer.start()
+
+    def _timed_flush(self) -> None:
+        try:
+            self.save()
+        except OSError as e:
+            get_logger("utils.lexical_index").warning(f"Could not save lexical index to {self.path}: {e}")
+
+    def save(self) -> None:
+        """Writes the index to its JSON file (no-op for in-memory indexes)."""
+        if not self.path:
+            return
+        with self._lock:
+            if self._flush_timer is not None and self._flush_timer is not threading.current_thread():
+                self._flush_timer.cancel()
+            self._flush_timer = None
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "postings": self.postings,
+                        "doc_lengths": self.doc_lengths,
+                        "version": list(self.version) if self.version is not None else None,
+                    },
+                    f,
+                )
+            os.replace(tmp_path, self.path)
+            self._pending_writes = 0
+
+    @classmethod
+    def load(cls, collection_name: str, path: str) -> "BM25Index":
+        """Loads an index previously written with `save`."""
+        index = cls(collection_name, path)
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        index.postings = data.get("postings", {})
+        index.doc_lengths = data.get("doc_lengths", {})
+        index.total_length = sum(index.doc_lengths.values())
+        version = data.get("version")
+        index.version = tuple(version) if version is not None else None
+        for term, docs in index.postings.items():
+            for doc_id in docs:
+                index.doc_terms.setdefault(doc_id, []).append(term)
+        return index
+
+
+# --- Registry --- #
+
+_indexes: Dict[str, BM25Index] = {}
+_registry_lock = threading.Lock()
+
+
+def _index_path(collection_name: str) -> Optional[str]:
+    """Returns the JSON path for a collection's index, or None when not using a persistent client."""
+    try:
+        config = get_server_config()
+    except Exception:
+        return None
+    if config.client_type != "persistent" or not config.data_dir:
+        return None
+    return os.path.join(config.data_dir, LEXICAL_INDEX_DIRNAME, f"{collection_name}.json")
+
+
+def get_lexical_index(collection_name: str) -> Optional[BM25Index]:
+    """Returns the loaded index for a collection, loading it from disk if present.
+
+    Returns None if no index has been built for the collection yet.
+    """
+    with _registry_lock:
+        index = _indexes.get(collection_name)
+        if index is not None:
+            return index
+        path = _index_path(collection_name)
+        if path and os.path.exists(path):
+            try:
+                index = BM25Index.load(collection_name, path)
+                _indexes[collection_name] = index
+                return index
+            except (OSError, ValueError) as e:
+                get_logger("utils.lexical_index").warning(f"Could not load lexical index from {path}: {e}")
+        return None
+
+
+def build_lexical_index(collection_name: str, collection, batch_size: int = 1000) -> BM25Index:
+    """Builds (or rebuilds) a collection's index from its stored documents."""
+    logger = get_logger("utils.lexical_index")
+    index = BM25Index(collection_name, _index_path(collection_name))
+    # Taken before reading, so writes racing with the build make the next check rebuild again
+    index.version = collection_version(collection)
+    offset = 0
+    while True:
+        batch = collection.get(include=["documents"], limit=batch_size, offset=offset)
+        ids = batch.get("ids") or []
+        if not ids:
+            break
+        index.add(ids, batch.get("documents") or [None] * len(ids))
+        offset += len(ids)
+        if len(ids) < batch_size:
+            break
+    index.save()
+    with _registry_lock:
+        _indexes[collection_name] = index
+    logger.info(f"Built lexical index for '{collection_name}' with {len(index)} documents.")
+    return index
+
+
+def ensure_lexical_index(collection_name: str, collection) -> BM25Index:
+    """Returns a collection's index, (re)building it if it is missing or behind the collection."""
+    index = get_lexical_index(collection_name)
+    if index is not None and index.version is not None and index.version == collection_version(collection):
+        return index
+    if index is not None:
+        get_logger("utils.lexical_index").info(f"Lexical index for '{collection_name}' is stale; rebuilding.")
+    return build_lexical_index(collection_name, collection)
+
+
+def sync_lexical_index_add(
+    collection_name: str,
+    ids: List[str],
+    documents: List[Optional[str]],
+    version_before: Optional[CollectionVersion] = None,
+    version_after: Optional[CollectionVersion] = None,
+) -> None:
+    """Write-path hook: indexes added or updated documents if the collection has an index.
+
+    `version_before`/`version_after` are the collection versions around the write; without
+    them the index is marked unverified and checked against the collection on next use.
+    """
+    index = get_lexical_index(collection_name)
+    if index is not None:
+        index.add(ids, documents)
+        index.advance_version(version_before, version_after)
+
+
+def sync_lexical_index_delete(
+    collection_name: str,
+    ids: List[str],
+    version_before: Optional[CollectionVersion] = None,
+    version_after: Optional[CollectionVersion] = None,
+) -> None:
+    """Write-path hook: removes deleted documents if the collection has an index."""
+    index = get_lexical_index(collection_name)
+    if index is not None:
+        index.remove(ids)
+        index.advance_version(version_before, version_after)
+
+
+def drop_lexical_index(collection_name: str) -> None:
+    """Forgets a collection's index and removes its file (e.g. after the collection is deleted)."""
+    with _registry_lock:
+        index = _indexes.pop(collection_name, None)
+    if index is not None:
+        with index._lock:
+            # Stop a pending timed flush from writing the file back
+            if index._flush_timer is not None:
+                index._flush_timer.cancel()
+                index._flush_timer = None
+            index.path = None
+    path = _index_path(collection_name)
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+@atexit.register
+def flush_lexical_indexes() -> None:
+    """Writes all indexes with pending changes to disk."""
+    with _registry_lock:
+        indexes = list(_indexes.values())
+    for index in indexes:
+        if index._flush_timer is not None:
+            index._flush_timer.cancel()
+            index._flush_timer = None
+        if index._pending_writes:
+            try:
+                index.save()
+            except OSError:
+                pass
@@ -0,0 +1,127 @@
+"""
+Streaming metadata aggregation (facets) for ChromaDB collections.
+
+Used by the `chroma_aggregate` tool to answer questions such as "chat entries
+per `modification_type` and `status`" or "chunks per `file_path`" without
+returning documents. Metadatas are read page by page (optionally restricted by
+a `where` filter) and folded into group-by counts, per-group min/max/avg of
+numeric fields and distinct-value counts. Only the aggregates are kept, and both
+the number of groups and the distinct values per field are capped, so memory
+stays bounded regardless of collection size.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .collection_stats import MAX_DISTINCT_VALUES
+from .sharding import get_pages
+
+AGGREGATE_PAGE_SIZE = 1000
+# Groups tracked before further new keys are counted under `other_count`
+MAX_AGGREGATE_GROUPS = 10000
+DEFAULT_AGGREGATE_GROUP_LIMIT = 100
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _fold_numeric(numeric: Dict[str, List[float]], field: str, value: Any) -> None:
+    if not _is_number(value):
+        return
+    acc = numeric.get(field)
+    if acc is None:
+        numeric[field] = [1, value, value, value]
+    else:
+        acc[0] += 1
+        acc[1] = min(acc[1], value)
+        acc[2] = max(acc[2], value)
+        acc[3] += value
+
+
+def _numeric_summary(numeric: Dict[str, List[float]], fields: Sequence[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    summary: Dict[str, Optional[Dict[str, Any]]] = {}
+    for field in fields:
+        acc = numeric.get(field)
+        summary[field] = (
+            None
+            if acc is None
+            else {"count": acc[0], "min": acc[1], "max": acc[2], "avg": round(acc[3] / acc[0], 6), "sum": acc[3]}
+        )
+    return summary
+
+
+def aggregate_metadata(
+    collection,
+    group_by: Sequence[str] = (),
+    numeric_fields: Sequence[str] = (),
+    distinct_fields: Sequence[str] = (),
+    where: Optional[Dict[str, Any]] = None,
+    limit: int = DEFAULT_AGGREGATE_GROUP_LIMIT,
+    page_size: int = AGGREGATE_PAGE_SIZE,
+    max_groups: int = MAX_AGGREGATE_GROUPS,
+) -> Dict[str, Any]:
+    """Aggregates a collection's metadata page by page without reading documents or embeddings.
+
+    Args:
+        collection: The Chroma collection (or sharded collection).
+        group_by: Metadata fields whose value combination defines a group (none: one group).
+        numeric_fields: Fields summarised with count/min/max/avg/sum per group; non-numeric
+            values are ignored.
+        distinct_fields: Fields whose distinct values are counted over all matching records,
+            up to `MAX_DISTINCT_VALUES`.
+        where: Optional metadata filter restricting the records.
+        limit: Groups returned, largest first.
+        page_size: Records read per `get`.
+        max_groups: Groups tracked before new keys are only counted in `other_count`.
+
+    Returns:
+        A dict with `records_scanned`, `groups` (each with `key`, `count` and, when requested,
+        `numeric`), `groups_total`, `groups_truncated`, `other_count` and `distinct`.
+    """
+    group_by = list(group_by)
+    groups: Dict[Tuple[Any, ...], List[Any]] = {}  # key -> [count, numeric accumulators]
+    other_count = 0
+    # None once a field has more than MAX_DISTINCT_VALUES distinct values
+    distinct: Dict[str, Optional[set]] = {field: set() for field in distinct_fields}
+    scanned = 0
+
+    for page in get_pages(collection, page_size, where=where, include=["metadatas"]):
+        metadatas = page.get("metadatas") or []
+        for metadata in metadatas:
+            metadata = metadata or {}
+            scanned += 1
+            key = tuple(metadata.get(field) for field in group_by)
+            group = groups.get(key)
+            if group is None:
+                if len(groups) >= max_groups:
+                    other_count += 1
+                else:
+                    group = groups[key] = [0, {}]
+            if group is not None:
+                group[0] += 1
+                for field in numeric_fields:
+                    _fold_numeric(group[1], field, metadata.get(field))
+            for field, values in distinct.items():
+                if values is not None and field in metadata:
+                    values.add(metadata[field])
+                    if len(values) > MAX_DISTINCT_VALUES:
+                        distinct[field] = None
+
+    ranked = sorted(groups.items(), key=lambda item: (-item[1][0], repr(item[0])))
+    result_groups = []
+    for key, (count, numeric) in ranked[:limit]:
+        entry: Dict[str, Any] = {"key": dict(zip(group_by, key)), "count": count}
+        if numeric_fields:
+            entry["numeric"] = _numeric_summary(numeric, numeric_fields)
+        result_groups.append(entry)
+    return {
+        "records_scanned": scanned,
+        "groups": result_groups,
+        "groups_total": len(groups),
+        "groups_truncated": len(groups) > limit or other_count > 0,
+        "other_count": other_count,
+        "distinct": {
+            field: len(values) if values is not None else f">{MAX_DISTINCT_VALUES}"
+            for field, values in distinct.items()
+        },
+    }
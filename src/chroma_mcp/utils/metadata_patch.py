@@ -0,0 +1,159 @@
+"""
+Bulk metadata patches (merge updates).
+
+Link maintenance and status changes only touch a field or two of each entry.
+`patch_metadata` reads the current metadata of all targeted entries in one
+`get`, merges the patches in memory and writes back only the changed fields in
+one `update` per batch (Chroma merges update metadata into the stored dict).
+
+A patch maps fields to new values. `None` removes a field. Fields that hold
+comma-joined ID lists (e.g. `related_chat_ids`) take set operators instead of a
+value: `{"related_chat_ids": {"$add": ["chat-1"]}}` adds the IDs not already
+present, `{"$remove": [...]}` drops them, and an emptied list removes the field.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+SET_ADD = "$add"
+SET_REMOVE = "$remove"
+SET_SEPARATOR = ","
+PATCH_BATCH_SIZE = 1000  # Entries per get/update round trip
+
+MetadataPatch = Mapping[str, Any]
+
+
+@dataclass
+class MetadataPatchResult:
+    """Outcome of a bulk metadata patch."""
+
+    matched: int = 0
+    updated: int = 0
+    updated_ids: List[str] = field(default_factory=list)
+    missing_ids: List[str] = field(default_factory=list)
+
+
+def split_id_list(value: Any) -> List[str]:
+    """Returns the items of a comma-joined ID list field (or of a list) without blanks."""
+    if value is None:
+        return []
+    items = value if isinstance(value, (list, tuple, set)) else str(value).split(SET_SEPARATOR)
+    return [str(item).strip() for item in items if str(item).strip()]
+
+
+def validate_patch(patch: Any) -> None:
+    """Raises ValueError unless `patch` is a dict whose dict values only use the set operators."""
+    if not isinstance(patch, Mapping):
+        raise ValueError("A metadata patch must be a JSON object (dict).")
+    for key, value in patch.items():
+        if isinstance(value, Mapping):
+            unknown = set(value) - {SET_ADD, SET_REMOVE}
+            if unknown or not value:
+                raise ValueError(f"Field '{key}' must use {SET_ADD} and/or {SET_REMOVE}, got: {sorted(unknown)}.")
+
+
+def _apply_set_operators(current: Any, operators: Mapping[str, Any]) -> Optional[str]:
+    removed = set(split_id_list(operators.get(SET_REMOVE)))
+    items = [item for item in dict.fromkeys(split_id_list(current)) if item not in removed]
+    items.extend(item for item in split_id_list(operators.get(SET_ADD)) if item not in items and item not in removed)
+    return SET_SEPARATOR.join(items) if items else None
+
+
+def resolve_patch(current: Optional[Mapping[str, Any]], patch: MetadataPatch) -> Dict[str, Any]:
+    """Returns the fields `patch` changes in `current` (`None` marks a field to remove)."""
+    current = current or {}
+    changes: Dict[str, Any] = {}
+    for key, value in patch.items():
+        new_value = _apply_set_operators(current.get(key), value) if isinstance(value, Mapping) else value
+        if new_value is None:
+            if key in current:
+                changes[key] = None
+        elif key not in current or current[key] != new_value:
+            changes[key] = new_value
+    return changes
+
+
+def merge_metadata(current: Optional[Mapping[str, Any]], patch: MetadataPatch) -> Dict[str, Any]:
+    """Returns `current` with `patch` applied."""
+    merged = dict(current or {})
+    for key, value in resolve_patch(current, patch).items():
+        if value is None:
+            merged.pop(key, None)
+        else:
+            merged[key] = value
+    return merged
+
+
+def _write_batch(collection, ids: List[str], metadatas: List[Optional[Mapping[str, Any]]], patches, result) -> None:
+    update_ids: List[str] = []
+    update_metadatas: List[Dict[str, Any]] = []
+    for doc_id, current in zip(ids, metadatas):
+        changes = resolve_patch(current, patches(doc_id))
+        if changes:
+            update_ids.append(doc_id)
+            update_metadatas.append(changes)
+    if update_ids:
+        collection.update(ids=update_ids, metadatas=update_metadatas)
+    result.matched += len(ids)
+    result.updated += len(update_ids)
+    result.updated_ids.extend(update_ids)
+
+
+def patch_metadata(
+    collection,
+    patches: Optional[Mapping[str, MetadataPatch]] = None,
+    patch: Optional[MetadataPatch] = None,
+    where: Optional[Dict[str, Any]] = None,
+    batch_size: int = PATCH_BATCH_SIZE,
+) -> MetadataPatchResult:
+    """Merges partial metadata into many entries with one read and one write per batch.
+
+    Args:
+        collection: The Chroma collection (or sharded collection) to patch.
+        patches: Per-entry patches keyed by ID.
+        patch: A single patch applied to every entry matching `where`.
+        where: Metadata filter selecting the entries for `patch`.
+        batch_size: Entries read and written per round trip.
+
+    Returns:
+        A MetadataPatchResult; entries whose patch changes nothing are not written, and
+        IDs in `patches` that do not exist are reported in `missing_ids`.
+
+    Raises:
+        ValueError: If neither `patches` nor `patch` with `where` is given, or a patch uses
+            an unknown set operator.
+    """
+    if patches is None and (patch is None or where is None):
+        raise ValueError("Provide per-ID `patches`, or one `patch` with a `where` filter.")
+    # Validate everything up front so a bad patch never leaves a batch half-written
+    for entry_patch in patches.values() if patches is not None else [patch]:
+        validate_patch(entry_patch)
+    result = MetadataPatchResult()
+    if patches is not None:
+        ids = list(patches)
+        for start in range(0, len(ids), batch_size):
+            chunk = ids[start : start + batch_size]
+            found = collection.get(ids=chunk, include=["metadatas"])
+            found_ids = found.get("ids") or []
+            result.missing_ids.extend(sorted(set(chunk) - set(found_ids)))
+            _write_batch(collection, found_ids, found.get("metadatas") or [], lambda doc_id: patches[doc_id], result)
+        return result
+
+    found = collection.get(where=where, include=["metadatas"])
+    found_ids = found.get("ids") or []
+    metadatas = found.get("metadatas") or []
+    for start in range(0, len(found_ids), batch_size):
+        _write_batch(
+            collection,
+            found_ids[start : start + batch_size],
+            metadatas[start : start + batch_size],
+            lambda _id: patch,
+            result,
+        )
+    return result
+
+
+def add_to_id_lists(collection, ids: Iterable[str], field_name: str, values: Iterable[str]) -> MetadataPatchResult:
+    """Adds `values` to the comma-joined `field_name` list of every entry in `ids`."""
+    values = list(values)
+    return patch_metadata(collection, patches={doc_id: {field_name: {SET_ADD: values}} for doc_id in ids})
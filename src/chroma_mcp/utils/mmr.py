@@ -0,0 +1,68 @@
+"""
+Maximal Marginal Relevance (MMR) re-ranking.
+
+Used by the query tools to diversify results, e.g. when several overlapping
+chunks of the same file would otherwise fill the top-k.
+"""
+
+from typing import List, Sequence
+
+import numpy as np
+
+# Candidates fetched per requested result when diversifying (k x m over-fetch)
+DEFAULT_MMR_FETCH_MULTIPLIER = 4
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def mmr_select(
+    query_embedding: Sequence[float],
+    candidate_embeddings: Sequence[Sequence[float]],
+    k: int,
+    lambda_mult: float = 0.5,
+) -> List[int]:
+    """Selects `k` candidate indices by Maximal Marginal Relevance.
+
+    Each step picks the candidate maximising
+    `lambda_mult * sim(query, c) - (1 - lambda_mult) * max(sim(c, selected))`
+    using cosine similarity. `lambda_mult=1.0` reproduces plain relevance order,
+    lower values favour candidates unlike those already selected.
+
+    Args:
+        query_embedding: The query vector.
+        candidate_embeddings: Candidate vectors, typically in relevance order.
+        k: Number of candidates to select.
+        lambda_mult: Relevance/diversity trade-off in [0, 1].
+
+    Returns:
+        Indices into `candidate_embeddings` in selection order.
+    """
+    candidates = np.asarray(candidate_embeddings, dtype=np.float32)
+    if candidates.ndim != 2 or candidates.shape[0] == 0 or k <= 0:
+        return []
+    k = min(k, candidates.shape[0])
+
+    candidates = _normalize(candidates)
+    query = _normalize(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))[0]
+    relevance = candidates @ query
+    # Pairwise similarities are computed once; each step only reads one row
+    pairwise = candidates @ candidates.T
+
+    selected: List[int] = []
+    max_sim_to_selected = np.full(candidates.shape[0], -np.inf, dtype=np.float32)
+    available = np.ones(candidates.shape[0], dtype=bool)
+    for _ in range(k):
+        if selected:
+            scores = lambda_mult * relevance - (1.0 - lambda_mult) * max_sim_to_selected
+        else:
+            scores = relevance.copy()
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(max_sim_to_selected, pairwise[best], out=max_sim_to_selected)
+    return selected
@@ -0,0 +1,279 @@
+"""
+Hot/cold tiering for append-only working-memory collections.
+
+`chat_history_v1`, `sequential_thoughts_v1` and `thinking_sessions` only ever
+grow, so every status scan (`fetch_recent_chat_entries`) or session lookup pays
+for the full history. A retention policy selects entries that are old enough
+(`max_age_days`), beyond the newest `max_count`, and in an eligible status, and
+moves them with their stored embeddings into `<collection>_archive` in batches
+before deleting them from the hot collection. Nothing is re-embedded, and the
+archive keeps the hot collection's metadata, so it can be queried the same way.
+
+Policies run from `chroma-mcp-client archive` or, when
+`--retention-interval-hours` is set, from a background task in the server.
+Tools only read the archive when a caller asks for it (`include_archive`).
+"""
+
+import asyncio
+import datetime
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..types import ChromaClientConfig
+from . import get_chroma_client, get_embedding_function, get_logger, get_server_config
+from .collection_stats import _to_epoch
+from .exact_search import invalidate_exact_index
+from .fts_index import sync_fts_delete
+from .lexical_index import sync_lexical_index_delete
+
+ARCHIVE_SUFFIX = "_archive"
+DEFAULT_RETENTION_BATCH_SIZE = 500
+RETENTION_PAGE_SIZE = 1000
+ARCHIVED_AT_FIELD = "archived_at"
+
+
+@dataclass
+class RetentionPolicy:
+    """Which entries of a collection move to its archive.
+
+    Attributes:
+        collection_name: Hot collection the policy applies to.
+        max_age_days: Archive entries whose timestamp is older than this.
+        max_count: Keep at most this many entries (or groups) in the hot collection.
+        statuses: Only entries whose `status` metadata is in this list are eligible.
+        timestamp_field: Metadata field holding the entry time (ISO string or epoch seconds).
+        group_by: Archive whole groups (e.g. all thoughts of a session) using the group's newest timestamp.
+        orphaned_in: Archive entries whose ID no longer appears as `orphan_key` in this collection.
+        orphan_key: Metadata field of `orphaned_in` that references this collection's IDs.
+    """
+
+    collection_name: str
+    max_age_days: Optional[float] = None
+    max_count: Optional[int] = None
+    statuses: Optional[List[str]] = None
+    timestamp_field: str = "timestamp"
+    group_by: Optional[str] = None
+    orphaned_in: Optional[str] = None
+    orphan_key: str = "session_id"
+
+    @property
+    def archive_name(self) -> str:
+        return archive_collection_name(self.collection_name)
+
+
+@dataclass
+class RetentionResult:
+    """Outcome of applying one policy."""
+
+    collection_name: str
+    archive_name: str
+    scanned: int = 0
+    archived: int = 0
+    dry_run: bool = False
+    seconds: float = 0.0
+    archived_ids: List[str] = field(default_factory=list)
+
+
+# Thoughts run before session summaries so summaries of fully archived sessions follow them
+DEFAULT_RETENTION_POLICIES = [
+    RetentionPolicy("chat_history_v1", max_age_days=90, statuses=["analyzed", "promoted", "ignored"]),
+    RetentionPolicy("sequential_thoughts_v1", max_age_days=180, group_by="session_id"),
+    RetentionPolicy("thinking_sessions", orphaned_in="sequential_thoughts_v1"),
+]
+
+
+def archive_collection_name(collection_name: str) -> str:
+    """Returns the name of the archive collection for a hot collection."""
+    return f"{collection_name}{ARCHIVE_SUFFIX}"
+
+
+def load_retention_policies() -> List[RetentionPolicy]:
+    """Returns the default policies with `CHROMA_RETENTION_<NAME>_*` environment overrides applied.
+
+    `MAX_AGE_DAYS` and `MAX_COUNT` accept a number or an empty value/`none` to disable the limit;
+    `STATUSES` is a comma-separated list.
+    """
+    policies = []
+    for default in DEFAULT_RETENTION_POLICIES:
+        policy = RetentionPolicy(**{**default.__dict__})
+        prefix = f"CHROMA_RETENTION_{policy.collection_name.upper()}_"
+        if (value := os.getenv(f"{prefix}MAX_AGE_DAYS")) is not None:
+            policy.max_age_days = None if value.strip().lower() in ("", "none") else float(value)
+        if (value := os.getenv(f"{prefix}MAX_COUNT")) is not None:
+            policy.max_count = None if value.strip().lower() in ("", "none") else int(value)
+        if (value := os.getenv(f"{prefix}STATUSES")) is not None:
+            policy.statuses = [s.strip() for s in value.split(",") if s.strip()] or None
+        policies.append(policy)
+    return policies
+
+
+def _page_metadatas(collection) -> Iterable[Tuple[str, Dict[str, Any]]]:
+    offset = 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=RETENTION_PAGE_SIZE, offset=offset)
+        ids = page.get("ids") or []
+        for doc_id, metadata in zip(ids, page.get("metadatas") or [{}] * len(ids)):
+            yield doc_id, metadata or {}
+        if len(ids) < RETENTION_PAGE_SIZE:
+            return
+        offset += len(ids)
+
+
+def _referenced_keys(client, collection_name: str, key: str) -> Optional[set]:
+    try:
+        collection = client.get_collection(name=collection_name)
+    except Exception:
+        return None
+    return {str(metadata[key]) for _, metadata in _page_metadatas(collection) if key in metadata}
+
+
+def select_archivable(
+    client, collection, policy: RetentionPolicy, now: Optional[float] = None
+) -> Tuple[int, List[str]]:
+    """Returns (entries scanned, IDs the policy moves to the archive)."""
+    now = time.time() if now is None else now
+    cutoff = now - policy.max_age_days * 86400 if policy.max_age_days is not None else None
+    referenced = _referenced_keys(client, policy.orphaned_in, policy.orphan_key) if policy.orphaned_in else None
+
+    # Each unit is an entry or, with group_by, a group: [newest timestamp, ids, eligible]
+    units: Dict[str, List[Any]] = {}
+    scanned = 0
+    for doc_id, metadata in _page_metadatas(collection):
+        scanned += 1
+        key = str(metadata.get(policy.group_by, doc_id)) if policy.group_by else doc_id
+        unit = units.setdefault(key, [None, [], True])
+        ts = _to_epoch(metadata.get(policy.timestamp_field))
+        if ts is not None and (unit[0] is None or ts > unit[0]):
+            unit[0] = ts
+        unit[1].append(doc_id)
+        if policy.statuses is not None and metadata.get("status") not in policy.statuses:
+            unit[2] = False
+
+    selected: set = set()
+    for key, (ts, ids, eligible) in units.items():
+        if not eligible:
+            continue
+        if cutoff is not None and ts is not None and ts < cutoff:
+            selected.add(key)
+        if referenced is not None and key not in referenced:
+            selected.add(key)
+    if policy.max_count is not None:
+        dated = sorted((unit[0], key) for key, unit in units.items() if unit[0] is not None)
+        overflow = max(0, len(units) - policy.max_count)
+        selected.update(key for _, key in dated[:overflow] if units[key][2])
+
+    ids = [doc_id for key in units if key in selected for doc_id in units[key][1]]
+    return scanned, ids
+
+
+def _move_batch(hot, archive, ids: List[str], archived_at: str) -> None:
+    batch = hot.get(ids=ids, include=["embeddings", "documents", "metadatas"])
+    if not batch.get("ids"):
+        return
+    metadatas = [{**(m or {}), ARCHIVED_AT_FIELD: archived_at} for m in batch["metadatas"]]
+    # Write the archive copy before deleting so an interrupted run never loses entries
+    archive.upsert(
+        ids=batch["ids"], embeddings=batch["embeddings"], documents=batch.get("documents"), metadatas=metadatas
+    )
+    hot.delete(ids=batch["ids"])
+    sync_lexical_index_delete(hot.name, batch["ids"])
+    sync_fts_delete(hot.name, batch["ids"])
+
+
+def apply_retention(
+    client,
+    policy: RetentionPolicy,
+    embedding_function=None,
+    batch_size: int = DEFAULT_RETENTION_BATCH_SIZE,
+    dry_run: bool = False,
+    now: Optional[float] = None,
+) -> RetentionResult:
+    """Moves the entries selected by `policy` into the archive collection.
+
+    Args:
+        client: ChromaDB client.
+        policy: The retention policy.
+        embedding_function: Attached to the archive so it can be queried by text (stored
+            embeddings are copied, not recomputed).
+        batch_size: Entries moved per batch.
+        dry_run: Only report what would be archived.
+        now: Reference time in epoch seconds (defaults to the current time).
+
+    Returns:
+        A RetentionResult; a missing hot collection yields an empty result.
+    """
+    start = time.perf_counter()
+    logger = get_logger("utils.retention")
+    result = RetentionResult(policy.collection_name, policy.archive_name, dry_run=dry_run)
+    try:
+        hot = client.get_collection(name=policy.collection_name, embedding_function=embedding_function)
+    except Exception as e:
+        logger.info(f"Skipping retention for '{policy.collection_name}': {e}")
+        return result
+
+    result.scanned, ids = select_archivable(client, hot, policy, now=now)
+    result.archived_ids = ids
+    result.archived = len(ids)
+    if ids and not dry_run:
+        archive = client.get_or_create_collection(
+            name=policy.archive_name, metadata=hot.metadata or None, embedding_function=embedding_function
+        )
+        archived_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        for offset in range(0, len(ids), batch_size):
+            _move_batch(hot, archive, ids[offset : offset + batch_size], archived_at)
+        invalidate_exact_index(policy.collection_name)
+        invalidate_exact_index(policy.archive_name)
+        logger.info(f"Archived {len(ids)} of {result.scanned} entries from '{policy.collection_name}'.")
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def run_retention(
+    client,
+    policies: Optional[List[RetentionPolicy]] = None,
+    embedding_function=None,
+    batch_size: int = DEFAULT_RETENTION_BATCH_SIZE,
+    dry_run: bool = False,
+) -> List[RetentionResult]:
+    """Applies each policy in order (the configured defaults when none are given)."""
+    return [
+        apply_retention(client, policy, embedding_function, batch_size=batch_size, dry_run=dry_run)
+        for policy in (policies if policies is not None else load_retention_policies())
+    ]
+
+
+def get_archive_collection(client, collection_name: str, embedding_function=None):
+    """Returns the archive of `collection_name`, or None if nothing has been archived yet."""
+    try:
+        return client.get_collection(
+            name=archive_collection_name(collection_name), embedding_function=embedding_function
+        )
+    except Exception:
+        return None
+
+
+async def retention_loop(interval_hours: float) -> None:
+    """Runs the configured policies every `interval_hours` until cancelled."""
+    logger = get_logger("utils.retention")
+    while True:
+        await asyncio.sleep(interval_hours * 3600)
+        try:
+            ef = get_embedding_function(get_server_config().embedding_function_name)
+            results = await asyncio.to_thread(run_retention, get_chroma_client(), None, ef)
+            logger.info(f"Retention run archived {sum(r.archived for r in results)} entries.")
+        except Exception as e:
+            logger.error(f"Retention run failed: {e}", exc_info=True)
+
+
+def start_retention_task(config: Optional[ChromaClientConfig]) -> Optional["asyncio.Task"]:
+    """Starts `retention_loop` on the running event loop if `config` sets `retention_interval_hours`.
+
+    Returns None when the server is not configured yet or retention is disabled.
+    """
+    interval = float(getattr(config, "retention_interval_hours", 0) or 0)
+    if interval <= 0:
+        return None
+    get_logger("utils.retention").info(f"Background retention enabled every {interval}h.")
+    return asyncio.create_task(retention_loop(interval))
@@ -0,0 +1,304 @@
+"""
+Incremental maintenance of session vectors in `thinking_sessions`.
+
+`chroma_find_similar_sessions` searches one vector per thinking session. Each
+session entry carries a `thought_count` and a `dirty` flag:
+
+- recording a thought marks its session dirty (`mark_session_dirty`). A new
+  session is added straight away from its first thought's embedding, which is
+  the session's whole text at that point, so no extra inference is needed;
+- `refresh_sessions` re-embeds all dirty sessions with batched upserts, so the
+  search itself is a single vector query.
+
+Sessions recorded before entries were maintained this way are found by
+`stale_sessions`, which compares per-session thought counts from a paged,
+metadata-only scan (`count_session_thoughts`) with the stored counts. The tool
+runs that scan once per process.
+
+With `--session-embedding-mode mean` a session's vector is instead the
+normalised mean of its thought embeddings, which are already computed when the
+thoughts are added. The entry stores the mean's norm (`mean_norm`) next to
+`thought_count`, so the running sum is `vector * mean_norm * thought_count` and
+`add_to_session_mean` folds in a new thought in O(dim) without any model call.
+Long sessions are not truncated by the model's token limit either. Refreshes in
+this mode average the stored thought embeddings instead of re-embedding text.
+
+Both write hooks also extend the session's branch tree (see `branch_tree`),
+which is kept in the same entry; `get_branch_tree` reads it. The write hooks
+and refreshes drop the collection's exact-search matrix (`exact_search`): on
+HTTP and ephemeral clients its version is the entry count only, which these
+updates and upserts do not change.
+"""
+
+import threading
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .branch_tree import (
+    BRANCH_TREE_FIELD,
+    BranchTree,
+    ThoughtPosition,
+    add_thoughts,
+    build_tree,
+    decode_tree,
+    empty_tree,
+    encode_tree,
+    extended_tree_field,
+)
+from .exact_search import invalidate_exact_index
+from .session_index import get_session_thoughts
+
+THOUGHT_COUNT_FIELD = "thought_count"
+DIRTY_FIELD = "dirty"
+MEAN_NORM_FIELD = "mean_norm"
+SESSION_EMBEDDING_TEXT = "text"
+SESSION_EMBEDDING_MEAN = "mean"
+COUNT_PAGE_SIZE = 1000
+# Sessions re-embedded per upsert (one embedding function call each)
+REFRESH_BATCH_SIZE = 100
+
+_reconciled: set = set()
+_reconciled_lock = threading.Lock()
+
+
+def mark_session_dirty(
+    sessions_collection,
+    session_id: str,
+    thought: str,
+    embedding: Optional[Any] = None,
+    first_thought: bool = False,
+    thought_count: int = 1,
+    positions: Sequence[ThoughtPosition] = (),
+) -> None:
+    """Write-path hook: records new thoughts for a session's vector.
+
+    Args:
+        sessions_collection: The sessions collection.
+        session_id: The thoughts' session.
+        thought: The thought text (the thoughts joined, for a batch).
+        embedding: The thought's embedding, reused for a new session entry.
+        first_thought: Whether the thoughts start the session; a new entry for a session
+            that already had thoughts is added dirty.
+        thought_count: Thoughts recorded. A new entry for more than one thought is added
+            dirty, with `embedding` as a placeholder until the next refresh.
+        positions: (thought_number, branch_id, branch_from_thought) of each thought, for
+            the session's branch tree.
+    """
+    existing = sessions_collection.get(ids=[session_id], include=["metadatas"])
+    if existing.get("ids"):
+        metadata = (existing.get("metadatas") or [None])[0] or {}
+        count = int(metadata.get(THOUGHT_COUNT_FIELD, 0))
+        sessions_collection.update(
+            ids=[session_id],
+            metadatas=[
+                {
+                    THOUGHT_COUNT_FIELD: count + thought_count,
+                    DIRTY_FIELD: True,
+                    **extended_tree_field(metadata, count, positions, thought_count),
+                }
+            ],
+        )
+    else:
+        sessions_collection.add(
+            ids=[session_id],
+            documents=[thought],
+            embeddings=[embedding] if embedding is not None else None,
+            metadatas=[
+                {
+                    THOUGHT_COUNT_FIELD: thought_count,
+                    DIRTY_FIELD: not first_thought or thought_count > 1,
+                    **_new_tree_field(first_thought, thought_count, positions),
+                }
+            ],
+        )
+    invalidate_exact_index(sessions_collection.name)
+
+
+def _new_tree_field(first_thought: bool, thought_count: int, positions: Sequence[ThoughtPosition]) -> Dict[str, Any]:
+    """Branch tree of a new entry, when the recorded thoughts are the whole session."""
+    if not first_thought or len(positions) != thought_count:
+        return {}
+    return {BRANCH_TREE_FIELD: encode_tree(add_thoughts(empty_tree(), positions))}
+
+
+def _normalised_mean(total: np.ndarray, count: int) -> Tuple[List[float], float]:
+    """The unit-length mean vector and the norm of the mean."""
+    mean = total / count
+    norm = float(np.linalg.norm(mean))
+    return (mean / norm if norm > 0 else mean).tolist(), norm
+
+
+def add_to_session_mean(
+    sessions_collection,
+    session_id: str,
+    thought: str,
+    embedding: Any,
+    first_thought: bool = False,
+    thought_count: int = 1,
+    positions: Sequence[ThoughtPosition] = (),
+) -> None:
+    """Write-path hook for `mean` mode: folds thought embeddings into their session's mean vector.
+
+    For a batch, `embedding` is the sum of the `thought_count` thoughts' embeddings.
+    Entries without `mean_norm` (written in `text` mode) are marked dirty instead, so the
+    next refresh rebuilds their mean from the stored thought embeddings.
+    """
+    vector = np.asarray(embedding, dtype=np.float64)
+    existing = sessions_collection.get(ids=[session_id], include=["embeddings", "metadatas"])
+    if existing.get("ids"):
+        metadata = (existing.get("metadatas") or [None])[0] or {}
+        count = int(metadata.get(THOUGHT_COUNT_FIELD, 0))
+        mean_norm = metadata.get(MEAN_NORM_FIELD)
+        tree_field = extended_tree_field(metadata, count, positions, thought_count)
+        if mean_norm is None or count < 1 or metadata.get(DIRTY_FIELD):
+            sessions_collection.update(
+                ids=[session_id],
+                metadatas=[{THOUGHT_COUNT_FIELD: count + thought_count, DIRTY_FIELD: True, **tree_field}],
+            )
+        else:
+            stored = np.asarray(existing["embeddings"][0], dtype=np.float64)
+            mean, norm = _normalised_mean(stored * float(mean_norm) * count + vector, count + thought_count)
+            sessions_collection.update(
+                ids=[session_id],
+                embeddings=[mean],
+                metadatas=[{THOUGHT_COUNT_FIELD: count + thought_count, MEAN_NORM_FIELD: norm, **tree_field}],
+            )
+    else:
+        mean, norm = _normalised_mean(vector, thought_count)
+        sessions_collection.add(
+            ids=[session_id],
+            documents=[thought],
+            embeddings=[mean],
+            metadatas=[
+                {
+                    THOUGHT_COUNT_FIELD: thought_count,
+                    MEAN_NORM_FIELD: norm,
+                    DIRTY_FIELD: not first_thought,
+                    **_new_tree_field(first_thought, thought_count, positions),
+                }
+            ],
+        )
+    invalidate_exact_index(sessions_collection.name)
+
+
+def get_branch_tree(
+    thoughts_collection_name: str, thoughts_collection, sessions_collection, session_id: str
+) -> BranchTree:
+    """Returns a session's branch tree, rebuilding and storing it if the entry has no current tree."""
+    existing = sessions_collection.get(ids=[session_id], include=["metadatas"])
+    metadata = ((existing.get("metadatas") or [None])[0] or {}) if existing.get("ids") else None
+    count = int((metadata or {}).get(THOUGHT_COUNT_FIELD, 0))
+    if metadata is not None:
+        tree = decode_tree(metadata.get(BRANCH_TREE_FIELD), count)
+        if tree is not None:
+            return tree
+
+    results = get_session_thoughts(thoughts_collection_name, thoughts_collection, session_id, include=["metadatas"])
+    tree = build_tree(results.get("metadatas") or [])
+    # A tree for a different count (thoughts archived, entry not refreshed yet) would not be trusted
+    if metadata is not None and tree["n"] == count:
+        sessions_collection.update(ids=[session_id], metadatas=[{BRANCH_TREE_FIELD: encode_tree(tree)}])
+    return tree
+
+
+def count_session_thoughts(thoughts_collection, page_size: int = COUNT_PAGE_SIZE) -> Dict[str, int]:
+    """Thoughts per session, read page by page from metadatas only."""
+    counts: Dict[str, int] = {}
+    offset = 0
+    while True:
+        page = thoughts_collection.get(include=["metadatas"], limit=page_size, offset=offset)
+        for metadata in page.get("metadatas") or []:
+            session_id = (metadata or {}).get("session_id")
+            if session_id:
+                counts[session_id] = counts.get(session_id, 0) + 1
+        if len(page.get("ids") or []) < page_size:
+            return counts
+        offset += page_size
+
+
+def stale_sessions(sessions_collection, thought_counts: Mapping[str, int]) -> List[str]:
+    """Sessions whose entry is missing or was written for a different number of thoughts."""
+    stored = sessions_collection.get(include=["metadatas"])
+    stored_counts = {
+        session_id: (metadata or {}).get(THOUGHT_COUNT_FIELD)
+        for session_id, metadata in zip(stored.get("ids") or [], stored.get("metadatas") or [])
+    }
+    return sorted(session_id for session_id, count in thought_counts.items() if stored_counts.get(session_id) != count)
+
+
+def session_text(results: Mapping[str, Any]) -> str:
+    """A session's thoughts, joined in thought order, as embedded for the session vector."""
+    rows = zip(results.get("documents") or [], results.get("metadatas") or [])
+    ordered = sorted(rows, key=lambda row: (row[1] or {}).get("thought_number", 999999))
+    return " ".join(document for document, _ in ordered if document)
+
+
+def refresh_sessions(
+    thoughts_collection_name: str,
+    thoughts_collection,
+    sessions_collection,
+    session_ids: Iterable[str] = (),
+    batch_size: int = REFRESH_BATCH_SIZE,
+    mode: str = SESSION_EMBEDDING_TEXT,
+) -> int:
+    """Re-embeds dirty sessions (plus `session_ids`) in batched upserts.
+
+    In `mean` mode the vectors are averaged from the stored thought embeddings and the
+    upserts carry them, so the embedding function is not called. Sessions without thoughts
+    left are removed from the sessions collection.
+
+    Returns:
+        The number of sessions re-embedded.
+    """
+    mean_mode = mode == SESSION_EMBEDDING_MEAN
+    include = ("documents", "metadatas", "embeddings") if mean_mode else ("documents", "metadatas")
+    dirty = sessions_collection.get(where={DIRTY_FIELD: True}, include=[])
+    pending = list(dict.fromkeys([*(dirty.get("ids") or []), *session_ids]))
+    refreshed = 0
+    for start in range(0, len(pending), batch_size):
+        ids, documents, metadatas, embeddings, empty = [], [], [], [], []
+        for session_id in pending[start : start + batch_size]:
+            results = get_session_thoughts(thoughts_collection_name, thoughts_collection, session_id, include=include)
+            text = session_text(results)
+            if not text:
+                empty.append(session_id)
+                continue
+            count = len(results.get("ids") or [])
+            # A text-mode vector invalidates any running mean stored for the entry
+            metadata: Dict[str, Any] = {THOUGHT_COUNT_FIELD: count, DIRTY_FIELD: False, MEAN_NORM_FIELD: None}
+            if mean_mode:
+                mean, metadata[MEAN_NORM_FIELD] = _normalised_mean(
+                    np.asarray(results["embeddings"], dtype=np.float64).sum(axis=0), count
+                )
+                embeddings.append(mean)
+            ids.append(session_id)
+            documents.append(text)
+            metadatas.append(metadata)
+        if ids:
+            sessions_collection.upsert(
+                ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings if mean_mode else None
+            )
+            refreshed += len(ids)
+        if empty:
+            sessions_collection.delete(ids=empty)
+        if ids or empty:
+            invalidate_exact_index(sessions_collection.name)
+    return refreshed
+
+
+def needs_reconcile(thoughts_collection_name: str) -> bool:
+    """True until `mark_reconciled` was called for the collection in this process."""
+    with _reconciled_lock:
+        return thoughts_collection_name not in _reconciled
+
+
+def mark_reconciled(thoughts_collection_name: str) -> None:
+    with _reconciled_lock:
+        _reconciled.add(thoughts_collection_name)
+
+
+def reset_session_embeddings() -> None:
+    """Forgets which collections were reconciled (used by tests)."""
+    with _reconciled_lock:
+        _reconciled.clear()
@@ -0,0 +1,324 @@
+"""
+Per-session thought caches for the thinking tools.
+
+`chroma_get_session_summary` (and `chroma_find_similar_sessions`, which
+summarises every session) needs the thoughts of one session. A session's
+thoughts are loaded once with a `session_id` `where` filter; afterwards their
+IDs (with each thought's `branch_id`) are kept in memory, so later summaries are
+a direct `get(ids=...)` whose cost does not depend on the collection size.
+
+Recording thought N needs the thoughts before it on the same branch path (the
+branch's own thoughts plus the main trunk before the branch point).
+`previous_path_thoughts` reads them once with a `thought_number < N` filter and
+keeps the ordered list per session and branch path; thoughts recorded afterwards
+are appended on write, so recording a chain reads the collection once instead of
+once per thought.
+
+Both caches record the collection version (see `collection_version`) they
+reflect. Thoughts recorded by this server are added through
+`sync_session_thought`, which advances the version; any other write, such as
+retention archiving or another process, changes the version and clears the
+caches, so sessions are reloaded from the filter on next use. Branch exclusion is
+applied in Python: Chroma cannot filter on a missing `branch_id` (`$ne`/`$nin`
+also match entries without the key).
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Mapping, Optional, Sequence, Tuple
+
+from .collection_version import CollectionVersion, collection_version
+
+# Sessions kept per collection, least recently used evicted first
+MAX_INDEXED_SESSIONS = 1000
+# Branch paths whose ordered thoughts are kept per collection
+MAX_CACHED_PATHS = 1000
+
+SessionThoughts = Dict[str, Optional[str]]  # thought ID -> branch_id (None on the main trunk)
+PathKey = Tuple[str, Optional[str], Optional[int]]  # (session_id, branch_id, branch_from_thought)
+ThoughtRecord = Dict[str, Any]  # {"id", "content", "metadata"} with the metadata as stored
+
+
+class _VersionedCache:
+    """LRU of entries derived from one collection at one collection version."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        # Collection version the entries reflect; None means nothing is cached yet
+        self.version: Optional[CollectionVersion] = None
+        self.entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _use_version(self, version: CollectionVersion) -> None:
+        if self.version != version:
+            self.entries.clear()
+            self.version = version
+
+    def _get(self, key: Hashable, version: CollectionVersion) -> Optional[Any]:
+        with self._lock:
+            self._use_version(version)
+            value = self.entries.get(key)
+            if value is None:
+                return None
+            self.entries.move_to_end(key)
+            return value.copy()
+
+    def _put(self, key: Hashable, value: Any, version: CollectionVersion) -> None:
+        with self._lock:
+            self._use_version(version)
+            self.entries[key] = value.copy()
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def _advance(
+        self,
+        before: Optional[CollectionVersion],
+        after: Optional[CollectionVersion],
+        apply: Callable[["OrderedDict[Hashable, Any]"], None],
+    ) -> None:
+        """Applies a write made by this server if the cache was current before it."""
+        with self._lock:
+            if before is None or self.version != before:
+                self.entries.clear()
+                self.version = None
+                return
+            self.version = after
+            apply(self.entries)
+
+
+class SessionThoughtIndex(_VersionedCache):
+    """Thought IDs and branch IDs per session for one collection."""
+
+    def __init__(self, max_sessions: int = MAX_INDEXED_SESSIONS):
+        super().__init__(max_sessions)
+
+    def lookup(self, session_id: str, version: CollectionVersion) -> Optional[SessionThoughts]:
+        """Returns the session's thoughts if indexed at `version`, clearing the index if it is stale."""
+        return self._get(session_id, version)
+
+    def store(self, session_id: str, thoughts: SessionThoughts, version: CollectionVersion) -> None:
+        """Indexes a session loaded from the collection at `version`."""
+        self._put(session_id, thoughts, version)
+
+    def add(
+        self,
+        session_id: str,
+        thought_id: str,
+        branch_id: Optional[str],
+        before: Optional[CollectionVersion],
+        after: Optional[CollectionVersion],
+    ) -> None:
+        """Adds a thought written by this server if the index was current before the write."""
+
+        def apply(sessions):
+            # Sessions that are not indexed yet are loaded in full on first use
+            if session_id in sessions:
+                sessions[session_id][thought_id] = branch_id
+
+        self._advance(before, after, apply)
+
+
+def on_branch_path(metadata: Mapping[str, Any], branch_id: Optional[str], branch_from_thought: Optional[int]) -> bool:
+    """Whether a thought belongs to the history of `branch_id` (the main trunk if None)."""
+    thought_branch_id = metadata.get("branch_id")
+    if not branch_id:
+        return thought_branch_id is None
+    if thought_branch_id == branch_id:
+        return True
+    thought_number = metadata.get("thought_number")
+    return (
+        thought_branch_id is None
+        and thought_number is not None
+        and (branch_from_thought is None or thought_number < branch_from_thought)
+    )
+
+
+class ThoughtPathCache(_VersionedCache):
+    """Ordered thoughts per session branch path for one collection."""
+
+    def __init__(self, max_paths: int = MAX_CACHED_PATHS):
+        super().__init__(max_paths)
+
+    def lookup(self, key: PathKey, version: CollectionVersion) -> Optional[List[ThoughtRecord]]:
+        """Returns the path's thoughts (ordered by `thought_number`) if cached at `version`."""
+        return self._get(key, version)
+
+    def store(self, key: PathKey, records: Sequence[ThoughtRecord], version: CollectionVersion) -> None:
+        """Caches a path's thoughts read from the collection at `version`."""
+        self._put(key, _ordered(records), version)
+
+    def add(
+        self,
+        record: ThoughtRecord,
+        before: Optional[CollectionVersion],
+        after: Optional[CollectionVersion],
+    ) -> None:
+        """Appends a thought written by this server to the cached paths it belongs to."""
+        metadata = record["metadata"]
+
+        def apply(paths):
+            for key, records in paths.items():
+                if key[0] == metadata.get("session_id") and on_branch_path(metadata, key[1], key[2]):
+                    paths[key] = _ordered([*records, record])
+
+        self._advance(before, after, apply)
+
+
+def _ordered(records: Sequence[ThoughtRecord]) -> List[ThoughtRecord]:
+    """Records by `thought_number`, the last one written winning for a repeated ID."""
+    by_id = {record["id"]: record for record in records}
+    return sorted(by_id.values(), key=lambda record: record["metadata"].get("thought_number", 0))
+
+
+_indexes: Dict[str, SessionThoughtIndex] = {}
+_path_caches: Dict[str, ThoughtPathCache] = {}
+_registry_lock = threading.Lock()
+
+
+def _get_cache(registry: Dict[str, Any], factory, collection_name: str, create: bool = False):
+    with _registry_lock:
+        cache = registry.get(collection_name)
+        if cache is None and create:
+            cache = registry[collection_name] = factory()
+        return cache
+
+
+def _get_index(collection_name: str, create: bool = False) -> Optional[SessionThoughtIndex]:
+    return _get_cache(_indexes, SessionThoughtIndex, collection_name, create)
+
+
+def _get_path_cache(collection_name: str, create: bool = False) -> Optional[ThoughtPathCache]:
+    return _get_cache(_path_caches, ThoughtPathCache, collection_name, create)
+
+
+def is_session_index_tracked(collection_name: str) -> bool:
+    """True if the collection has a session cache the write path has to keep current."""
+    return _get_index(collection_name) is not None or _get_path_cache(collection_name) is not None
+
+
+def _empty_result(include: Sequence[str]) -> Dict[str, Any]:
+    return {"ids": [], **{key: [] for key in include}}
+
+
+def get_session_thoughts(
+    collection_name: str,
+    collection,
+    session_id: str,
+    include_branches: bool = True,
+    include: Sequence[str] = ("documents", "metadatas"),
+) -> Dict[str, Any]:
+    """Returns a session's thoughts as a `collection.get` result (unordered).
+
+    Args:
+        collection_name: Name the index is kept under.
+        collection: The thoughts collection.
+        session_id: The session to read.
+        include_branches: Whether thoughts with a `branch_id` are returned.
+        include: Fields to return, as for `collection.get`.
+    """
+    include = list(include)
+    index = _get_index(collection_name, create=True)
+    version = collection_version(collection)
+    thoughts = index.lookup(session_id, version)
+    if thoughts is not None:
+        ids = [thought_id for thought_id, branch_id in thoughts.items() if include_branches or branch_id is None]
+        return collection.get(ids=ids, include=include) if ids else _empty_result(include)
+
+    results = collection.get(where={"session_id": session_id}, include=sorted(set(include) | {"metadatas"}))
+    ids: List[str] = results.get("ids") or []
+    metadatas = results.get("metadatas") or [None] * len(ids)
+    index.store(
+        session_id,
+        {thought_id: (metadata or {}).get("branch_id") for thought_id, metadata in zip(ids, metadatas)},
+        version,
+    )
+    keep = [i for i, metadata in enumerate(metadatas) if include_branches or (metadata or {}).get("branch_id") is None]
+    # Embeddings come back as a numpy array, so test for None rather than truthiness
+    columns = {key: results.get(key) if results.get(key) is not None else [None] * len(ids) for key in include}
+    return {"ids": [ids[i] for i in keep], **{key: [values[i] for i in keep] for key, values in columns.items()}}
+
+
+def previous_thoughts_filter(
+    session_id: str,
+    thought_number: int,
+    branch_id: Optional[str] = None,
+    branch_from_thought: Optional[int] = None,
+) -> Dict[str, Any]:
+    """`where` filter for the thoughts before `thought_number` that can be on the branch path.
+
+    Trunk-only conditions cannot be expressed (no filter for a missing `branch_id`), so
+    results still go through `on_branch_path`.
+    """
+    clauses: List[Dict[str, Any]] = [{"session_id": session_id}, {"thought_number": {"$lt": thought_number}}]
+    if branch_id and branch_from_thought is not None:
+        clauses.append({"$or": [{"branch_id": branch_id}, {"thought_number": {"$lt": branch_from_thought}}]})
+    return {"$and": clauses}
+
+
+def previous_path_thoughts(
+    collection_name: str,
+    collection,
+    record: ThoughtRecord,
+    version: CollectionVersion,
+) -> List[ThoughtRecord]:
+    """Returns the thoughts before a just-recorded thought on its branch path, ordered by number.
+
+    Args:
+        collection_name: Name the cache is kept under.
+        collection: The thoughts collection.
+        record: The thought just added (`id`, `content` and its stored `metadata`).
+        version: The collection version after the thought was added.
+    """
+    metadata = record["metadata"]
+    thought_number = metadata["thought_number"]
+    branch_id = metadata.get("branch_id")
+    branch_from_thought = metadata.get("branch_from_thought") if branch_id else None
+    key = (metadata["session_id"], branch_id, branch_from_thought)
+    cache = _get_path_cache(collection_name, create=True)
+
+    records = cache.lookup(key, version)
+    if records is None:
+        results = collection.get(
+            where=previous_thoughts_filter(key[0], thought_number, branch_id, branch_from_thought),
+            include=["documents", "metadatas"],
+        )
+        ids = results.get("ids") or []
+        documents = results.get("documents") or [None] * len(ids)
+        metadatas = results.get("metadatas") or [None] * len(ids)
+        records = [
+            {"id": thought_id, "content": document, "metadata": stored or {}}
+            for thought_id, document, stored in zip(ids, documents, metadatas)
+            if on_branch_path(stored or {}, branch_id, branch_from_thought)
+        ]
+        # The path now also holds the thought just added, so the next one is served from the cache
+        cache.store(key, [*records, record], version)
+    return [
+        previous
+        for previous in _ordered(records)
+        if previous["id"] != record["id"]
+        and previous["metadata"].get("thought_number", thought_number) < thought_number
+    ]
+
+
+def sync_session_thought(
+    collection_name: str,
+    record: ThoughtRecord,
+    version_before: Optional[CollectionVersion] = None,
+    version_after: Optional[CollectionVersion] = None,
+) -> None:
+    """Write-path hook: records a thought added by this server in the collection's session caches."""
+    metadata = record["metadata"]
+    index = _get_index(collection_name)
+    if index is not None:
+        index.add(metadata["session_id"], record["id"], metadata.get("branch_id"), version_before, version_after)
+    path_cache = _get_path_cache(collection_name)
+    if path_cache is not None:
+        path_cache.add(record, version_before, version_after)
+
+
+def reset_session_index() -> None:
+    """Forgets all session caches (used by tests)."""
+    with _registry_lock:
+        _indexes.clear()
+        _path_caches.clear()
@@ -0,0 +1,432 @@
+"""
+Logical collections split across several physical Chroma collections.
+
+A sharded collection `name` with N shards is stored as the collections
+`name__shard0` ... `name__shard{N-1}`. Each shard's metadata records the logical
+name, the shard count and the optional routing key (`shard:logical`,
+`shard:count`, `shard:key`), so every process resolves the same layout.
+
+Writes are routed by a stable hash (CRC32) of the routing key's metadata value,
+e.g. `file_path`, so all chunks of a file land on one shard. Records without
+that key, and all records when no key is set, are routed by ID. Queries fan out
+to all shards in parallel and the per-shard top-k lists, already sorted by
+distance, are merged with a heap into the global top-k.
+
+Existing records are found the same way: by ID, or by the routing value when a
+write carries it, so upserts, updates, ID deletes and ID-restricted queries
+only touch the owning shards. A record's routing value is expected to stay the
+same (chunks keep their file path); to move a record, delete and re-add it. The
+owning shard is looked up on every shard only when it cannot be derived: for
+key-routed records written without the key, and when the shards disagree about
+the shard count (the layout changed after records were written).
+
+`ShardedCollection` implements the subset of the Collection API used by the
+document tools and the client indexer; they obtain one through
+`resolve_collection` in `chroma_client.py`. Full scans go through `get_pages`,
+which pages each shard separately.
+"""
+
+import heapq
+import itertools
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+SHARD_NAME_FORMAT = "{name}__shard{index}"
+SHARD_LOGICAL_KEY = "shard:logical"
+SHARD_COUNT_KEY = "shard:count"
+SHARD_ROUTING_KEY = "shard:key"
+# Maximum shards queried at the same time
+SHARD_QUERY_WORKERS = 8
+
+_RESULT_FIELDS = ("ids", "embeddings", "documents", "metadatas", "uris", "data")
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def shard_name(name: str, index: int) -> str:
+    """Returns the physical collection name of a shard."""
+    return SHARD_NAME_FORMAT.format(name=name, index=index)
+
+
+def _fan_out(fn: Callable[[Any], Any], items: Sequence[Any]) -> List[Any]:
+    """Applies `fn` to each item on the shared shard pool, preserving order."""
+    global _executor
+    if len(items) == 1:
+        return [fn(items[0])]
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=SHARD_QUERY_WORKERS, thread_name_prefix="chroma-shard")
+    return list(_executor.map(fn, items))
+
+
+def _rows(values: Any) -> Optional[List[Any]]:
+    return None if values is None else list(values)
+
+
+def _merge_get_results(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Concatenates per-shard GetResults."""
+    merged: Dict[str, Any] = {"ids": []}
+    for field in _RESULT_FIELDS[1:]:
+        parts = [_rows(r.get(field)) for r in results]
+        merged[field] = None if all(p is None for p in parts) else list(itertools.chain(*(p or [] for p in parts)))
+    for r in results:
+        merged["ids"].extend(r.get("ids") or [])
+    merged["included"] = results[0].get("included") if results else []
+    return merged
+
+
+def _slice_get_result(result: Dict[str, Any], start: int, end: Optional[int]) -> Dict[str, Any]:
+    return {k: (v[start:end] if isinstance(v, list) and k != "included" else v) for k, v in result.items()}
+
+
+class ShardedCollection:
+    """A logical collection whose records are spread over several physical collections."""
+
+    def __init__(
+        self,
+        name: str,
+        shards: List[Any],
+        shard_key: Optional[str] = None,
+        embedding_function: Optional[Callable] = None,
+    ):
+        self.name = name
+        self.shards = shards
+        self.shard_key = shard_key or None
+        self.id = f"sharded:{name}"
+        self._embedding_function = embedding_function or getattr(shards[0], "_embedding_function", None)
+        # False when the shards disagree about the shard count, so hashes no longer locate records
+        self.routing_stable = all(
+            (shard.metadata or {}).get(SHARD_COUNT_KEY, len(shards)) == len(shards) for shard in shards
+        )
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """Metadata of the logical collection (shard 0's, without the shard bookkeeping keys)."""
+        return {k: v for k, v in (self.shards[0].metadata or {}).items() if not k.startswith("shard:")}
+
+    # --- Routing --- #
+
+    def shard_index(self, doc_id: str, metadata: Optional[Dict[str, Any]] = None) -> int:
+        """Returns the shard a new record is written to."""
+        value = doc_id
+        if self.shard_key and metadata and metadata.get(self.shard_key) is not None:
+            value = metadata[self.shard_key]
+        return zlib.crc32(str(value).encode("utf-8")) % len(self.shards)
+
+    def _routable(self, metadata: Optional[Dict[str, Any]] = None) -> bool:
+        """True if the shard holding a record follows from its ID (and `metadata`) alone."""
+        if not self.routing_stable:
+            return False
+        return not self.shard_key or bool(metadata and metadata.get(self.shard_key) is not None)
+
+    def _owners(self, ids: List[str], metadatas: Optional[List[Any]] = None) -> Dict[str, int]:
+        """Finds the shard holding each existing ID, hashing where possible and looking up the rest."""
+        metadatas = metadatas or [None] * len(ids)
+        owners = {i: self.shard_index(i, m) for i, m in zip(ids, metadatas) if self._routable(m)}
+        unknown = [i for i in ids if i not in owners]
+        if unknown:
+            found = _fan_out(lambda shard: shard.get(ids=unknown, include=[])["ids"], self.shards)
+            owners.update({doc_id: index for index, shard_ids in enumerate(found) for doc_id in shard_ids})
+        return owners
+
+    def _split_ids(self, ids: List[str]) -> Dict[int, List[str]]:
+        """Groups existing IDs by owning shard; IDs found on no shard are dropped."""
+        owners = self._owners(ids)
+        by_shard: Dict[int, List[str]] = {}
+        for doc_id in ids:
+            if doc_id in owners:
+                by_shard.setdefault(owners[doc_id], []).append(doc_id)
+        return by_shard
+
+    def _write(self, method: str, ids: Any, routes: List[int], **columns: Any) -> None:
+        ids = [ids] if isinstance(ids, str) else list(ids)
+        by_shard: Dict[int, List[int]] = {}
+        for position, index in enumerate(routes):
+            by_shard.setdefault(index, []).append(position)
+
+        def _apply(item):
+            index, positions = item
+            kwargs = {"ids": [ids[p] for p in positions]}
+            for column, values in columns.items():
+                if values is not None:
+                    kwargs[column] = [values[p] for p in positions]
+            getattr(self.shards[index], method)(**kwargs)
+
+        _fan_out(_apply, list(by_shard.items()))
+
+    @staticmethod
+    def _as_list(values: Any) -> Optional[List[Any]]:
+        if values is None:
+            return None
+        if isinstance(values, (str, dict)):
+            return [values]
+        return list(values)
+
+    def _columns(self, embeddings, metadatas, documents, uris) -> Dict[str, Any]:
+        return {
+            "embeddings": self._as_list(embeddings),
+            "metadatas": self._as_list(metadatas),
+            "documents": self._as_list(documents),
+            "uris": self._as_list(uris),
+        }
+
+    # --- Writes --- #
+
+    def add(self, ids, embeddings=None, metadatas=None, documents=None, uris=None, **_: Any) -> None:
+        ids = [ids] if isinstance(ids, str) else list(ids)
+        columns = self._columns(embeddings, metadatas, documents, uris)
+        metas = columns["metadatas"] or [None] * len(ids)
+        self._write("add", ids, [self.shard_index(i, m) for i, m in zip(ids, metas)], **columns)
+
+    def upsert(self, ids, embeddings=None, metadatas=None, documents=None, uris=None, **_: Any) -> None:
+        ids = [ids] if isinstance(ids, str) else list(ids)
+        columns = self._columns(embeddings, metadatas, documents, uris)
+        metas = columns["metadatas"] or [None] * len(ids)
+        owners = self._owners(ids, metas)
+        routes = [owners.get(i, self.shard_index(i, m)) for i, m in zip(ids, metas)]
+        self._write("upsert", ids, routes, **columns)
+
+    def update(self, ids, embeddings=None, metadatas=None, documents=None, uris=None, **_: Any) -> None:
+        ids = [ids] if isinstance(ids, str) else list(ids)
+        columns = self._columns(embeddings, metadatas, documents, uris)
+        owners = self._owners(ids, columns["metadatas"])
+        missing = [i for i in ids if i not in owners]
+        if missing:
+            # Chroma ignores updates to unknown IDs; route them anyway so behaviour matches
+            owners.update({i: self.shard_index(i) for i in missing})
+        self._write("update", ids, [owners[i] for i in ids], **columns)
+
+    def delete(self, ids=None, where=None, where_document=None) -> None:
+        if ids is None or not self._routable():
+            # Filters can match on any shard, as can key-routed IDs
+            _fan_out(lambda shard: shard.delete(ids=ids, where=where, where_document=where_document), self.shards)
+            return
+        ids = [ids] if isinstance(ids, str) else list(ids)
+        by_shard: Dict[int, List[str]] = {}
+        for doc_id in ids:
+            by_shard.setdefault(self.shard_index(doc_id), []).append(doc_id)
+        _fan_out(
+            lambda item: self.shards[item[0]].delete(ids=item[1], where=where, where_document=where_document),
+            list(by_shard.items()),
+        )
+
+    # --- Reads --- #
+
+    def count(self) -> int:
+        return sum(_fan_out(lambda shard: shard.count(), self.shards))
+
+    def get(
+        self,
+        ids=None,
+        where=None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        where_document=None,
+        include: Sequence[str] = ("metadatas", "documents"),
+    ) -> Dict[str, Any]:
+        """Reads records from all shards (shard 0 first), applying limit/offset to the combined result."""
+        include = list(include)
+        ids = [ids] if isinstance(ids, str) else ids
+        offset = offset or 0
+
+        if limit is None and not offset:
+            results = _fan_out(
+                lambda s: s.get(ids=ids, where=where, where_document=where_document, include=include), self.shards
+            )
+            return _merge_get_results(results)
+
+        if ids is None and where is None and where_document is None:
+            # Unfiltered pages: use shard counts to read only the shards overlapping the window
+            counts = _fan_out(lambda shard: shard.count(), self.shards)
+            remaining = limit if limit is not None else sum(counts)
+            parts = []
+            for shard, count in zip(self.shards, counts):
+                if offset >= count:
+                    offset -= count
+                    continue
+                if remaining <= 0:
+                    break
+                take = min(remaining, count - offset)
+                parts.append(shard.get(limit=take, offset=offset, include=include))
+                remaining -= take
+                offset = 0
+            return _merge_get_results(parts) if parts else _merge_get_results([{"ids": [], "included": include}])
+
+        # Filtered pages: each shard can contribute at most offset + limit records, so paging a
+        # filter to the end re-reads earlier pages; full scans should use `get_pages` instead
+        window = None if limit is None else offset + limit
+        results = _fan_out(
+            lambda s: s.get(ids=ids, where=where, where_document=where_document, limit=window, include=include),
+            self.shards,
+        )
+        merged = _merge_get_results(results)
+        return _slice_get_result(merged, offset, window)
+
+    def peek(self, limit: int = 10) -> Dict[str, Any]:
+        return self.get(limit=limit, include=["embeddings", "documents", "metadatas"])
+
+    def query(
+        self,
+        query_embeddings=None,
+        query_texts=None,
+        n_results: int = 10,
+        where=None,
+        where_document=None,
+        include: Sequence[str] = ("metadatas", "documents", "distances"),
+        **kwargs: Any,
+    ) -> Dict[str, Any]:
+        """Queries every shard in parallel and heap-merges the per-shard top-k by distance.
+
+        An `ids` restriction is split by owning shard, so each shard only sees its own
+        IDs (Chroma rejects unknown IDs) and shards owning none are skipped.
+        """
+        include = list(include)
+        if query_embeddings is None and query_texts is not None:
+            texts = [query_texts] if isinstance(query_texts, str) else list(query_texts)
+            if self._embedding_function is not None:
+                # Embed once here instead of once per shard
+                query_embeddings, query_texts = self._embedding_function(texts), None
+            else:
+                query_texts = texts
+        shard_include = include if "distances" in include else include + ["distances"]
+        ids = kwargs.pop("ids", None)
+        if ids is None:
+            targets = [(shard, None) for shard in self.shards]
+        else:
+            ids = [ids] if isinstance(ids, str) else list(ids)
+            targets = [(self.shards[index], shard_ids) for index, shard_ids in sorted(self._split_ids(ids).items())]
+
+        def _query(target):
+            shard, shard_ids = target
+            restriction = {} if shard_ids is None else {"ids": shard_ids}
+            return shard.query(
+                query_embeddings=query_embeddings,
+                query_texts=query_texts,
+                n_results=n_results if shard_ids is None else min(n_results, len(shard_ids)),
+                where=where,
+                where_document=where_document,
+                include=shard_include,
+                **restriction,
+                **kwargs,
+            )
+
+        results = _fan_out(_query, targets) if targets else []
+        if results:
+            num_queries = len(results[0]["ids"])
+        else:
+            num_queries = len(query_embeddings if query_embeddings is not None else query_texts)
+        fields = ["ids"] + [f for f in _RESULT_FIELDS[1:] if f in include] + ["distances"]
+        merged: Dict[str, Any] = {f: [] for f in fields}
+        for q in range(num_queries):
+            # Each shard's list is already sorted by distance, so a k-way heap merge yields the global order
+            streams = [
+                [(dist, shard, pos) for pos, dist in enumerate(r["distances"][q])] for shard, r in enumerate(results)
+            ]
+            top = list(itertools.islice(heapq.merge(*streams), n_results))
+            for field in fields:
+                rows = [_rows(r[field][q]) for r in results]
+                merged[field].append([rows[shard][pos] for _, shard, pos in top])
+        for field in _RESULT_FIELDS[1:] + ("distances",):
+            merged.setdefault(field, None)
+        if "distances" not in include:
+            merged["distances"] = None
+        merged["included"] = include
+        return merged
+
+
+def get_pages(collection, page_size: int, **get_kwargs: Any) -> Iterator[Dict[str, Any]]:
+    """Yields the non-empty `get` pages of a full scan of `collection`.
+
+    A sharded collection's shards are paged one after the other, each with its own
+    offset, so a filtered scan reads every record once. Paging the logical
+    collection would re-read `offset + limit` matches from every shard per page.
+    """
+    for target in collection.shards if isinstance(collection, ShardedCollection) else [collection]:
+        offset = 0
+        while True:
+            page = target.get(limit=page_size, offset=offset, **get_kwargs)
+            count = len(page.get("ids") or [])
+            if count:
+                yield page
+            if count < page_size:
+                break
+            offset += count
+
+
+def sharded_collection_spec(client, name: str) -> Optional[Dict[str, Any]]:
+    """Returns `{"count", "key"}` if `name` is a sharded logical collection, else None."""
+    from .collection_names import get_sorted_names
+
+    first = shard_name(name, 0)
+    if first not in get_sorted_names(client):
+        return None
+    metadata = client.get_collection(name=first).metadata or {}
+    if metadata.get(SHARD_LOGICAL_KEY) != name:
+        return None
+    return {"count": int(metadata[SHARD_COUNT_KEY]), "key": metadata.get(SHARD_ROUTING_KEY) or None}
+
+
+def open_sharded_collection(client, name: str, embedding_function=None) -> Optional[ShardedCollection]:
+    """Opens a sharded logical collection, or returns None if `name` is not one."""
+    spec = sharded_collection_spec(client, name)
+    if spec is None:
+        return None
+    kwargs = {"embedding_function": embedding_function} if embedding_function is not None else {}
+    shards = _fan_out(lambda i: client.get_collection(name=shard_name(name, i), **kwargs), list(range(spec["count"])))
+    return ShardedCollection(name, shards, spec["key"], embedding_function)
+
+
+def delete_sharded_collection(client, name: str) -> bool:
+    """Deletes every shard of a sharded logical collection; returns False if `name` is not one."""
+    from .collection_names import invalidate_collection_names
+
+    spec = sharded_collection_spec(client, name)
+    if spec is None:
+        return False
+    # Shard 0 identifies the logical collection, so it goes last: a failed run can be retried
+    for index in reversed(range(spec["count"])):
+        try:
+            client.delete_collection(name=shard_name(name, index))
+        except Exception as e:
+            if index == 0 or "does not exist" not in str(e):
+                raise
+    invalidate_collection_names()
+    return True
+
+
+def create_sharded_collection(
+    client,
+    name: str,
+    num_shards: int,
+    shard_key: Optional[str] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+    embedding_function=None,
+) -> ShardedCollection:
+    """Creates the physical shards of a new logical collection.
+
+    Args:
+        client: ChromaDB client.
+        name: Logical collection name (must not exist as a plain collection).
+        num_shards: Number of physical collections.
+        shard_key: Metadata field to route writes by (e.g. `file_path`); None routes by ID.
+        metadata: Collection metadata/settings applied to every shard.
+        embedding_function: Embedding function for the shards.
+    """
+    from .collection_names import invalidate_collection_names
+
+    if num_shards < 1:
+        raise ValueError("num_shards must be at least 1.")
+    if name in [c if isinstance(c, str) else c.name for c in client.list_collections()]:
+        raise ValueError(f"Collection {name} already exists.")
+    shard_metadata = dict(metadata or {})
+    shard_metadata.update({SHARD_LOGICAL_KEY: name, SHARD_COUNT_KEY: num_shards})
+    if shard_key:
+        shard_metadata[SHARD_ROUTING_KEY] = shard_key
+    kwargs = {"embedding_function": embedding_function} if embedding_function is not None else {}
+    shards = [
+        client.create_collection(name=shard_name(name, i), metadata=shard_metadata, **kwargs) for i in range(num_shards)
+    ]
+    invalidate_collection_names()
+    return ShardedCollection(name, shards, shard_key, embedding_function)
@@ -0,0 +1,161 @@
+"""
+Unix domain socket transport for a long-lived local MCP server.
+
+`python -m chroma_mcp.cli --mode stdio` pays for imports, client initialisation
+and the embedding model load on every start, which dominates short CLI calls
+such as `chroma-mcp-thinking record`. In `--mode socket` the server instead
+listens on a Unix socket and serves each connection as its own MCP session, so
+later invocations connect to the warm process.
+
+Messages use the stdio framing (one JSON-RPC message per line). The server exits
+after `idle_timeout` seconds without connections and removes its socket.
+"""
+
+import hashlib
+import os
+import socket
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from typing import Mapping, Optional
+
+import anyio
+import anyio.abc
+import anyio.lowlevel
+from anyio.streams.buffered import BufferedByteReceiveStream
+
+import mcp.types as types
+from mcp.shared.message import SessionMessage
+
+from . import get_logger
+
+# Largest single JSON-RPC message accepted from a peer
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+
+
+def unix_sockets_supported() -> bool:
+    return hasattr(socket, "AF_UNIX")
+
+
+def default_socket_path(environment: Optional[Mapping[str, str]] = None) -> str:
+    """Per-user socket path, distinct for each server environment.
+
+    Servers started with different settings (data dir, client type, embedding
+    function, ...) get different sockets, so a daemon is only reused by callers that
+    would have started the same server.
+    """
+    digest = hashlib.sha256(repr(sorted((environment or {}).items())).encode("utf-8")).hexdigest()[:12]
+    base = os.getenv("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(base, f"chroma-mcp-{os.getuid()}-{digest}.sock")
+
+
+@asynccontextmanager
+async def socket_streams(stream: anyio.abc.ByteStream):
+    """Adapts a byte stream carrying line-delimited JSON-RPC to MCP session streams."""
+    read_stream_writer, read_stream = anyio.create_memory_object_stream(0)
+    write_stream, write_stream_reader = anyio.create_memory_object_stream(0)
+    buffered = BufferedByteReceiveStream(stream)
+
+    async def socket_reader():
+        try:
+            async with read_stream_writer:
+                while True:
+                    try:
+                        line = await buffered.receive_until(b"\n", MAX_MESSAGE_BYTES)
+                    except (anyio.EndOfStream, anyio.IncompleteRead, anyio.BrokenResourceError):
+                        return
+                    if not line.strip():
+                        continue
+                    try:
+                        message = types.JSONRPCMessage.model_validate_json(line)
+                    except Exception as exc:
+                        await read_stream_writer.send(exc)
+                        continue
+                    await read_stream_writer.send(SessionMessage(message))
+        except anyio.ClosedResourceError:
+            await anyio.lowlevel.checkpoint()
+
+    async def socket_writer():
+        try:
+            async with write_stream_reader:
+                async for session_message in write_stream_reader:
+                    json = session_message.message.model_dump_json(by_alias=True, exclude_none=True)
+                    await stream.send((json + "\n").encode("utf-8"))
+        except (anyio.ClosedResourceError, anyio.BrokenResourceError):
+            await anyio.lowlevel.checkpoint()
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(socket_reader)
+        tg.start_soon(socket_writer)
+        try:
+            yield read_stream, write_stream
+        finally:
+            tg.cancel_scope.cancel()
+
+
+@asynccontextmanager
+async def unix_socket_client(socket_path: str):
+    """Client transport: connects to a server listening on `socket_path`."""
+    stream = await anyio.connect_unix(socket_path)
+    async with stream:
+        async with socket_streams(stream) as streams:
+            yield streams
+
+
+async def socket_is_live(socket_path: str) -> bool:
+    """True if a server accepts connections on `socket_path`."""
+    try:
+        stream = await anyio.connect_unix(socket_path)
+    except OSError:
+        return False
+    await stream.aclose()
+    return True
+
+
+async def serve_unix_socket(server, init_options, socket_path: str, idle_timeout: float = 0) -> None:
+    """Serves MCP sessions on a Unix socket until idle for `idle_timeout` seconds (0: forever).
+
+    Raises:
+        RuntimeError: If another server is already listening on `socket_path`.
+    """
+    logger = get_logger("utils.socket_transport")
+    if os.path.exists(socket_path):
+        if await socket_is_live(socket_path):
+            raise RuntimeError(f"A server is already listening on {socket_path}")
+        os.unlink(socket_path)  # Left behind by a server that did not shut down cleanly
+
+    listener = await anyio.create_unix_listener(socket_path)
+    os.chmod(socket_path, 0o600)
+    active = 0
+    last_activity = time.monotonic()
+
+    async def handle(stream: anyio.abc.ByteStream) -> None:
+        nonlocal active, last_activity
+        active += 1
+        try:
+            async with stream, socket_streams(stream) as (read_stream, write_stream):
+                await server.run(read_stream, write_stream, init_options)
+        except Exception as e:
+            # One broken client must not take the daemon down
+            logger.warning(f"Socket session ended with an error: {e}", exc_info=True)
+        finally:
+            active -= 1
+            last_activity = time.monotonic()
+
+    async def stop_when_idle(scope: anyio.CancelScope) -> None:
+        while True:
+            await anyio.sleep(min(idle_timeout, 1.0))
+            if active == 0 and time.monotonic() - last_activity >= idle_timeout:
+                logger.info(f"No connections for {idle_timeout:g}s, shutting down socket server")
+                scope.cancel()
+                return
+
+    logger.info(f"Serving MCP on unix socket {socket_path} (idle timeout: {idle_timeout:g}s)")
+    try:
+        async with listener, anyio.create_task_group() as tg:
+            tg.start_soon(listener.serve, handle)
+            if idle_timeout > 0:
+                tg.start_soon(stop_when_idle, tg.cancel_scope)
+    finally:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
@@ -7,6 +7,8 @@ import numpy as np  # Added for cosine similarity
 from chromadb.utils.embedding_functions import DefaultEmbeddingFunction  # Added
 import chromadb
 
+from chroma_mcp.utils.metadata_patch import patch_metadata
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -271,6 +273,28 @@ def update_entry_status(client, collection_name, entry_id, new_status="analyzed"
         return False
 
 
+def update_entry_statuses(client, collection_name, entry_ids, new_status="analyzed"):
+    """Sets the status of many entries with one metadata read and one update.
+
+    Returns:
+        The IDs that exist in the collection (and now carry `new_status`); empty on failure.
+    """
+    entry_ids = list(dict.fromkeys(entry_ids))
+    if not entry_ids:
+        return []
+    logger.info(f"Updating status of {len(entry_ids)} entries in '{collection_name}' to '{new_status}'.")
+    try:
+        collection = client.get_collection(name=collection_name)
+        result = patch_metadata(collection, patches={entry_id: {"status": new_status} for entry_id in entry_ids})
+    except Exception as e:
+        logger.error(f"Failed to update status for entries in '{collection_name}': {e}", exc_info=True)
+        return []
+    if result.missing_ids:
+        logger.warning(f"Entries not found while updating status: {', '.join(result.missing_ids)}")
+    missing = set(result.missing_ids)
+    return [entry_id for entry_id in entry_ids if entry_id not in missing]
+
+
 def analyze_chat_history(  # pylint: disable=too-many-locals,too-many-statements
     client: chromadb.Client,
     embedding_function: chromadb.EmbeddingFunction,
@@ -342,7 +366,8 @@ def analyze_chat_history(  # pylint: disable=too-many-locals,too-many-statements
         entries.sort(key=lambda entry: float(entry.get("metadata", {}).get("confidence_score", 0.0)), reverse=True)
         logger.info("Entries sorted by confidence score (highest first).")
 
-    # 2. Process each entry
+    # 2. Process each entry; statuses are written in one batch afterwards
+    analyzed_entries = []
     for entry in entries:
         entry_id = entry.get("id")
         metadata = entry.get("metadata", {})
@@ -436,17 +461,21 @@ def analyze_chat_history(  # pylint: disable=too-many-locals,too-many-statements
         if correlated_this_entry:
             correlated_count += 1
 
-        # 5. Update status (if processing was successful, regardless of correlation)
-        if update_entry_status(client, collection_name, entry_id, new_status):
+        # 5. Queue the status update (if processing was successful, regardless of correlation)
+        analyzed_entries.append((entry_id, metadata.get("prompt_summary", ""), confidence_score))
+
+        logger.info(f"--- Finished Processing Entry: {entry_id} ---")
+
+    updated_ids = set(
+        update_entry_statuses(client, collection_name, [entry[0] for entry in analyzed_entries], new_status)
+    )
+    for entry_id, summary, confidence_score in analyzed_entries:
+        if entry_id in updated_ids:
             processed_count += 1
-            # Store info for printing later
-            confidence_str = f" (confidence: {confidence_score})" if confidence_score else ""
-            updated_entries_info.append((entry_id, metadata.get("prompt_summary", ""), confidence_score))
+            updated_entries_info.append((entry_id, summary, confidence_score))
         else:
             logger.error(f"Failed to update status for {entry_id}. It might be reprocessed next time.")
 
-        logger.info(f"--- Finished Processing Entry: {entry_id} ---")
-
     logger.info(
         f"Analysis complete. Processed {processed_count} entries. Found potential correlation in {correlated_count} entries."
     )
@@ -8,10 +8,14 @@ in the chat_history_v1 collection.
 
 import json
 import logging
+import os
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 import uuid
 
+from chroma_mcp.utils.dedup import dedup_metadata, find_duplicate, max_distance_from_env, record_duplicate
+from chroma_mcp.utils.metadata_patch import add_to_id_lists
+
 from .context import (
     extract_code_snippets,
     generate_diff_summary,
@@ -147,6 +151,8 @@ def log_chat_to_chroma(
     file_changes: List[Dict[str, Any]],
     involved_entities: str,
     session_id: str = None,
+    dedup: Optional[bool] = None,
+    dedup_max_distance: Optional[float] = None,
 ) -> str:
     """
     Log chat to ChromaDB with enhanced context capture.
@@ -161,9 +167,13 @@ def log_chat_to_chroma(
         file_changes: List of files modified with before/after content
         involved_entities: Comma-separated string of entities involved
         session_id: Optional session ID (UUID string)
+        dedup: Skip the insert if an entry with the same or a near-identical document exists
+            (defaults to the CHROMA_DEDUP_ON_ADD environment variable)
+        dedup_max_distance: Near duplicates must also be within this vector distance
+            (defaults to the CHROMA_DEDUP_MAX_DISTANCE environment variable; unset skips the check)
 
     Returns:
-        ID of the added document
+        ID of the added document, or of the existing entry it duplicates
     """
     try:
         # Process the chat for logging
@@ -187,13 +197,28 @@ def log_chat_to_chroma(
             logger.info(f"Collection {collection_name} not found. Creating it.")
             collection = chroma_client.create_collection(name=collection_name)
 
-        # Generate a unique ID for the document
-        chat_id = str(uuid.uuid4())
+        if dedup is None:
+            dedup = os.getenv("CHROMA_DEDUP_ON_ADD", "false").lower() in ("true", "yes", "1", "t", "y")
+        if dedup_max_distance is None:
+            dedup_max_distance = max_distance_from_env()
+        duplicate = find_duplicate(collection, log_data["document"], max_distance=dedup_max_distance) if dedup else None
+
+        if duplicate is not None:
+            # Merge into the existing entry instead of embedding the same summary again
+            chat_id = duplicate.id
+            record_duplicate(collection, duplicate)
+            logger.info(f"Chat log is a {duplicate.kind} duplicate of {chat_id}; not adding a new entry.")
+        else:
+            # Generate a unique ID for the document
+            chat_id = str(uuid.uuid4())
+            metadata = (
+                {**log_data["metadata"], **dedup_metadata(log_data["document"])} if dedup else log_data["metadata"]
+            )
 
-        # Use the collection.add method with properly formatted lists
-        collection.add(documents=[log_data["document"]], ids=[chat_id], metadatas=[log_data["metadata"]])
+            # Use the collection.add method with properly formatted lists
+            collection.add(documents=[log_data["document"]], ids=[chat_id], metadatas=[metadata])
 
-        logger.info(f"Successfully added chat log to collection {collection_name} with ID: {chat_id}")
+            logger.info(f"Successfully added chat log to collection {collection_name} with ID: {chat_id}")
 
         # Process bidirectional links if we modified files
         if file_changes:
@@ -209,18 +234,9 @@ def log_chat_to_chroma(
                     related_code_chunks.extend(chunk_ids)
 
                 if related_code_chunks:
-                    # Update the chat history entry with the related chunk IDs
-                    # Get existing metadata
-                    chat_data = collection.get(ids=[chat_id])
-                    if chat_data and chat_data.get("metadatas") and len(chat_data["metadatas"]) > 0:
-                        metadata = chat_data["metadatas"][0]
-
-                        # Add related code chunks
-                        metadata["related_code_chunks"] = ",".join(related_code_chunks)
-
-                        # Update metadata
-                        collection.update(ids=[chat_id], metadatas=[metadata])
-                        logger.debug(f"Updated chat {chat_id} with related code chunks: {related_code_chunks}")
+                    # Merge the related chunk IDs into the chat entry's metadata
+                    add_to_id_lists(collection, [chat_id], "related_code_chunks", related_code_chunks)
+                    logger.debug(f"Updated chat {chat_id} with related code chunks: {related_code_chunks}")
 
         return chat_id
     except Exception as e:
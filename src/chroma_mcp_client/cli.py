@@ -48,6 +48,44 @@ from .validation.test_workflow import (
 # Import the schema for CodeQualityEvidence
 from .validation.schemas import CodeQualityEvidence
 
+# Import HNSW tuning helpers
+from .hnsw_tuning import (
+    DEFAULT_CONSTRUCTION_EF_VALUES,
+    DEFAULT_M_VALUES,
+    DEFAULT_NUM_QUERIES,
+    DEFAULT_SAMPLE_SIZE,
+    DEFAULT_SEARCH_EF_VALUES,
+    DEFAULT_TARGET_RECALL,
+    apply_env_overrides,
+    choose_best,
+    format_results_table,
+    tune_hnsw,
+)
+
+# Import compaction helpers
+from .compaction import (
+    DEFAULT_COMPACT_BATCH_SIZE,
+    DEFAULT_LATENCY_QUERIES,
+    compact_collection,
+    format_compaction_report,
+)
+
+# Import sharding helpers
+from chroma_mcp.utils.chroma_client import resolve_collection
+from chroma_mcp.utils.config import get_collection_settings
+from chroma_mcp.utils.sharding import create_sharded_collection
+
+# Import retention (archival) helpers
+from chroma_mcp.utils.retention import (
+    DEFAULT_RETENTION_BATCH_SIZE,
+    RetentionPolicy,
+    load_retention_policies,
+    run_retention,
+)
+
+# Import collection statistics helpers
+from chroma_mcp.utils.collection_stats import DEFAULT_STATS_SAMPLE_SIZE, get_collection_stats, persist_directory
+
 # --- Constants ---
 DEFAULT_COLLECTION_NAME = "codebase_v1"
 DEFAULT_QUERY_RESULTS = 5
@@ -110,7 +148,9 @@ def main():
         help="Repository root path (used for determining relative paths for IDs).",
     )
     index_parser.add_argument(
-        "--all", action="store_true", help="Index all files currently tracked by git in the repo."
+        "--all",
+        action="store_true",
+        help="Index all files currently tracked by git in the repo (only files changed since the last run).",
     )
     index_parser.add_argument(
         "--collection-name",
@@ -391,6 +431,20 @@ def main():
         default="chat_history_v1",
         help="Name of the ChromaDB collection to log to.",
     )
+    log_chat_parser.add_argument(
+        "--dedup",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="Skip the entry if an identical or near-identical chat summary is already logged "
+        "(default: CHROMA_DEDUP_ON_ADD).",
+    )
+    log_chat_parser.add_argument(
+        "--dedup-max-distance",
+        type=float,
+        default=None,
+        help="With --dedup, near-identical summaries must also be within this vector distance "
+        "(default: CHROMA_DEDUP_MAX_DISTANCE; unset skips the check).",
+    )
 
     # --- Log Error Subparser ---
     log_error_parser = subparsers.add_parser(
@@ -561,6 +615,131 @@ def main():
         help="Path to the workflow file that references the artifacts to clean up.",
     )
 
+    # --- Tune HNSW Subparser ---
+    tune_hnsw_parser = subparsers.add_parser(
+        "tune-hnsw",
+        help="Sweep HNSW parameters on temporary clones of a collection sample and report recall@k vs latency.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    tune_hnsw_parser.add_argument(
+        "--collection-name",
+        default=DEFAULT_COLLECTION_NAME,
+        help="Name of the ChromaDB collection to sample (it is not modified).",
+    )
+    tune_hnsw_parser.add_argument(
+        "--search-ef",
+        default=",".join(str(v) for v in DEFAULT_SEARCH_EF_VALUES),
+        help="Comma-separated hnsw:search_ef values to try.",
+    )
+    tune_hnsw_parser.add_argument(
+        "--m", default=",".join(str(v) for v in DEFAULT_M_VALUES), help="Comma-separated hnsw:M values to try."
+    )
+    tune_hnsw_parser.add_argument(
+        "--construction-ef",
+        default=",".join(str(v) for v in DEFAULT_CONSTRUCTION_EF_VALUES),
+        help="Comma-separated hnsw:construction_ef values to try.",
+    )
+    tune_hnsw_parser.add_argument(
+        "--sample-size", type=int, default=DEFAULT_SAMPLE_SIZE, help="Maximum number of vectors to sample."
+    )
+    tune_hnsw_parser.add_argument(
+        "--num-queries", type=int, default=DEFAULT_NUM_QUERIES, help="Number of held-out query vectors."
+    )
+    tune_hnsw_parser.add_argument("-n", "--n-results", type=int, default=10, help="k for recall@k.")
+    tune_hnsw_parser.add_argument(
+        "--target-recall",
+        type=float,
+        default=DEFAULT_TARGET_RECALL,
+        help="Recall the chosen settings must reach; the fastest qualifying combination is chosen.",
+    )
+    tune_hnsw_parser.add_argument(
+        "--apply",
+        action="store_true",
+        help="Write the chosen settings as CHROMA_COLLECTION_<NAME>_HNSW_* overrides into --env-file. "
+        "M and construction_ef take effect when the collection is next created (e.g. after compaction).",
+    )
+    tune_hnsw_parser.add_argument("--env-file", default=".env", help="The .env file updated by --apply.")
+
+    # --- Stats Subparser ---
+    stats_parser = subparsers.add_parser(
+        "stats",
+        help="Show size and shape statistics for a collection as JSON.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    stats_parser.add_argument(
+        "--collection-name", default=DEFAULT_COLLECTION_NAME, help="Name of the ChromaDB collection to describe."
+    )
+    stats_parser.add_argument(
+        "--sample-size",
+        type=int,
+        default=DEFAULT_STATS_SAMPLE_SIZE,
+        help="Records read for document length, metadata and age statistics.",
+    )
+    stats_parser.add_argument(
+        "--full-scan", action="store_true", help="Read every record instead of a sample (slower on large collections)."
+    )
+
+    # --- Create Sharded Collection Subparser ---
+    create_sharded_parser = subparsers.add_parser(
+        "create-sharded-collection",
+        help="Create a logical collection split across several physical collections (shards).",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    create_sharded_parser.add_argument("collection_name", help="Logical name used by the document tools and indexer.")
+    create_sharded_parser.add_argument("--shards", type=int, default=4, help="Number of physical collections.")
+    create_sharded_parser.add_argument(
+        "--shard-key",
+        default="file_path",
+        help="Metadata field used to route writes, so records sharing it land on one shard. Empty routes by ID.",
+    )
+
+    # --- Compact Subparser ---
+    compact_parser = subparsers.add_parser(
+        "compact",
+        help="Rebuild a collection from its live records to reclaim space left by deleted vectors.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    compact_parser.add_argument("collection_name", help="Name of the ChromaDB collection to compact.")
+    compact_parser.add_argument(
+        "--batch-size", type=int, default=DEFAULT_COMPACT_BATCH_SIZE, help="Records copied per batch."
+    )
+    compact_parser.add_argument(
+        "--latency-queries",
+        type=int,
+        default=DEFAULT_LATENCY_QUERIES,
+        help="Stored embeddings used as probe queries to compare latency before and after.",
+    )
+    compact_parser.add_argument(
+        "--keep-backup",
+        action="store_true",
+        help="Keep the old collection as '<name>_precompact_<suffix>' instead of deleting it.",
+    )
+
+    # --- Archive Subparser ---
+    archive_parser = subparsers.add_parser(
+        "archive",
+        help="Move old chat history and thoughts into '<collection>_archive' according to retention policies.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    archive_parser.add_argument(
+        "--collection-name",
+        default=None,
+        help="Apply an ad-hoc policy to this collection. Without it, the configured default policies run.",
+    )
+    archive_parser.add_argument(
+        "--max-age-days", type=float, default=None, help="Archive entries older than this many days."
+    )
+    archive_parser.add_argument(
+        "--max-count", type=int, default=None, help="Keep at most this many entries in the hot collection."
+    )
+    archive_parser.add_argument(
+        "--statuses", default=None, help="Comma-separated 'status' values eligible for archival (default: any)."
+    )
+    archive_parser.add_argument(
+        "--batch-size", type=int, default=DEFAULT_RETENTION_BATCH_SIZE, help="Entries moved per batch."
+    )
+    archive_parser.add_argument("--dry-run", action="store_true", help="Only report what would be archived.")
+
     args = parser.parse_args()
 
     # --- Setup Logging Level based on verbosity ---
@@ -624,8 +803,12 @@ def main():
         if args.all:
             logger.info(f"Indexing all tracked git files in {repo_root_path}...")
             # Pass the collection_name string
-            count = index_git_files(repo_root_path, collection_name)
-            logger.info(f"Git index command finished. Indexed {count} files.")
+            result = index_git_files(repo_root_path, collection_name)
+            print(
+                f"Indexed '{collection_name}' in {result.seconds:.1f}s: {result.added} added, "
+                f"{result.updated} updated, {result.deleted} deleted, {result.skipped} unchanged"
+                + (f", {result.failed} failed" if result.failed else "")
+            )
         elif args.paths:
             logger.info(f"Processing {len(args.paths)} specified file/directory paths...")
             indexed_count = 0
@@ -764,7 +947,8 @@ def main():
                 # Attempt to get the collection first to see if it exists
                 # This is a bit more verbose but gives clearer logging
                 try:
-                    client.get_collection(name=collection_name)
+                    # A sharded logical collection of this name also counts as existing
+                    resolve_collection(client, name=collection_name)
                     logger.info(f"Collection '{collection_name}' already exists.")
                     collections_existing += 1
                 except Exception:  # Should be a more specific exception if Chroma client provides one for not found
@@ -1205,6 +1389,8 @@ def main():
                 file_changes=file_changes,
                 involved_entities=args.involved_entities,
                 session_id=args.session_id,
+                dedup=args.dedup,
+                dedup_max_distance=args.dedup_max_distance,
             )
 
             logger.info(f"'log-chat' command finished. Chat ID: {chat_id}")
@@ -1278,6 +1464,127 @@ def main():
             print(f"Error during cleanup: {e}")
             sys.exit(1)
 
+    elif args.command == "tune-hnsw":
+        collection_name = args.collection_name
+        logger.info(f"Executing 'tune-hnsw' command for collection '{collection_name}'...")
+        try:
+            results = tune_hnsw(
+                client,
+                collection_name,
+                search_ef_values=[int(v) for v in args.search_ef.split(",") if v.strip()],
+                m_values=[int(v) for v in args.m.split(",") if v.strip()],
+                construction_ef_values=[int(v) for v in args.construction_ef.split(",") if v.strip()],
+                sample_size=args.sample_size,
+                num_queries=args.num_queries,
+                n_results=args.n_results,
+            )
+        except Exception as e:
+            logger.error(f"HNSW tuning failed for collection '{collection_name}': {e}", exc_info=True)
+            print(f"Error during HNSW tuning: {e}", file=sys.stderr)
+            sys.exit(1)
+
+        best = choose_best(results, args.target_recall)
+        print(f"\n--- HNSW sweep for '{collection_name}' ---")
+        print(format_results_table(results, args.n_results, best))
+        if best is not None:
+            print(
+                f"\nChosen: M={best.m}, construction_ef={best.construction_ef}, search_ef={best.search_ef} "
+                f"(recall@{args.n_results}={best.recall:.3f}, p50={best.p50_ms:.2f} ms)"
+            )
+            if args.apply:
+                overrides = apply_env_overrides(collection_name, best, args.env_file)
+                for key, value in overrides:
+                    print(f"  {key}={value}")
+                print(f"Overrides written to {args.env_file}.")
+
+    elif args.command == "stats":
+        collection_name = args.collection_name
+        logger.info(f"Executing 'stats' command for collection '{collection_name}'...")
+        try:
+            collection = resolve_collection(client, name=collection_name)
+            stats = get_collection_stats(
+                collection,
+                data_dir=persist_directory(client),
+                sample_size=args.sample_size,
+                full_scan=args.full_scan,
+            )
+        except Exception as e:
+            logger.error(f"Failed to compute stats for collection '{collection_name}': {e}", exc_info=True)
+            print(f"Error: Could not compute stats for collection '{collection_name}': {e}", file=sys.stderr)
+            sys.exit(1)
+        print(json.dumps(stats, indent=2))
+
+    elif args.command == "create-sharded-collection":
+        collection_name = args.collection_name
+        logger.info(f"Executing 'create-sharded-collection' for '{collection_name}' with {args.shards} shards...")
+        try:
+            sharded = create_sharded_collection(
+                client,
+                collection_name,
+                args.shards,
+                shard_key=args.shard_key or None,
+                metadata=get_collection_settings(collection_name=collection_name),
+                embedding_function=ef,
+            )
+        except Exception as e:
+            logger.error(f"Failed to create sharded collection '{collection_name}': {e}", exc_info=True)
+            print(f"Error: Could not create sharded collection '{collection_name}': {e}", file=sys.stderr)
+            sys.exit(1)
+        print(
+            f"Created sharded collection '{collection_name}': "
+            f"{', '.join(shard.name for shard in sharded.shards)} (routing key: {sharded.shard_key or 'id'})."
+        )
+
+    elif args.command == "compact":
+        collection_name = args.collection_name
+        logger.info(f"Executing 'compact' command for collection '{collection_name}'...")
+        try:
+            result = compact_collection(
+                client,
+                collection_name,
+                embedding_function=ef,
+                batch_size=args.batch_size,
+                num_latency_queries=args.latency_queries,
+                keep_backup=args.keep_backup,
+            )
+        except Exception as e:
+            logger.error(f"Compaction failed for collection '{collection_name}': {e}", exc_info=True)
+            print(f"Error during compaction: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(format_compaction_report(result))
+
+    elif args.command == "archive":
+        if args.collection_name:
+            if args.max_age_days is None and args.max_count is None:
+                print("Error: --max-age-days or --max-count is required with --collection-name.", file=sys.stderr)
+                sys.exit(1)
+            statuses = [s.strip() for s in args.statuses.split(",") if s.strip()] if args.statuses else None
+            policies = [
+                RetentionPolicy(
+                    args.collection_name,
+                    max_age_days=args.max_age_days,
+                    max_count=args.max_count,
+                    statuses=statuses or None,
+                )
+            ]
+        else:
+            policies = load_retention_policies()
+        logger.info(f"Executing 'archive' command for {', '.join(p.collection_name for p in policies)}...")
+        try:
+            results = run_retention(
+                client, policies, embedding_function=ef, batch_size=args.batch_size, dry_run=args.dry_run
+            )
+        except Exception as e:
+            logger.error(f"Archival failed: {e}", exc_info=True)
+            print(f"Error during archival: {e}", file=sys.stderr)
+            sys.exit(1)
+        verb = "Would archive" if args.dry_run else "Archived"
+        for result in results:
+            print(
+                f"{verb} {result.archived} of {result.scanned} entries from '{result.collection_name}' "
+                f"into '{result.archive_name}' ({result.seconds:.1f}s)."
+            )
+
     else:
         logger.error(f"Unknown command: {args.command}")
 
@@ -0,0 +1,201 @@
+"""
+Collection compaction (rebuild) for ChromaDB collections.
+
+Collections that see constant churn (re-indexed chunks, deletes, upserts)
+accumulate deleted vectors in their HNSW segments, so disk use and query latency
+grow over time. Compaction streams the live records, including their stored
+embeddings (nothing is re-embedded), into a freshly built collection with the
+same settings and then swaps names with `collection.modify(name=...)`, the same
+mechanism `chroma_rename_collection` uses.
+
+Writers should be paused while a collection is compacted. If the source count
+changes during the copy the swap is aborted and the source is left untouched.
+
+Chroma has no atomic rename, so the swap takes two `modify(name=...)` calls:
+the source moves to a backup name, then the rebuilt collection takes the
+original name. Between the two calls no collection has the original name, and
+readers looking it up get a not-found error. If the second rename fails the
+source is renamed back; if that also fails, the source is left under its
+backup name and the error says so.
+"""
+
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from chroma_mcp.utils.collection_stats import hnsw_settings, persist_directory, segment_bytes
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COMPACT_BATCH_SIZE = 1000
+DEFAULT_LATENCY_QUERIES = 20
+# HNSW configuration keys accepted when creating a collection
+_HNSW_CONFIG_KEYS = ("space", "ef_construction", "ef_search", "max_neighbors")
+
+
+@dataclass
+class CompactionResult:
+    """Before/after measurements of a compaction run."""
+
+    collection_name: str
+    records: int
+    bytes_before: Optional[int]
+    bytes_after: Optional[int]
+    p50_ms_before: Optional[float]
+    p50_ms_after: Optional[float]
+    seconds: float
+    backup_name: Optional[str] = None
+
+
+def _copy_settings(source) -> dict:
+    """Returns create_collection kwargs reproducing the source's metadata and HNSW settings."""
+    metadata = dict(source.metadata or {})
+    kwargs = {"metadata": metadata or None}
+    if not any(key.startswith("hnsw:") for key in metadata):
+        # Settings given via configuration rather than metadata must be carried over explicitly
+        hnsw = {k: v for k, v in hnsw_settings(source).items() if k in _HNSW_CONFIG_KEYS}
+        if hnsw:
+            kwargs["configuration"] = {"hnsw": hnsw}
+    return kwargs
+
+
+def _copy_records(source, target, batch_size: int) -> Tuple[int, np.ndarray]:
+    """Streams all records into `target`; returns the count and a few embeddings for latency probes."""
+    copied = 0
+    probes = np.zeros((0, 0), dtype=np.float32)
+    while True:
+        batch = source.get(include=["embeddings", "documents", "metadatas"], limit=batch_size, offset=copied)
+        ids = batch.get("ids") or []
+        if not ids:
+            break
+        embeddings = np.asarray(batch["embeddings"], dtype=np.float32)
+        target.add(
+            ids=ids,
+            embeddings=embeddings,
+            documents=batch.get("documents"),
+            metadatas=batch.get("metadatas"),
+        )
+        if probes.size == 0:
+            probes = embeddings[:DEFAULT_LATENCY_QUERIES]
+        copied += len(ids)
+        if len(ids) < batch_size:
+            break
+    return copied, probes
+
+
+def measure_query_latency(collection, query_embeddings: np.ndarray, n_results: int = 10) -> Optional[float]:
+    """Returns the p50 single-query latency in milliseconds, or None without query vectors."""
+    if len(query_embeddings) == 0:
+        return None
+    latencies: List[float] = []
+    for query in query_embeddings:
+        start = time.perf_counter()
+        collection.query(query_embeddings=[query], n_results=n_results, include=[])
+        latencies.append((time.perf_counter() - start) * 1000)
+    return float(np.percentile(latencies, 50))
+
+
+def compact_collection(
+    client,
+    collection_name: str,
+    embedding_function=None,
+    batch_size: int = DEFAULT_COMPACT_BATCH_SIZE,
+    num_latency_queries: int = DEFAULT_LATENCY_QUERIES,
+    keep_backup: bool = False,
+) -> CompactionResult:
+    """Rebuilds a collection from its live records and swaps it in under the same name.
+
+    Args:
+        client: ChromaDB client.
+        collection_name: Collection to compact.
+        embedding_function: Embedding function attached to the rebuilt collection
+            (stored embeddings are copied, not recomputed).
+        batch_size: Records read and written per batch.
+        num_latency_queries: Stored embeddings used as probe queries before and after.
+        keep_backup: Keep the old collection under a backup name instead of deleting it.
+
+    Returns:
+        A CompactionResult with before/after size and latency.
+
+    Raises:
+        RuntimeError: If the source changed while it was being copied.
+    """
+    start = time.perf_counter()
+    source = client.get_collection(name=collection_name, embedding_function=embedding_function)
+    data_dir = persist_directory(client)
+    bytes_before = segment_bytes(data_dir, str(source.id)) if data_dir else None
+
+    suffix = uuid.uuid4().hex[:8]
+    temp_name = f"{collection_name}_compact_{suffix}"
+    target = client.create_collection(name=temp_name, embedding_function=embedding_function, **_copy_settings(source))
+    try:
+        copied, probes = _copy_records(source, target, batch_size)
+        if source.count() != copied or target.count() != copied:
+            raise RuntimeError(
+                f"Collection '{collection_name}' changed during compaction "
+                f"(copied {copied}, source now {source.count()}); pause writers and retry."
+            )
+        probes = probes[:num_latency_queries]
+        p50_before = measure_query_latency(source, probes)
+        p50_after = measure_query_latency(target, probes)
+    except Exception:
+        client.delete_collection(name=temp_name)
+        raise
+
+    # Swap names: move the source aside first so the rebuilt collection can take its name.
+    # Until the second rename lands, no collection is named `collection_name`.
+    backup_name = f"{collection_name}_precompact_{suffix}"
+    source.modify(name=backup_name)
+    try:
+        target.modify(name=collection_name)
+    except Exception as swap_error:
+        try:
+            source.modify(name=collection_name)
+        except Exception as rollback_error:
+            raise RuntimeError(
+                f"Compaction of '{collection_name}' failed to swap ({swap_error}) and to roll back "
+                f"({rollback_error}); the original collection is '{backup_name}' and the rebuilt copy '{temp_name}'."
+            ) from swap_error
+        client.delete_collection(name=temp_name)
+        logger.warning(f"Swap failed; restored original collection '{collection_name}': {swap_error}")
+        raise
+    logger.info(f"Swapped rebuilt collection in as '{collection_name}' ({copied} records).")
+
+    if not keep_backup:
+        client.delete_collection(name=backup_name)
+        backup_name = None
+    bytes_after = segment_bytes(data_dir, str(target.id)) if data_dir else None
+
+    return CompactionResult(
+        collection_name=collection_name,
+        records=copied,
+        bytes_before=bytes_before,
+        bytes_after=bytes_after,
+        p50_ms_before=p50_before,
+        p50_ms_after=p50_after,
+        seconds=time.perf_counter() - start,
+        backup_name=backup_name,
+    )
+
+
+def format_compaction_report(result: CompactionResult) -> str:
+    """Renders a before/after summary."""
+
+    def _bytes(value: Optional[int]) -> str:
+        return "n/a" if value is None else f"{value:,} bytes"
+
+    def _ms(value: Optional[float]) -> str:
+        return "n/a" if value is None else f"{value:.2f} ms"
+
+    lines = [
+        f"Compacted '{result.collection_name}': {result.records} records in {result.seconds:.1f}s",
+        f"  size:        {_bytes(result.bytes_before)} -> {_bytes(result.bytes_after)}",
+        f"  p50 latency: {_ms(result.p50_ms_before)} -> {_ms(result.p50_ms_after)}",
+    ]
+    if result.backup_name:
+        lines.append(f"  previous collection kept as '{result.backup_name}'")
+    return "\n".join(lines)
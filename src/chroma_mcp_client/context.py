@@ -23,6 +23,8 @@ from enum import Enum
 from datetime import datetime
 import uuid
 
+from chroma_mcp.utils.metadata_patch import add_to_id_lists
+
 # Set up logging
 logger = logging.getLogger(__name__)
 
@@ -373,31 +375,16 @@ def manage_bidirectional_links(chat_id: str, file_changes: List[Dict[str, str]],
 
                 # Only add to result if we have actual chunk IDs
                 if chunk_ids:
-                    # Store in result map for return
                     result[file_path] = chunk_ids
 
-                    # For each chunk, update the related_chat_ids field
-                    for chunk_id in chunk_ids:
-                        try:
-                            # Get current metadata for this chunk
-                            chunk_data = codebase_collection.get(ids=[chunk_id])
-
-                            if chunk_data and "metadatas" in chunk_data and chunk_data["metadatas"]:
-                                metadata = chunk_data["metadatas"][0]
-
-                                # Update related_chat_ids field
-                                related_chat_ids = metadata.get("related_chat_ids", "")
-                                chat_ids = set(related_chat_ids.split(",")) if related_chat_ids else set()
-                                chat_ids.add(chat_id)
-
-                                # Update metadata with new related_chat_ids
-                                metadata["related_chat_ids"] = ",".join(filter(None, chat_ids))
-
-                                # Update the chunk's metadata
-                                codebase_collection.update(ids=[chunk_id], metadatas=[metadata])
-                                logger.debug(f"Updated bidirectional link for chunk {chunk_id} with chat {chat_id}")
-                        except Exception as e:
-                            logger.error(f"Failed to update bidirectional link for chunk {chunk_id}: {e}")
+        # Add the chat to every linked chunk's related_chat_ids in one read and one update
+        linked_chunk_ids = list(dict.fromkeys(chunk_id for chunk_ids in result.values() for chunk_id in chunk_ids))
+        if linked_chunk_ids:
+            try:
+                add_to_id_lists(codebase_collection, linked_chunk_ids, "related_chat_ids", [chat_id])
+                logger.debug(f"Linked chat {chat_id} to {len(linked_chunk_ids)} code chunks")
+            except Exception as e:
+                logger.error(f"Failed to update bidirectional links for chat {chat_id}: {e}")
 
     except Exception as e:
         logger.error(f"Error managing bidirectional links: {e}")
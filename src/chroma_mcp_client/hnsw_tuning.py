@@ -0,0 +1,204 @@
+"""
+HNSW parameter tuning for ChromaDB collections.
+
+Samples vectors from an existing collection, computes exact top-k ground truth
+with numpy, then builds temporary clones of the sample with each combination of
+`hnsw:M`, `hnsw:construction_ef` and `hnsw:search_ef` and measures recall@k and
+query latency against them. The source collection is never modified.
+
+The chosen settings can be written back as per-collection environment overrides
+(`CHROMA_COLLECTION_<NAME>_HNSW_...`), which `get_collection_settings` picks up
+when the collection is (re)created.
+"""
+
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+from dotenv import set_key
+
+from chroma_mcp.utils.collection_stats import distance_space
+from chroma_mcp.utils.config import get_collection_settings
+from chroma_mcp.utils.exact_search import ExactIndex
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEARCH_EF_VALUES = [10, 20, 50, 100]
+DEFAULT_M_VALUES = [16]
+DEFAULT_CONSTRUCTION_EF_VALUES = [100]
+DEFAULT_SAMPLE_SIZE = 5000
+DEFAULT_NUM_QUERIES = 100
+DEFAULT_TARGET_RECALL = 0.95
+TEMP_COLLECTION_PREFIX = "tune-hnsw-tmp"
+
+
+@dataclass
+class TuningResult:
+    """Recall and latency measured for one HNSW parameter combination."""
+
+    m: int
+    construction_ef: int
+    search_ef: int
+    recall: float
+    p50_ms: float
+    p99_ms: float
+    build_seconds: float
+
+
+def sample_collection(collection, sample_size: int, batch_size: int = 1000) -> Tuple[List[str], np.ndarray]:
+    """Reads up to `sample_size` IDs and embeddings from a collection."""
+    ids: List[str] = []
+    chunks: List[np.ndarray] = []
+    while len(ids) < sample_size:
+        limit = min(batch_size, sample_size - len(ids))
+        batch = collection.get(include=["embeddings"], limit=limit, offset=len(ids))
+        batch_ids = batch.get("ids") or []
+        if not batch_ids:
+            break
+        ids.extend(batch_ids)
+        chunks.append(np.asarray(batch["embeddings"], dtype=np.float32))
+        if len(batch_ids) < limit:
+            break
+    embeddings = np.concatenate(chunks) if chunks else np.zeros((0, 0), dtype=np.float32)
+    return ids, embeddings
+
+
+def _build_clone(client, name: str, ids: List[str], embeddings: np.ndarray, settings: dict, batch_size: int = 1000):
+    clone = client.create_collection(name=name, metadata=settings, embedding_function=None)
+    for start in range(0, len(ids), batch_size):
+        clone.add(ids=ids[start : start + batch_size], embeddings=embeddings[start : start + batch_size])
+    return clone
+
+
+def _measure(clone, queries: np.ndarray, truth: List[List[str]], n_results: int) -> Tuple[float, float, float]:
+    """Returns (recall@k, p50 ms, p99 ms) for single-query requests against a clone."""
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        result = clone.query(query_embeddings=[query], n_results=n_results, include=[])
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len(set(result["ids"][0]) & set(expected))
+    recall = hits / max(1, sum(len(expected) for expected in truth))
+    return recall, float(np.percentile(latencies, 50)), float(np.percentile(latencies, 99))
+
+
+def tune_hnsw(
+    client,
+    collection_name: str,
+    search_ef_values: Iterable[int] = DEFAULT_SEARCH_EF_VALUES,
+    m_values: Iterable[int] = DEFAULT_M_VALUES,
+    construction_ef_values: Iterable[int] = DEFAULT_CONSTRUCTION_EF_VALUES,
+    sample_size: int = DEFAULT_SAMPLE_SIZE,
+    num_queries: int = DEFAULT_NUM_QUERIES,
+    n_results: int = 10,
+    seed: int = 0,
+) -> List[TuningResult]:
+    """Sweeps HNSW parameters on temporary clones of a collection sample.
+
+    Query vectors are drawn from the sample and held out of the clones, so they
+    behave like unseen queries. Ground truth is the exact top-k over the clone
+    contents in the collection's distance space.
+
+    Args:
+        client: ChromaDB client.
+        collection_name: Collection to sample from (read-only).
+        search_ef_values: Values of `hnsw:search_ef` to try.
+        m_values: Values of `hnsw:M` to try.
+        construction_ef_values: Values of `hnsw:construction_ef` to try.
+        sample_size: Maximum number of vectors read from the collection.
+        num_queries: Number of held-out query vectors.
+        n_results: k for recall@k.
+        seed: Random seed for choosing the query vectors.
+
+    Returns:
+        One TuningResult per parameter combination.
+    """
+    source = client.get_collection(name=collection_name)
+    # Configuration first: collections created through the Chroma 1.x configuration API have no hnsw:space
+    space = distance_space(source)
+    ids, embeddings = sample_collection(source, sample_size)
+    if len(ids) <= num_queries:
+        raise ValueError(
+            f"Collection '{collection_name}' has {len(ids)} sampled vectors; need more than num_queries={num_queries}."
+        )
+
+    rng = np.random.default_rng(seed)
+    query_rows = rng.choice(len(ids), size=num_queries, replace=False)
+    corpus_mask = np.ones(len(ids), dtype=bool)
+    corpus_mask[query_rows] = False
+    corpus_ids = [doc_id for doc_id, keep in zip(ids, corpus_mask) if keep]
+    corpus = embeddings[corpus_mask]
+    queries = embeddings[query_rows]
+
+    truth = [[doc_id for doc_id, _ in row] for row in ExactIndex(corpus_ids, corpus, space).search(queries, n_results)]
+    logger.info(f"Sampled {len(ids)} vectors from '{collection_name}' ({space}); {num_queries} held-out queries.")
+
+    results: List[TuningResult] = []
+    for m in m_values:
+        for construction_ef in construction_ef_values:
+            for search_ef in search_ef_values:
+                settings = get_collection_settings(
+                    hnsw_space=space,
+                    hnsw_construction_ef=construction_ef,
+                    **{"hnsw:M": m, "hnsw:search_ef": search_ef},
+                )
+                name = f"{TEMP_COLLECTION_PREFIX}-{uuid.uuid4().hex[:12]}"
+                try:
+                    build_start = time.perf_counter()
+                    clone = _build_clone(client, name, corpus_ids, corpus, settings)
+                    build_seconds = time.perf_counter() - build_start
+                    recall, p50, p99 = _measure(clone, queries, truth, n_results)
+                finally:
+                    try:
+                        client.delete_collection(name=name)
+                    except Exception as e:
+                        logger.warning(f"Could not delete temporary collection '{name}': {e}")
+                result = TuningResult(m, construction_ef, search_ef, recall, p50, p99, build_seconds)
+                logger.info(f"Measured {result}")
+                results.append(result)
+    return results
+
+
+def choose_best(results: List[TuningResult], target_recall: float = DEFAULT_TARGET_RECALL) -> Optional[TuningResult]:
+    """Picks the lowest-p50 combination reaching `target_recall`, else the highest-recall one."""
+    if not results:
+        return None
+    qualifying = [r for r in results if r.recall >= target_recall]
+    if qualifying:
+        return min(qualifying, key=lambda r: (r.p50_ms, r.p99_ms))
+    return max(results, key=lambda r: (r.recall, -r.p50_ms))
+
+
+def format_results_table(results: List[TuningResult], n_results: int, best: Optional[TuningResult] = None) -> str:
+    """Renders the sweep as a plain-text table."""
+    header = f"{'M':>4} {'constr_ef':>9} {'search_ef':>9} {f'recall@{n_results}':>10} {'p50 ms':>8} {'p99 ms':>8} {'build s':>8}"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        marker = "  <- best" if r is best else ""
+        lines.append(
+            f"{r.m:>4} {r.construction_ef:>9} {r.search_ef:>9} {r.recall:>10.3f} "
+            f"{r.p50_ms:>8.2f} {r.p99_ms:>8.2f} {r.build_seconds:>8.2f}{marker}"
+        )
+    return "\n".join(lines)
+
+
+def env_override_keys(collection_name: str, result: TuningResult) -> List[Tuple[str, Any]]:
+    """Returns the environment variables that make `get_collection_settings` use `result`."""
+    prefix = f"CHROMA_COLLECTION_{collection_name.upper()}_"
+    return [
+        (f"{prefix}HNSW_M", result.m),
+        (f"{prefix}HNSW_CONSTRUCTION_EF", result.construction_ef),
+        (f"{prefix}HNSW_SEARCH_EF", result.search_ef),
+    ]
+
+
+def apply_env_overrides(collection_name: str, result: TuningResult, env_file: str) -> List[Tuple[str, Any]]:
+    """Writes the chosen settings into a .env file as per-collection overrides."""
+    overrides = env_override_keys(collection_name, result)
+    for key, value in overrides:
+        set_key(env_file, key, str(value), quote_mode="never")
+    return overrides
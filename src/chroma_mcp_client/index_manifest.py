@@ -0,0 +1,126 @@
+"""
+Manifest of the files indexed into a codebase collection by `index --all`.
+
+Chunk IDs are `relative_path:commit_sha:chunk_index`, so re-indexing every
+tracked file at each commit re-embeds the whole repository and leaves the
+previous commit's chunks behind. The manifest records, per indexed file, the
+hash of the content that was embedded, the commit it was indexed at and its
+number of chunks; its chunk IDs are `path:commit:0` to `path:commit:chunks-1`.
+`index_git_files` then only re-chunks and re-embeds files whose content hash
+changed, and removes the chunks of changed and deleted files.
+
+The manifest is a JSON file in the repository's git directory, one per
+collection:
+
+    {"version": 1, "collection": "codebase_v1", "collection_id": "...",
+     "files": {"src/app.py": {"hash": "...", "commit": "...", "chunks": 3}}}
+
+It is only trusted for the collection it was written for: if the collection
+was recreated (its ID changed), the file is missing or unreadable, or the
+format version differs, it is rebuilt from the chunks in the collection
+(`manifest_from_collection`). Files whose chunks do not all come from one
+indexing run are then re-indexed.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import subprocess
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+MANIFEST_DIR = "chroma-mcp"
+
+ManifestEntry = Dict[str, Any]  # {"hash": str | None, "commit": str | None, "chunks": int}
+
+
+def content_hash(content: str) -> str:
+    """Hash of the (decoded) content a file was chunked from."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def manifest_path(repo_root: Path, collection_name: str) -> Path:
+    """Location of the manifest for `collection_name` inside the repository's git directory."""
+    git_dir = repo_root / ".git"
+    if not git_dir.is_dir():
+        # Worktrees and submodules have a .git file pointing elsewhere
+        cmd = ["git", "-C", str(repo_root), "rev-parse", "--absolute-git-dir"]
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True, encoding="utf-8")
+        git_dir = Path(result.stdout.strip())
+    return git_dir / MANIFEST_DIR / f"index-{collection_name}.json"
+
+
+def load_manifest(path: Path, collection_id: str) -> Optional[Dict[str, ManifestEntry]]:
+    """The files recorded in the manifest at `path`, or None if it is missing or not for this collection."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable index manifest {path}: {e}")
+        return None
+    if (
+        not isinstance(data, dict)
+        or data.get("version") != MANIFEST_VERSION
+        or data.get("collection_id") != collection_id
+        or not isinstance(data.get("files"), dict)
+    ):
+        logger.info(f"Index manifest {path} does not match collection {collection_id}, rebuilding it")
+        return None
+    return data["files"]
+
+
+def save_manifest(path: Path, collection_name: str, collection_id: str, files: Dict[str, ManifestEntry]) -> None:
+    """Writes the manifest atomically, so an interrupted run leaves the previous one intact."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {
+        "version": MANIFEST_VERSION,
+        "collection": collection_name,
+        "collection_id": collection_id,
+        "files": files,
+    }
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"), sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def manifest_from_collection(collection) -> Dict[str, ManifestEntry]:
+    """Rebuilds the manifest from the chunks stored in `collection`.
+
+    Reads all chunk IDs, which carry the file, commit and chunk index, and the
+    metadata of each file's first chunk for the content hash; reading the metadata
+    of every chunk is an order of magnitude slower on large collections. A file gets
+    its content hash only if all its chunks were written by one indexing run (one
+    commit, indexes 0..n-1); otherwise the hash is None, so the file is re-indexed
+    and all its chunks, including those of older commits, are removed.
+    """
+    runs: Dict[str, Dict[str, List[int]]] = {}
+    for chunk_id in collection.get(include=[]).get("ids") or []:
+        parts = chunk_id.rsplit(":", 2)
+        if len(parts) != 3 or not parts[2].isdigit():
+            continue
+        relative_path, commit, index = parts
+        runs.setdefault(relative_path, {}).setdefault(commit, []).append(int(index))
+
+    first_chunks = collection.get(where={"chunk_index": 0}, include=["metadatas"]).get("metadatas") or []
+    hashes = {
+        (metadata.get("file_path"), metadata.get("commit_sha")): metadata.get("content_hash")
+        for metadata in first_chunks
+        if metadata
+    }
+
+    files: Dict[str, ManifestEntry] = {}
+    for relative_path, file_runs in runs.items():
+        chunk_count = sum(len(indexes) for indexes in file_runs.values())
+        (commit, indexes), *others = file_runs.items()
+        digest = hashes.get((relative_path, commit))
+        if others or not digest or sorted(indexes) != list(range(len(indexes))):
+            commit, digest = None, None
+        files[relative_path] = {"hash": digest, "commit": commit, "chunks": chunk_count}
+    return files
@@ -4,7 +4,8 @@ import hashlib
 import subprocess
 import logging
 from pathlib import Path
-from typing import Set, List, Tuple, Optional
+from dataclasses import dataclass
+from typing import Dict, Set, List, Tuple, Optional
 import os
 import glob
 import re
@@ -19,7 +20,12 @@ if not logger.handlers:
     handler.setFormatter(formatter)
     logger.addHandler(handler)
 
+from chromadb.errors import NotFoundError
+
+from chroma_mcp.utils.chroma_client import resolve_collection
+
 from .connection import get_client_and_ef
+from .index_manifest import content_hash, load_manifest, manifest_from_collection, manifest_path, save_manifest
 
 # Define supported file types (can be extended)
 DEFAULT_SUPPORTED_SUFFIXES: Set[str] = {
@@ -50,6 +56,8 @@ DEFAULT_SUPPORTED_SUFFIXES: Set[str] = {
 
 # Default collection name (consider making this configurable)
 DEFAULT_COLLECTION_NAME = "codebase_v1"
+# Files whose chunks are removed per delete call when re-indexing
+DEFAULT_DELETE_BATCH_SIZE = 100
 
 
 def get_current_commit_sha(repo_root: Path) -> Optional[str]:
@@ -241,6 +249,161 @@ def _chunk_code_semantic(lines: List[str], file_type: str) -> List[Tuple[str, in
     return result_chunks
 
 
+def _get_index_collection(client, embedding_func, collection_name: str):
+    """Gets (or creates) the collection to index into; logs and returns None on failure.
+
+    An embedding function mismatch is also reported on stderr, since every file would fail.
+    """
+    try:
+        # Explicitly pass embedding_function to trigger early mismatch error
+        # Sharded logical collections route each file's chunks to one shard
+        collection = resolve_collection(client, name=collection_name, embedding_function=embedding_func)
+        logger.debug(f"Using existing collection: {collection_name} with configured embedding function.")
+    except (ValueError, NotFoundError) as e:
+        error_str = str(e).lower()
+        # Check for specific ChromaDB error messages related to EF mismatch
+        ef_mismatch_error = (
+            "embedding function name mismatch" in error_str or "an embedding function must be specified" in error_str
+        )  # if collection expects EF but none/wrong one given
+
+        if ef_mismatch_error:
+            client_ef_name_str = type(embedding_func).__name__ if embedding_func else "None"
+            collection_ef_name_str = "unknown (from collection)"  # Default if parsing fails
+
+            # Map of known EF class names to their likely representation in ChromaDB error messages
+            # (typically lowercase with underscores)
+            ef_class_to_error_name_map = {
+                "SentenceTransformerEmbeddingFunction": "sentence_transformer",
+                "ONNXMiniLM_L6_V2": "onnx_mini_lm_l6_v2",
+                "OpenAIEmbeddingFunction": "openai",  # Guessing pattern
+                "CohereEmbeddingFunction": "cohere",  # Guessing pattern
+                # Add others as encountered or confirmed
+            }
+
+            # Get the expected error string name for the client's current EF
+            client_ef_error_name_lower = ef_class_to_error_name_map.get(client_ef_name_str, client_ef_name_str.lower())
+
+            if "embedding function name mismatch" in error_str:
+                try:
+                    mismatch_details = str(e).split("Embedding function name mismatch: ")[1]
+                    parts = mismatch_details.split(" != ")
+                    if len(parts) == 2:
+                        part0_lower = parts[0].strip().lower()
+                        part1_lower = parts[1].strip().lower()
+
+                        # Check if the client's EF (in its error string form) matches one of the parts
+                        if client_ef_error_name_lower == part0_lower:
+                            collection_ef_name_str = parts[1].strip()  # The other part is the collection's EF
+                        elif client_ef_error_name_lower == part1_lower:
+                            collection_ef_name_str = parts[0].strip()  # The other part is the collection's EF
+                        else:
+                            # Client's EF error name didn't match either part directly.
+                            # This could happen if map is incomplete or error format is very unexpected.
+                            logger.debug(
+                                f"Client EF error name '{client_ef_error_name_lower}' (from class '{client_ef_name_str}') "
+                                f"did not match parts '{part0_lower}' or '{part1_lower}' from error: {str(e)}. "
+                                f"Falling back to OR display."
+                            )
+                            collection_ef_name_str = (
+                                f"{parts[0].strip()} OR {parts[1].strip()} (client used {client_ef_name_str})"
+                            )
+                    else:  # Mismatch string present, but " != " format not as expected
+                        logger.debug(
+                            f"EF mismatch error string '{str(e)}' did not contain ' != ' separator or produce 2 parts as expected."
+                        )
+                        collection_ef_name_str = "different from client's configuration (malformed error details)"
+
+                except (IndexError, ValueError) as parse_error:  # Errors from split() or list indexing
+                    logger.debug(
+                        f"Could not parse EF mismatch details from error string '{str(e)}': {parse_error}",
+                        exc_info=True,
+                    )
+                    collection_ef_name_str = "different from client's configuration (parsing failed)"
+            elif "an embedding function must be specified" in error_str:
+                logger.debug(
+                    f"EF mismatch: collection requires an EF, but client's attempt was problematic. Error: {str(e)}"
+                )
+                collection_ef_name_str = "required by collection (mismatch with client's attempt)"
+            else:  # ef_mismatch_error is True, but the specific known strings weren't matched
+                logger.debug(f"Unhandled ef_mismatch_error string: {str(e)}")
+                collection_ef_name_str = "different from client's configuration (unrecognized error format)"
+
+            env_ef_setting = os.getenv("CHROMA_EMBEDDING_FUNCTION", "default")
+            error_message = (
+                f"Failed to get collection '{collection_name}' for indexing. Mismatch: "
+                f"Client is configured to use an embedding function derived from '{env_ef_setting}' (resolves to {client_ef_name_str}), "
+                f"but the collection appears to use an EF like '{collection_ef_name_str}'. "
+                f"Ensure CHROMA_EMBEDDING_FUNCTION is consistent or re-index collection '{collection_name}' with the correct embedding function."
+            )
+            logger.error(error_message)
+            print(f"ERROR: {error_message}", file=sys.stderr)
+            return None  # Critical error, cannot proceed
+
+        # Preserved logic: Check if the error message indicates the collection doesn't exist
+        not_found = False
+        if (
+            f"collection {collection_name} does not exist" in error_str
+            or f"collection named {collection_name} does not exist" in error_str
+            # Chroma 1.x: NotFoundError "Collection [name] does not exists"
+            or isinstance(e, NotFoundError)
+        ):
+            not_found = True
+
+        if not_found:
+            logger.info(f"Collection '{collection_name}' not found, creating...")
+            try:
+                collection = client.create_collection(
+                    name=collection_name,
+                    embedding_function=embedding_func,
+                    get_or_create=False,
+                )
+                logger.info(f"Successfully created collection: {collection_name}")
+            except Exception as create_e:
+                logger.error(f"Failed to create collection '{collection_name}': {create_e}", exc_info=True)
+                return None
+        else:
+            logger.error(f"Error getting collection '{collection_name}': {e}", exc_info=True)
+            return None
+    except Exception as get_e:
+        logger.error(f"Unexpected error getting collection '{collection_name}': {get_e}", exc_info=True)
+        return None
+    return collection
+
+
+def _chunk_records(
+    content: str, file_path: Path, relative_path: str, commit_sha: str
+) -> Tuple[List[str], List[dict], List[str]]:
+    """Chunks a file's content; returns the chunk IDs, metadatas and documents to upsert."""
+    # Chunk the file content using semantic boundaries when possible
+    chunks_with_pos = chunk_file_content_semantic(content, file_path)
+    logger.debug(f"Split {file_path} into {len(chunks_with_pos)} chunks")
+    digest = content_hash(content)
+
+    ids_list = []
+    metadatas_list = []
+    documents_list = []
+    for chunk_index, (chunk_text, start_line, end_line) in enumerate(chunks_with_pos):
+        # Generate chunk_id: relative_path:commit_sha:chunk_index
+        chunk_id = f"{relative_path}:{commit_sha}:{chunk_index}"
+
+        chunk_metadata = {
+            "file_path": relative_path,
+            "commit_sha": commit_sha,
+            "chunk_index": chunk_index,
+            "start_line": start_line + 1,  # User-facing lines are 1-based
+            "end_line": end_line + 1,  # User-facing lines are 1-based
+            "filename": file_path.name,
+            "last_indexed_utc": time.time(),
+            "chunk_id": chunk_id,  # Also store chunk_id in metadata for easier retrieval if needed
+            "content_hash": digest,  # Lets `index --all` rebuild its manifest from the collection
+        }
+
+        ids_list.append(chunk_id)
+        metadatas_list.append(chunk_metadata)
+        documents_list.append(chunk_text)
+    return ids_list, metadatas_list, documents_list
+
+
 def index_file(
     file_path: Path,
     repo_root: Path,
@@ -299,162 +462,18 @@ def index_file(
 
         relative_path = str(file_path.relative_to(repo_root))
 
-        # Get or create the collection (only need to do this once per file)
-        try:
-            # Explicitly pass embedding_function to trigger early mismatch error
-            collection = client.get_collection(name=collection_name, embedding_function=embedding_func)
-            logger.debug(f"Using existing collection: {collection_name} with configured embedding function.")
-        except ValueError as e:
-            error_str = str(e).lower()
-            # Check for specific ChromaDB error messages related to EF mismatch
-            ef_mismatch_error = (
-                "embedding function name mismatch" in error_str
-                or "an embedding function must be specified" in error_str
-            )  # if collection expects EF but none/wrong one given
-
-            if ef_mismatch_error:
-                client_ef_name_str = type(embedding_func).__name__ if embedding_func else "None"
-                collection_ef_name_str = "unknown (from collection)"  # Default if parsing fails
-
-                # Map of known EF class names to their likely representation in ChromaDB error messages
-                # (typically lowercase with underscores)
-                ef_class_to_error_name_map = {
-                    "SentenceTransformerEmbeddingFunction": "sentence_transformer",
-                    "ONNXMiniLM_L6_V2": "onnx_mini_lm_l6_v2",
-                    "OpenAIEmbeddingFunction": "openai",  # Guessing pattern
-                    "CohereEmbeddingFunction": "cohere",  # Guessing pattern
-                    # Add others as encountered or confirmed
-                }
-
-                # Get the expected error string name for the client's current EF
-                client_ef_error_name_lower = ef_class_to_error_name_map.get(
-                    client_ef_name_str, client_ef_name_str.lower()
-                )
-
-                if "embedding function name mismatch" in error_str:
-                    try:
-                        mismatch_details = str(e).split("Embedding function name mismatch: ")[1]
-                        parts = mismatch_details.split(" != ")
-                        if len(parts) == 2:
-                            part0_lower = parts[0].strip().lower()
-                            part1_lower = parts[1].strip().lower()
-
-                            # Check if the client's EF (in its error string form) matches one of the parts
-                            if client_ef_error_name_lower == part0_lower:
-                                collection_ef_name_str = parts[1].strip()  # The other part is the collection's EF
-                            elif client_ef_error_name_lower == part1_lower:
-                                collection_ef_name_str = parts[0].strip()  # The other part is the collection's EF
-                            else:
-                                # Client's EF error name didn't match either part directly.
-                                # This could happen if map is incomplete or error format is very unexpected.
-                                logger.debug(
-                                    f"Client EF error name '{client_ef_error_name_lower}' (from class '{client_ef_name_str}') "
-                                    f"did not match parts '{part0_lower}' or '{part1_lower}' from error: {str(e)}. "
-                                    f"Falling back to OR display."
-                                )
-                                collection_ef_name_str = (
-                                    f"{parts[0].strip()} OR {parts[1].strip()} (client used {client_ef_name_str})"
-                                )
-                        else:  # Mismatch string present, but " != " format not as expected
-                            logger.debug(
-                                f"EF mismatch error string '{str(e)}' did not contain ' != ' separator or produce 2 parts as expected."
-                            )
-                            collection_ef_name_str = "different from client's configuration (malformed error details)"
-
-                    except (IndexError, ValueError) as parse_error:  # Errors from split() or list indexing
-                        logger.debug(
-                            f"Could not parse EF mismatch details from error string '{str(e)}': {parse_error}",
-                            exc_info=True,
-                        )
-                        collection_ef_name_str = "different from client's configuration (parsing failed)"
-                elif "an embedding function must be specified" in error_str:
-                    logger.debug(
-                        f"EF mismatch: collection requires an EF, but client's attempt was problematic. Error: {str(e)}"
-                    )
-                    collection_ef_name_str = "required by collection (mismatch with client's attempt)"
-                else:  # ef_mismatch_error is True, but the specific known strings weren't matched
-                    logger.debug(f"Unhandled ef_mismatch_error string: {str(e)}")
-                    collection_ef_name_str = "different from client's configuration (unrecognized error format)"
-
-                env_ef_setting = os.getenv("CHROMA_EMBEDDING_FUNCTION", "default")
-                error_message = (
-                    f"Failed to get collection '{collection_name}' for indexing. Mismatch: "
-                    f"Client is configured to use an embedding function derived from '{env_ef_setting}' (resolves to {client_ef_name_str}), "
-                    f"but the collection appears to use an EF like '{collection_ef_name_str}'. "
-                    f"Ensure CHROMA_EMBEDDING_FUNCTION is consistent or re-index collection '{collection_name}' with the correct embedding function."
-                )
-                logger.error(error_message)
-                print(f"ERROR: {error_message}", file=sys.stderr)
-                return False  # Critical error, cannot proceed
-
-            # Preserved logic: Check if the error message indicates the collection doesn't exist
-            not_found = False
-            if (
-                f"collection {collection_name} does not exist" in error_str
-                or f"collection named {collection_name} does not exist" in error_str
-            ):
-                not_found = True
-
-            if not_found:
-                logger.info(f"Collection '{collection_name}' not found, creating...")
-                try:
-                    collection = client.create_collection(
-                        name=collection_name,
-                        embedding_function=embedding_func,
-                        get_or_create=False,
-                    )
-                    logger.info(f"Successfully created collection: {collection_name}")
-                except Exception as create_e:
-                    logger.error(f"Failed to create collection '{collection_name}': {create_e}", exc_info=True)
-                    return False
-            else:
-                logger.error(f"Error getting collection '{collection_name}': {e}", exc_info=True)
-                return False
-        except Exception as get_e:
-            logger.error(f"Unexpected error getting collection '{collection_name}': {get_e}", exc_info=True)
-            return False
-
-        # Now chunk the file content using semantic boundaries when possible
-        chunks_with_pos = chunk_file_content_semantic(content, file_path)
-        if not chunks_with_pos:
-            logger.info(f"No meaningful chunks extracted from {file_path}")
+        collection = _get_index_collection(client, embedding_func, collection_name)
+        if collection is None:
             return False
 
-        # Log info about chunking
-        logger.debug(f"Split {file_path} into {len(chunks_with_pos)} chunks")
-
-        ids_list = []
-        metadatas_list = []
-        documents_list = []
-        chunk_count = 0
-
-        for chunk_index, (chunk_text, start_line, end_line) in enumerate(chunks_with_pos):
-            # Generate chunk_id: relative_path:commit_sha:chunk_index
-            chunk_id = f"{relative_path}:{commit_sha}:{chunk_index}"
-
-            chunk_metadata = {
-                "file_path": relative_path,
-                "commit_sha": commit_sha,
-                "chunk_index": chunk_index,
-                "start_line": start_line + 1,  # User-facing lines are 1-based
-                "end_line": end_line + 1,  # User-facing lines are 1-based
-                "filename": file_path.name,
-                "last_indexed_utc": time.time(),
-                "chunk_id": chunk_id,  # Also store chunk_id in metadata for easier retrieval if needed
-            }
-
-            ids_list.append(chunk_id)
-            metadatas_list.append(chunk_metadata)
-            documents_list.append(chunk_text)
-            chunk_count += 1
-
+        ids_list, metadatas_list, documents_list = _chunk_records(content, file_path, relative_path, commit_sha)
         if not ids_list:
-            logger.warning(f"No chunks generated to index for {relative_path} at commit {commit_sha}")
+            logger.info(f"No meaningful chunks extracted from {file_path}")
             return False
 
         # Upsert all chunks for this file at once
         collection.upsert(ids=ids_list, metadatas=metadatas_list, documents=documents_list)
-        logger.info(f"Indexed {chunk_count} chunks for: {relative_path} at commit {commit_sha[:7]}")
+        logger.info(f"Indexed {len(ids_list)} chunks for: {relative_path} at commit {commit_sha[:7]}")
         return True
 
     except Exception as e:
@@ -462,53 +481,154 @@ def index_file(
         return False
 
 
+@dataclass
+class IndexResult:
+    """File counts of an `index_git_files` run."""
+
+    added: int = 0
+    updated: int = 0
+    deleted: int = 0
+    skipped: int = 0  # Unchanged since the last run
+    failed: int = 0
+    seconds: float = 0.0
+
+
+def _tracked_files(repo_root: Path) -> List[str]:
+    """Paths, relative to the repository root, of the files tracked by git."""
+    # Use 'git ls-files -z' for safer handling of filenames with spaces/special chars
+    cmd = ["git", "-C", str(repo_root), "ls-files", "-z"]
+    result = subprocess.run(cmd, capture_output=True, check=True, encoding="utf-8")
+    # Split by null character
+    return [f for f in result.stdout.strip("\0").split("\0") if f]
+
+
+def _delete_file_chunks(collection, relative_paths: List[str], batch_size: int) -> None:
+    """Deletes every chunk of the given files, whichever commit it was indexed at."""
+    for i in range(0, len(relative_paths), batch_size):
+        collection.delete(where={"file_path": {"$in": relative_paths[i : i + batch_size]}})
+
+
 def index_git_files(
     repo_root: Path,
     collection_name: str = DEFAULT_COLLECTION_NAME,
     supported_suffixes: Set[str] = DEFAULT_SUPPORTED_SUFFIXES,
-) -> int:
-    """Indexes all files tracked by Git within the repository root.
+    delete_batch_size: int = DEFAULT_DELETE_BATCH_SIZE,
+) -> IndexResult:
+    """Brings the collection in line with the files tracked by Git within the repository root.
+
+    Only files whose content changed since the last run (per the manifest, see
+    `index_manifest.py`) are re-chunked and embedded. Chunks of changed files and of
+    files that are no longer tracked (or no longer indexable) are deleted, in batches
+    of `delete_batch_size` files. Files that cannot be read or chunked keep their
+    previous chunks and are retried on the next run. The collection is treated as the
+    index of this repository only.
 
     Args:
         repo_root: Absolute path to the repository root.
         collection_name: Name of the ChromaDB collection.
         supported_suffixes: Set of file extensions to index.
+        delete_batch_size: Number of files whose chunks are deleted per call.
 
     Returns:
-        The number of files successfully indexed.
+        Counts of added, updated, deleted, unchanged and failed files.
     """
+    start = time.monotonic()
+    result = IndexResult()
     logger.info(f"Indexing all tracked git files in {repo_root}...")
-    indexed_count = 0
     try:
-        # Use 'git ls-files -z' for safer handling of filenames with spaces/special chars
-        cmd = ["git", "-C", str(repo_root), "ls-files", "-z"]
-        result = subprocess.run(cmd, capture_output=True, check=True, encoding="utf-8")
-
-        # Split by null character
-        files_to_index = [repo_root / f for f in result.stdout.strip("\0").split("\0") if f]
-        logger.info(f"Found {len(files_to_index)} files tracked by git.")
-
-        # Consider getting the collection once before the loop for efficiency
-        # client, _ = get_client_and_ef()
-        # collection = client.get_or_create_collection(name=collection_name, ...)
+        tracked = _tracked_files(repo_root)
+        logger.info(f"Found {len(tracked)} files tracked by git.")
+        if not tracked:
+            return result
+
+        commit_sha = get_current_commit_sha(repo_root)
+        if not commit_sha:
+            logger.error(f"Could not determine commit SHA for {repo_root}. Skipping indexing.")
+            return result
+
+        client, embedding_func = get_client_and_ef()
+        collection = _get_index_collection(client, embedding_func, collection_name)
+        if collection is None:
+            return result
+        collection_id = str(collection.id)
+
+        path = manifest_path(repo_root, collection_name)
+        manifest = load_manifest(path, collection_id)
+        if manifest is None:
+            manifest = manifest_from_collection(collection)
+            logger.info(f"Rebuilt index manifest for {len(manifest)} files from collection '{collection_name}'.")
+
+        indexed: Dict[str, dict] = {}
+        changed: List[Tuple[str, str, Tuple[List[str], List[dict], List[str]]]] = []
+        for relative_path in tracked:
+            file_path = repo_root / relative_path
+            if file_path.suffix.lower() not in supported_suffixes or not file_path.is_file():
+                continue
+            entry = manifest.get(relative_path)
+            try:
+                content = file_path.read_text(encoding="utf-8", errors="ignore")
+                if not content.strip():
+                    continue
+                digest = content_hash(content)
+                if entry is not None and entry.get("hash") == digest:
+                    indexed[relative_path] = entry
+                    result.skipped += 1
+                    continue
+                # Chunked before any deletes, so a file that cannot be re-chunked keeps its old chunks
+                records = _chunk_records(content, file_path, relative_path, commit_sha)
+            except Exception as e:
+                logger.error(f"Error reading or chunking {file_path}: {e}")
+                records = None
+            if records is None or not records[0]:
+                if records is not None:
+                    logger.warning(f"No chunks produced for {file_path}; keeping its previous chunks.")
+                result.failed += 1
+                if entry is not None:
+                    indexed[relative_path] = entry
+                continue
+            changed.append((relative_path, digest, records))
 
-        for file_path in files_to_index:
-            if index_file(file_path, repo_root, collection_name, supported_suffixes):
-                indexed_count += 1
+        # Chunks of changed files are replaced rather than overwritten, as their IDs carry the
+        # commit they were indexed at (and `index` on single files may have added others)
+        changed_paths = {relative_path for relative_path, _, _ in changed}
+        removed = [relative_path for relative_path in manifest if relative_path not in indexed]
+        _delete_file_chunks(collection, sorted(changed_paths.union(removed)), delete_batch_size)
+        result.deleted = sum(1 for relative_path in removed if relative_path not in changed_paths)
 
-        logger.info(f"Successfully indexed {indexed_count} out of {len(files_to_index)} tracked files.")
-        return indexed_count
+        for relative_path, digest, (ids_list, metadatas_list, documents_list) in changed:
+            try:
+                collection.upsert(ids=ids_list, metadatas=metadatas_list, documents=documents_list)
+            except Exception as e:
+                logger.error(f"Error indexing {relative_path}: {e}", exc_info=True)
+                result.failed += 1
+                continue
+            indexed[relative_path] = {"hash": digest, "commit": commit_sha, "chunks": len(ids_list)}
+            if relative_path in manifest:
+                result.updated += 1
+            else:
+                result.added += 1
+            logger.debug(f"Indexed {len(ids_list)} chunks for: {relative_path} at commit {commit_sha[:7]}")
+
+        # Files that failed keep their previous entry (or none), so the next run retries them
+        save_manifest(path, collection_name, collection_id, indexed)
+        logger.info(
+            f"Indexed {len(tracked)} tracked files: {result.added} added, {result.updated} updated, "
+            f"{result.deleted} deleted, {result.skipped} unchanged, {result.failed} failed."
+        )
+        return result
 
     except FileNotFoundError:
         logger.error(f"'git' command not found. Ensure Git is installed and in PATH.")
-        return 0
+        return result
     except subprocess.CalledProcessError as e:
         logger.error(f"Error running 'git ls-files' in {repo_root}: {e}")
         logger.error(f"Git stderr: {e.stderr}")
-        return 0
+        return result
     except Exception as e:
         logger.error(f"An unexpected error occurred during git file indexing: {e}", exc_info=True)
-        return 0
+        return result
+    finally:
+        result.seconds = time.monotonic() - start
 
 
 def index_paths(
@@ -11,6 +11,8 @@ import chromadb
 from typing import Optional, Dict, Any, List, Union
 import json
 
+from chroma_mcp.utils.metadata_patch import patch_metadata
+
 logger = logging.getLogger(__name__)
 
 
@@ -218,19 +220,15 @@ def promote_to_learnings_collection(
         if source_chat_id:
             try:
                 chat_collection = client.get_collection(name=chat_history_collection_name)
-                result = chat_collection.get(ids=[source_chat_id], include=["metadatas"])
-
-                if result and result["metadatas"] and len(result["metadatas"]) > 0:
-                    chat_metadata = result["metadatas"][0]
-                    chat_metadata["status"] = "promoted"
-                    chat_metadata["derived_learning_id"] = learning_id
+                patch_result = patch_metadata(
+                    chat_collection,
+                    patches={source_chat_id: {"status": "promoted", "derived_learning_id": learning_id}},
+                )
 
-                    # Update the metadata
-                    chat_collection.update(ids=[source_chat_id], metadatas=[chat_metadata])
-
-                    logger.info(f"Updated source chat entry {source_chat_id} status to 'promoted'")
-                else:
+                if patch_result.missing_ids:
                     logger.warning(f"Source chat entry {source_chat_id} not found")
+                else:
+                    logger.info(f"Updated source chat entry {source_chat_id} status to 'promoted'")
             except Exception as e:
                 logger.warning(f"Failed to update source chat entry status: {e}")
 
@@ -300,7 +300,11 @@ def create_runtime_error_evidence(
 
 
 def store_runtime_error(
-    error: RuntimeErrorEvidence, collection_name: str = "validation_evidence_v1", chroma_client=None
+    error: RuntimeErrorEvidence,
+    collection_name: str = "validation_evidence_v1",
+    chroma_client=None,
+    dedup: Optional[bool] = None,
+    dedup_max_distance: Optional[float] = None,
 ) -> str:
     """
     Store a single runtime error in ChromaDB.
@@ -309,9 +313,13 @@ def store_runtime_error(
         error: The RuntimeErrorEvidence object to store
         collection_name: Name of the ChromaDB collection
         chroma_client: Optional ChromaDB client instance
+        dedup: Skip the insert if the same or a near-identical error is already stored
+            (defaults to the CHROMA_DEDUP_ON_ADD environment variable)
+        dedup_max_distance: Near duplicates must also be within this vector distance
+            (defaults to the CHROMA_DEDUP_MAX_DISTANCE environment variable; unset skips the check)
 
     Returns:
-        ID of the stored error
+        ID of the stored error, or of the existing entry it duplicates
     """
     # Import here to avoid circular imports
     try:
@@ -346,6 +354,19 @@ def store_runtime_error(
         "affected_files": list(error.code_changes.keys()) if error.code_changes else [],
     }
 
+    if dedup is None:
+        dedup = os.getenv("CHROMA_DEDUP_ON_ADD", "false").lower() in ("true", "yes", "1", "t", "y")
+    if dedup:
+        from chroma_mcp.utils.dedup import dedup_metadata, find_duplicate, max_distance_from_env, record_duplicate
+
+        if dedup_max_distance is None:
+            dedup_max_distance = max_distance_from_env()
+        duplicate = find_duplicate(collection, document, max_distance=dedup_max_distance)
+        if duplicate is not None:
+            record_duplicate(collection, duplicate, duplicate_id=error_id)
+            return duplicate.id
+        metadata.update(dedup_metadata(document))
+
     # Store in collection
     collection.add(documents=[document], metadatas=[metadata], ids=[error_id])
 
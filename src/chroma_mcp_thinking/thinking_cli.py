@@ -11,18 +11,29 @@ import uuid
 from typing import List, Optional, Dict, Any
 import os
 import asyncio  # Needed for eventual async implementation
-from datetime import timedelta
+from datetime import datetime, timedelta
 import logging  # Add logging import
+import subprocess
+import time
+from contextlib import asynccontextmanager
 
 from mcp import ClientSession, StdioServerParameters
 from mcp import types as mcp_types
 from mcp.client.stdio import stdio_client
 
+from chroma_mcp.utils.socket_transport import (
+    default_socket_path,
+    socket_is_live,
+    unix_socket_client,
+    unix_sockets_supported,
+)
 from chroma_mcp_thinking.thinking_session import ThinkingSession
+from chroma_mcp_thinking.transfer import DEFAULT_TRANSFER_BATCH_SIZE, export_thinking, import_thinking
 from chroma_mcp_thinking.utils import (
     record_thought_chain,
     create_thought_branch,
     find_thoughts_across_sessions,
+    thought_batch,
 )
 
 # Configure logging
@@ -74,10 +85,79 @@ def _get_server_params() -> StdioServerParameters:
     )
 
 
+# Seconds to wait for a newly started daemon (it loads the embedding model before listening)
+DAEMON_START_TIMEOUT = 60.0
+DEFAULT_DAEMON_IDLE_TIMEOUT = 600.0
+
+
+def _daemon_socket_path(server_params: StdioServerParameters) -> str:
+    # PATH does not change which server would be started
+    return default_socket_path({k: v for k, v in (server_params.env or {}).items() if k != "PATH"})
+
+
+def _start_daemon(server_params: StdioServerParameters, socket_path: str, idle_timeout: float) -> None:
+    """Starts a detached socket-mode server that outlives this command."""
+    subprocess.Popen(
+        [
+            server_params.command,
+            "-m",
+            "chroma_mcp.cli",
+            "--mode",
+            "socket",
+            "--socket-path",
+            socket_path,
+            "--idle-timeout",
+            str(idle_timeout),
+        ],
+        env=server_params.env,
+        cwd=server_params.cwd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+async def _connect_daemon(server_params: StdioServerParameters, idle_timeout: float) -> Optional[str]:
+    """Returns the socket of a running daemon, starting one if needed; None if it did not come up."""
+    socket_path = _daemon_socket_path(server_params)
+    if await socket_is_live(socket_path):
+        return socket_path
+    logger.info(f"Starting thinking daemon on {socket_path}")
+    _start_daemon(server_params, socket_path, idle_timeout)
+    deadline = time.monotonic() + DAEMON_START_TIMEOUT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+        if await socket_is_live(socket_path):
+            return socket_path
+    logger.warning(f"Thinking daemon did not start within {DAEMON_START_TIMEOUT:g}s, using a one-off server")
+    return None
+
+
+@asynccontextmanager
+async def _server_streams(args: argparse.Namespace):
+    """MCP streams to a server: the shared daemon when enabled, else a one-off stdio server.
+
+    The daemon serves later commands without re-importing and re-loading the embedding
+    model; it exits after `--daemon-idle-timeout` seconds without connections.
+    """
+    server_params = _get_server_params()
+    socket_path = None
+    if getattr(args, "daemon", False) and unix_sockets_supported():
+        socket_path = await _connect_daemon(
+            server_params, getattr(args, "daemon_idle_timeout", DEFAULT_DAEMON_IDLE_TIMEOUT)
+        )
+    if socket_path:
+        async with unix_socket_client(socket_path) as streams:
+            yield streams
+    else:
+        async with stdio_client(server_params) as streams:
+            yield streams
+
+
 async def cmd_record_async(args: argparse.Namespace) -> None:
     """Record a thought or chain of thoughts (Async Version)."""
-    server_params = _get_server_params()
-    async with stdio_client(server_params) as (read_stream, write_stream):
+    async with _server_streams(args) as (read_stream, write_stream):
         async with ClientSession(read_stream, write_stream) as client:
             try:
                 await client.initialize()
@@ -161,22 +241,13 @@ async def cmd_record_async(args: argparse.Namespace) -> None:
                     session_id_to_use = session_id_to_use or "unknown"
 
             else:
-                # Record a chain of thoughts
+                # Record a chain of thoughts in one batch
                 if not session_id_to_use:
                     session_id_to_use = str(uuid.uuid4())
-                total_thoughts_chain = len(thoughts)
-                for i, thought_text in enumerate(thoughts):
-                    # Use call_tool with CORRECT name
-                    chain_args = {
-                        "thought": thought_text,
-                        "thought_number": i + 1,
-                        "total_thoughts": total_thoughts_chain,
-                        "session_id": session_id_to_use,
-                    }
-                    result = await client.call_tool(
-                        name="chroma_sequential_thinking",
-                        arguments=chain_args,
-                    )
+                result = await client.call_tool(
+                    name="chroma_record_thoughts",
+                    arguments={"thoughts": thought_batch(thoughts), "session_id": session_id_to_use},
+                )
 
             # Use the final session_id determined
             recorded_session_id = session_id_to_use
@@ -203,9 +274,8 @@ def cmd_record(args: argparse.Namespace) -> None:
 
 async def cmd_branch_async(args: argparse.Namespace) -> None:
     """Create a thought branch from an existing session (Async Version)."""
-    server_params = _get_server_params()
     try:
-        async with stdio_client(server_params) as (read_stream, write_stream):
+        async with _server_streams(args) as (read_stream, write_stream):
             async with ClientSession(read_stream, write_stream) as client:
                 try:
                     await client.initialize()
@@ -232,21 +302,15 @@ async def cmd_branch_async(args: argparse.Namespace) -> None:
                 # Generate branch ID if not provided
                 branch_id = args.branch_id or str(uuid.uuid4())[:8]
 
-                # Use direct client calls in a loop
-                total_branch_thoughts = len(branch_thoughts)
-                for i, thought_text in enumerate(branch_thoughts):
-                    # Use call_tool with CORRECT name
-                    await client.call_tool(
-                        name="chroma_sequential_thinking",
-                        arguments={
-                            "thought": thought_text,
-                            "thought_number": i + 1,
-                            "total_thoughts": total_branch_thoughts,
-                            "session_id": args.parent_session_id,
-                            "branch_id": branch_id,
-                            "branch_from_thought": args.parent_thought_number if i == 0 else 0,
-                        },
-                    )
+                await client.call_tool(
+                    name="chroma_record_thoughts",
+                    arguments={
+                        "thoughts": thought_batch(
+                            branch_thoughts, branch_id=branch_id, branch_from_thought=args.parent_thought_number
+                        ),
+                        "session_id": args.parent_session_id,
+                    },
+                )
 
                 print(
                     f"Created branch '{branch_id}' from session {args.parent_session_id} thought #{args.parent_thought_number}"
@@ -272,9 +336,8 @@ def cmd_branch(args: argparse.Namespace) -> None:
 
 async def cmd_search_async(args: argparse.Namespace) -> None:
     """Search for thoughts similar to a query (Async Version)."""
-    server_params = _get_server_params()
     try:
-        async with stdio_client(server_params) as (read_stream, write_stream):
+        async with _server_streams(args) as (read_stream, write_stream):
             async with ClientSession(read_stream, write_stream) as client:
                 try:
                     await client.initialize()
@@ -336,9 +399,8 @@ def cmd_search(args: argparse.Namespace) -> None:
 
 async def cmd_summary_async(args: argparse.Namespace) -> None:
     """Get a summary of a thinking session (Async Version)."""
-    server_params = _get_server_params()
     try:
-        async with stdio_client(server_params) as (read_stream, write_stream):
+        async with _server_streams(args) as (read_stream, write_stream):
             async with ClientSession(read_stream, write_stream) as client:
                 try:
                     await client.initialize()
@@ -418,8 +480,78 @@ def cmd_summary(args: argparse.Namespace) -> None:
         sys.exit(1)
 
 
+def _parse_since(value: str) -> int:
+    """Unix timestamp from an integer or an ISO 8601 date/datetime (local time if no offset)."""
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return int(datetime.fromisoformat(value).timestamp())
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a Unix timestamp or ISO 8601 date, got '{value}'")
+
+
+def _direct_connection():
+    """Chroma client, embedding function and its name, configured like `chroma-mcp-client`."""
+    from chroma_mcp_client.connection import get_client_and_ef
+
+    client, ef = get_client_and_ef()
+    return client, ef, os.getenv("CHROMA_EMBEDDING_FUNCTION", "default")
+
+
+def cmd_export(args: argparse.Namespace) -> None:
+    """Writes thoughts and session vectors, with embeddings, to a file (no MCP server involved)."""
+    try:
+        client, _, ef_name = _direct_connection()
+        result = export_thinking(
+            client,
+            args.output,
+            session_ids=args.session or (),
+            since=args.since,
+            embedding_function_name=ef_name,
+            batch_size=args.batch_size,
+        )
+    except Exception as e:
+        print(f"Error in cmd_export: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(
+        f"Exported {result.thoughts} thoughts and {result.sessions} sessions to {args.output} ({result.seconds:.1f}s)."
+    )
+
+
+def cmd_import(args: argparse.Namespace) -> None:
+    """Adds the thoughts and session vectors of an export file without re-embedding them."""
+    try:
+        client, ef, ef_name = _direct_connection()
+        result = import_thinking(
+            client, args.input, embedding_function=ef, embedding_function_name=ef_name, batch_size=args.batch_size
+        )
+    except Exception as e:
+        print(f"Error in cmd_import: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(
+        f"Imported {result.thoughts_added} thoughts ({result.thoughts_skipped} already present) into "
+        f"{len(result.session_ids)} sessions; {result.sessions_added} session entries added, "
+        f"{result.sessions_updated} updated ({result.seconds:.1f}s)."
+    )
+
+
 def main():
     parser = argparse.ArgumentParser(description="Chroma MCP Thinking Tools CLI")
+    parser.add_argument(
+        "--no-daemon",
+        dest="daemon",
+        action="store_false",
+        default=os.getenv("CHROMA_THINKING_DAEMON", "true").lower() in ("true", "1", "yes"),
+        help="Start a one-off stdio server instead of reusing the background server (or set CHROMA_THINKING_DAEMON=false).",
+    )
+    parser.add_argument(
+        "--daemon-idle-timeout",
+        type=float,
+        default=float(os.getenv("CHROMA_THINKING_DAEMON_IDLE_TIMEOUT", str(DEFAULT_DAEMON_IDLE_TIMEOUT))),
+        help="Seconds the background server stays up without connections (default: 600).",
+    )
     subparsers = parser.add_subparsers(dest="command", required=True)
 
     # --- Record Command ---
@@ -474,6 +606,32 @@ def main():
     )
     parser_summary.set_defaults(func=cmd_summary)
 
+    # --- Export Command ---
+    parser_export = subparsers.add_parser(
+        "export", help="Export thoughts and session vectors, with their embeddings, to a file."
+    )
+    parser_export.add_argument("output", help="Output file (JSON Lines; gzip-compressed if it ends in .gz).")
+    parser_export.add_argument(
+        "--session", action="append", help="Only export this session (repeat for several; default: all)."
+    )
+    parser_export.add_argument(
+        "--since", type=_parse_since, help="Only thoughts recorded at or after this Unix timestamp or ISO date."
+    )
+    parser_export.add_argument(
+        "--batch-size", type=int, default=DEFAULT_TRANSFER_BATCH_SIZE, help="Records read per batch (default: 500)."
+    )
+    parser_export.set_defaults(func=cmd_export)
+
+    # --- Import Command ---
+    parser_import = subparsers.add_parser(
+        "import", help="Import an export file without re-embedding; thoughts that already exist are skipped."
+    )
+    parser_import.add_argument("input", help="File written by the export command.")
+    parser_import.add_argument(
+        "--batch-size", type=int, default=DEFAULT_TRANSFER_BATCH_SIZE, help="Records written per batch (default: 500)."
+    )
+    parser_import.set_defaults(func=cmd_import)
+
     # Parse arguments
     args = parser.parse_args()
 
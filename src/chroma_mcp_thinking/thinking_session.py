@@ -74,6 +74,24 @@ class ThinkingSession:
 
         return response
 
+    def record_thoughts(self, thoughts: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Record an ordered batch of thoughts in one call.
+
+        Args:
+            thoughts: Thought entries as accepted by `chroma_record_thoughts` (`thought`, `thought_number`
+                      and optionally `total_thoughts`, `branch_id`, `branch_from_thought`, `next_thought_needed`)
+
+        Returns:
+            Response from MCP server including the session ID and the recorded thought IDs
+        """
+        response = self.client.mcp_chroma_dev_chroma_record_thoughts(session_id=self.session_id, thoughts=thoughts)
+
+        if not self.session_id and "session_id" in response:
+            self.session_id = response["session_id"]
+
+        return response
+
     def find_similar_thoughts(
         self, query: str, n_results: int = 5, threshold: float = -1.0, include_branches: bool = True
     ) -> List[Dict[str, Any]]:
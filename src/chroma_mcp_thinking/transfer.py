@@ -0,0 +1,306 @@
+"""
+Bulk export and import of thinking sessions, with their embeddings.
+
+Moving thinking history between machines used to mean re-recording every
+thought through `chroma_sequential_thinking`, which embeds each one again.
+`export_thinking` instead streams thoughts from `sequential_thoughts_v1` and the
+matching session vectors from `thinking_sessions` into a JSON Lines file
+(gzip-compressed when the name ends in `.gz`); `import_thinking` writes them back
+in batches with the stored vectors, so nothing is embedded.
+
+File layout: a header line, then one line per thought, then one line per
+session. Embeddings are base64-encoded little-endian float32:
+
+    {"format": "chroma-mcp-thinking-export", "version": 1, "embedding_function": "default", ...}
+    {"type": "thought", "id": "...", "document": "...", "metadata": {...}, "embedding": "..."}
+    {"type": "session", "id": "...", "document": "...", "metadata": {...}, "embedding": "..."}
+
+Imports skip thoughts whose ID already exists, so importing the same file twice
+(or several developers' files with overlapping sessions) does not duplicate
+anything. Session entries are written for the thoughts actually imported: an
+existing entry gets the new thought count and is marked dirty, like the server's
+write path does, and a new entry keeps the exported vector only if all of the
+session's thoughts came with it.
+
+Writers should not record thoughts into the sessions being imported at the same
+time; the server notices the writes through the collection version and reloads
+its caches.
+"""
+
+import base64
+import gzip
+import io
+import json
+import time
+from dataclasses import dataclass, field
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from chroma_mcp.tools.thinking_tools import SESSIONS_COLLECTION, THOUGHTS_COLLECTION
+from chroma_mcp.utils.branch_tree import BRANCH_TREE_FIELD
+from chroma_mcp.utils.session_embeddings import DIRTY_FIELD, MEAN_NORM_FIELD, THOUGHT_COUNT_FIELD
+
+EXPORT_FORMAT = "chroma-mcp-thinking-export"
+EXPORT_VERSION = 1
+DEFAULT_TRANSFER_BATCH_SIZE = 500
+
+
+@dataclass
+class ExportResult:
+    thoughts: int = 0
+    sessions: int = 0
+    seconds: float = 0.0
+
+
+@dataclass
+class ImportResult:
+    thoughts_added: int = 0
+    thoughts_skipped: int = 0
+    sessions_added: int = 0
+    sessions_updated: int = 0
+    seconds: float = 0.0
+    session_ids: List[str] = field(default_factory=list)
+
+
+def _open(path: str, mode: str) -> IO[str]:
+    if path.endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(path, mode + "b"), encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def encode_embedding(embedding: Any) -> str:
+    return base64.b64encode(np.asarray(embedding, dtype="<f4").tobytes()).decode("ascii")
+
+
+def decode_embedding(value: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(value), dtype="<f4")
+
+
+def export_where(session_ids: Sequence[str] = (), since: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """`where` filter selecting the thoughts of `session_ids` recorded at or after `since`."""
+    clauses: List[Dict[str, Any]] = []
+    if session_ids:
+        clauses.append({"session_id": {"$in": list(session_ids)}})
+    if since is not None:
+        clauses.append({"timestamp": {"$gte": since}})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def _records(record_type: str, batch: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    ids = batch.get("ids") or []
+    documents = batch.get("documents") or [None] * len(ids)
+    metadatas = batch.get("metadatas") or [None] * len(ids)
+    # Embeddings come back as a numpy array, so test for None rather than truthiness
+    embeddings = batch.get("embeddings")
+    for i, record_id in enumerate(ids):
+        yield {
+            "type": record_type,
+            "id": record_id,
+            "document": documents[i],
+            "metadata": metadatas[i] or {},
+            "embedding": encode_embedding(embeddings[i]) if embeddings is not None else None,
+        }
+
+
+def export_thinking(
+    client,
+    path: str,
+    session_ids: Sequence[str] = (),
+    since: Optional[int] = None,
+    embedding_function_name: str = "default",
+    batch_size: int = DEFAULT_TRANSFER_BATCH_SIZE,
+) -> ExportResult:
+    """Streams the selected thoughts, then their sessions' entries, to `path`.
+
+    Args:
+        client: Chroma client holding the thinking collections.
+        path: Output file; compressed with gzip if it ends in `.gz`.
+        session_ids: Only these sessions (all if empty).
+        since: Only thoughts recorded at or after this Unix timestamp.
+        embedding_function_name: Recorded in the header and checked on import.
+        batch_size: Records read per `get`.
+    """
+    start = time.monotonic()
+    result = ExportResult()
+    thoughts = client.get_collection(THOUGHTS_COLLECTION)
+    where = export_where(session_ids, since)
+    exported_sessions: Dict[str, None] = {}
+    with _open(path, "w") as out:
+        header = {
+            "format": EXPORT_FORMAT,
+            "version": EXPORT_VERSION,
+            "embedding_function": embedding_function_name,
+            "exported_at": int(time.time()),
+        }
+        out.write(json.dumps(header) + "\n")
+        offset = 0
+        while True:
+            batch = thoughts.get(
+                where=where, include=["documents", "metadatas", "embeddings"], limit=batch_size, offset=offset
+            )
+            for record in _records("thought", batch):
+                out.write(json.dumps(record, separators=(",", ":")) + "\n")
+                exported_sessions.setdefault(record["metadata"].get("session_id"), None)
+                result.thoughts += 1
+            count = len(batch.get("ids") or [])
+            if count < batch_size:
+                break
+            offset += count
+
+        exported_sessions.pop(None, None)
+        session_list = list(exported_sessions)
+        try:
+            sessions = client.get_collection(SESSIONS_COLLECTION)
+        except Exception:
+            sessions = None  # No session vectors recorded yet
+        for i in range(0, len(session_list) if sessions is not None else 0, batch_size):
+            batch = sessions.get(ids=session_list[i : i + batch_size], include=["documents", "metadatas", "embeddings"])
+            for record in _records("session", batch):
+                out.write(json.dumps(record, separators=(",", ":")) + "\n")
+                result.sessions += 1
+    result.seconds = time.monotonic() - start
+    return result
+
+
+def read_export(path: str) -> Iterator[Dict[str, Any]]:
+    """Yields the header, then the records, of an export file."""
+    with _open(path, "r") as source:
+        for line_number, line in enumerate(source, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if line_number == 1 and (record.get("format") != EXPORT_FORMAT or record.get("version") != EXPORT_VERSION):
+                raise ValueError(f"{path} is not a thinking export (version {EXPORT_VERSION})")
+            yield record
+
+
+def _add_new_thoughts(collection, records: List[Dict[str, Any]], result: ImportResult, counts: Dict[str, int]) -> None:
+    ids = [record["id"] for record in records]
+    existing = set(collection.get(ids=ids, include=[]).get("ids") or [])
+    new = [record for record in dict(zip(ids, records)).values() if record["id"] not in existing]
+    result.thoughts_skipped += len(records) - len(new)
+    if not new:
+        return
+    collection.add(
+        ids=[record["id"] for record in new],
+        documents=[record["document"] for record in new],
+        metadatas=[record["metadata"] or None for record in new],
+        embeddings=np.stack([decode_embedding(record["embedding"]) for record in new]),
+    )
+    result.thoughts_added += len(new)
+    for record in new:
+        session_id = record["metadata"].get("session_id")
+        if session_id:
+            counts[session_id] = counts.get(session_id, 0) + 1
+
+
+def _mark_sessions_dirty(collection, session_ids: List[str], counts: Dict[str, int], result: ImportResult) -> set:
+    """Adds imported thoughts to existing session entries; returns the sessions that had one.
+
+    As on the server's write path, the vector and branch tree are rebuilt on next use.
+    """
+    existing = collection.get(ids=session_ids, include=["metadatas"]) if session_ids else {}
+    existing_counts = {
+        session_id: int((metadata or {}).get(THOUGHT_COUNT_FIELD, 0))
+        for session_id, metadata in zip(existing.get("ids") or [], existing.get("metadatas") or [])
+    }
+    if existing_counts:
+        updated = list(existing_counts)
+        collection.update(
+            ids=updated,
+            metadatas=[
+                {THOUGHT_COUNT_FIELD: existing_counts[s] + counts[s], DIRTY_FIELD: True, BRANCH_TREE_FIELD: None}
+                for s in updated
+            ],
+        )
+        result.sessions_updated += len(updated)
+    return set(existing_counts)
+
+
+def _import_sessions(collection, records: List[Dict[str, Any]], result: ImportResult, counts: Dict[str, int]) -> None:
+    """Writes session entries for the thoughts imported for them."""
+    records = [record for record in records if counts.get(record["id"])]
+    existing = _mark_sessions_dirty(collection, [record["id"] for record in records], counts, result)
+    new = [record for record in records if record["id"] not in existing]
+    if not new:
+        return
+    metadatas = []
+    for record in new:
+        metadata = dict(record["metadata"])
+        imported = counts[record["id"]]
+        if metadata.get(THOUGHT_COUNT_FIELD) != imported:
+            # Only part of the session was exported (e.g. with --since)
+            metadata.update({THOUGHT_COUNT_FIELD: imported, DIRTY_FIELD: True})
+            metadata.pop(BRANCH_TREE_FIELD, None)
+            metadata.pop(MEAN_NORM_FIELD, None)
+        metadatas.append(metadata)
+    collection.add(
+        ids=[record["id"] for record in new],
+        documents=[record["document"] for record in new],
+        metadatas=metadatas,
+        embeddings=np.stack([decode_embedding(record["embedding"]) for record in new]),
+    )
+    result.sessions_added += len(new)
+
+
+def _batches(records: Iterable[Dict[str, Any]], batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    batch: List[Dict[str, Any]] = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_thinking(
+    client,
+    path: str,
+    embedding_function=None,
+    embedding_function_name: str = "default",
+    batch_size: int = DEFAULT_TRANSFER_BATCH_SIZE,
+) -> ImportResult:
+    """Adds the thoughts and session entries of an export file to the thinking collections.
+
+    Raises:
+        ValueError: If the file is not an export, was written with a different embedding
+            function, or a record has no embedding.
+    """
+    start = time.monotonic()
+    result = ImportResult()
+    records = read_export(path)
+    header = next(records, None)
+    if header is None:
+        raise ValueError(f"{path} is empty")
+    if header.get("embedding_function") != embedding_function_name:
+        raise ValueError(
+            f"{path} was exported with embedding function '{header.get('embedding_function')}', "
+            f"this store uses '{embedding_function_name}'"
+        )
+
+    thoughts = client.get_or_create_collection(name=THOUGHTS_COLLECTION, embedding_function=embedding_function)
+    sessions = client.get_or_create_collection(name=SESSIONS_COLLECTION, embedding_function=embedding_function)
+    counts: Dict[str, int] = {}
+    covered = set()
+    for batch in _batches(records, batch_size):
+        if any(record.get("embedding") is None for record in batch):
+            raise ValueError(f"{path} contains records without embeddings")
+        # Thoughts precede their sessions in the file, so sessions see all their imported thoughts
+        thought_records = [record for record in batch if record.get("type") == "thought"]
+        session_records = [record for record in batch if record.get("type") == "session"]
+        if thought_records:
+            _add_new_thoughts(thoughts, thought_records, result, counts)
+        if session_records:
+            _import_sessions(sessions, session_records, result, counts)
+            covered.update(record["id"] for record in session_records)
+    # Sessions exported without an entry: keep existing entries in step, others are found by reconciliation
+    uncovered = [session_id for session_id in counts if session_id not in covered]
+    for i in range(0, len(uncovered), batch_size):
+        _mark_sessions_dirty(sessions, uncovered[i : i + batch_size], counts, result)
+    result.session_ids = sorted(counts)
+    result.seconds = time.monotonic() - start
+    return result
@@ -8,6 +8,35 @@ from chroma_mcp_client import ChromaMcpClient
 from .thinking_session import ThinkingSession
 
 
+def thought_batch(thoughts: List[str], branch_id: str = "", branch_from_thought: int = 0) -> List[Dict[str, Any]]:
+    """
+    Builds the `thoughts` argument of `chroma_record_thoughts` for a chain of thoughts.
+
+    Args:
+        thoughts: List of thought strings, in order
+        branch_id: Optional branch identifier for all thoughts
+        branch_from_thought: Parent thought number the branch starts from (set on the first thought only)
+
+    Returns:
+        List of thought entries numbered from 1
+    """
+    total_thoughts = len(thoughts)
+    batch = []
+    for idx, thought in enumerate(thoughts, 1):
+        entry: Dict[str, Any] = {
+            "thought": thought,
+            "thought_number": idx,
+            "total_thoughts": total_thoughts,
+            "next_thought_needed": idx < total_thoughts,
+        }
+        if branch_id:
+            entry["branch_id"] = branch_id
+        if branch_from_thought and idx == 1:
+            entry["branch_from_thought"] = branch_from_thought
+        batch.append(entry)
+    return batch
+
+
 def record_thought_chain(
     thoughts: List[str],
     session_id: Optional[str] = None,
@@ -28,12 +57,7 @@ def record_thought_chain(
     """
     session = ThinkingSession(client=client, session_id=session_id)
     total_thoughts = len(thoughts)
-
-    for idx, thought in enumerate(thoughts, 1):
-        next_thought_needed = idx < total_thoughts
-        session.record_thought(
-            thought=thought, thought_number=idx, total_thoughts=total_thoughts, next_thought_needed=next_thought_needed
-        )
+    session.record_thoughts(thought_batch(thoughts))
 
     return {
         "session_id": session.session_id,
@@ -99,19 +123,9 @@ def create_thought_branch(
 
     session = ThinkingSession(client=client, session_id=parent_session_id)
     total_thoughts = len(branch_thoughts)
-
-    for idx, thought in enumerate(branch_thoughts, 1):
-        next_thought_needed = idx < total_thoughts
-        branch_from = parent_thought_number if idx == 1 else 0
-
-        session.record_thought(
-            thought=thought,
-            thought_number=idx,
-            total_thoughts=total_thoughts,
-            branch_id=branch_id or "",
-            branch_from_thought=branch_from,
-            next_thought_needed=next_thought_needed,
-        )
+    session.record_thoughts(
+        thought_batch(branch_thoughts, branch_id=branch_id or "", branch_from_thought=parent_thought_number)
+    )
 
     return {
         "session_id": session.session_id,
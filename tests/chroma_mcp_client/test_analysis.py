@@ -479,7 +479,7 @@ def test_update_entry_status_failure(
 @patch("chroma_mcp_client.analysis.fetch_recent_chat_entries")
 @patch("chroma_mcp_client.analysis.get_git_diff_after_timestamp")
 @patch("chroma_mcp_client.analysis.correlate_summary_with_diff")
-@patch("chroma_mcp_client.analysis.update_entry_status")
+@patch("chroma_mcp_client.analysis.update_entry_statuses")
 def test_analyze_chat_history_orchestration(
     mock_update_status, mock_correlate, mock_get_diff, mock_fetch_entries, mock_chroma_client, tmp_path
 ):
@@ -541,8 +541,8 @@ def test_analyze_chat_history_orchestration(
     # Explicitly set return values based on call order
     mock_correlate.side_effect = [True, False]  # True for first call (entry1), False for second (entry2)
 
-    # Mock update_entry_status to succeed
-    mock_update_status.return_value = True
+    # Mock update_entry_statuses to succeed for every entry
+    mock_update_status.side_effect = lambda client, name, ids, status: list(ids)
 
     # Mock the collection retrieval on the client (important!)
     mock_collection_instance = MagicMock(name="MockAnalysisCollection")
@@ -596,11 +596,11 @@ def test_analyze_chat_history_orchestration(
         mock_embedding_function,
     )
 
-    # Verify update calls
-    assert mock_update_status.call_count == 3
-    mock_update_status.assert_any_call(mock_chroma_client, collection_name, "entry1", "analyzed")
-    mock_update_status.assert_any_call(mock_chroma_client, collection_name, "entry2", "analyzed")
-    mock_update_status.assert_any_call(mock_chroma_client, collection_name, "entry3", "analyzed")
+    # Verify the statuses are written in one batch
+    mock_update_status.assert_called_once()
+    _, _, updated_ids, status = mock_update_status.call_args.args
+    assert sorted(updated_ids) == ["entry1", "entry2", "entry3"]
+    assert status == "analyzed"
 
     # *** NEW/UPDATED Log Assertions ***
 
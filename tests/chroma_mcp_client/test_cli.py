@@ -21,6 +21,7 @@ from chroma_mcp_client.validation.schemas import ValidationEvidence, ValidationE
 # Module to test
 from chroma_mcp_client import cli
 from chroma_mcp_client.cli import main, DEFAULT_COLLECTION_NAME
+from chroma_mcp_client.indexing import IndexResult
 from chromadb.api.models.Collection import Collection
 
 
@@ -232,7 +233,7 @@ def test_index_all_files(mock_index_git, mock_get_client_ef, mock_argparse, test
     mock_get_client_ef.return_value = (mock_client_instance, DefaultEmbeddingFunction())
 
     collection_name = "git_collection"
-    mock_index_git.return_value = 2  # Simulate 2 files indexed
+    mock_index_git.return_value = IndexResult(added=2)  # Simulate 2 files indexed
 
     # Mock argparse return value
     mock_parser_instance = mock_argparse.return_value
@@ -934,7 +935,7 @@ def test_promote_learning_success_with_source_update(mock_get_client_ef, mock_ar
     updated_meta = update_args["metadatas"][0]
     assert updated_meta["status"] == "promoted"
     assert updated_meta["derived_learning_id"] == learning_id
-    assert updated_meta["other"] == "data"  # Ensure other metadata was preserved
+    assert "other" not in updated_meta  # Only changed fields are written; Chroma merges the rest
 
     # Check output contains success messages
     captured = capsys.readouterr()
@@ -1704,3 +1705,95 @@ def test_cli_setup_test_workflow(mock_setup_workflow, monkeypatch):
 
                 # Check exit was called with error code
                 mock_exit.assert_called_with(1)
+
+
+@patch("chroma_mcp_client.cli.persist_directory", return_value="/data")
+@patch("chroma_mcp_client.cli.get_collection_stats")
+@patch("chroma_mcp_client.cli.get_client_and_ef")
+def test_stats_command(mock_get_client_ef, mock_stats, mock_persist, capsys, monkeypatch):
+    """Test the stats command prints the collection statistics as JSON."""
+    mock_client = MagicMock()
+    mock_collection = MagicMock()
+    mock_client.get_collection.return_value = mock_collection
+    mock_get_client_ef.return_value = (mock_client, None)
+    mock_stats.return_value = {"name": "codebase_v1", "count": 42}
+    monkeypatch.setattr(sys, "argv", ["chroma-mcp-client", "stats", "--full-scan", "--sample-size", "500"])
+
+    main()
+
+    mock_client.get_collection.assert_called_once_with(name=DEFAULT_COLLECTION_NAME)
+    mock_stats.assert_called_once_with(mock_collection, data_dir="/data", sample_size=500, full_scan=True)
+    assert '"count": 42' in capsys.readouterr().out
+
+
+@patch("chroma_mcp_client.cli.create_sharded_collection")
+@patch("chroma_mcp_client.cli.get_client_and_ef")
+def test_create_sharded_collection_command(mock_get_client_ef, mock_create, capsys, monkeypatch):
+    """Test create-sharded-collection passes the shard count, routing key and default settings."""
+    mock_client, mock_ef = MagicMock(), MagicMock()
+    mock_get_client_ef.return_value = (mock_client, mock_ef)
+    shards = [MagicMock(), MagicMock()]
+    shards[0].name, shards[1].name = "codebase_v1__shard0", "codebase_v1__shard1"
+    mock_create.return_value = MagicMock(shards=shards, shard_key="file_path")
+    monkeypatch.setattr(sys, "argv", ["chroma-mcp-client", "create-sharded-collection", "codebase_v1", "--shards", "2"])
+
+    main()
+
+    args, kwargs = mock_create.call_args
+    assert args == (mock_client, "codebase_v1", 2)
+    assert kwargs["shard_key"] == "file_path"
+    assert kwargs["embedding_function"] is mock_ef
+    assert kwargs["metadata"]["hnsw:space"] == "cosine"
+    assert "codebase_v1__shard0, codebase_v1__shard1" in capsys.readouterr().out
+
+
+@patch("chroma_mcp_client.cli.run_retention")
+@patch("chroma_mcp_client.cli.get_client_and_ef")
+def test_archive_command_ad_hoc_policy(mock_get_client_ef, mock_run, capsys, monkeypatch):
+    """Test archive builds a policy from the options and reports what was moved."""
+    from chroma_mcp.utils.retention import RetentionResult
+
+    mock_client, mock_ef = MagicMock(), MagicMock()
+    mock_get_client_ef.return_value = (mock_client, mock_ef)
+    mock_run.return_value = [RetentionResult("chat_history_v1", "chat_history_v1_archive", scanned=10, archived=3)]
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "chroma-mcp-client",
+            "archive",
+            "--collection-name",
+            "chat_history_v1",
+            "--max-age-days",
+            "30",
+            "--statuses",
+            "analyzed,promoted",
+            "--dry-run",
+        ],
+    )
+
+    main()
+
+    args, kwargs = mock_run.call_args
+    (policy,) = args[1]
+    assert (policy.collection_name, policy.max_age_days, policy.statuses) == (
+        "chat_history_v1",
+        30,
+        ["analyzed", "promoted"],
+    )
+    assert kwargs["dry_run"] is True and kwargs["embedding_function"] is mock_ef
+    assert "Would archive 3 of 10 entries from 'chat_history_v1'" in capsys.readouterr().out
+
+
+@patch("chroma_mcp_client.cli.run_retention")
+@patch("chroma_mcp_client.cli.get_client_and_ef")
+def test_archive_command_requires_limit(mock_get_client_ef, mock_run, monkeypatch):
+    """Test archive rejects an ad-hoc collection without an age or count limit."""
+    mock_get_client_ef.return_value = (MagicMock(), None)
+    monkeypatch.setattr(sys, "argv", ["chroma-mcp-client", "archive", "--collection-name", "chat_history_v1"])
+
+    with pytest.raises(SystemExit) as exc_info:
+        main()
+
+    assert exc_info.value.code == 1
+    mock_run.assert_not_called()
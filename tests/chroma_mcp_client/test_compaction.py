@@ -0,0 +1,143 @@
+"""
+Tests for the chroma_mcp_client.compaction module.
+"""
+
+import uuid
+
+import chromadb
+import numpy as np
+import pytest
+from unittest.mock import patch, MagicMock
+
+from chroma_mcp_client.cli import main
+from chroma_mcp_client.compaction import CompactionResult, compact_collection, format_compaction_report
+
+
+@pytest.fixture
+def churned_client(tmp_path):
+    """Persistent client with a collection that has seen deletes and re-adds."""
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    name = f"compact-{uuid.uuid4().hex[:8]}"
+    collection = client.create_collection(
+        name=name, metadata={"hnsw:space": "cosine", "description": "churn"}, embedding_function=None
+    )
+    rng = np.random.default_rng(0)
+    collection.add(
+        ids=[f"id{i}" for i in range(300)],
+        embeddings=rng.normal(size=(300, 8)).tolist(),
+        documents=[f"doc {i}" for i in range(300)],
+        metadatas=[{"n": i} for i in range(300)],
+    )
+    collection.delete(ids=[f"id{i}" for i in range(0, 300, 2)])
+    return client, name
+
+
+def test_compact_collection_preserves_records_and_settings(churned_client):
+    client, name = churned_client
+    before = client.get_collection(name)
+    old_id = before.id
+    expected = before.get(ids=["id1", "id299"], include=["embeddings", "documents", "metadatas"])
+
+    result = compact_collection(client, name, batch_size=64, num_latency_queries=5)
+
+    after = client.get_collection(name)
+    assert after.id != old_id
+    assert after.count() == 150 and result.records == 150
+    assert after.metadata == {"hnsw:space": "cosine", "description": "churn"}
+    assert after.configuration_json["hnsw"]["space"] == "cosine"
+    copied = after.get(ids=["id1", "id299"], include=["embeddings", "documents", "metadatas"])
+    assert copied["documents"] == expected["documents"]
+    assert copied["metadatas"] == expected["metadatas"]
+    np.testing.assert_allclose(copied["embeddings"], expected["embeddings"], rtol=1e-6)
+
+    assert result.bytes_before > 0 and result.bytes_after > 0
+    assert result.p50_ms_before is not None and result.p50_ms_after is not None
+    assert result.backup_name is None
+    assert [c.name for c in client.list_collections()] == [name]
+
+
+def test_compact_collection_keep_backup(churned_client):
+    client, name = churned_client
+    result = compact_collection(client, name, keep_backup=True)
+    assert client.get_collection(result.backup_name).count() == 150
+    assert "previous collection kept as" in format_compaction_report(result)
+
+
+def test_compact_collection_aborts_when_source_changes(churned_client):
+    client, name = churned_client
+    source = client.get_collection(name)
+    original_get = type(source).get
+
+    def get_then_write(self, *args, **kwargs):
+        batch = original_get(self, *args, **kwargs)
+        if self.name == name and kwargs.get("offset") == 0:
+            self.add(ids=["late"], embeddings=[[0.0] * 8])
+        return batch
+
+    with patch.object(type(source), "get", get_then_write):
+        with pytest.raises(RuntimeError, match="changed during compaction"):
+            compact_collection(client, name)
+
+    assert [c.name for c in client.list_collections()] == [name]
+    assert client.get_collection(name).id == source.id
+
+
+def _failing_modify(source_name, fail_rollback=False):
+    """Patched Collection.modify that fails the rebuilt collection's rename (and optionally the rollback)."""
+    original_modify = chromadb.api.models.Collection.Collection.modify
+
+    def modify(self, *args, **kwargs):
+        if kwargs.get("name") == source_name and (fail_rollback or "_compact_" in self.name):
+            raise RuntimeError("rename failed")
+        return original_modify(self, *args, **kwargs)
+
+    return patch.object(chromadb.api.models.Collection.Collection, "modify", modify)
+
+
+def test_compact_collection_rolls_back_when_swap_fails(churned_client):
+    client, name = churned_client
+    source = client.get_collection(name)
+
+    with _failing_modify(name):
+        with pytest.raises(RuntimeError, match="rename failed"):
+            compact_collection(client, name)
+
+    # The original collection is back under its name and the rebuilt copy is gone
+    assert [c.name for c in client.list_collections()] == [name]
+    assert client.get_collection(name).id == source.id
+    assert client.get_collection(name).count() == 150
+
+
+def test_compact_collection_reports_failed_rollback(churned_client):
+    client, name = churned_client
+
+    with _failing_modify(name, fail_rollback=True):
+        with pytest.raises(RuntimeError, match="failed to swap .* and to roll back") as exc_info:
+            compact_collection(client, name)
+
+    names = {c.name for c in client.list_collections()}
+    assert name not in names
+    assert any(n.startswith(f"{name}_precompact_") and n in str(exc_info.value) for n in names)
+
+
+def test_format_compaction_report_without_sizes():
+    report = format_compaction_report(CompactionResult("docs", 10, None, None, 1.5, 1.0, 0.2))
+    assert "n/a -> n/a" in report
+    assert "1.50 ms -> 1.00 ms" in report
+
+
+@patch("chroma_mcp_client.cli.compact_collection")
+@patch("chroma_mcp_client.cli.get_client_and_ef")
+def test_compact_command(mock_get_client_ef, mock_compact, capsys, monkeypatch):
+    """Test the compact CLI command passes options through and prints the report."""
+    mock_client, mock_ef = MagicMock(), MagicMock()
+    mock_get_client_ef.return_value = (mock_client, mock_ef)
+    mock_compact.return_value = CompactionResult("codebase_v1", 5, 2048, 1024, 2.0, 1.0, 0.1)
+    monkeypatch.setattr("sys.argv", ["chroma-mcp-client", "compact", "codebase_v1", "--batch-size", "50"])
+
+    main()
+
+    mock_compact.assert_called_once_with(
+        mock_client, "codebase_v1", embedding_function=mock_ef, batch_size=50, num_latency_queries=20, keep_backup=False
+    )
+    assert "2,048 bytes -> 1,024 bytes" in capsys.readouterr().out
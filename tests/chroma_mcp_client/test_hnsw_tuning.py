@@ -0,0 +1,130 @@
+"""
+Tests for the chroma_mcp_client.hnsw_tuning module.
+"""
+
+import uuid
+
+import chromadb
+from chromadb.api.client import SharedSystemClient
+from chromadb.config import Settings
+import numpy as np
+import pytest
+from unittest.mock import patch, MagicMock
+
+from chroma_mcp.utils.exact_search import ExactIndex
+from chroma_mcp_client.cli import main
+from chroma_mcp_client.hnsw_tuning import (
+    TEMP_COLLECTION_PREFIX,
+    TuningResult,
+    apply_env_overrides,
+    choose_best,
+    format_results_table,
+    tune_hnsw,
+)
+
+
+@pytest.fixture(scope="module")
+def ephemeral_client():
+    """Ephemeral client with the server's settings; the shared Chroma system is reset afterwards."""
+    SharedSystemClient.clear_system_cache()
+    client = chromadb.EphemeralClient(settings=Settings(anonymized_telemetry=False))
+    yield client
+    SharedSystemClient.clear_system_cache()
+
+
+@pytest.fixture
+def sample_client(ephemeral_client):
+    """Ephemeral client with a small random collection to tune against."""
+    client = ephemeral_client
+    name = f"tune-src-{uuid.uuid4().hex[:8]}"
+    collection = client.create_collection(name=name, metadata={"hnsw:space": "cosine"}, embedding_function=None)
+    rng = np.random.default_rng(1)
+    collection.add(ids=[f"id{i}" for i in range(200)], embeddings=rng.normal(size=(200, 8)).astype(np.float32))
+    yield client, name
+    client.delete_collection(name=name)
+
+
+def test_tune_hnsw_sweeps_grid_and_cleans_up(sample_client):
+    client, name = sample_client
+    results = tune_hnsw(client, name, search_ef_values=[5, 50], m_values=[8], num_queries=10, n_results=5)
+
+    assert [(r.m, r.construction_ef, r.search_ef) for r in results] == [(8, 100, 5), (8, 100, 50)]
+    assert all(0.0 <= r.recall <= 1.0 and r.p99_ms >= r.p50_ms for r in results)
+    assert results[1].recall == pytest.approx(1.0)  # search_ef 50 on 190 vectors is effectively exact
+    assert not [c for c in client.list_collections() if c.name.startswith(TEMP_COLLECTION_PREFIX)]
+    assert client.get_collection(name).count() == 200  # Source untouched
+
+
+def test_tune_hnsw_uses_configured_space(ephemeral_client):
+    """A cosine collection created via the configuration API is swept as cosine, not L2."""
+    name = f"tune-cfg-{uuid.uuid4().hex[:8]}"
+    collection = ephemeral_client.create_collection(
+        name=name, configuration={"hnsw": {"space": "cosine"}}, embedding_function=None
+    )
+    collection.add(ids=[f"id{i}" for i in range(50)], embeddings=np.random.default_rng(2).normal(size=(50, 8)))
+    try:
+        with patch("chroma_mcp_client.hnsw_tuning.ExactIndex", wraps=ExactIndex) as mock_exact:
+            tune_hnsw(ephemeral_client, name, search_ef_values=[10], m_values=[8], num_queries=5, n_results=3)
+    finally:
+        ephemeral_client.delete_collection(name=name)
+
+    assert mock_exact.call_args.args[2] == "cosine"
+
+
+def test_tune_hnsw_needs_more_vectors_than_queries(sample_client):
+    client, name = sample_client
+    with pytest.raises(ValueError):
+        tune_hnsw(client, name, num_queries=500)
+
+
+def test_choose_best_prefers_fastest_qualifying():
+    slow = TuningResult(16, 100, 100, 0.99, 2.0, 3.0, 1.0)
+    fast = TuningResult(16, 100, 20, 0.96, 1.0, 1.5, 1.0)
+    low = TuningResult(16, 100, 10, 0.80, 0.5, 0.8, 1.0)
+    assert choose_best([slow, fast, low], 0.95) is fast
+    assert choose_best([slow, fast, low], 0.999) is slow  # Nothing qualifies: highest recall wins
+    assert choose_best([]) is None
+    assert "<- best" in format_results_table([slow, fast], 10, fast).splitlines()[3]
+
+
+def test_apply_env_overrides_writes_collection_keys(tmp_path):
+    env_file = tmp_path / ".env"
+    env_file.write_text("EXISTING=1\n")
+    apply_env_overrides("codebase_v1", TuningResult(32, 200, 40, 0.97, 1.0, 2.0, 1.0), str(env_file))
+
+    content = env_file.read_text()
+    assert "EXISTING=1" in content
+    assert "CHROMA_COLLECTION_CODEBASE_V1_HNSW_M=32" in content
+    assert "CHROMA_COLLECTION_CODEBASE_V1_HNSW_CONSTRUCTION_EF=200" in content
+    assert "CHROMA_COLLECTION_CODEBASE_V1_HNSW_SEARCH_EF=40" in content
+
+
+@patch("chroma_mcp_client.cli.apply_env_overrides")
+@patch("chroma_mcp_client.cli.tune_hnsw")
+@patch("chroma_mcp_client.cli.get_client_and_ef")
+def test_tune_hnsw_command(mock_get_client_ef, mock_tune, mock_apply, capsys, monkeypatch):
+    """Test the tune-hnsw CLI command parses the grid and applies the chosen settings."""
+    mock_client = MagicMock()
+    mock_get_client_ef.return_value = (mock_client, None)
+    best = TuningResult(16, 100, 20, 0.97, 1.0, 1.5, 0.5)
+    mock_tune.return_value = [TuningResult(16, 100, 10, 0.90, 0.8, 1.0, 0.5), best]
+    mock_apply.return_value = [("CHROMA_COLLECTION_CODEBASE_V1_HNSW_SEARCH_EF", 20)]
+    monkeypatch.setattr(
+        "sys.argv", ["chroma-mcp-client", "tune-hnsw", "--search-ef", "10,20", "--apply", "--env-file", "x.env"]
+    )
+
+    main()
+
+    mock_tune.assert_called_once_with(
+        mock_client,
+        "codebase_v1",
+        search_ef_values=[10, 20],
+        m_values=[16],
+        construction_ef_values=[100],
+        sample_size=5000,
+        num_queries=100,
+        n_results=10,
+    )
+    mock_apply.assert_called_once_with("codebase_v1", best, "x.env")
+    out = capsys.readouterr().out
+    assert "Chosen: M=16, construction_ef=100, search_ef=20" in out
@@ -8,11 +8,18 @@ from unittest.mock import patch, MagicMock, mock_open
 import subprocess
 import os
 import logging
+import uuid
+
+import chromadb
+import numpy as np
+from chromadb.api.client import SharedSystemClient
+from chromadb.api.types import EmbeddingFunction
+from chromadb.config import Settings
 
 # Assuming get_client_and_ef is mocked elsewhere or we mock it here
 from chroma_mcp_client.connection import get_client_and_ef
-from chroma_mcp_client.indexing import index_file, index_git_files, index_paths
-
+from chroma_mcp_client.index_manifest import manifest_path
+from chroma_mcp_client.indexing import IndexResult, get_current_commit_sha, index_file, index_git_files, index_paths
 
 # --- Fixtures ---
 
@@ -414,72 +421,183 @@ def test_index_file_upsert_error(mock_get_sha, temp_repo: Path, mock_chroma_clie
 # --- Tests for index_git_files ---
 
 
-@patch("subprocess.run")
-@patch("chroma_mcp_client.indexing.index_file", return_value=True)
-def test_index_git_files_success(mock_index_file, mock_subprocess_run, temp_repo: Path, mocker):
-    """Test successful indexing of files listed by git."""
-    # Simulate git ls-files returning two files separated by null
-    mock_process = MagicMock()
-    mock_process.stdout = "src/main.py\0README.md\0"
-    mock_process.stderr = ""
-    mock_subprocess_run.return_value = mock_process
+class CountingEmbedding(EmbeddingFunction):
+    """Records how many documents were embedded."""
 
-    indexed_count = index_git_files(temp_repo)
+    def __init__(self):
+        self.embedded = 0
 
-    assert indexed_count == 2
-    mock_subprocess_run.assert_called_once()
-    # Check the command called
-    cmd_args = mock_subprocess_run.call_args.args[0]
-    assert cmd_args == ["git", "-C", str(temp_repo), "ls-files", "-z"]
+    def __call__(self, input):
+        self.embedded += len(input)
+        return [np.array([float(len(text)), 1.0], dtype=np.float32) for text in input]
+
+
+def git(repo: Path, *args: str) -> None:
+    subprocess.run(
+        ["git", "-C", str(repo), "-c", "user.name=Test", "-c", "user.email=test@example.com", *args],
+        check=True,
+        capture_output=True,
+    )
+
+
+@pytest.fixture
+def git_repo(tmp_path: Path):
+    repo = tmp_path / "git_repo"
+    repo.mkdir()
+    git(repo, "init", "-q")
+    (repo / "app.py").write_text("def main():\n    return 1\n")
+    (repo / "README.md").write_text("# Project\n")
+    (repo / "notes.md").write_text("Some notes\n")
+    (repo / "image.zip").write_text("not indexed")
+    git(repo, "add", ".")
+    git(repo, "commit", "-q", "-m", "initial")
+    return repo
+
+
+@pytest.fixture
+def indexing_store(mocker):
+    SharedSystemClient.clear_system_cache()
+    client = chromadb.EphemeralClient(settings=Settings(anonymized_telemetry=False))
+    ef = CountingEmbedding()
+    mocker.patch("chroma_mcp_client.indexing.get_client_and_ef", return_value=(client, ef))
+    collection_name = f"codebase-{uuid.uuid4().hex[:8]}"
+    yield client, ef, collection_name
+    SharedSystemClient.clear_system_cache()
+
+
+def indexed_files(client, collection_name):
+    metadatas = client.get_collection(collection_name).get(include=["metadatas"])["metadatas"]
+    return sorted({(m["file_path"], m["commit_sha"]) for m in metadatas})
+
+
+def test_index_git_files_only_reindexes_changes(git_repo: Path, indexing_store):
+    """A second run embeds nothing; later runs replace changed files and remove deleted ones."""
+    client, ef, collection_name = indexing_store
+
+    first = index_git_files(git_repo, collection_name)
+    first_commit = get_current_commit_sha(git_repo)
+    assert (first.added, first.updated, first.deleted, first.skipped) == (3, 0, 0, 0)
+
+    embedded = ef.embedded
+    again = index_git_files(git_repo, collection_name)
+    assert (again.added, again.updated, again.deleted, again.skipped) == (0, 0, 0, 3)
+    assert ef.embedded == embedded
+
+    (git_repo / "app.py").write_text("def main():\n    return 2\n")
+    (git_repo / "new.py").write_text("VALUE = 1\n")
+    git(git_repo, "rm", "-q", "notes.md")
+    git(git_repo, "add", ".")
+    git(git_repo, "commit", "-q", "-m", "change")
+    second_commit = get_current_commit_sha(git_repo)
+
+    changed = index_git_files(git_repo, collection_name, delete_batch_size=1)
+    assert (changed.added, changed.updated, changed.deleted, changed.skipped) == (1, 1, 1, 1)
+    assert indexed_files(client, collection_name) == [
+        ("README.md", first_commit),
+        ("app.py", second_commit),
+        ("new.py", second_commit),
+    ]
+
+
+def test_index_git_files_rebuilds_missing_manifest(git_repo: Path, indexing_store):
+    """Without a manifest, unchanged files are recognised from their chunks and stale commits are removed."""
+    client, ef, collection_name = indexing_store
+    index_git_files(git_repo, collection_name)
+    # A chunk left over from an older commit, as written before the manifest existed
+    client.get_collection(collection_name).add(
+        ids=["README.md:oldsha:0"],
+        documents=["# Old"],
+        embeddings=[[1.0, 1.0]],
+        metadatas=[{"file_path": "README.md", "commit_sha": "oldsha", "chunk_index": 0}],
+    )
+    manifest_path(git_repo, collection_name).unlink()
 
-    # Check that index_file was called for each file
-    assert mock_index_file.call_count == 2
-    mock_index_file.assert_any_call(
-        temp_repo / "src/main.py", temp_repo, "codebase_v1", mocker.ANY
-    )  # mocker.ANY for default suffixes
-    mock_index_file.assert_any_call(temp_repo / "README.md", temp_repo, "codebase_v1", mocker.ANY)
+    embedded = ef.embedded
+    result = index_git_files(git_repo, collection_name)
+
+    assert (result.added, result.updated, result.deleted, result.skipped) == (0, 1, 0, 2)
+    assert ef.embedded == embedded + 1
+    commit = get_current_commit_sha(git_repo)
+    assert indexed_files(client, collection_name) == [("README.md", commit), ("app.py", commit), ("notes.md", commit)]
+
+
+def test_index_git_files_keeps_chunks_of_files_that_fail(git_repo: Path, indexing_store, mocker):
+    """Changed files that cannot be read or chunked keep their chunks and are retried on the next run."""
+    client, ef, collection_name = indexing_store
+    index_git_files(git_repo, collection_name)
+    first_commit = get_current_commit_sha(git_repo)
+
+    (git_repo / "app.py").write_text("def main():\n    return 2\n")
+    (git_repo / "notes.md").write_text("Other notes\n")
+    git(git_repo, "commit", "-q", "-am", "change")
+
+    read_text = Path.read_text
+
+    def failing_read_text(path, *args, **kwargs):
+        if path.name == "app.py":
+            raise PermissionError("denied")
+        return read_text(path, *args, **kwargs)
+
+    with (
+        patch.object(Path, "read_text", failing_read_text),
+        patch("chroma_mcp_client.indexing._chunk_records", return_value=([], [], [])),
+    ):
+        failed = index_git_files(git_repo, collection_name)
+
+    assert (failed.added, failed.updated, failed.deleted, failed.skipped, failed.failed) == (0, 0, 0, 1, 2)
+    assert indexed_files(client, collection_name) == [
+        ("README.md", first_commit),
+        ("app.py", first_commit),
+        ("notes.md", first_commit),
+    ]
+
+    retried = index_git_files(git_repo, collection_name)
+    second_commit = get_current_commit_sha(git_repo)
+    assert (retried.added, retried.updated, retried.deleted, retried.skipped, retried.failed) == (0, 2, 0, 1, 0)
+    assert indexed_files(client, collection_name) == [
+        ("README.md", first_commit),
+        ("app.py", second_commit),
+        ("notes.md", second_commit),
+    ]
 
 
 @patch("subprocess.run", side_effect=FileNotFoundError("git not found"))
-@patch("chroma_mcp_client.indexing.index_file")
-def test_index_git_files_git_not_found(mock_index_file, mock_subprocess_run, temp_repo: Path):
+def test_index_git_files_git_not_found(mock_subprocess_run, temp_repo: Path, mock_chroma_client_tuple):
     """Test handling when git command is not found."""
-    indexed_count = index_git_files(temp_repo)
+    result = index_git_files(temp_repo)
 
-    assert indexed_count == 0
+    assert result == IndexResult(seconds=result.seconds)
     mock_subprocess_run.assert_called_once()
-    mock_index_file.assert_not_called()
+    mock_chroma_client_tuple[3].assert_not_called()
 
 
 @patch("subprocess.run")
-@patch("chroma_mcp_client.indexing.index_file")
-def test_index_git_files_git_error(mock_index_file, mock_subprocess_run, temp_repo: Path):
+def test_index_git_files_git_error(mock_subprocess_run, temp_repo: Path, mock_chroma_client_tuple):
     """Test handling errors during git ls-files execution."""
     mock_subprocess_run.side_effect = subprocess.CalledProcessError(
         cmd=["git", "ls-files"], returncode=1, stderr="fatal: not a git repository"
     )
 
-    indexed_count = index_git_files(temp_repo)
+    result = index_git_files(temp_repo)
 
-    assert indexed_count == 0
+    assert result == IndexResult(seconds=result.seconds)
     mock_subprocess_run.assert_called_once()
-    mock_index_file.assert_not_called()
+    mock_chroma_client_tuple[3].assert_not_called()
 
 
 @patch("subprocess.run")
-@patch("chroma_mcp_client.indexing.index_file")
-def test_index_git_files_no_files(mock_index_file, mock_subprocess_run, temp_repo: Path):
+def test_index_git_files_no_files(mock_subprocess_run, temp_repo: Path, mock_chroma_client_tuple):
     """Test handling when git ls-files returns no files."""
     mock_process = MagicMock()
     mock_process.stdout = ""  # Empty output
     mock_process.stderr = ""
     mock_subprocess_run.return_value = mock_process
 
-    indexed_count = index_git_files(temp_repo)
+    result = index_git_files(temp_repo)
 
-    assert indexed_count == 0
+    assert result == IndexResult(seconds=result.seconds)
     mock_subprocess_run.assert_called_once()
-    mock_index_file.assert_not_called()
+    mock_chroma_client_tuple[3].assert_not_called()
 
 
 # --- Tests for index_paths ---
@@ -10,11 +10,12 @@ from chroma_mcp_client.validation.runtime_collector import (
     parse_error_log,
     compare_error_logs,
     create_runtime_error_evidence,
+    create_runtime_error_evidence_cli,
+    store_runtime_error,
     store_runtime_errors,
 )
 from chroma_mcp_client.validation.schemas import RuntimeErrorEvidence
 
-
 # Sample error logs for testing
 ERROR_LOG_BEFORE = """
 [2023-04-15 14:30:00] ERROR: IndexError: list index out of range
@@ -259,3 +260,18 @@ class TestRuntimeCollector:
                     assert "IndexError" in documents[0]
                     assert metadatas[0]["error_type"] == "IndexError"
                     assert ids[0].startswith("test-uuid_")
+
+    def test_store_runtime_error_dedup_max_distance(self):
+        """Test that the dedup vector distance comes from CHROMA_DEDUP_MAX_DISTANCE unless given."""
+        mock_client = MagicMock()
+        error = create_runtime_error_evidence_cli(error_type="IndexError", error_message="list index out of range")
+
+        with (
+            patch.dict("os.environ", {"CHROMA_DEDUP_MAX_DISTANCE": "0.3"}),
+            patch("chroma_mcp.utils.dedup.find_duplicate", return_value=None) as mock_find,
+        ):
+            store_runtime_error(error, chroma_client=mock_client, dedup=True)
+            assert mock_find.call_args.kwargs["max_distance"] == 0.3
+
+            store_runtime_error(error, chroma_client=mock_client, dedup=True, dedup_max_distance=0.1)
+            assert mock_find.call_args.kwargs["max_distance"] == 0.1
@@ -30,6 +30,14 @@ DEFAULT_EXPECTED = {
     "api_key": None,
     "dotenv_path": ".env",
     "cpu_execution_provider": "auto",
+    "fts_accelerator": False,
+    "exact_search_threshold": 0,
+    "retention_interval_hours": 0,
+    "dedup_on_add": False,
+    "dedup_max_distance": None,
+    "session_embedding_mode": "text",
+    "socket_path": None,
+    "idle_timeout": 0,
 }
 
 
@@ -107,6 +115,7 @@ def test_parse_args_env_vars():
         "CHROMA_DOTENV_PATH": ".env.prod",
         "CHROMA_CPU_EXECUTION_PROVIDER": "false",
         "CHROMA_EMBEDDING_FUNCTION": "accurate",
+        "CHROMA_DEDUP_MAX_DISTANCE": "0.25",
     }
     with patch.dict(os.environ, env_vars, clear=True):
         args = parse_args([])  # No command line args
@@ -123,6 +132,7 @@ def test_parse_args_env_vars():
         assert args.dotenv_path == ".env.prod"
         assert args.cpu_execution_provider == "false"
         assert args.embedding_function_name == "accurate"
+        assert args.dedup_max_distance == 0.25
 
 
 def test_parse_args_cmd_line_overrides_env():
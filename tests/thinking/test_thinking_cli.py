@@ -130,24 +130,22 @@ async def test_cmd_record_from_file(mock_file_open, mocker):  # Added mocker fix
 
     # Check client methods
     mock_mcp_client.initialize.assert_awaited_once()
-    assert mock_mcp_client.call_tool.await_count == 2
+    # The whole file is recorded in one batch call
+    mock_mcp_client.call_tool.assert_awaited_once()
+    call_kwargs = mock_mcp_client.call_tool.await_args.kwargs
+    assert call_kwargs["name"] == "chroma_record_thoughts"
+    assert call_kwargs["arguments"]["session_id"] == "file-session"
+    batch = call_kwargs["arguments"]["thoughts"]
 
-    # Check arguments of the first call
-    call1_args = mock_mcp_client.call_tool.await_args_list[0].kwargs["arguments"]
     # Let's assert with the newline and see if *that* passes, confirming strip() isn't working in mock context
-    # assert call1_args['thought'] == "Thought from file 1"
-    assert call1_args["thought"] == "Thought from file 1\\n"  # Temporarily assert with newline
-    assert call1_args["thought_number"] == 1
-    assert call1_args["total_thoughts"] == 2
-    assert call1_args["session_id"] == "file-session"
+    # assert batch[0]['thought'] == "Thought from file 1"
+    assert batch[0]["thought"] == "Thought from file 1\\n"  # Temporarily assert with newline
+    assert batch[0]["thought_number"] == 1
+    assert batch[0]["total_thoughts"] == 2
 
-    # Check arguments of the second call
-    call2_args = mock_mcp_client.call_tool.await_args_list[1].kwargs["arguments"]
-    # assert call2_args['thought'] == "Thought from file 2"
-    assert call2_args["thought"] == "Thought from file 2\\n"  # Temporarily assert with newline
-    assert call2_args["thought_number"] == 2
-    assert call2_args["total_thoughts"] == 2
-    assert call2_args["session_id"] == "file-session"
+    assert batch[1]["thought"] == "Thought from file 2\\n"  # Temporarily assert with newline
+    assert batch[1]["thought_number"] == 2
+    assert batch[1]["total_thoughts"] == 2
 
 
 @pytest.mark.xfail(reason="Teardown issues with SystemExit and async context mocks")
@@ -416,25 +414,24 @@ async def test_cmd_branch(MockSessionClass, mock_stdio, mock_mcp_client):
     await cmd_branch_async(args)
 
     mock_mcp_client.initialize.assert_awaited_once()
-    assert mock_mcp_client.call_tool.await_count == len(branch_thoughts)
-
-    # Check the first call (should include branch_from_thought)
-    first_call_args = mock_mcp_client.call_tool.await_args_list[0].kwargs
-    assert first_call_args["name"] == "chroma_sequential_thinking"
-    assert first_call_args["arguments"]["thought"] == branch_thoughts[0]
-    assert first_call_args["arguments"]["thought_number"] == 1
-    assert first_call_args["arguments"]["branch_id"] == "test-branch"
-    assert first_call_args["arguments"]["branch_from_thought"] == 2
-    assert first_call_args["arguments"]["session_id"] == "parent-session-id"
-
-    # Check the second call
-    second_call_args = mock_mcp_client.call_tool.await_args_list[1].kwargs
-    assert second_call_args["name"] == "chroma_sequential_thinking"
-    assert second_call_args["arguments"]["thought"] == branch_thoughts[1]
-    assert second_call_args["arguments"]["thought_number"] == 2
-    assert second_call_args["arguments"]["branch_id"] == "test-branch"
-    assert second_call_args["arguments"]["branch_from_thought"] == 0
-    assert second_call_args["arguments"]["session_id"] == "parent-session-id"
+    mock_mcp_client.call_tool.assert_awaited_once()
+    call_kwargs = mock_mcp_client.call_tool.await_args.kwargs
+    assert call_kwargs["name"] == "chroma_record_thoughts"
+    assert call_kwargs["arguments"]["session_id"] == "parent-session-id"
+    batch = call_kwargs["arguments"]["thoughts"]
+    assert len(batch) == len(branch_thoughts)
+
+    # Check the first thought (should include branch_from_thought)
+    assert batch[0]["thought"] == branch_thoughts[0]
+    assert batch[0]["thought_number"] == 1
+    assert batch[0]["branch_id"] == "test-branch"
+    assert batch[0]["branch_from_thought"] == 2
+
+    # Check the second thought
+    assert batch[1]["thought"] == branch_thoughts[1]
+    assert batch[1]["thought_number"] == 2
+    assert batch[1]["branch_id"] == "test-branch"
+    assert "branch_from_thought" not in batch[1]
 
 
 @pytest.mark.asyncio
@@ -0,0 +1,108 @@
+"""
+Tests for exporting and importing thinking sessions.
+"""
+
+import gzip
+import json
+
+import chromadb
+import numpy as np
+import pytest
+from chromadb.api.client import SharedSystemClient
+from chromadb.api.types import EmbeddingFunction
+from chromadb.config import Settings
+
+from chroma_mcp_thinking.transfer import export_thinking, import_thinking
+from chroma_mcp.tools.thinking_tools import SESSIONS_COLLECTION, THOUGHTS_COLLECTION
+
+
+class FailingEmbedding(EmbeddingFunction):
+    """Imports must not embed anything."""
+
+    def __init__(self):
+        pass
+
+    def __call__(self, input):
+        raise AssertionError("embedding function called")
+
+
+@pytest.fixture
+def stores(tmp_path):
+    SharedSystemClient.clear_system_cache()
+    settings = Settings(anonymized_telemetry=False)
+    source = chromadb.PersistentClient(path=str(tmp_path / "source"), settings=settings)
+    target = chromadb.PersistentClient(path=str(tmp_path / "target"), settings=settings)
+    yield source, target
+    SharedSystemClient.clear_system_cache()
+
+
+def add_session(client, session_id, timestamps):
+    thoughts = client.get_or_create_collection(THOUGHTS_COLLECTION, embedding_function=FailingEmbedding())
+    sessions = client.get_or_create_collection(SESSIONS_COLLECTION, embedding_function=FailingEmbedding())
+    numbers = range(1, len(timestamps) + 1)
+    thoughts.add(
+        ids=[f"thought_{session_id}_{n}" for n in numbers],
+        documents=[f"{session_id} thought {n}" for n in numbers],
+        embeddings=[[float(n), 0.5, 0.25] for n in numbers],
+        metadatas=[
+            {"session_id": session_id, "thought_number": n, "timestamp": t} for n, t in zip(numbers, timestamps)
+        ],
+    )
+    sessions.add(
+        ids=[session_id],
+        documents=[f"{session_id} text"],
+        embeddings=[[0.0, 1.0, 0.0]],
+        metadatas=[{"thought_count": len(timestamps), "dirty": False}],
+    )
+
+
+def test_round_trip_keeps_embeddings_without_embedding(stores, tmp_path):
+    source, target = stores
+    add_session(source, "s1", [100, 200])
+    add_session(source, "s2", [300])
+    path = str(tmp_path / "thinking.jsonl.gz")
+
+    exported = export_thinking(source, path, batch_size=1)
+    imported = import_thinking(target, path, embedding_function=FailingEmbedding(), batch_size=2)
+
+    assert (exported.thoughts, exported.sessions) == (3, 2)
+    assert (imported.thoughts_added, imported.sessions_added, imported.session_ids) == (3, 2, ["s1", "s2"])
+    with gzip.open(path, "rt") as f:
+        assert json.loads(f.readline())["format"] == "chroma-mcp-thinking-export"
+    copied = target.get_collection(THOUGHTS_COLLECTION).get(ids=["thought_s1_2"], include=["embeddings", "metadatas"])
+    assert np.allclose(copied["embeddings"][0], [2.0, 0.5, 0.25])
+    assert copied["metadatas"][0]["timestamp"] == 200
+    assert target.get_collection(SESSIONS_COLLECTION).get(ids=["s1"])["metadatas"][0] == {
+        "thought_count": 2,
+        "dirty": False,
+    }
+
+    again = import_thinking(target, path, embedding_function=FailingEmbedding())
+    assert (again.thoughts_added, again.thoughts_skipped, again.sessions_updated) == (0, 3, 0)
+
+
+def test_partial_export_marks_sessions_dirty(stores, tmp_path):
+    source, target = stores
+    add_session(source, "s1", [100, 200, 300])
+    add_session(target, "s2", [50])
+    add_session(source, "s2", [50, 400])
+    path = str(tmp_path / "recent.jsonl")
+
+    export_thinking(source, path, since=200)
+    imported = import_thinking(target, path, embedding_function=FailingEmbedding())
+
+    assert (imported.thoughts_added, imported.sessions_added, imported.sessions_updated) == (3, 1, 1)
+    entries = target.get_collection(SESSIONS_COLLECTION).get(ids=["s1", "s2"], include=["metadatas"])
+    by_id = dict(zip(entries["ids"], entries["metadatas"]))
+    assert by_id["s1"] == {"thought_count": 2, "dirty": True}
+    assert by_id["s2"] == {"thought_count": 2, "dirty": True}
+
+
+def test_import_rejects_other_embedding_function(stores, tmp_path):
+    source, target = stores
+    add_session(source, "s1", [100])
+    path = str(tmp_path / "thinking.jsonl")
+    export_thinking(source, path, embedding_function_name="accurate")
+
+    with pytest.raises(ValueError, match="embedding function 'accurate'"):
+        import_thinking(target, path, embedding_function=FailingEmbedding(), embedding_function_name="default")
@@ -8,7 +8,12 @@ from unittest.mock import MagicMock, patch
 # Mock ChromaMcpClient since we don't need the actual implementation for tests
 with patch("chroma_mcp_thinking.utils.ChromaMcpClient"):
     with patch("chroma_mcp_thinking.thinking_session.ClientSession") as MockMcpClient:
-        from chroma_mcp_thinking.utils import record_thought_chain, find_thoughts_across_sessions, create_thought_branch
+        from chroma_mcp_thinking.utils import (
+            record_thought_chain,
+            find_thoughts_across_sessions,
+            create_thought_branch,
+            thought_batch,
+        )
 
 
 @pytest.fixture
@@ -50,22 +55,24 @@ def test_record_thought_chain(mock_thinking_session_class, mock_client):
     # Verify ThinkingSession was created correctly
     mock_thinking_session_class.assert_called_once_with(client=mock_client, session_id="test-session-id")
 
-    # Verify record_thought was called for each thought
-    assert mock_session.record_thought.call_count == 3
-
-    # Check first thought call
-    first_call = mock_session.record_thought.call_args_list[0][1]
-    assert first_call["thought"] == "Thought 1"
-    assert first_call["thought_number"] == 1
-    assert first_call["total_thoughts"] == 3
-    assert first_call["next_thought_needed"] is True
-
-    # Check last thought call
-    last_call = mock_session.record_thought.call_args_list[2][1]
-    assert last_call["thought"] == "Thought 3"
-    assert last_call["thought_number"] == 3
-    assert last_call["total_thoughts"] == 3
-    assert last_call["next_thought_needed"] is False
+    # Verify the chain was recorded as one batch
+    mock_session.record_thought.assert_not_called()
+    mock_session.record_thoughts.assert_called_once()
+    batch = mock_session.record_thoughts.call_args[0][0]
+    assert len(batch) == 3
+
+    # Check first thought
+    assert batch[0]["thought"] == "Thought 1"
+    assert batch[0]["thought_number"] == 1
+    assert batch[0]["total_thoughts"] == 3
+    assert batch[0]["next_thought_needed"] is True
+
+    # Check last thought
+    assert batch[2]["thought"] == "Thought 3"
+    assert batch[2]["thought_number"] == 3
+    assert batch[2]["total_thoughts"] == 3
+    assert batch[2]["next_thought_needed"] is False
+    assert "branch_id" not in batch[2]
 
     # Verify result contains expected keys
     assert "session_id" in result
@@ -126,26 +133,24 @@ def test_create_thought_branch(mock_thinking_session_class, mock_client):
     # Verify ThinkingSession was created correctly
     mock_thinking_session_class.assert_called_once_with(client=mock_client, session_id="parent-session-id")
 
-    # Verify record_thought was called for each thought
-    assert mock_session.record_thought.call_count == 2
-
-    # Check first thought call (should include branch_from_thought)
-    first_call = mock_session.record_thought.call_args_list[0][1]
-    assert first_call["thought"] == "Branch thought 1"
-    assert first_call["thought_number"] == 1
-    assert first_call["total_thoughts"] == 2
-    assert first_call["branch_id"] == "test-branch"
-    assert first_call["branch_from_thought"] == 2
-    assert first_call["next_thought_needed"] is True
-
-    # Check second thought call
-    second_call = mock_session.record_thought.call_args_list[1][1]
-    assert second_call["thought"] == "Branch thought 2"
-    assert second_call["thought_number"] == 2
-    assert second_call["total_thoughts"] == 2
-    assert second_call["branch_id"] == "test-branch"
-    assert second_call["branch_from_thought"] == 0  # Only the first thought links to parent
-    assert second_call["next_thought_needed"] is False
+    # Verify the branch was recorded as one batch
+    mock_session.record_thoughts.assert_called_once()
+    batch = mock_session.record_thoughts.call_args[0][0]
+
+    # Check first thought (should include branch_from_thought)
+    assert batch[0]["thought"] == "Branch thought 1"
+    assert batch[0]["thought_number"] == 1
+    assert batch[0]["total_thoughts"] == 2
+    assert batch[0]["branch_id"] == "test-branch"
+    assert batch[0]["branch_from_thought"] == 2
+    assert batch[0]["next_thought_needed"] is True
+
+    # Check second thought
+    assert batch[1]["thought"] == "Branch thought 2"
+    assert batch[1]["thought_number"] == 2
+    assert batch[1]["branch_id"] == "test-branch"
+    assert "branch_from_thought" not in batch[1]  # Only the first thought links to parent
+    assert batch[1]["next_thought_needed"] is False
 
     # Verify result contains expected keys
     assert "session_id" in result
@@ -167,3 +172,10 @@ def test_create_thought_branch_invalid_parent():
             parent_thought_number=0,  # Invalid, must be at least 1
             branch_thoughts=["Branch thought"],
         )
+
+
+def test_thought_batch_single_thought():
+    """A one-thought batch needs no further thought."""
+    assert thought_batch(["Only"]) == [
+        {"thought": "Only", "thought_number": 1, "total_thoughts": 1, "next_thought_needed": False}
+    ]
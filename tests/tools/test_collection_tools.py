@@ -30,6 +30,8 @@ from src.chroma_mcp.tools.collection_tools import (
     _rename_collection_impl,
     _delete_collection_impl,
     _peek_collection_impl,
+    _get_collection_stats_impl,
+    _aggregate_impl,
 )
 
 # Import Pydantic models used by the tools
@@ -41,6 +43,8 @@ from src.chroma_mcp.tools.collection_tools import (
     RenameCollectionInput,
     DeleteCollectionInput,
     PeekCollectionInput,
+    CollectionStatsInput,
+    AggregateInput,
 )
 
 # Correct import for get_collection_settings
@@ -565,6 +569,91 @@ class TestCollectionTools:
             # Check default limit for PeekCollectionInput is 10
             local_mock_collection.peek.assert_called_once_with(limit=10)
 
+    # --- _get_collection_stats_impl Tests ---
+    @pytest.mark.asyncio
+    async def test_collection_stats_success(self):
+        """Test stats are computed with the client's persist directory and the input flags."""
+        collection_name = "test_stats"
+        expected_stats = {"name": collection_name, "count": 3, "segment_bytes": 1024}
+        local_mock_collection = MagicMock()
+        local_mock_client = MagicMock()
+        local_mock_client.get_collection.return_value = local_mock_collection
+
+        with (
+            patch("src.chroma_mcp.tools.collection_tools.validate_collection_name") as mock_validate,
+            patch("src.chroma_mcp.tools.collection_tools.get_chroma_client", return_value=local_mock_client),
+            patch("src.chroma_mcp.tools.collection_tools.persist_directory", return_value="/data") as mock_persist,
+            patch(
+                "src.chroma_mcp.tools.collection_tools.get_collection_stats", return_value=expected_stats
+            ) as mock_stats,
+        ):
+            input_model = CollectionStatsInput(collection_name=collection_name, refresh=True)
+            result = await _get_collection_stats_impl(input_model)
+
+            mock_validate.assert_called_once_with(collection_name)
+            mock_persist.assert_called_once_with(local_mock_client)
+            mock_stats.assert_called_once_with(local_mock_collection, data_dir="/data", full_scan=False, refresh=True)
+            assert_successful_json_result(result, expected_stats)
+
+    @pytest.mark.asyncio
+    async def test_collection_stats_not_found(self):
+        """Test stats for a missing collection raise a not-found McpError."""
+        collection_name = "stats_missing"
+        local_mock_client = MagicMock()
+        local_mock_client.get_collection.side_effect = ValueError(f"Collection {collection_name} does not exist.")
+
+        with (
+            patch("src.chroma_mcp.tools.collection_tools.validate_collection_name"),
+            patch("src.chroma_mcp.tools.collection_tools.get_chroma_client", return_value=local_mock_client),
+        ):
+            with pytest.raises(McpError) as exc_info:
+                await _get_collection_stats_impl(CollectionStatsInput(collection_name=collection_name))
+            assert f"Collection '{collection_name}' not found." in exc_info.value.error.message
+
+    # --- _aggregate_impl Tests ---
+    @pytest.mark.asyncio
+    async def test_aggregate_passes_fields_and_filter(self):
+        """Test aggregation resolves the collection and forwards fields, filter and limit."""
+        local_mock_collection = MagicMock()
+        local_mock_client = MagicMock()
+        local_mock_client.get_collection.return_value = local_mock_collection
+        aggregates = {"records_scanned": 2, "groups": [{"key": {"status": "captured"}, "count": 2}]}
+
+        with (
+            patch("src.chroma_mcp.tools.collection_tools.validate_collection_name"),
+            patch("src.chroma_mcp.tools.collection_tools.get_chroma_client", return_value=local_mock_client),
+            patch("src.chroma_mcp.tools.collection_tools.aggregate_metadata", return_value=aggregates) as mock_agg,
+        ):
+            input_model = AggregateInput(
+                collection_name="chat_history_v1", group_by=["status"], where='{"session_id": "s1"}', limit=5
+            )
+            result = await _aggregate_impl(input_model)
+
+        mock_agg.assert_called_once_with(
+            local_mock_collection,
+            group_by=["status"],
+            numeric_fields=[],
+            distinct_fields=[],
+            where={"session_id": "s1"},
+            limit=5,
+        )
+        data = json.loads(result[0].text)
+        assert data["collection_name"] == "chat_history_v1"
+        assert data["groups"] == aggregates["groups"]
+
+    @pytest.mark.asyncio
+    async def test_aggregate_validation(self):
+        """Test aggregation rejects requests without fields and malformed filters before reading."""
+        local_mock_client = MagicMock()
+        with patch("src.chroma_mcp.tools.collection_tools.get_chroma_client", return_value=local_mock_client):
+            with pytest.raises(McpError) as exc_info:
+                await _aggregate_impl(AggregateInput(collection_name="c1"))
+            assert "Provide at least one of" in exc_info.value.error.message
+            with pytest.raises(McpError) as exc_info:
+                await _aggregate_impl(AggregateInput(collection_name="c1", group_by=["a"], where="[1]"))
+            assert "Invalid JSON format or type for 'where'" in exc_info.value.error.message
+        local_mock_client.get_collection.assert_not_called()
+
     # --- _create_collection_with_metadata_impl Tests ---
     @pytest.mark.asyncio
     # Remove all fixtures except reset_chroma_client_cache (autouse=True)
@@ -798,6 +887,45 @@ class TestCollectionTools:
             assert result_data.get("limit") == 1
             assert result_data.get("offset") == 1
 
+    @pytest.mark.asyncio
+    async def test_list_collections_pushes_down_pagination(self):
+        """Test limit/offset are passed to the client and the total comes from count_collections."""
+        page = [MagicMock(), MagicMock()]
+        page[0].name, page[1].name = "coll_c", "coll_d"
+        local_mock_client = MagicMock()
+        local_mock_client.list_collections.return_value = page
+        local_mock_client.count_collections.return_value = 10
+
+        with patch("src.chroma_mcp.tools.collection_tools.get_chroma_client", return_value=local_mock_client):
+            result_list = await _list_collections_impl(ListCollectionsInput(limit=2, offset=2))
+
+        local_mock_client.list_collections.assert_called_once_with(limit=2, offset=2)
+        result_data = assert_successful_json_result(result_list)
+        assert result_data["collection_names"] == ["coll_c", "coll_d"]
+        assert result_data["total_count"] == 10
+        assert "counts" not in result_data
+        page[0].count.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_list_collections_prefix_with_counts(self):
+        """Test name_prefix uses the sorted name index and with_counts counts only the returned page."""
+        collection_tools.invalidate_collection_names()
+        local_mock_client = MagicMock()
+        local_mock_client.list_collections.return_value = ["branch_b", "main", "branch_a", "branch_c", "other"]
+        local_mock_client.get_collection.side_effect = lambda name: MagicMock(count=MagicMock(return_value=len(name)))
+
+        with patch("src.chroma_mcp.tools.collection_tools.get_chroma_client", return_value=local_mock_client):
+            result_list = await _list_collections_impl(
+                ListCollectionsInput(name_prefix="branch_", limit=2, with_counts=True)
+            )
+
+        result_data = assert_successful_json_result(result_list)
+        assert result_data["collection_names"] == ["branch_a", "branch_b"]
+        assert result_data["total_count"] == 3
+        assert result_data["counts"] == {"branch_a": 8, "branch_b": 8}
+        assert local_mock_client.get_collection.call_count == 2
+        collection_tools.invalidate_collection_names()
+
     @pytest.mark.skip(
         reason="got empty parameter set ['limit', 'offset', 'expected_error_msg'], function test_list_collections_validation_error at /Users/dominikus/git/nold-ai/chroma_mcp_server/tests/tools/test_collection_tools.py:745"
     )
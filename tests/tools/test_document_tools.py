@@ -20,6 +20,8 @@ from mcp.shared.exceptions import McpError
 # Keep only ValidationError from errors module
 from src.chroma_mcp.utils.errors import ValidationError
 from src.chroma_mcp.tools import document_tools
+from src.chroma_mcp.utils.mmr import DEFAULT_MMR_FETCH_MULTIPLIER
+from src.chroma_mcp.utils.dedup import DuplicateMatch, dedup_metadata
 
 # Import the implementation functions directly - Updated for variants
 from src.chroma_mcp.tools.document_tools import (
@@ -40,8 +42,13 @@ from src.chroma_mcp.tools.document_tools import (
     # Update variants (Singular)
     _update_document_content_impl,
     _update_document_metadata_impl,
-    # Delete variants (Singular ID only)
+    # Delete variants
     _delete_document_by_id_impl,
+    _delete_documents_impl,
+    _patch_metadata_impl,
+    # Batch and hybrid query
+    _query_documents_batch_impl,
+    _hybrid_query_impl,
 )
 
 # Import Pydantic models - Updated for variants
@@ -63,8 +70,13 @@ from src.chroma_mcp.tools.document_tools import (
     # Update variants (Singular)
     UpdateDocumentContentInput,
     UpdateDocumentMetadataInput,
-    # Delete variants (Singular ID only)
+    # Delete variants
     DeleteDocumentByIdInput,
+    DeleteDocumentsInput,
+    PatchMetadataInput,
+    # Batch and hybrid query
+    QueryDocumentsBatchInput,
+    HybridQueryInput,
 )
 
 # Import Chroma exceptions used in mocking
@@ -141,6 +153,9 @@ def mock_chroma_client_document():
         patch("src.chroma_mcp.tools.document_tools.get_chroma_client") as mock_get_client,
         patch("src.chroma_mcp.tools.document_tools.get_embedding_function") as mock_get_embedding_function,
         patch("src.chroma_mcp.tools.document_tools.validate_collection_name") as mock_validate_name,
+        patch("src.chroma_mcp.tools.document_tools.get_server_config") as mock_get_server_config,
+        # Exact search is exercised in tests/utils/test_exact_search.py; keep the HNSW path here
+        patch("src.chroma_mcp.tools.document_tools.exact_query", return_value=None),
     ):
         # Use AsyncMock for the client and collection methods if they are awaited
         # But the underlying Chroma client is synchronous, so MagicMock is appropriate
@@ -177,6 +192,7 @@ def mock_chroma_client_document():
         mock_get_client.return_value = mock_client_instance
         mock_get_embedding_function.return_value = MagicMock(name="mock_embedding_function")
         mock_validate_name.return_value = None  # Assume valid name by default
+        mock_get_server_config.return_value = MagicMock(embedding_function_name="default")
 
         yield mock_client_instance, mock_collection_instance, mock_validate_name  # Yield validator too
 
@@ -489,6 +505,41 @@ class TestDocumentTools:
         mock_client.get_collection.assert_not_called()
         mock_collection.add.assert_not_called()
 
+    @pytest.mark.asyncio
+    async def test_add_document_dedup_on_add(self, mock_chroma_client_document):
+        """With dedup_on_add, duplicates are recorded on the existing entry and new documents carry hashes."""
+        mock_client, mock_collection, mock_validate = mock_chroma_client_document
+        config = MagicMock(dedup_on_add=True, dedup_max_distance=0.2)
+        match = DuplicateMatch("existing", "near", hamming=1, metadata={"duplicate_count": 1})
+
+        with (
+            patch("src.chroma_mcp.tools.document_tools.get_server_config_if_set", return_value=config),
+            patch("src.chroma_mcp.tools.document_tools.find_duplicate", return_value=match) as mock_find,
+        ):
+            input_model = AddDocumentWithIDInput(collection_name="test_dedup", document="Error at line 42", id="new")
+            result = await _add_document_with_id_impl(input_model)
+
+        assert_successful_json_result(result, {"duplicate_of": "existing", "match": "near"})
+        mock_find.assert_called_once_with(mock_collection, "Error at line 42", max_distance=0.2)
+        mock_collection.add.assert_not_called()
+        update_kwargs = mock_collection.update.call_args.kwargs
+        assert update_kwargs["ids"] == ["existing"]
+        assert update_kwargs["metadatas"][0]["duplicate_count"] == 2
+        assert update_kwargs["metadatas"][0]["duplicate_ids"] == "new"
+
+        with (
+            patch("src.chroma_mcp.tools.document_tools.get_server_config_if_set", return_value=config),
+            patch("src.chroma_mcp.tools.document_tools.find_duplicate", return_value=None),
+        ):
+            input_model = AddDocumentWithIDAndMetadataInput(
+                collection_name="test_dedup", document="Error at line 42", id="new", metadata='{"k": "v"}'
+            )
+            result = await _add_document_with_id_and_metadata_impl(input_model)
+
+        assert_successful_json_result(result, {"added_id": "new"})
+        added_metadata = mock_collection.add.call_args.kwargs["metadatas"][0]
+        assert added_metadata == {"k": "v", **dedup_metadata("Error at line 42")}
+
     # --- Query Documents Tests ---
 
     @pytest.mark.asyncio
@@ -1153,6 +1204,38 @@ class TestDocumentTools:
         parsed_result = assert_successful_json_result(result)
         assert parsed_result.get("ids") == expected_get_result["ids"]
 
+    @pytest.mark.asyncio
+    async def test_get_documents_where_doc_uses_fts_ids(self, mock_chroma_client_document):
+        """Test that a filter resolved by the FTS accelerator is passed as an ID restriction."""
+        _, mock_collection, _ = mock_chroma_client_document
+        mock_collection.get.return_value = {"ids": ["a", "b"], "documents": ["x", "y"]}
+        input_model = GetDocumentsWithDocumentFilterInput(
+            collection_name="fts_coll", where_document=json.dumps({"$contains": "x"}), limit=5
+        )
+
+        with patch(
+            "src.chroma_mcp.tools.document_tools.resolve_document_filter", return_value={"b", "a"}
+        ) as mock_resolve:
+            result = await _get_documents_with_document_filter_impl(input_model)
+
+        mock_resolve.assert_called_once_with("fts_coll", mock_collection, {"$contains": "x"})
+        mock_collection.get.assert_called_once_with(ids=["a", "b"], limit=5, offset=None)
+        assert assert_successful_json_result(result)["ids"] == ["a", "b"]
+
+    @pytest.mark.asyncio
+    async def test_query_where_doc_fts_no_matches_skips_chroma(self, mock_chroma_client_document):
+        """Test that an empty FTS match returns empty result sets without querying Chroma."""
+        _, mock_collection, _ = mock_chroma_client_document
+        input_model = QueryDocumentsWithDocumentFilterInput(
+            collection_name="fts_coll", query_texts=["q1", "q2"], where_document=json.dumps({"$contains": "none"})
+        )
+
+        with patch("src.chroma_mcp.tools.document_tools.resolve_document_filter", return_value=set()):
+            result = await _query_documents_with_document_filter_impl(input_model)
+
+        mock_collection.query.assert_not_called()
+        assert assert_successful_json_result(result)["ids"] == [[], []]
+
     # Test for GetAllDocumentsInput - similar structure
     @pytest.mark.asyncio
     async def test_get_all_documents_success(self, mock_chroma_client_document):
@@ -1457,6 +1540,121 @@ class TestDocumentTools:
         mock_client.get_collection.assert_called_once_with(name=collection_name)
         mock_collection.delete.assert_called_once()  # Verify delete was attempted
 
+    @pytest.mark.asyncio
+    async def test_delete_documents_by_filter_in_batches(self, mock_chroma_client_document):
+        """Test that filter deletes resolve IDs first, then delete and sync caches once per batch."""
+        _, mock_collection, _ = mock_chroma_client_document
+        mock_collection.get.return_value = {"ids": ["a", "b", "c", "d", "e"]}
+
+        with patch("src.chroma_mcp.tools.document_tools._on_documents_deleted") as mock_on_deleted:
+            input_model = DeleteDocumentsInput(collection_name="cleanup", where='{"status": "stale"}', batch_size=2)
+            data = assert_successful_json_result(await _delete_documents_impl(input_model))
+
+        mock_collection.get.assert_called_once_with(
+            where={"status": "stale"}, where_document=None, include=[], limit=1000, offset=0
+        )
+        assert [c.kwargs["ids"] for c in mock_collection.delete.call_args_list] == [["a", "b"], ["c", "d"], ["e"]]
+        assert [c.args[1] for c in mock_on_deleted.call_args_list] == [["a", "b"], ["c", "d"], ["e"]]
+        assert data["matched"] == 5 and data["deleted"] == 5 and data["batches"] == 3
+        assert data["dry_run"] is False
+
+    @pytest.mark.asyncio
+    async def test_delete_documents_dry_run_counts_only(self, mock_chroma_client_document):
+        """Test that dry runs report matches without deleting."""
+        _, mock_collection, _ = mock_chroma_client_document
+        mock_collection.get.return_value = {"ids": ["a", "c"]}
+
+        input_model = DeleteDocumentsInput(
+            collection_name="cleanup", ids=["a", "b", "c", "a"], where_document='{"$contains": "tmp"}', dry_run=True
+        )
+        data = assert_successful_json_result(await _delete_documents_impl(input_model))
+
+        mock_collection.get.assert_called_once_with(
+            ids=["a", "b", "c"], where=None, where_document={"$contains": "tmp"}, include=[]
+        )
+        mock_collection.delete.assert_not_called()
+        assert data == {"collection_name": "cleanup", "matched": 2, "dry_run": True, "sample_ids": ["a", "c"]}
+
+    @pytest.mark.asyncio
+    async def test_delete_documents_requires_ids_or_filter(self, mock_chroma_client_document):
+        """Test that an unfiltered delete-everything request is rejected."""
+        mock_client, mock_collection, _ = mock_chroma_client_document
+        with assert_raises_mcp_error("Provide `ids`, `where` or `where_document`"):
+            await _delete_documents_impl(DeleteDocumentsInput(collection_name="cleanup"))
+        with assert_raises_mcp_error("Invalid JSON format or type for 'where'"):
+            await _delete_documents_impl(DeleteDocumentsInput(collection_name="cleanup", where="[1]"))
+        mock_client.get_collection.assert_not_called()
+        mock_collection.delete.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_delete_documents_reports_progress(self, mock_chroma_client_document):
+        """Test that a progress notification is sent per batch when the caller passed a progress token."""
+        _, mock_collection, _ = mock_chroma_client_document
+        mock_collection.get.return_value = {"ids": ["a", "b", "c"]}
+        session = MagicMock()
+        session.send_progress_notification = AsyncMock()
+        ctx = MagicMock(session=session)
+        ctx.meta.progressToken = "tok"
+
+        token = document_tools.request_ctx.set(ctx)
+        try:
+            await _delete_documents_impl(
+                DeleteDocumentsInput(collection_name="cleanup", ids=["a", "b", "c"], batch_size=2)
+            )
+        finally:
+            document_tools.request_ctx.reset(token)
+
+        progress = [c.args[:2] for c in session.send_progress_notification.call_args_list]
+        assert progress == [("tok", 2), ("tok", 3)]
+
+    @pytest.mark.asyncio
+    async def test_patch_metadata_merges_in_one_get_and_update(self, mock_chroma_client_document):
+        """Test that per-ID patches are merged against one read and written back in one update."""
+        _, mock_collection, _ = mock_chroma_client_document
+        mock_collection.get.return_value = {
+            "ids": ["a", "b"],
+            "metadatas": [{"status": "captured", "related_chat_ids": "c1,c2"}, {"status": "done", "stale": 1}],
+        }
+        patches = {
+            "a": {"status": "done", "related_chat_ids": {"$add": ["c2", "c3"], "$remove": ["c1"]}},
+            "b": {"status": "done", "stale": None},
+            "missing": {"status": "done"},
+        }
+
+        input_model = PatchMetadataInput(collection_name="chats", patches=json.dumps(patches))
+        data = assert_successful_json_result(await _patch_metadata_impl(input_model))
+
+        mock_collection.get.assert_called_once_with(ids=["a", "b", "missing"], include=["metadatas"])
+        mock_collection.update.assert_called_once_with(
+            ids=["a", "b"], metadatas=[{"status": "done", "related_chat_ids": "c2,c3"}, {"stale": None}]
+        )
+        assert data == {"collection_name": "chats", "matched": 2, "updated": 2, "missing_ids": ["missing"]}
+
+    @pytest.mark.asyncio
+    async def test_patch_metadata_with_where_skips_unchanged(self, mock_chroma_client_document):
+        """Test that one patch applies to every `where` match and unchanged entries are not written."""
+        _, mock_collection, _ = mock_chroma_client_document
+        mock_collection.get.return_value = {"ids": ["a", "b"], "metadatas": [{"status": "old"}, {"status": "new"}]}
+
+        input_model = PatchMetadataInput(collection_name="chats", patch='{"status": "new"}', where='{"session": "s1"}')
+        data = assert_successful_json_result(await _patch_metadata_impl(input_model))
+
+        mock_collection.get.assert_called_once_with(where={"session": "s1"}, include=["metadatas"])
+        mock_collection.update.assert_called_once_with(ids=["a"], metadatas=[{"status": "new"}])
+        assert data["matched"] == 2 and data["updated"] == 1
+
+    @pytest.mark.asyncio
+    async def test_patch_metadata_validation(self, mock_chroma_client_document):
+        """Test that ambiguous requests and unknown set operators are rejected before any read."""
+        mock_client, _, _ = mock_chroma_client_document
+        with assert_raises_mcp_error("Provide either `patches`, or `patch` together with `where`."):
+            await _patch_metadata_impl(PatchMetadataInput(collection_name="chats", patch='{"status": "x"}'))
+        with assert_raises_mcp_error("Invalid metadata patch"):
+            await _patch_metadata_impl(
+                PatchMetadataInput(collection_name="chats", patches='{"a": {"ids": {"$union": ["x"]}}}')
+            )
+        mock_client.get_collection.assert_not_called()
+
     # --- Generic Error Handling Test (Updated for singular ops) ---
 
     @pytest.mark.asyncio
@@ -1677,3 +1875,283 @@ class TestDocumentTools:
         mock_collection.get.assert_called_once()  # Verify get was attempted
 
     # --- End: Tests for New Include Variants ---
+
+    # --- Start: Tests for Batch Query ---
+
+    @pytest.mark.asyncio
+    async def test_query_batch_single_embedding_and_query_call(self, mock_chroma_client_document):
+        """Test that a batch query embeds all texts once and issues a single collection.query."""
+        mock_client, mock_collection, mock_validate = mock_chroma_client_document
+        collection_name = "batch_coll"
+        query_texts = ["alpha", "beta", "gamma"]
+        mock_ef = MagicMock(return_value=[[0.1, 0.2], [0.3, 0.4], [0.5, 0.6]])
+        mock_collection._embedding_function = mock_ef
+        mock_collection.query.return_value = {
+            "ids": [["a1"], ["b1"], ["c1"]],
+            "documents": [["doc a"], ["doc b"], ["doc c"]],
+            "metadatas": [[{"k": 1}], [{"k": 2}], [{"k": 3}]],
+            "distances": [[0.1], [0.2], [0.3]],
+        }
+
+        input_model = QueryDocumentsBatchInput(collection_name=collection_name, query_texts=query_texts, n_results=1)
+        result = await _query_documents_batch_impl(input_model)
+
+        mock_validate.assert_called_once_with(collection_name)
+        mock_client.get_collection.assert_called_once_with(name=collection_name)
+        mock_ef.assert_called_once_with(query_texts)
+        document_tools.get_embedding_function.return_value.assert_not_called()
+        mock_collection.query.assert_called_once_with(
+            query_embeddings=mock_ef.return_value,
+            n_results=1,
+            where=None,
+            include=["documents", "metadatas", "distances"],
+        )
+        data = assert_successful_json_result(result)
+        assert data["num_queries"] == 3
+        assert [r["query"] for r in data["results"]] == query_texts
+        assert data["results"][1]["ids"] == ["b1"]
+        assert data["results"][2]["metadatas"] == [{"k": 3}]
+
+    @pytest.mark.asyncio
+    async def test_query_batch_falls_back_to_server_embedding_function(self, mock_chroma_client_document):
+        """Test that a collection without an embedding function is queried with the server default."""
+        _, mock_collection, _ = mock_chroma_client_document
+        mock_collection._embedding_function = None
+        document_tools.get_embedding_function.return_value.return_value = [[0.1, 0.2]]
+        input_model = QueryDocumentsBatchInput(collection_name="batch_no_ef", query_texts=["q"])
+
+        await _query_documents_batch_impl(input_model)
+
+        document_tools.get_embedding_function.return_value.assert_called_once_with(["q"])
+        assert mock_collection.query.call_args.kwargs["query_embeddings"] == [[0.1, 0.2]]
+
+    @pytest.mark.asyncio
+    async def test_query_batch_dedup_keeps_closest_query(self, mock_chroma_client_document):
+        """Test that dedup keeps a shared ID only for the query it is closest to."""
+        _, mock_collection, _ = mock_chroma_client_document
+        mock_collection._embedding_function = MagicMock(return_value=[[0.1], [0.2]])
+        mock_collection.query.return_value = {
+            "ids": [["shared", "a1"], ["shared", "b1"]],
+            "documents": [["s", "a"], ["s", "b"]],
+            "metadatas": [[{}, {}], [{}, {}]],
+            "distances": [[0.4, 0.5], [0.1, 0.6]],
+        }
+
+        input_model = QueryDocumentsBatchInput(
+            collection_name="batch_dedup", query_texts=["q1", "q2"], n_results=2, dedup=True
+        )
+        data = assert_successful_json_result(await _query_documents_batch_impl(input_model))
+
+        assert data["deduplicated"] is True
+        assert data["results"][0]["ids"] == ["a1"]
+        assert data["results"][0]["distances"] == [0.5]
+        assert data["results"][1]["ids"] == ["shared", "b1"]
+
+    @pytest.mark.asyncio
+    async def test_query_batch_passes_where_filter(self, mock_chroma_client_document):
+        """Test that a where filter is parsed and applied to the batched query."""
+        _, mock_collection, _ = mock_chroma_client_document
+        mock_collection.query.return_value = {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}
+
+        input_model = QueryDocumentsBatchInput(
+            collection_name="batch_where", query_texts=["q"], where='{"file_path": "a.py"}'
+        )
+        await _query_documents_batch_impl(input_model)
+
+        assert mock_collection.query.call_args.kwargs["where"] == {"file_path": "a.py"}
+
+    @pytest.mark.asyncio
+    async def test_query_batch_invalid_where(self, mock_chroma_client_document):
+        """Test that invalid where JSON is rejected before querying."""
+        _, mock_collection, _ = mock_chroma_client_document
+        input_model = QueryDocumentsBatchInput(collection_name="batch_bad", query_texts=["q"], where="{bad")
+        with assert_raises_mcp_error("Invalid JSON format or type for 'where' filter"):
+            await _query_documents_batch_impl(input_model)
+        mock_collection.query.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_query_batch_collection_not_found(self, mock_chroma_client_document):
+        """Test batch query when the collection does not exist."""
+        mock_client, _, _ = mock_chroma_client_document
+        mock_client.get_collection.side_effect = ValueError("Collection batch_nf does not exist.")
+        input_model = QueryDocumentsBatchInput(collection_name="batch_nf", query_texts=["q"])
+        with assert_raises_mcp_error("Collection 'batch_nf' not found."):
+            await _query_documents_batch_impl(input_model)
+
+    # --- End: Tests for Batch Query ---
+
+    # --- Start: Tests for Hybrid Query ---
+
+    @pytest.mark.asyncio
+    async def test_hybrid_query_fuses_vector_and_lexical(self, mock_chroma_client_document):
+        """Test that hybrid query merges both rankings with RRF and fetches lexical-only hits."""
+        mock_client, mock_collection, mock_validate = mock_chroma_client_document
+        mock_collection.query.return_value = {
+            "ids": [["v1", "both"]],
+            "documents": [["vector doc", "shared doc"]],
+            "metadatas": [[{"src": "v"}, {"src": "s"}]],
+            "distances": [[0.1, 0.2]],
+        }
+        mock_collection.get.return_value = {"ids": ["lex1"], "documents": ["lexical doc"], "metadatas": [{"src": "l"}]}
+        mock_index = MagicMock()
+        mock_index.search.return_value = [("both", 3.0), ("lex1", 2.0)]
+
+        with patch("src.chroma_mcp.tools.document_tools.ensure_lexical_index", return_value=mock_index):
+            input_model = HybridQueryInput(collection_name="hybrid_coll", query_text="parse_config", n_results=3)
+            data = assert_successful_json_result(await _hybrid_query_impl(input_model))
+
+        mock_validate.assert_called_once_with("hybrid_coll")
+        mock_client.get_collection.assert_called_once_with(name="hybrid_coll")
+        mock_collection._embedding_function.assert_called_once_with(["parse_config"])
+        assert (
+            mock_collection.query.call_args.kwargs["query_embeddings"]
+            == mock_collection._embedding_function.return_value
+        )
+        assert data["ids"][0] == "both"  # Ranked by both retrievers
+        assert set(data["ids"]) == {"both", "v1", "lex1"}
+        lex_pos = data["ids"].index("lex1")
+        assert data["documents"][lex_pos] == "lexical doc"
+        assert data["vector_ranks"][lex_pos] is None
+        assert data["lexical_ranks"][lex_pos] == 2
+        mock_collection.get.assert_called_once_with(ids=["lex1"], include=["documents", "metadatas"])
+
+    @pytest.mark.asyncio
+    async def test_hybrid_query_builds_index_on_first_use(self, mock_chroma_client_document):
+        """Test that a missing lexical index is built from the collection."""
+        _, mock_collection, _ = mock_chroma_client_document
+        mock_collection.query.return_value = {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}
+        built_index = MagicMock()
+        built_index.search.return_value = []
+
+        with (
+            patch("src.chroma_mcp.utils.lexical_index.get_lexical_index", return_value=None),
+            patch("src.chroma_mcp.utils.lexical_index.build_lexical_index", return_value=built_index) as mock_build,
+        ):
+            input_model = HybridQueryInput(collection_name="hybrid_new", query_text="anything")
+            data = assert_successful_json_result(await _hybrid_query_impl(input_model))
+
+        mock_build.assert_called_once_with("hybrid_new", mock_collection)
+        assert data["ids"] == []
+
+    @pytest.mark.asyncio
+    async def test_hybrid_query_collection_not_found(self, mock_chroma_client_document):
+        """Test hybrid query when the collection does not exist."""
+        mock_client, _, _ = mock_chroma_client_document
+        mock_client.get_collection.side_effect = ValueError("Collection hybrid_nf does not exist.")
+        input_model = HybridQueryInput(collection_name="hybrid_nf", query_text="q")
+        with assert_raises_mcp_error("Collection 'hybrid_nf' not found."):
+            await _hybrid_query_impl(input_model)
+
+    @pytest.mark.asyncio
+    async def test_write_paths_sync_lexical_index(self, mock_chroma_client_document):
+        """Test that add, update and delete keep the lexical index in sync."""
+        with (
+            patch("src.chroma_mcp.tools.document_tools.sync_lexical_index_add") as mock_sync_add,
+            patch("src.chroma_mcp.tools.document_tools.sync_lexical_index_delete") as mock_sync_delete,
+        ):
+            await _add_document_with_id_impl(
+                AddDocumentWithIDInput(collection_name="sync_coll", document="new text", id="d1")
+            )
+            await _update_document_content_impl(
+                UpdateDocumentContentInput(collection_name="sync_coll", id="d1", document="changed")
+            )
+            await _delete_document_by_id_impl(DeleteDocumentByIdInput(collection_name="sync_coll", id="d1"))
+
+        # No index is loaded for the collection, so no versions are taken around the writes
+        assert mock_sync_add.call_args_list == [
+            call("sync_coll", ["d1"], ["new text"], version_before=None, version_after=None),
+            call("sync_coll", ["d1"], ["changed"], version_before=None, version_after=None),
+        ]
+        mock_sync_delete.assert_called_once_with("sync_coll", ["d1"], version_before=None, version_after=None)
+
+    # --- End: Tests for Hybrid Query ---
+
+    # --- Start: Tests for MMR Diversity ---
+
+    @pytest.mark.asyncio
+    async def test_query_where_with_diversity_overfetches_and_reranks(self, mock_chroma_client_document):
+        """Test that diversity over-fetches candidates with embeddings and keeps the MMR selection."""
+        _, mock_collection, _ = mock_chroma_client_document
+        mock_collection._embedding_function = MagicMock(return_value=[[1.0, 0.0]])
+        mock_collection.query.return_value = {
+            "ids": [["a", "a_overlap", "b"]],
+            "documents": [["chunk a", "chunk a again", "chunk b"]],
+            "metadatas": [[{"file": "x.py"}, {"file": "x.py"}, {"file": "y.py"}]],
+            "distances": [[0.1, 0.11, 0.3]],
+            "embeddings": [[[1.0, 0.05], [1.0, 0.06], [0.7, 0.7]]],
+        }
+        input_model = QueryDocumentsWithWhereFilterInput(
+            collection_name="mmr_coll", query_texts=["q"], where='{"lang": "py"}', n_results=2, diversity=0.3
+        )
+
+        data = assert_successful_json_result(await _query_documents_with_where_filter_impl(input_model))
+
+        mock_collection.query.assert_called_once_with(
+            query_embeddings=[[1.0, 0.0]],
+            n_results=2 * DEFAULT_MMR_FETCH_MULTIPLIER,
+            include=["documents", "metadatas", "distances", "embeddings"],
+            where={"lang": "py"},
+        )
+        assert data["ids"] == [["a", "b"]]
+        assert data["metadatas"] == [[{"file": "x.py"}, {"file": "y.py"}]]
+        assert "embeddings" not in data
+        assert data["stats"]["candidates_fetched"] == 3
+        assert {"fetch_ms", "rerank_ms", "diversity"} <= set(data["stats"])
+        # Queries are embedded in the collection's space, not the server default's
+        mock_collection._embedding_function.assert_called_once_with(["q"])
+        document_tools.get_embedding_function.return_value.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_query_with_diversity_falls_back_to_server_embedding_function(self, mock_chroma_client_document):
+        """Test that a collection without an attached embedding function uses the server default."""
+        _, mock_collection, _ = mock_chroma_client_document
+        mock_collection._embedding_function = None
+        document_tools.get_embedding_function.return_value.return_value = [[1.0, 0.0]]
+        mock_collection.query.return_value = {"ids": [["a"]], "distances": [[0.1]], "embeddings": [[[1.0, 0.0]]]}
+        input_model = QueryDocumentsWithWhereFilterInput(
+            collection_name="mmr_coll", query_texts=["q"], where="{}", n_results=1, diversity=0.5
+        )
+
+        data = assert_successful_json_result(await _query_documents_with_where_filter_impl(input_model))
+
+        assert mock_collection.query.call_args.kwargs["query_embeddings"] == [[1.0, 0.0]]
+        assert data["ids"] == [["a"]]
+
+    @pytest.mark.asyncio
+    async def test_query_without_diversity_is_unchanged(self, mock_chroma_client_document):
+        """Test that omitting diversity keeps the plain query path (no embeddings, no stats)."""
+        _, mock_collection, _ = mock_chroma_client_document
+        mock_collection.query.return_value = {"ids": [["a"]], "distances": [[0.1]]}
+        input_model = QueryDocumentsWithWhereFilterInput(collection_name="mmr_coll", query_texts=["q"], where="{}")
+
+        data = assert_successful_json_result(await _query_documents_with_where_filter_impl(input_model))
+
+        assert "query_embeddings" not in mock_collection.query.call_args.kwargs
+        assert "stats" not in data
+
+    # --- End: Tests for MMR Diversity ---
+
+    # --- Start: Tests for Exact Search ---
+
+    @pytest.mark.asyncio
+    async def test_batch_query_uses_exact_search_for_small_collections(self, mock_chroma_client_document):
+        """Test that an unfiltered batch query is answered by exact search when it applies."""
+        _, mock_collection, _ = mock_chroma_client_document
+        mock_collection._embedding_function = MagicMock(return_value=[[0.1, 0.2]])
+        exact_result = {"ids": [["e1"]], "documents": [["exact doc"]], "metadatas": [[{}]], "distances": [[0.0]]}
+
+        with patch("src.chroma_mcp.tools.document_tools.exact_query", return_value=exact_result) as mock_exact:
+            input_model = QueryDocumentsBatchInput(collection_name="small_coll", query_texts=["q"], n_results=3)
+            data = assert_successful_json_result(await _query_documents_batch_impl(input_model))
+
+        mock_exact.assert_called_once_with(
+            "small_coll",
+            mock_collection,
+            query_embeddings=[[0.1, 0.2]],
+            n_results=3,
+            include=["documents", "metadatas", "distances"],
+        )
+        mock_collection.query.assert_not_called()
+        assert data["results"][0]["ids"] == ["e1"]
+
+    # --- End: Tests for Exact Search ---
@@ -10,12 +10,21 @@ from typing import Dict, Any, List, Optional
 from datetime import datetime
 from unittest.mock import patch, MagicMock, ANY
 
+import chromadb
+import numpy as np
+from chromadb.api.client import SharedSystemClient
+from chromadb.api.types import EmbeddingFunction
+from chromadb.config import Settings
+
 from mcp import types as mcp_types
 from mcp.shared.exceptions import McpError
 from mcp.types import INVALID_PARAMS, INTERNAL_ERROR, ErrorData
 
 from src.chroma_mcp.utils.errors import ValidationError
 from src.chroma_mcp.types import ChromaClientConfig
+from src.chroma_mcp.utils import exact_search
+from src.chroma_mcp.utils.session_index import reset_session_index
+from src.chroma_mcp.utils.session_embeddings import reset_session_embeddings
 from src.chroma_mcp.tools.thinking_tools import (
     ThoughtMetadata,  # Import if needed for checks
     THOUGHTS_COLLECTION,  # Import constants
@@ -31,6 +40,10 @@ from src.chroma_mcp.tools.thinking_tools import (
     FindSimilarSessionsInput,
     SequentialThinkingWithCustomDataInput,
     _sequential_thinking_with_custom_data_impl,
+    RecordThoughtsInput,
+    _record_thoughts_impl,
+    GetBranchPathInput,
+    _get_branch_path_impl,
 )
 
 # --- Helper Functions (Copied from test_collection_tools.py) ---
@@ -93,7 +106,10 @@ def mock_chroma_client_thinking():
     with (
         patch("src.chroma_mcp.tools.thinking_tools.get_chroma_client") as mock_get_client,
         patch("src.chroma_mcp.tools.thinking_tools.get_server_config") as mock_tt_get_server_config,
+        patch("src.chroma_mcp.tools.thinking_tools.exact_query", return_value=None),
     ):
+        reset_session_index()
+        reset_session_embeddings()
 
         # Setup a default ChromaClientConfig for the tests
         # This is what get_server_config() will return when called by the _impl functions
@@ -150,7 +166,7 @@ class TestThinkingTools:
         result_data = assert_successful_json_list_result(result)
 
         # Assertions on mocks
-        mock_client.get_or_create_collection.assert_called_once_with(name=THOUGHTS_COLLECTION, embedding_function=ANY)
+        mock_client.get_or_create_collection.assert_any_call(name=THOUGHTS_COLLECTION, embedding_function=ANY)
         mock_collection.add.assert_called_once()
         call_args = mock_collection.add.call_args
         assert call_args.kwargs["documents"] == ["Initial thought"]
@@ -167,6 +183,84 @@ class TestThinkingTools:
         assert result_data.get("session_id") == session_id
         assert result_data.get("previous_thoughts_count") == 0  # Check count
 
+    @pytest.mark.asyncio
+    async def test_sequential_thinking_maintains_session_entry(self, mock_chroma_client_thinking):
+        """A new session's entry reuses the thought's embedding; later thoughts only mark it dirty."""
+        mock_client, mock_collection, mock_sessions_collection = mock_chroma_client_thinking
+        mock_sessions_collection.get.return_value = {"ids": [], "metadatas": []}
+
+        await _sequential_thinking_impl(
+            SequentialThinkingInput(thought="First", thought_number=1, total_thoughts=2, session_id="s1")
+        )
+
+        thought_embeddings = mock_collection.add.call_args.kwargs["embeddings"]
+        mock_sessions_collection.add.assert_called_once_with(
+            ids=["s1"],
+            documents=["First"],
+            embeddings=[thought_embeddings[0]],
+            metadatas=[{"thought_count": 1, "dirty": False, "branch_tree": '{"b":{"":[0,[1]]},"n":1}'}],
+        )
+
+        mock_sessions_collection.get.return_value = {"ids": ["s1"], "metadatas": [{"thought_count": 1}]}
+        mock_collection.get.return_value = {"ids": [], "metadatas": [], "documents": []}
+        await _sequential_thinking_impl(
+            SequentialThinkingInput(thought="Second", thought_number=2, total_thoughts=2, session_id="s1")
+        )
+
+        mock_sessions_collection.update.assert_called_once_with(
+            ids=["s1"], metadatas=[{"thought_count": 2, "dirty": True}]
+        )
+        mock_sessions_collection.add.assert_called_once()  # Not re-embedded on the write path
+
+    @pytest.mark.asyncio
+    async def test_record_thoughts_batch(self, mock_chroma_client_thinking):
+        """A batch is embedded once and written with a single add; the session entry is updated once."""
+        mock_client, mock_collection, mock_sessions_collection = mock_chroma_client_thinking
+        mock_sessions_collection.get.return_value = {"ids": [], "metadatas": []}
+        embed_calls = []
+
+        def embed(documents):
+            embed_calls.append(list(documents))
+            return [[1.0, 0.0] for _ in documents]
+
+        input_data = RecordThoughtsInput(
+            session_id="s1",
+            thoughts=[
+                {"thought": "First", "thought_number": 1},
+                {"thought": "Second", "thought_number": 2, "custom_data": '{"tag": "x"}'},
+                {"thought": "Alt", "thought_number": 2, "branch_id": "b", "branch_from_thought": 1},
+            ],
+        )
+        with patch("src.chroma_mcp.tools.thinking_tools.get_embedding_function", return_value=embed):
+            result = await _record_thoughts_impl(input_data)
+
+        result_data = assert_successful_json_list_result(result)
+        assert result_data["thought_ids"] == ["thought_s1_1", "thought_s1_2", "thought_s1_2_branch_b"]
+        assert embed_calls == [["First", "Second", "Alt"]]
+        mock_collection.add.assert_called_once()
+        metadatas = mock_collection.add.call_args.kwargs["metadatas"]
+        assert [m["total_thoughts"] for m in metadatas] == [3, 3, 3]
+        assert metadatas[1]["custom:tag"] == "x"
+        assert metadatas[2]["branch_id"] == "b" and metadatas[2]["branch_from_thought"] == 1
+        mock_sessions_collection.add.assert_called_once_with(
+            ids=["s1"],
+            documents=["First Second Alt"],
+            embeddings=[ANY],
+            metadatas=[{"thought_count": 3, "dirty": True, "branch_tree": '{"b":{"":[0,[1,2]],"b":[1,[2]]},"n":3}'}],
+        )
+
+    @pytest.mark.asyncio
+    async def test_record_thoughts_rejects_duplicates(self, mock_chroma_client_thinking):
+        """Two entries mapping to the same thought ID are rejected before anything is written."""
+        _, mock_collection, _ = mock_chroma_client_thinking
+        input_data = RecordThoughtsInput(
+            session_id="s1", thoughts=[{"thought": "a", "thought_number": 1}, {"thought": "b", "thought_number": 1}]
+        )
+
+        with assert_raises_mcp_error("Duplicate thought in batch: thought_s1_1"):
+            await _record_thoughts_impl(input_data)
+        mock_collection.add.assert_not_called()
+
     @pytest.mark.asyncio  # Mark as async
     async def test_sequential_thinking_existing_session(self, mock_chroma_client_thinking):
         """Test recording subsequent thoughts in an existing session."""
@@ -193,12 +287,12 @@ class TestThinkingTools:
 
         # Assertions on mocks
         # Use keyword argument 'name'
-        mock_client.get_or_create_collection.assert_called_once_with(name=THOUGHTS_COLLECTION, embedding_function=ANY)
+        mock_client.get_or_create_collection.assert_any_call(name=THOUGHTS_COLLECTION, embedding_function=ANY)
         mock_collection.add.assert_called_once()
         # Assert the get call for previous thoughts
         mock_collection.get.assert_called_once()
         call_args, call_kwargs = mock_collection.get.call_args
-        assert call_kwargs.get("where") == {"session_id": session_id}
+        assert call_kwargs.get("where") == {"$and": [{"session_id": session_id}, {"thought_number": {"$lt": 2}}]}
 
     @pytest.mark.asyncio  # Mark as async
     async def test_sequential_thinking_new_branch(self, mock_chroma_client_thinking):
@@ -248,8 +342,14 @@ class TestThinkingTools:
         # Assertions on mocks
         mock_collection.get.assert_called_once()
         get_call_args = mock_collection.get.call_args
-        # Updated expected_where to reflect the simplified get call
-        expected_where = {"session_id": session_id}  # Fetch all session thoughts, filter in Python
+        # Thoughts before this one, on the branch or on the trunk before the branch point
+        expected_where = {
+            "$and": [
+                {"session_id": session_id},
+                {"thought_number": {"$lt": 3}},
+                {"$or": [{"branch_id": branch_id}, {"thought_number": {"$lt": branch_from}}]},
+            ]
+        }
         assert get_call_args.kwargs["where"] == expected_where
 
         mock_collection.add.assert_called_once()
@@ -329,7 +429,7 @@ class TestThinkingTools:
         mock_client.get_collection.assert_called_once_with(name=THOUGHTS_COLLECTION, embedding_function=ANY)
         # Expect n_results=5 (Pydantic default)
         mock_collection.query.assert_called_once_with(
-            query_texts=[query], n_results=5, where=None, include=["documents", "metadatas", "distances"]
+            query_embeddings=ANY, n_results=5, where=None, include=["documents", "metadatas", "distances"]
         )
 
         # Assertions on result data
@@ -375,7 +475,7 @@ class TestThinkingTools:
 
         # Check query was called with the where clause
         mock_collection.query.assert_called_once_with(
-            query_texts=[session_id_to_find], n_results=3, where={"session_id": session_id_to_find}, include=ANY
+            query_embeddings=ANY, n_results=3, where={"session_id": session_id_to_find}, include=ANY
         )
 
         # Assertions on result data (mock doesn't filter, so we expect all 3, but check metadata)
@@ -384,6 +484,118 @@ class TestThinkingTools:
         # assert result_data["similar_thoughts"][1].get("metadata", {}).get("session_id") == "s2" # Mock doesn't filter
         assert result_data["similar_thoughts"][2].get("metadata", {}).get("session_id") == "s1"
 
+    @pytest.mark.asyncio
+    async def test_find_similar_thoughts_pushes_filters_into_where(self, mock_chroma_client_thinking):
+        """Session, branch and time window restrictions become one `where` filter."""
+        _, mock_collection, _ = mock_chroma_client_thinking
+        mock_collection.query.return_value = {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}
+
+        await _find_similar_thoughts_impl(
+            FindSimilarThoughtsInput(
+                query="idea", session_id="s1", branch_id="alt", since_timestamp=100, until_timestamp=200
+            )
+        )
+
+        assert mock_collection.query.call_args.kwargs["where"] == {
+            "$and": [
+                {"session_id": "s1"},
+                {"branch_id": "alt"},
+                {"timestamp": {"$gte": 100}},
+                {"timestamp": {"$lte": 200}},
+            ]
+        }
+
+    @pytest.mark.asyncio
+    async def test_find_similar_thoughts_overfetches_for_trunk_only(self, mock_chroma_client_thinking):
+        """Branch thoughts dropped after the query are replaced by fetching more candidates."""
+        _, mock_collection, _ = mock_chroma_client_thinking
+        branch_meta = {"session_id": "s1", "branch_id": "b"}
+        mock_collection.query.side_effect = [
+            {
+                "ids": [["b1", "b2"]],
+                "documents": [["branch 1", "branch 2"]],
+                "metadatas": [[branch_meta, branch_meta]],
+                "distances": [[0.1, 0.2]],
+            },
+            {
+                "ids": [["b1", "b2", "t1", "t2", "t3"]],
+                "documents": [["branch 1", "branch 2", "trunk 1", "trunk 2", "trunk 3"]],
+                "metadatas": [[branch_meta, branch_meta, {"session_id": "s1"}, {"session_id": "s1"}, {}]],
+                "distances": [[0.1, 0.2, 0.3, 0.35, 0.9]],
+            },
+        ]
+
+        result = await _find_similar_thoughts_impl(
+            FindSimilarThoughtsInput(query="idea", n_results=2, threshold=0.5, include_branches=False)
+        )
+
+        result_data = assert_successful_json_list_result(result)
+        assert [t["id"] for t in result_data["similar_thoughts"]] == ["t1", "t2"]
+        assert [c.kwargs["n_results"] for c in mock_collection.query.call_args_list] == [2, 8]
+
+    @pytest.mark.asyncio
+    async def test_find_similar_thoughts_stops_at_threshold_boundary(self, mock_chroma_client_thinking):
+        """No further candidates are fetched once one falls below the threshold."""
+        _, mock_collection, _ = mock_chroma_client_thinking
+        mock_collection.query.return_value = {
+            "ids": [["b1", "t1"]],
+            "documents": [["branch", "trunk"]],
+            "metadatas": [[{"branch_id": "b"}, {}]],
+            "distances": [[0.1, 0.8]],
+        }
+
+        result = await _find_similar_thoughts_impl(
+            FindSimilarThoughtsInput(query="idea", n_results=2, threshold=0.5, include_branches=False)
+        )
+
+        assert assert_successful_json_list_result(result)["similar_thoughts"] == []
+        mock_collection.query.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_find_similar_thoughts_rejects_conflicting_filters(self, mock_chroma_client_thinking):
+        """A branch with trunk-only search, or an empty time window, is invalid."""
+        with assert_raises_mcp_error("branch_id cannot be combined with include_branches=false"):
+            await _find_similar_thoughts_impl(
+                FindSimilarThoughtsInput(query="idea", branch_id="b", include_branches=False)
+            )
+        with assert_raises_mcp_error("since_timestamp must not be after until_timestamp"):
+            await _find_similar_thoughts_impl(
+                FindSimilarThoughtsInput(query="idea", since_timestamp=20, until_timestamp=10)
+            )
+
+    @pytest.mark.asyncio
+    async def test_find_similar_thoughts_include_archive(self, mock_chroma_client_thinking):
+        """Test include_archive merges archived thoughts by distance."""
+        _, mock_collection, _ = mock_chroma_client_thinking
+        mock_collection.metadata = {"hnsw:space": "cosine"}
+        mock_collection.query.return_value = {
+            "ids": [["t1", "t2"]],
+            "documents": [["idea A", "idea B"]],
+            "metadatas": [[{"session_id": "s1"}, {"session_id": "s1"}]],
+            "distances": [[0.1, 0.3]],
+        }
+        mock_archive = MagicMock(name="archive")
+        mock_archive.metadata = {"hnsw:space": "cosine"}
+        mock_archive.query.return_value = {
+            "ids": [["old1"]],
+            "documents": [["archived idea"]],
+            "metadatas": [[{"session_id": "s0", "archived_at": "2026-01-01T00:00:00+00:00"}]],
+            "distances": [[0.2]],
+        }
+
+        with patch("src.chroma_mcp.tools.thinking_tools.get_archive_collection", return_value=mock_archive):
+            result = await _find_similar_thoughts_impl(
+                FindSimilarThoughtsInput(query="idea", n_results=2, threshold=0.5, include_archive=True)
+            )
+            result_data = assert_successful_json_list_result(result)
+            assert [t["id"] for t in result_data["similar_thoughts"]] == ["t1", "old1"]
+
+            # Archive is ignored unless asked for
+            result = await _find_similar_thoughts_impl(FindSimilarThoughtsInput(query="idea", threshold=0.5))
+            result_data = assert_successful_json_list_result(result)
+            assert [t["id"] for t in result_data["similar_thoughts"]] == ["t1", "t2"]
+            mock_archive.query.assert_called_once()
+
     @pytest.mark.asyncio  # Mark as async
     async def test_find_similar_thoughts_collection_not_found(self, mock_chroma_client_thinking):
         """Test find_similar_thoughts when the collection does not exist."""
@@ -432,7 +644,9 @@ class TestThinkingTools:
 
         # Assertions on mocks
         mock_client.get_or_create_collection.assert_called_once_with(name=THOUGHTS_COLLECTION, embedding_function=ANY)
-        mock_collection.get.assert_called_once_with(include=["documents", "metadatas"])
+        mock_collection.get.assert_called_once_with(
+            where={"session_id": session_id}, include=["documents", "metadatas"]
+        )
 
         # Assertions on result data
         assert result_data["session_id"] == session_id
@@ -444,6 +658,79 @@ class TestThinkingTools:
         # Check reconstructed custom data
         assert result_data["session_thoughts"][1]["metadata"].get("custom_data") == {"tag": "final"}
 
+    @pytest.mark.asyncio
+    async def test_get_session_summary_uses_session_index(self, mock_chroma_client_thinking):
+        """Later summaries fetch the indexed thought IDs directly; branch exclusion uses the index."""
+        mock_client, mock_collection, _ = mock_chroma_client_thinking
+        session_id = "indexed_session"
+        trunk_id, branch_id = f"thought_{session_id}_1", f"thought_{session_id}_2_branch_b1"
+        mock_collection.get.return_value = {
+            "ids": [trunk_id, branch_id],
+            "documents": ["Trunk", "Branch"],
+            "metadatas": [
+                {"session_id": session_id, "thought_number": 1},
+                {"session_id": session_id, "thought_number": 2, "branch_id": "b1"},
+            ],
+        }
+
+        first = assert_successful_json_list_result(
+            await _get_session_summary_impl(GetSessionSummaryInput(session_id=session_id, include_branches=False))
+        )
+        assert [t["id"] for t in first["session_thoughts"]] == [trunk_id]
+
+        mock_collection.get.reset_mock()
+        await _get_session_summary_impl(GetSessionSummaryInput(session_id=session_id))
+        mock_collection.get.assert_called_once_with(ids=[trunk_id, branch_id], include=["documents", "metadatas"])
+
+        mock_collection.get.reset_mock()
+        await _get_session_summary_impl(GetSessionSummaryInput(session_id=session_id, include_branches=False))
+        mock_collection.get.assert_called_once_with(ids=[trunk_id], include=["documents", "metadatas"])
+
+    @pytest.mark.asyncio
+    async def test_get_branch_path_reads_path_ids_from_tree(self, mock_chroma_client_thinking):
+        """The path is fetched by the IDs in the stored branch tree, without a session scan."""
+        _, mock_collection, mock_sessions_collection = mock_chroma_client_thinking
+        tree = '{"b":{"":[0,[1,2,3]],"alt":[2,[3]]},"n":4}'
+        mock_sessions_collection.get.return_value = {
+            "ids": ["s1"],
+            "metadatas": [{"thought_count": 4, "branch_tree": tree}],
+        }
+        mock_collection.get.return_value = {
+            "ids": ["thought_s1_3_branch_alt", "thought_s1_1"],
+            "documents": ["Alt", "One"],
+            "metadatas": [
+                {"session_id": "s1", "thought_number": 3, "branch_id": "alt", "custom:tag": "x"},
+                {"session_id": "s1", "thought_number": 1},
+            ],
+        }
+
+        result = await _get_branch_path_impl(GetBranchPathInput(session_id="s1", branch_id="alt"))
+
+        result_data = assert_successful_json_list_result(result)
+        mock_collection.get.assert_called_once_with(
+            ids=["thought_s1_1", "thought_s1_3_branch_alt"], include=["documents", "metadatas"]
+        )
+        assert [t["content"] for t in result_data["path"]] == ["One", "Alt"]
+        assert result_data["path"][1]["metadata"]["custom_data"] == {"tag": "x"}
+        assert result_data["segments"] == [
+            {"branch_id": "", "branch_from_thought": 0, "thought_numbers": [1]},
+            {"branch_id": "alt", "branch_from_thought": 2, "thought_numbers": [3]},
+        ]
+        assert result_data["child_branches"] == []
+
+    @pytest.mark.asyncio
+    async def test_get_branch_path_unknown_branch(self, mock_chroma_client_thinking):
+        """An unknown branch is rejected as invalid parameters."""
+        _, mock_collection, mock_sessions_collection = mock_chroma_client_thinking
+        mock_sessions_collection.get.return_value = {
+            "ids": ["s1"],
+            "metadatas": [{"thought_count": 1, "branch_tree": '{"b":{"":[0,[1]]},"n":1}'}],
+        }
+
+        with assert_raises_mcp_error("Branch 'nope' not found in session 's1'"):
+            await _get_branch_path_impl(GetBranchPathInput(session_id="s1", branch_id="nope"))
+        mock_collection.get.assert_not_called()
+
     @pytest.mark.asyncio  # Mark as async
     async def test_get_session_summary_no_thoughts(self, mock_chroma_client_thinking):
         """Test getting a summary for a session with no thoughts found."""
@@ -464,7 +751,9 @@ class TestThinkingTools:
 
         # Assertions on mocks
         mock_client.get_or_create_collection.assert_called_once_with(name=THOUGHTS_COLLECTION, embedding_function=ANY)
-        mock_collection.get.assert_called_once_with(include=["documents", "metadatas"])
+        mock_collection.get.assert_called_once_with(
+            where={"session_id": session_id}, include=["documents", "metadatas"]
+        )
 
     @pytest.mark.asyncio  # Mark as async
     async def test_get_session_summary_collection_not_found(self, mock_chroma_client_thinking):
@@ -491,7 +780,9 @@ class TestThinkingTools:
 
         # Assert mocks were called
         mock_client.get_or_create_collection.assert_called_once_with(name=THOUGHTS_COLLECTION, embedding_function=ANY)
-        mock_collection.get.assert_called_once_with(include=["documents", "metadatas"])
+        mock_collection.get.assert_called_once_with(
+            where={"session_id": session_id}, include=["documents", "metadatas"]
+        )
 
     @pytest.mark.asyncio
     async def test_get_session_summary_unexpected_error(self, mock_chroma_client_thinking):
@@ -538,9 +829,14 @@ class TestThinkingTools:
             "metadatas": [[{"summary": "Plan A"}, {"summary": "Plan B"}]],
             "documents": [[None], [None]],
         }
-        # Mock the SESSIONS collection .get() call used for embedding new sessions
-        # Assume session_abc and session_xyz already exist
-        mock_sessions_collection.get.return_value = {"ids": ["session_abc", "session_xyz"]}
+
+        # Both sessions have up-to-date entries, none is dirty
+        def sessions_get(where=None, include=None, **kwargs):
+            if where is not None:
+                return {"ids": []}
+            return {"ids": ["session_abc", "session_xyz"], "metadatas": [{"thought_count": 2}, {"thought_count": 1}]}
+
+        mock_sessions_collection.get.side_effect = sessions_get
 
         # Mock the internal call to _get_session_summary_impl for the final result assembly
         with patch("src.chroma_mcp.tools.thinking_tools._get_session_summary_impl") as mock_get_summary:
@@ -575,6 +871,7 @@ class TestThinkingTools:
             mock_sessions_collection.query.assert_called_once_with(
                 query_texts=[query], n_results=n_results, include=["metadatas", "distances"]
             )
+            mock_sessions_collection.upsert.assert_not_called()  # Nothing to re-embed
 
             # Assertions on result data
             assert len(result_data.get("similar_sessions", [])) == 1  # session_xyz filtered
@@ -769,24 +1066,26 @@ class TestThinkingTools:
         mock_client, mock_thoughts_collection, mock_sessions_collection = mock_chroma_client_thinking
         error_message = "Embedding failed"
         # Mock thoughts collection successfully
-        mock_thoughts_collection.get.return_value = {"metadatas": [{"session_id": "s1"}]}
-        # Mock sessions collection get returns empty (to trigger add)
+        mock_thoughts_collection.get.return_value = {
+            "ids": ["t1"],
+            "documents": ["Summary"],
+            "metadatas": [{"session_id": "s1", "thought_number": 1}],
+        }
+        # Mock sessions collection get returns empty (so session s1 is re-embedded)
         mock_sessions_collection.get.return_value = {"ids": []}
-        # Mock sessions collection add error
-        mock_sessions_collection.add.side_effect = Exception(error_message)
+        # Mock sessions collection upsert error
+        mock_sessions_collection.upsert.side_effect = Exception(error_message)
 
-        # Mock the internal call to _get_session_summary_impl for embedding
-        with patch("src.chroma_mcp.tools.thinking_tools._get_session_summary_impl") as mock_get_summary:
-            # Return a list containing a TextContent object, not CallToolResult
-            mock_summary_result_list = [
-                mcp_types.TextContent(type="text", text=json.dumps({"session_thoughts": [{"content": "Summary"}]}))
-            ]
-            mock_get_summary.return_value = mock_summary_result_list
-
-            input_model = FindSimilarSessionsInput(query="q")
+        input_model = FindSimilarSessionsInput(query="q")
 
-            with assert_raises_mcp_error(f"ChromaDB Error updating sessions: {error_message}"):
-                await _find_similar_sessions_impl(input_model)
+        with assert_raises_mcp_error(f"ChromaDB Error updating sessions: {error_message}"):
+            await _find_similar_sessions_impl(input_model)
+        mock_sessions_collection.upsert.assert_called_once_with(
+            ids=["s1"],
+            documents=["Summary"],
+            metadatas=[{"thought_count": 1, "dirty": False, "mean_norm": None}],
+            embeddings=None,
+        )
 
     @pytest.mark.asyncio
     async def test_find_similar_sessions_query_error(self, mock_chroma_client_thinking):
@@ -794,7 +1093,11 @@ class TestThinkingTools:
         mock_client, mock_thoughts_collection, mock_sessions_collection = mock_chroma_client_thinking
         error_message = "Session query failed"
         # Mock thoughts collection successfully
-        mock_thoughts_collection.get.return_value = {"metadatas": [{"session_id": "s1"}]}
+        mock_thoughts_collection.get.return_value = {
+            "ids": ["t1"],
+            "documents": ["Thought"],
+            "metadatas": [{"session_id": "s1", "thought_number": 1}],
+        }
         # Mock sessions collection get returns existing
         mock_sessions_collection.get.return_value = {"ids": ["s1"]}
         # Mock sessions collection query error
@@ -822,3 +1125,61 @@ class TestThinkingTools:
             await _find_similar_sessions_impl(input_data_high)
 
     # +++ End New Coverage Tests +++
+
+
+class KeywordEmbedding(EmbeddingFunction):
+    """Unit vectors over the counts of three keywords, so distances are predictable."""
+
+    KEYWORDS = ("cache", "auth", "deploy")
+
+    def __call__(self, input):
+        vectors = []
+        for text in input:
+            words = text.lower().split()
+            vector = np.array([words.count(keyword) for keyword in self.KEYWORDS], dtype=np.float32) + 1e-3
+            vectors.append(vector / np.linalg.norm(vector))
+        return vectors
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["text", "mean"])
+async def test_find_similar_sessions_exact_search_sees_refreshed_vectors(mode):
+    """A rewritten session vector is ranked by its new content, not by a cached exact-search matrix."""
+    SharedSystemClient.clear_system_cache()
+    client = chromadb.EphemeralClient(settings=Settings(anonymized_telemetry=False))
+    config = ChromaClientConfig(client_type="ephemeral", exact_search_threshold=100, session_embedding_mode=mode)
+    exact_search._indexes.clear()
+    reset_session_index()
+    reset_session_embeddings()
+    try:
+        with (
+            patch("src.chroma_mcp.tools.thinking_tools.get_chroma_client", return_value=client),
+            patch("src.chroma_mcp.tools.thinking_tools.get_embedding_function", return_value=KeywordEmbedding()),
+            patch("src.chroma_mcp.tools.thinking_tools.get_server_config", return_value=config),
+            patch("src.chroma_mcp.utils.exact_search.get_server_config", return_value=config),
+        ):
+
+            async def think(session_id, number, thought):
+                await _sequential_thinking_impl(
+                    SequentialThinkingInput(
+                        thought=thought, thought_number=number, total_thoughts=4, session_id=session_id
+                    )
+                )
+
+            async def ranking(query):
+                result = await _find_similar_sessions_impl(FindSimilarSessionsInput(query=query, threshold=0.0))
+                return [session["session_id"] for session in json.loads(result[0].text)["similar_sessions"]]
+
+            await think("a", 1, "cache")
+            await think("b", 1, "deploy deploy auth")
+            assert await ranking("deploy") == ["b"]
+
+            # Same entry count, so only the write path can tell the cached matrix is stale
+            for number in (2, 3, 4):
+                await think("a", number, "deploy")
+            assert await ranking("deploy") == ["a", "b"]
+    finally:
+        exact_search._indexes.clear()
+        reset_session_index()
+        reset_session_embeddings()
+        SharedSystemClient.clear_system_cache()
@@ -0,0 +1,98 @@
+"""Tests for src/chroma_mcp/utils/branch_tree.py"""
+
+import uuid
+
+import chromadb
+import pytest
+from chromadb.api.client import SharedSystemClient
+from chromadb.config import Settings
+
+from src.chroma_mcp.utils.branch_tree import (
+    BRANCH_TREE_FIELD,
+    branch_path,
+    build_tree,
+    child_branches,
+    decode_tree,
+    thought_id,
+)
+from src.chroma_mcp.utils.session_embeddings import get_branch_tree, mark_session_dirty
+from src.chroma_mcp.utils.session_index import reset_session_index
+
+THOUGHTS = [
+    {"session_id": "s1", "thought_number": 1},
+    {"session_id": "s1", "thought_number": 2},
+    {"session_id": "s1", "thought_number": 3},
+    {"session_id": "s1", "thought_number": 3, "branch_id": "alt", "branch_from_thought": 2},
+    {"session_id": "s1", "thought_number": 4, "branch_id": "alt"},
+    {"session_id": "s1", "thought_number": 1, "branch_id": "early", "branch_from_thought": 1},
+]
+
+
+def test_branch_path_is_trunk_before_fork_then_branch():
+    tree = build_tree(THOUGHTS)
+
+    assert branch_path(tree, "alt") == [("", 0, [1]), ("alt", 2, [3, 4])]
+    assert branch_path(tree, "") == [("", 0, [1, 2, 3])]
+    assert branch_path(tree, "missing") is None
+    assert child_branches(tree, "") == [("early", 1, [1]), ("alt", 2, [3, 4])]
+    assert child_branches(tree, "alt") == []
+
+
+def test_thought_id_matches_stored_ids():
+    assert thought_id("s1", 2) == "thought_s1_2"
+    assert thought_id("s1", 3, "alt") == "thought_s1_3_branch_alt"
+
+
+@pytest.fixture
+def collections():
+    SharedSystemClient.clear_system_cache()
+    reset_session_index()
+    client = chromadb.EphemeralClient(settings=Settings(anonymized_telemetry=False))
+    suffix = uuid.uuid4().hex[:8]
+    thoughts = client.create_collection(name=f"thoughts-{suffix}")
+    sessions = client.create_collection(name=f"sessions-{suffix}")
+    yield thoughts, sessions
+    reset_session_index()
+    SharedSystemClient.clear_system_cache()
+
+
+def record(thoughts, sessions, metadata, positions=True):
+    number, branch_id = metadata["thought_number"], metadata.get("branch_id")
+    thoughts.add(
+        ids=[thought_id(metadata["session_id"], number, branch_id)],
+        documents=[f"thought {number} {branch_id}"],
+        embeddings=[[float(number), 1.0]],
+        metadatas=[metadata],
+    )
+    mark_session_dirty(
+        sessions,
+        metadata["session_id"],
+        "text",
+        embedding=[float(number), 1.0],
+        first_thought=number == 1 and not branch_id,
+        positions=[(number, branch_id, metadata.get("branch_from_thought"))] if positions else (),
+    )
+
+
+def stored_tree(sessions, thought_count):
+    metadata = sessions.get(ids=["s1"], include=["metadatas"])["metadatas"][0]
+    return decode_tree(metadata.get(BRANCH_TREE_FIELD), thought_count)
+
+
+def test_write_hook_extends_the_stored_tree(collections):
+    thoughts, sessions = collections
+    for metadata in THOUGHTS:
+        record(thoughts, sessions, metadata)
+
+    assert stored_tree(sessions, len(THOUGHTS)) == build_tree(THOUGHTS)
+    assert get_branch_tree(thoughts.name, thoughts, sessions, "s1") == build_tree(THOUGHTS)
+
+
+def test_tree_is_rebuilt_after_a_write_without_positions(collections):
+    thoughts, sessions = collections
+    record(thoughts, sessions, THOUGHTS[0])
+    record(thoughts, sessions, THOUGHTS[1], positions=False)
+    assert stored_tree(sessions, 2) is None
+
+    assert get_branch_tree(thoughts.name, thoughts, sessions, "s1") == build_tree(THOUGHTS[:2])
+    assert stored_tree(sessions, 2) == build_tree(THOUGHTS[:2])
@@ -0,0 +1,63 @@
+"""Tests for src/chroma_mcp/utils/collection_names.py"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.chroma_mcp.utils import collection_names
+from src.chroma_mcp.utils.collection_names import get_sorted_names, invalidate_collection_names, names_with_prefix
+
+
+@pytest.fixture(autouse=True)
+def clean_index():
+    invalidate_collection_names()
+    yield
+    invalidate_collection_names()
+
+
+def make_client(names):
+    client = MagicMock()
+    client.list_collections.side_effect = lambda: list(names)
+    client.count_collections.side_effect = lambda: len(names)
+    return client
+
+
+def test_names_with_prefix():
+    names = ["a", "branch_a", "branch_b", "branchx", "c"]
+    assert names_with_prefix(names, "branch_") == ["branch_a", "branch_b"]
+    assert names_with_prefix(names, "branch") == ["branch_a", "branch_b", "branchx"]
+    assert names_with_prefix(names, "zzz") == []
+    assert names_with_prefix(names, "") == names
+
+
+def test_sorted_names_cached_until_count_changes():
+    names = ["b", "a"]
+    client = make_client(names)
+    assert get_sorted_names(client) == ["a", "b"]
+    assert get_sorted_names(client) == ["a", "b"]
+    assert client.list_collections.call_count == 1
+
+    names.append("c")
+    assert get_sorted_names(client) == ["a", "b", "c"]
+    assert client.list_collections.call_count == 2
+
+
+def test_sorted_names_reloaded_after_invalidate_and_ttl():
+    names = ["a", "b"]
+    client = make_client(names)
+    get_sorted_names(client)
+    names[1] = "renamed"  # Same count, so only invalidation or the TTL notices
+    assert get_sorted_names(client) == ["a", "b"]
+
+    invalidate_collection_names()
+    assert get_sorted_names(client) == ["a", "renamed"]
+
+    names[1] = "again"
+    with patch.object(collection_names.time, "time", return_value=collection_names.time.time() + 3600):
+        assert get_sorted_names(client) == ["a", "again"]
+
+
+def test_sorted_names_per_client():
+    first, second = make_client(["x"]), make_client(["y"])
+    assert get_sorted_names(first) == ["x"]
+    assert get_sorted_names(second) == ["y"]
@@ -0,0 +1,165 @@
+"""Tests for src/chroma_mcp/utils/collection_stats.py"""
+
+import datetime
+import uuid
+
+import chromadb
+from chromadb.api.client import SharedSystemClient
+from chromadb.config import Settings
+import numpy as np
+import pytest
+
+from src.chroma_mcp.utils import collection_stats
+from src.chroma_mcp.utils.collection_stats import (
+    clear_collection_stats_cache,
+    get_collection_stats,
+    persist_directory,
+)
+from src.chroma_mcp.utils.sharding import create_sharded_collection, delete_sharded_collection
+
+
+@pytest.fixture(scope="module")
+def ephemeral_client():
+    """Ephemeral client with the server's settings; the shared Chroma system is reset afterwards."""
+    SharedSystemClient.clear_system_cache()
+    client = chromadb.EphemeralClient(settings=Settings(anonymized_telemetry=False))
+    yield client
+    SharedSystemClient.clear_system_cache()
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    clear_collection_stats_cache()
+    yield
+    clear_collection_stats_cache()
+
+
+@pytest.fixture
+def persistent_collection(tmp_path):
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    collection = client.create_collection(
+        name=f"stats-{uuid.uuid4().hex[:8]}", metadata={"hnsw:space": "cosine"}, embedding_function=None
+    )
+    now = datetime.datetime.now(datetime.timezone.utc)
+    collection.add(
+        ids=[f"id{i}" for i in range(10)],
+        embeddings=np.random.default_rng(0).normal(size=(10, 4)).tolist(),
+        documents=["x" * (i + 1) for i in range(10)],
+        metadatas=[
+            {"kind": "a" if i % 2 else "b", "timestamp": (now - datetime.timedelta(days=i)).isoformat(), "n": i}
+            for i in range(10)
+        ],
+    )
+    return client, collection
+
+
+def test_persist_directory(persistent_collection, ephemeral_client, tmp_path):
+    client, _ = persistent_collection
+    assert persist_directory(client) == str(tmp_path)
+    assert persist_directory(ephemeral_client) is None
+
+
+def test_collection_stats_values(persistent_collection):
+    client, collection = persistent_collection
+    stats = get_collection_stats(collection, data_dir=persist_directory(client))
+
+    assert stats["count"] == 10
+    assert stats["embedding_dimension"] == 4
+    assert stats["hnsw"]["space"] == "cosine"
+    assert stats["segment_bytes"] > 0
+    assert stats["records_scanned"] == 10 and stats["sampled"] is False
+    assert stats["document_length_chars"]["min"] == 1
+    assert stats["document_length_chars"]["max"] == 10
+    assert stats["document_length_chars"]["avg"] == 5.5
+    assert stats["metadata_keys"]["kind"] == {"distinct_values": 2, "present_in": 10}
+    assert stats["metadata_keys"]["n"]["distinct_values"] == 10
+    assert stats["newest_item"]["age_seconds"] < 60
+    assert 9 * 86400 - 60 < stats["oldest_item"]["age_seconds"] < 9 * 86400 + 60
+
+
+def test_collection_stats_cached_until_count_changes(persistent_collection):
+    _, collection = persistent_collection
+    first = get_collection_stats(collection)
+    second = get_collection_stats(collection)
+    assert second["computed_at"] == first["computed_at"]
+
+    collection.add(ids=["extra"], embeddings=[[0.1, 0.2, 0.3, 0.4]], documents=["y" * 100])
+    third = get_collection_stats(collection)
+    assert third["count"] == 11
+    assert third["records_scanned"] == 11
+    assert third["document_length_chars"]["max"] == 100
+
+
+def test_collection_stats_rescans_after_same_count_update(persistent_collection):
+    client, collection = persistent_collection
+    data_dir = persist_directory(client)
+    first = get_collection_stats(collection, data_dir=data_dir)
+
+    collection.update(ids=["id0"], embeddings=[[0.1, 0.2, 0.3, 0.4]], documents=["z" * 50])
+    second = get_collection_stats(collection, data_dir=data_dir)
+    assert second["count"] == first["count"]
+    assert second["document_length_chars"]["max"] == 50
+
+
+def test_distinct_values_are_capped(persistent_collection, monkeypatch):
+    _, collection = persistent_collection
+    monkeypatch.setattr(collection_stats, "MAX_DISTINCT_VALUES", 5)
+    stats = get_collection_stats(collection, refresh=True)
+    assert stats["metadata_keys"]["n"] == {"distinct_values": ">5", "present_in": 10}
+    assert stats["metadata_keys"]["kind"]["distinct_values"] == 2
+
+
+def test_collection_stats_refresh_and_ttl(persistent_collection):
+    _, collection = persistent_collection
+    first = get_collection_stats(collection)
+    cached = collection_stats._cache[str(collection.id)]
+    # Age the cached entry past the TTL
+    collection_stats._cache[str(collection.id)] = (cached[0] - 1000, cached[1], cached[2])
+    assert get_collection_stats(collection, ttl=300)["cache_age_seconds"] < 1
+    assert get_collection_stats(collection, refresh=True)["cache_age_seconds"] < 1
+    assert first["records_scanned"] == 10
+
+
+def test_collection_stats_sampling(persistent_collection, monkeypatch):
+    _, collection = persistent_collection
+    monkeypatch.setattr(collection_stats, "STATS_PAGE_SIZE", 2)
+
+    sampled = get_collection_stats(collection, sample_size=4)
+    assert sampled["sampled"] is True
+    assert sampled["records_scanned"] == 4
+
+    # A full scan does not reuse a sampled cache entry
+    full = get_collection_stats(collection, sample_size=4, full_scan=True)
+    assert full["sampled"] is False
+    assert full["records_scanned"] == 10
+
+
+def test_collection_stats_empty_collection(ephemeral_client):
+    collection = ephemeral_client.create_collection(name=f"stats-{uuid.uuid4().hex[:8]}", embedding_function=None)
+    stats = get_collection_stats(collection)
+    assert stats["count"] == 0
+    assert stats["embedding_dimension"] is None
+    assert stats["document_length_chars"] is None
+    assert stats["oldest_item"] is None
+    assert stats["segment_bytes"] is None
+
+
+def test_sharded_collection_stats_sum_shards(tmp_path):
+    client = chromadb.PersistentClient(path=str(tmp_path), settings=Settings(anonymized_telemetry=False))
+    name = f"stats-sharded-{uuid.uuid4().hex[:8]}"
+    collection = create_sharded_collection(client, name, 2, metadata={"hnsw:space": "cosine"})
+    collection.add(
+        ids=[f"id{i}" for i in range(20)],
+        embeddings=np.random.default_rng(0).normal(size=(20, 4)).tolist(),
+        documents=[f"doc {i}" for i in range(20)],
+        metadatas=[{"n": i} for i in range(20)],
+    )
+
+    stats = get_collection_stats(collection, data_dir=persist_directory(client))
+
+    assert stats["count"] == 20 and stats["records_scanned"] == 20
+    assert [shard["name"] for shard in stats["shards"]] == [f"{name}__shard0", f"{name}__shard1"]
+    assert sum(shard["count"] for shard in stats["shards"]) == 20
+    assert stats["segment_bytes"] == sum(shard["segment_bytes"] for shard in stats["shards"])
+    assert stats["hnsw"].get("space", stats["hnsw"].get("hnsw:space")) == "cosine"
+    delete_sharded_collection(client, name)
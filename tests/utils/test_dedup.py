@@ -0,0 +1,101 @@
+"""Tests for src/chroma_mcp/utils/dedup.py"""
+
+import uuid
+
+import chromadb
+import numpy as np
+import pytest
+from chromadb.api.client import SharedSystemClient
+from chromadb.api.types import EmbeddingFunction
+from chromadb.config import Settings
+
+from src.chroma_mcp.utils.dedup import (
+    HASH_FIELD,
+    SIMHASH_FIELD,
+    content_hash,
+    dedup_metadata,
+    find_duplicate,
+    record_duplicate,
+    simhash,
+)
+
+ERROR = "TypeError: cannot read property 'id' of undefined in handler.py line 42 while processing the request"
+
+
+class LengthEmbedding(EmbeddingFunction):
+    """Tiny deterministic embedding: vowel and consonant counts."""
+
+    def __init__(self):
+        pass
+
+    def __call__(self, input):
+        vectors = []
+        for text in input:
+            vowels = sum(ch in "aeiou" for ch in text.lower())
+            vectors.append(np.array([vowels, len(text) - vowels], dtype=np.float32))
+        return vectors
+
+
+@pytest.fixture(scope="module")
+def client():
+    SharedSystemClient.clear_system_cache()
+    client = chromadb.EphemeralClient(settings=Settings(anonymized_telemetry=False))
+    yield client
+    SharedSystemClient.clear_system_cache()
+
+
+@pytest.fixture
+def collection(client):
+    collection = client.create_collection(
+        name=f"dedup-{uuid.uuid4().hex[:8]}",
+        embedding_function=LengthEmbedding(),
+        configuration={"hnsw": {"space": "l2"}},
+    )
+    collection.add(ids=["e1"], documents=[ERROR], metadatas=[{"kind": "error", **dedup_metadata(ERROR)}])
+    collection.add(ids=["legacy"], documents=["an entry written without dedup fields"])
+    return collection
+
+
+def test_hashes_ignore_whitespace_and_tolerate_small_edits():
+    assert content_hash("a  b\nc") == content_hash("a b c")
+    assert simhash(ERROR.replace("line 42", "line 43")) == simhash(ERROR)  # Digits are normalised
+    assert bin(simhash(ERROR) ^ simhash("Fixed flaky test in the indexing module")).count("1") > 3
+    assert simhash("   ") is None
+    assert set(dedup_metadata(ERROR)) == {HASH_FIELD, SIMHASH_FIELD, *(f"dedup_band{i}" for i in range(4))}
+
+
+def test_exact_duplicate_is_found_by_hash(collection):
+    match = find_duplicate(collection, "  " + ERROR.replace(" ", "\t") + "\n")
+
+    assert match.id == "e1" and match.kind == "exact"
+
+
+def test_near_duplicate_is_found_by_simhash_bands(collection):
+    near = ERROR.replace("line 42", "line 57")
+    assert content_hash(near) != content_hash(ERROR)
+
+    match = find_duplicate(collection, near)
+
+    assert match.id == "e1" and match.kind == "near" and match.hamming == 0
+    assert find_duplicate(collection, "a completely different chat summary about tests") is None
+
+
+def test_vector_check_confirms_or_rejects_near_duplicates(collection):
+    near = ERROR.replace("line 42", "line 57")
+    confirmed = find_duplicate(collection, near, max_distance=10.0)
+    assert confirmed.id == "e1" and confirmed.distance is not None
+
+    # Same words, but "line 1234567" embeds far away in this toy space
+    assert find_duplicate(collection, ERROR.replace("line 42", "line 1234567"), max_distance=0.5) is None
+
+
+def test_record_duplicate_links_new_id(collection):
+    match = find_duplicate(collection, ERROR)
+
+    record_duplicate(collection, match, duplicate_id="e2")
+    record_duplicate(collection, find_duplicate(collection, ERROR), duplicate_id="e3")
+
+    metadata = collection.get(ids=["e1"], include=["metadatas"])["metadatas"][0]
+    assert metadata["duplicate_count"] == 2
+    assert metadata["duplicate_ids"] == "e2,e3"
+    assert metadata["kind"] == "error" and "last_duplicate_at" in metadata
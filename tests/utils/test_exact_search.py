@@ -0,0 +1,174 @@
+"""Tests for src/chroma_mcp/utils/exact_search.py"""
+
+import threading
+
+import numpy as np
+import pytest
+from unittest.mock import patch, MagicMock
+
+from src.chroma_mcp.types import ChromaClientConfig
+from src.chroma_mcp.utils import exact_search
+from src.chroma_mcp.utils.exact_search import ExactIndex, exact_query, invalidate_exact_index
+
+EMBEDDINGS = np.array([[1.0, 0.0], [0.0, 1.0], [0.8, 0.6], [-1.0, 0.0]], dtype=np.float32)
+IDS = ["a", "b", "c", "d"]
+
+
+def make_collection(space="cosine"):
+    collection = MagicMock()
+    collection.shards = None
+    collection._embedding_function = None
+    collection.configuration_json = {"hnsw": {"space": space}}
+    collection.metadata = None
+    collection.count.return_value = len(IDS)
+
+    def fake_get(ids=None, include=None, limit=None, offset=None):
+        if ids is not None:
+            return {
+                "ids": ids,
+                "documents": [f"doc {i}" for i in ids],
+                "metadatas": [{"id": i} for i in ids],
+            }
+        return {"ids": IDS[offset : offset + limit], "embeddings": EMBEDDINGS[offset : offset + limit]}
+
+    collection.get.side_effect = fake_get
+    return collection
+
+
+@pytest.fixture(autouse=True)
+def exact_config():
+    exact_search._indexes.clear()
+    config = ChromaClientConfig(exact_search_threshold=100)
+    with patch("src.chroma_mcp.utils.exact_search.get_server_config", return_value=config):
+        yield config
+    exact_search._indexes.clear()
+
+
+@pytest.mark.parametrize("space", ["cosine", "l2", "ip"])
+def test_exact_index_matches_brute_force(space):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(50, 8)).astype(np.float32)
+    queries = rng.normal(size=(3, 8)).astype(np.float32)
+    index = ExactIndex([str(i) for i in range(50)], vectors, space)
+
+    if space == "cosine":
+        unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        expected = 1 - (queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ unit.T
+    elif space == "l2":
+        expected = ((queries[:, None, :] - vectors[None, :, :]) ** 2).sum(axis=2)
+    else:
+        expected = 1 - queries @ vectors.T
+
+    results = index.search(queries, 5)
+    for row, hits in zip(expected, results):
+        assert [int(doc_id) for doc_id, _ in hits] == list(np.argsort(row)[:5])
+        assert np.allclose([d for _, d in hits], np.sort(row)[:5], atol=1e-4)
+
+
+def test_exact_query_returns_hydrated_results():
+    collection = make_collection()
+    result = exact_query("small", collection, query_embeddings=[[1.0, 0.1]], n_results=2)
+
+    assert result["ids"] == [["a", "c"]]
+    assert result["documents"] == [["doc a", "doc c"]]
+    assert result["metadatas"] == [[{"id": "a"}, {"id": "c"}]]
+    assert len(result["distances"][0]) == 2
+
+
+def test_exact_query_embeds_texts_with_collection_ef():
+    collection = make_collection()
+    collection._embedding_function = MagicMock(return_value=[[0.0, 1.0]])
+    server_ef = MagicMock()
+    with patch("src.chroma_mcp.utils.exact_search.get_embedding_function", return_value=server_ef):
+        result = exact_query("small", collection, query_texts=["q"], n_results=1, include=["distances"])
+    collection._embedding_function.assert_called_once_with(["q"])
+    server_ef.assert_not_called()
+    assert result["ids"] == [["b"]]
+
+
+def test_exact_query_falls_back_to_server_ef():
+    collection = make_collection()
+    ef = MagicMock(return_value=[[0.0, 1.0]])
+    with patch("src.chroma_mcp.utils.exact_search.get_embedding_function", return_value=ef):
+        result = exact_query("small", collection, query_texts=["q"], n_results=1, include=["distances"])
+    ef.assert_called_once_with(["q"])
+    assert result["ids"] == [["b"]]
+    assert "documents" not in result
+
+
+def test_exact_query_not_applicable(exact_config):
+    collection = make_collection()
+    exact_config.exact_search_threshold = 3  # Collection has 4 items
+    assert exact_query("small", collection, query_embeddings=[[1.0, 0.0]]) is None
+    exact_config.exact_search_threshold = 0
+    assert exact_query("small", collection, query_embeddings=[[1.0, 0.0]]) is None
+
+
+def test_space_is_read_from_configuration_before_metadata():
+    collection = make_collection(space="ip")
+    collection.metadata = {"hnsw:space": "cosine"}
+    exact_query("small", collection, query_embeddings=[[1.0, 0.0]], include=["distances"])
+    assert exact_search._indexes["small"].space == "ip"
+
+    legacy = make_collection()
+    legacy.configuration_json = None
+    legacy.metadata = {"hnsw:space": "l2"}
+    exact_query("legacy", legacy, query_embeddings=[[1.0, 0.0]], include=["distances"])
+    assert exact_search._indexes["legacy"].space == "l2"
+
+
+def test_disabled_by_default():
+    with patch("src.chroma_mcp.utils.exact_search.get_server_config", return_value=ChromaClientConfig()):
+        assert exact_query("small", make_collection(), query_embeddings=[[1.0, 0.0]]) is None
+
+
+def test_same_count_write_reloads_matrix():
+    collection = make_collection()
+    seq = [1]
+    with patch.object(exact_search, "collection_version", side_effect=lambda c: (c.count(), seq[0])):
+        exact_query("small", collection, query_embeddings=[[1.0, 0.0]], include=["distances"])
+        seq[0] += 1  # Another process updated an embedding in place
+        exact_query("small", collection, query_embeddings=[[1.0, 0.0]], include=["distances"])
+    assert collection.get.call_count == 2
+
+
+def test_matrix_is_cached_until_invalidated_or_count_changes():
+    collection = make_collection()
+    exact_query("small", collection, query_embeddings=[[1.0, 0.0]], include=["distances"])
+    exact_query("small", collection, query_embeddings=[[1.0, 0.0]], include=["distances"])
+    assert collection.get.call_count == 1
+
+    invalidate_exact_index("small")
+    exact_query("small", collection, query_embeddings=[[1.0, 0.0]], include=["distances"])
+    assert collection.get.call_count == 2
+
+    exact_search._indexes["small"] = ExactIndex(IDS[:3], EMBEDDINGS[:3], "cosine", (3, None))  # Stale version
+    exact_query("small", collection, query_embeddings=[[1.0, 0.0]], include=["distances"])
+    assert len(exact_search._indexes["small"]) == 4
+
+
+def test_loading_one_collection_does_not_block_others():
+    slow = make_collection()
+    loading, release = threading.Event(), threading.Event()
+    fake_get = slow.get.side_effect
+
+    def blocking_get(**kwargs):
+        if kwargs.get("ids") is None:
+            loading.set()
+            assert release.wait(5)
+        return fake_get(**kwargs)
+
+    slow.get.side_effect = blocking_get
+    worker = threading.Thread(
+        target=exact_query, args=("slow", slow), kwargs={"query_embeddings": [[1.0, 0.0]], "include": ["distances"]}
+    )
+    worker.start()
+    assert loading.wait(5)
+    try:
+        result = exact_query("fast", make_collection(), query_embeddings=[[1.0, 0.0]], include=["distances"])
+        assert result["ids"] == [["a", "c", "b", "d"]]
+        invalidate_exact_index("slow")  # A write while the matrix is being read
+    finally:
+        release.set()
+        worker.join(5)
+    assert "slow" not in exact_search._indexes
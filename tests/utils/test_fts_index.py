@@ -0,0 +1,169 @@
+"""Tests for src/chroma_mcp/utils/fts_index.py"""
+
+import pytest
+from unittest.mock import patch, MagicMock
+
+from src.chroma_mcp.types import ChromaClientConfig
+from src.chroma_mcp.utils import fts_index
+from src.chroma_mcp.utils.fts_index import (
+    resolve_document_filter,
+    sync_fts_add,
+    sync_fts_delete,
+    drop_fts_index,
+    rebuild_fts_index,
+    reset_fts_index,
+    wait_for_fts_rebuilds,
+)
+
+DOCS = {
+    "a": "def parse_Config(path): pass",
+    "b": "Parse config here",
+    "c": 'a "quoted" value',
+    "d": "zz",
+}
+
+
+def make_collection(docs):
+    """Builds a mock collection whose get/count reflect the given documents dict."""
+    collection = MagicMock()
+    collection.shards = None
+    collection.count.side_effect = lambda: len(docs)
+
+    def fake_get(ids=None, include=None, limit=None, offset=None):
+        if ids is not None:
+            return {"ids": [i for i in ids if i in docs]}
+        ids = list(docs)[offset : offset + limit]
+        return {"ids": ids, "documents": [docs[i] for i in ids]}
+
+    collection.get.side_effect = fake_get
+    return collection
+
+
+def rebuild_calls(collection):
+    return sum(1 for c in collection.get.call_args_list if c.kwargs.get("ids") is None)
+
+
+@pytest.fixture(autouse=True)
+def fts_config():
+    reset_fts_index()
+    config = ChromaClientConfig(client_type="ephemeral", fts_accelerator=True)
+    with patch("src.chroma_mcp.utils.fts_index.get_server_config", return_value=config):
+        yield config
+    reset_fts_index()
+
+
+@pytest.mark.parametrize(
+    "where_document, expected",
+    [
+        ({"$contains": "parse_Config"}, {"a"}),
+        ({"$contains": "config"}, {"b"}),  # Case-sensitive, like Chroma
+        ({"$contains": '"quoted"'}, {"c"}),
+        ({"$contains": "zz"}, {"d"}),  # Shorter than a trigram
+        ({"$not_contains": "config"}, {"a", "c", "d"}),
+        ({"$or": [{"$contains": "zz"}, {"$contains": "Parse"}]}, {"b", "d"}),
+        ({"$and": [{"$contains": "a"}, {"$not_contains": "quoted"}]}, {"a", "b"}),
+    ],
+)
+def test_resolve_document_filter(where_document, expected):
+    collection = make_collection(dict(DOCS))
+    rebuild_fts_index("coll", collection)
+    assert resolve_document_filter("coll", collection, where_document) == expected
+
+
+def test_first_use_builds_in_background_and_defers_to_chroma():
+    collection = make_collection(dict(DOCS))
+    assert resolve_document_filter("coll", collection, {"$contains": "config"}) is None
+    wait_for_fts_rebuilds()
+    assert resolve_document_filter("coll", collection, {"$contains": "config"}) == {"b"}
+
+
+def test_unsupported_filter_or_disabled_returns_none(fts_config):
+    collection = make_collection(dict(DOCS))
+    assert resolve_document_filter("coll", collection, {"$regex": "x"}) is None
+    assert resolve_document_filter("coll", collection, {"$contains": 1}) is None
+
+    fts_config.fts_accelerator = False
+    assert resolve_document_filter("coll", collection, {"$contains": "config"}) is None
+    collection.get.assert_not_called()
+
+
+def test_sync_hooks_keep_shadow_table_current():
+    docs = dict(DOCS)
+    collection = make_collection(docs)
+    rebuild_fts_index("coll", collection)
+
+    docs["e"] = "config again"
+    sync_fts_add("coll", ["e"], ["config again"], version_before=(4, None), version_after=(5, None))
+    del docs["b"]
+    sync_fts_delete("coll", ["b"], version_before=(5, None), version_after=(4, None))
+
+    assert resolve_document_filter("coll", collection, {"$contains": "config"}) == {"e"}
+    assert rebuild_calls(collection) == 1  # Versions advanced, no rebuild
+
+
+def test_sync_without_versions_marks_table_stale():
+    docs = dict(DOCS)
+    collection = make_collection(docs)
+    rebuild_fts_index("coll", collection)
+
+    sync_fts_add("coll", ["b"], ["config"])
+
+    assert resolve_document_filter("coll", collection, {"$contains": "config"}) is None
+    wait_for_fts_rebuilds()
+    assert rebuild_calls(collection) == 2
+
+
+def test_external_write_triggers_rebuild():
+    docs = dict(DOCS)
+    collection = make_collection(docs)
+    rebuild_fts_index("coll", collection)
+
+    docs["e"] = "config written by another process"
+    assert resolve_document_filter("coll", collection, {"$contains": "config"}) is None
+    wait_for_fts_rebuilds()
+    assert resolve_document_filter("coll", collection, {"$contains": "config"}) == {"b", "e"}
+
+
+def test_same_count_external_write_triggers_rebuild():
+    docs = dict(DOCS)
+    collection = make_collection(docs)
+    seq = [10]
+    with patch.object(fts_index, "collection_version", side_effect=lambda c: (c.count(), seq[0])):
+        rebuild_fts_index("coll", collection)
+        docs["b"] = "rewritten elsewhere"
+        seq[0] += 1
+
+        assert resolve_document_filter("coll", collection, {"$contains": "config"}) is None
+        wait_for_fts_rebuilds()
+        assert resolve_document_filter("coll", collection, {"$contains": "config"}) == set()
+
+
+def test_ids_deleted_since_build_are_not_returned():
+    docs = dict(DOCS)
+    collection = make_collection(docs)
+    rebuild_fts_index("coll", collection)
+    # Count-only versions cannot see a delete paired with an add
+    del docs["b"]
+    docs["e"] = "unrelated"
+
+    assert resolve_document_filter("coll", collection, {"$contains": "config"}) == set()
+
+
+def test_sync_ignores_untracked_and_dropped_collections():
+    collection = make_collection(dict(DOCS))
+    sync_fts_add("other", ["x"], ["config"])
+    rebuild_fts_index("coll", collection)
+
+    drop_fts_index("coll")
+    sync_fts_add("coll", ["x"], ["config"])
+    # Dropped collections are rebuilt from Chroma on next use
+    assert resolve_document_filter("coll", collection, {"$contains": "config"}) is None
+    wait_for_fts_rebuilds()
+    assert resolve_document_filter("coll", collection, {"$contains": "config"}) == {"b"}
+
+
+def test_large_match_defers_to_chroma():
+    collection = make_collection(dict(DOCS))
+    rebuild_fts_index("coll", collection)
+    with patch.object(fts_index, "MAX_ID_RESTRICTION", 2):
+        assert resolve_document_filter("coll", collection, {"$not_contains": "config"}) is None
@@ -0,0 +1,188 @@
+"""Tests for src/chroma_mcp/utils/lexical_index.py"""
+
+import os
+import time
+import uuid
+
+import chromadb
+import pytest
+from chromadb.api.client import SharedSystemClient
+from chromadb.config import Settings
+from unittest.mock import patch, MagicMock
+
+from src.chroma_mcp.types import ChromaClientConfig
+import src.chroma_mcp.utils.lexical_index as lexical_index
+from src.chroma_mcp.utils.lexical_index import (
+    BM25Index,
+    tokenize,
+    build_lexical_index,
+    ensure_lexical_index,
+    get_lexical_index,
+    sync_lexical_index_add,
+    sync_lexical_index_delete,
+    drop_lexical_index,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_registry():
+    """Ensure every test starts with an empty index registry."""
+    lexical_index._indexes.clear()
+    yield
+    lexical_index._indexes.clear()
+
+
+@pytest.fixture
+def persistent_config(tmp_path):
+    config = ChromaClientConfig(client_type="persistent", data_dir=str(tmp_path))
+    with (
+        patch("src.chroma_mcp.utils.lexical_index.get_server_config", return_value=config),
+        patch("src.chroma_mcp.utils.collection_version.get_server_config", return_value=config),
+    ):
+        yield tmp_path
+
+
+@pytest.fixture
+def persistent_collection(persistent_config):
+    client = chromadb.PersistentClient(path=str(persistent_config), settings=Settings(anonymized_telemetry=False))
+    collection = client.create_collection(name=f"lex-{uuid.uuid4().hex[:8]}", embedding_function=None)
+    collection.add(
+        ids=["a", "b"], embeddings=[[1.0, 0.0], [0.0, 1.0]], documents=["parse_config here", "load_settings"]
+    )
+    yield collection
+    SharedSystemClient.clear_system_cache()
+
+
+def test_tokenize_splits_code_identifiers():
+    tokens = tokenize("def get_chroma_client(): return HttpClient")
+    assert "get_chroma_client" in tokens
+    assert {"get", "chroma", "client"} <= set(tokens)
+    assert "httpclient" in tokens
+    assert "http" in tokens
+
+
+def test_bm25_ranks_exact_identifier_first():
+    index = BM25Index("test")
+    index.add(
+        ["a", "b", "c"],
+        [
+            "def validate_collection_name(name): pass",
+            "collection name handling and other collection things",
+            "unrelated text about embeddings",
+        ],
+    )
+    results = index.search("validate_collection_name", n_results=3)
+    assert results[0][0] == "a"
+    assert "c" not in [doc_id for doc_id, _ in results]
+
+
+def test_bm25_add_replaces_and_remove_deletes():
+    index = BM25Index("test")
+    index.add(["a"], ["alpha beta"])
+    index.add(["a"], ["gamma"])
+    assert index.search("alpha") == []
+    assert index.search("gamma")[0][0] == "a"
+
+    index.remove(["a", "unknown"])
+    assert len(index) == 0
+    assert index.postings == {}
+    assert index.total_length == 0
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    path = str(tmp_path / "idx" / "coll.json")
+    index = BM25Index("coll", path)
+    index.add(["a", "b"], ["parse_config value", "load settings"])
+    index.save()
+
+    loaded = BM25Index.load("coll", path)
+    assert len(loaded) == 2
+    assert loaded.search("parse_config")[0][0] == "a"
+    loaded.remove(["a"])
+    assert loaded.search("parse_config") == []
+
+
+def test_sync_hooks_are_noops_without_index(persistent_config):
+    sync_lexical_index_add("no_index", ["a"], ["text"])
+    sync_lexical_index_delete("no_index", ["a"])
+    assert get_lexical_index("no_index") is None
+
+
+def test_build_persists_and_sync_updates(persistent_config):
+    collection = MagicMock()
+    collection.get.side_effect = [
+        {"ids": ["a", "b"], "documents": ["foo_bar", "baz"]},
+        {"ids": [], "documents": []},
+    ]
+
+    index = build_lexical_index("coll", collection, batch_size=2)
+    assert os.path.exists(persistent_config / "lexical_index" / "coll.json")
+    assert len(index) == 2
+
+    sync_lexical_index_add("coll", ["c"], ["qux"])
+    sync_lexical_index_delete("coll", ["a"])
+    assert get_lexical_index("coll").search("qux")[0][0] == "c"
+    assert get_lexical_index("coll").search("foo_bar") == []
+
+    drop_lexical_index("coll")
+    assert not os.path.exists(persistent_config / "lexical_index" / "coll.json")
+    assert get_lexical_index("coll") is None
+
+
+def test_get_lexical_index_loads_from_disk(persistent_config):
+    path = persistent_config / "lexical_index" / "coll.json"
+    index = BM25Index("coll", str(path))
+    index.add(["a"], ["identifier_here"])
+    index.save()
+
+    loaded = get_lexical_index("coll")
+    assert loaded is not None
+    assert loaded.search("identifier_here")[0][0] == "a"
+
+
+def test_ensure_rebuilds_after_external_writes(persistent_collection):
+    collection = persistent_collection
+    index = ensure_lexical_index(collection.name, collection)
+    assert ensure_lexical_index(collection.name, collection) is index
+
+    # Writes that bypass the server hooks (e.g. another process), keeping the count unchanged
+    collection.delete(ids=["a"])
+    collection.add(ids=["c"], embeddings=[[0.5, 0.5]], documents=["fresh_identifier"])
+
+    rebuilt = ensure_lexical_index(collection.name, collection)
+    assert rebuilt is not index
+    assert rebuilt.search("fresh_identifier")[0][0] == "c"
+    assert rebuilt.search("parse_config") == []
+
+
+def test_sync_with_versions_keeps_index_current(persistent_collection):
+    from src.chroma_mcp.utils.collection_version import collection_version
+
+    collection = persistent_collection
+    index = ensure_lexical_index(collection.name, collection)
+
+    before = collection_version(collection)
+    collection.add(ids=["c"], embeddings=[[0.5, 0.5]], documents=["hooked_write"])
+    sync_lexical_index_add(collection.name, ["c"], ["hooked_write"], before, collection_version(collection))
+    assert ensure_lexical_index(collection.name, collection) is index
+
+    # A hook applied to an index that already missed an external write does not make it current
+    collection.add(ids=["d"], embeddings=[[0.1, 0.9]], documents=["external_write"])
+    before = collection_version(collection)
+    collection.delete(ids=["c"])
+    sync_lexical_index_delete(collection.name, ["c"], before, collection_version(collection))
+    assert ensure_lexical_index(collection.name, collection).search("external_write")[0][0] == "d"
+
+
+def test_changes_are_flushed_on_a_timer(persistent_config, monkeypatch):
+    monkeypatch.setattr(lexical_index, "FLUSH_INTERVAL_SECONDS", 0.05)
+    path = persistent_config / "lexical_index" / "coll.json"
+    index = BM25Index("coll", str(path))
+    lexical_index._indexes["coll"] = index
+
+    sync_lexical_index_add("coll", ["a"], ["timed_flush"])
+    deadline = time.time() + 2
+    while not path.exists() and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert BM25Index.load("coll", str(path)).search("timed_flush")[0][0] == "a"
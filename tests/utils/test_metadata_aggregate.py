@@ -0,0 +1,77 @@
+"""Tests for src/chroma_mcp/utils/metadata_aggregate.py"""
+
+import uuid
+
+import chromadb
+import pytest
+from chromadb.api.client import SharedSystemClient
+from chromadb.config import Settings
+
+from src.chroma_mcp.utils import metadata_aggregate
+from src.chroma_mcp.utils.metadata_aggregate import aggregate_metadata
+
+
+@pytest.fixture(scope="module")
+def collection():
+    SharedSystemClient.clear_system_cache()
+    client = chromadb.EphemeralClient(settings=Settings(anonymized_telemetry=False))
+    collection = client.create_collection(name=f"agg-{uuid.uuid4().hex[:8]}", embedding_function=None)
+    statuses = ["captured", "analyzed", "captured", "promoted", "captured", "analyzed"]
+    collection.add(
+        ids=[f"c{i}" for i in range(6)],
+        embeddings=[[float(i), 1.0] for i in range(6)],
+        metadatas=[
+            {
+                "status": status,
+                "modification_type": "refactor" if i % 2 else "feature",
+                "confidence_score": i / 10,
+                "session_id": f"s{i % 3}",
+                **({"flag": True} if i == 0 else {}),
+            }
+            for i, status in enumerate(statuses)
+        ],
+    )
+    yield collection
+    SharedSystemClient.clear_system_cache()
+
+
+def test_group_by_counts_and_numeric_summary(collection):
+    result = aggregate_metadata(
+        collection, group_by=["status"], numeric_fields=["confidence_score", "flag"], page_size=2
+    )
+
+    assert result["records_scanned"] == 6
+    assert [(g["key"]["status"], g["count"]) for g in result["groups"]] == [
+        ("captured", 3),
+        ("analyzed", 2),
+        ("promoted", 1),
+    ]
+    captured = result["groups"][0]["numeric"]
+    assert captured["confidence_score"]["min"] == 0.0 and captured["confidence_score"]["max"] == 0.4
+    assert captured["confidence_score"]["avg"] == pytest.approx(0.2)
+    assert captured["flag"] is None  # Booleans are not numeric
+    assert result["groups_truncated"] is False
+
+
+def test_multi_field_groups_with_where_and_distinct(collection):
+    result = aggregate_metadata(
+        collection,
+        group_by=["modification_type", "status"],
+        distinct_fields=["session_id", "missing"],
+        where={"status": {"$ne": "promoted"}},
+        limit=1,
+    )
+
+    assert result["records_scanned"] == 5
+    assert result["groups"] == [{"key": {"modification_type": "feature", "status": "captured"}, "count": 3}]
+    assert result["groups_total"] == 2 and result["groups_truncated"] is True
+    assert result["distinct"] == {"session_id": 3, "missing": 0}
+
+
+def test_group_and_distinct_caps(collection, monkeypatch):
+    monkeypatch.setattr(metadata_aggregate, "MAX_DISTINCT_VALUES", 2)
+
+    result = aggregate_metadata(collection, group_by=["session_id"], distinct_fields=["session_id"], max_groups=2)
+
+    assert result["groups_total"] == 2 and result["other_count"] == 2
+    assert result["distinct"] == {"session_id": ">2"}
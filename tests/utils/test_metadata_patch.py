@@ -0,0 +1,93 @@
+"""Tests for src/chroma_mcp/utils/metadata_patch.py"""
+
+import uuid
+
+import chromadb
+import pytest
+from chromadb.api.client import SharedSystemClient
+from chromadb.config import Settings
+
+from src.chroma_mcp.utils.metadata_patch import (
+    add_to_id_lists,
+    merge_metadata,
+    patch_metadata,
+    resolve_patch,
+    validate_patch,
+)
+
+
+@pytest.fixture(scope="module")
+def client():
+    SharedSystemClient.clear_system_cache()
+    client = chromadb.EphemeralClient(settings=Settings(anonymized_telemetry=False))
+    yield client
+    SharedSystemClient.clear_system_cache()
+
+
+@pytest.fixture
+def collection(client):
+    collection = client.create_collection(name=f"patch-{uuid.uuid4().hex[:8]}", embedding_function=None)
+    collection.add(
+        ids=["a", "b", "c"],
+        embeddings=[[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]],
+        metadatas=[
+            {"session": "s1", "status": "captured", "related_chat_ids": "c1,c2"},
+            {"session": "s1", "status": "captured"},
+            {"session": "s2", "status": "captured"},
+        ],
+    )
+    return collection
+
+
+def test_resolve_patch_set_semantics():
+    current = {"ids": "x, y,x", "keep": 1, "drop": "me"}
+
+    changes = resolve_patch(current, {"ids": {"$add": ["y", "z"], "$remove": "x"}, "keep": 1, "drop": None})
+
+    assert changes == {"ids": "y,z", "drop": None}
+    assert merge_metadata(current, {"ids": {"$remove": ["x", "y"]}}) == {"keep": 1, "drop": "me"}
+    assert resolve_patch({}, {"missing": None, "ids": {"$remove": ["x"]}}) == {}
+
+
+def test_validate_patch_rejects_unknown_operators():
+    validate_patch({"ids": {"$add": ["x"]}, "status": "done"})
+    with pytest.raises(ValueError):
+        validate_patch({"ids": {"$union": ["x"]}})
+    with pytest.raises(ValueError):
+        validate_patch(["not", "a", "dict"])
+
+
+def test_patch_by_ids_merges_and_reports_missing(collection):
+    result = patch_metadata(
+        collection,
+        patches={"a": {"related_chat_ids": {"$add": ["c3"]}, "status": None}, "b": {"status": "captured"}, "zz": {}},
+    )
+
+    assert result.matched == 2 and result.updated == 1
+    assert result.updated_ids == ["a"] and result.missing_ids == ["zz"]
+    stored = collection.get(ids=["a", "b"], include=["metadatas"])
+    assert stored["metadatas"][0] == {"session": "s1", "related_chat_ids": "c1,c2,c3"}
+    assert stored["metadatas"][1] == {"session": "s1", "status": "captured"}
+
+
+def test_patch_by_where_filter(collection):
+    result = patch_metadata(collection, patch={"status": "analyzed"}, where={"session": "s1"}, batch_size=1)
+
+    assert result.updated == 2
+    statuses = dict(zip(*[collection.get(include=["metadatas"])[k] for k in ("ids", "metadatas")]))
+    assert {doc_id: m["status"] for doc_id, m in statuses.items()} == {
+        "a": "analyzed",
+        "b": "analyzed",
+        "c": "captured",
+    }
+    with pytest.raises(ValueError):
+        patch_metadata(collection, patch={"status": "x"})
+
+
+def test_add_to_id_lists_is_idempotent(collection):
+    add_to_id_lists(collection, ["a", "b"], "related_chat_ids", ["c2", "c9"])
+    result = add_to_id_lists(collection, ["a", "b"], "related_chat_ids", ["c9"])
+
+    assert result.updated == 0
+    stored = collection.get(ids=["a", "b"], include=["metadatas"])["metadatas"]
+    assert [m["related_chat_ids"] for m in stored] == ["c1,c2,c9", "c2,c9"]
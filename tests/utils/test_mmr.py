@@ -0,0 +1,25 @@
+"""Tests for src/chroma_mcp/utils/mmr.py"""
+
+from src.chroma_mcp.utils.mmr import mmr_select
+
+QUERY = [1.0, 0.0]
+# Two near-duplicates of the most relevant direction, and one distinct but still relevant vector
+CANDIDATES = [[1.0, 0.05], [1.0, 0.06], [0.7, 0.7]]
+
+
+def test_lambda_one_is_relevance_order():
+    assert mmr_select(QUERY, CANDIDATES, k=3, lambda_mult=1.0) == [0, 1, 2]
+
+
+def test_low_lambda_skips_near_duplicates():
+    assert mmr_select(QUERY, CANDIDATES, k=2, lambda_mult=0.3) == [0, 2]
+
+
+def test_k_larger_than_candidates_and_empty_input():
+    assert sorted(mmr_select(QUERY, CANDIDATES, k=10)) == [0, 1, 2]
+    assert mmr_select(QUERY, [], k=3) == []
+    assert mmr_select(QUERY, CANDIDATES, k=0) == []
+
+
+def test_zero_vectors_do_not_break_selection():
+    assert len(mmr_select(QUERY, [[0.0, 0.0], [1.0, 0.0]], k=2)) == 2
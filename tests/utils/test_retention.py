@@ -0,0 +1,143 @@
+"""Tests for src/chroma_mcp/utils/retention.py"""
+
+import asyncio
+import datetime
+import uuid
+
+import chromadb
+import numpy as np
+import pytest
+from chromadb.api.client import SharedSystemClient
+from chromadb.config import Settings
+
+from src.chroma_mcp.types import ChromaClientConfig
+from src.chroma_mcp.utils.retention import (
+    ARCHIVED_AT_FIELD,
+    RetentionPolicy,
+    apply_retention,
+    get_archive_collection,
+    load_retention_policies,
+    select_archivable,
+    start_retention_task,
+)
+
+NOW = datetime.datetime(2026, 6, 1, tzinfo=datetime.timezone.utc).timestamp()
+DAY = 86400
+
+
+@pytest.fixture(scope="module")
+def client():
+    SharedSystemClient.clear_system_cache()
+    client = chromadb.EphemeralClient(settings=Settings(anonymized_telemetry=False))
+    yield client
+    SharedSystemClient.clear_system_cache()
+
+
+def _iso(epoch: float) -> str:
+    return datetime.datetime.fromtimestamp(epoch, tz=datetime.timezone.utc).isoformat()
+
+
+@pytest.fixture
+def chat_collection(client):
+    """Chat-like collection: 10 entries aged 0..9 * 20 days, alternating statuses."""
+    collection = client.create_collection(name=f"chat-{uuid.uuid4().hex[:8]}", embedding_function=None)
+    rng = np.random.default_rng(0)
+    collection.add(
+        ids=[f"c{i}" for i in range(10)],
+        embeddings=rng.normal(size=(10, 4)).tolist(),
+        documents=[f"chat {i}" for i in range(10)],
+        metadatas=[
+            {"timestamp": _iso(NOW - i * 20 * DAY), "status": "analyzed" if i % 2 else "captured"} for i in range(10)
+        ],
+    )
+    return collection
+
+
+def test_age_and_status_policy_moves_entries_with_embeddings(client, chat_collection):
+    before = chat_collection.get(ids=["c5"], include=["embeddings", "documents", "metadatas"])
+    policy = RetentionPolicy(chat_collection.name, max_age_days=90, statuses=["analyzed"])
+
+    result = apply_retention(client, policy, now=NOW)
+
+    # Older than 90 days: c5..c9; only the odd (analyzed) ones are eligible
+    assert sorted(result.archived_ids) == ["c5", "c7", "c9"]
+    assert chat_collection.count() == 7
+    archive = get_archive_collection(client, chat_collection.name)
+    assert archive.name == f"{chat_collection.name}_archive"
+    moved = archive.get(ids=["c5"], include=["embeddings", "documents", "metadatas"])
+    assert moved["documents"] == before["documents"]
+    np.testing.assert_allclose(moved["embeddings"], before["embeddings"], rtol=1e-6)
+    assert moved["metadatas"][0]["status"] == "analyzed"
+    assert ARCHIVED_AT_FIELD in moved["metadatas"][0]
+
+
+def test_dry_run_and_max_count(client, chat_collection):
+    policy = RetentionPolicy(chat_collection.name, max_count=6)
+
+    result = apply_retention(client, policy, dry_run=True, now=NOW)
+
+    assert sorted(result.archived_ids) == ["c6", "c7", "c8", "c9"]
+    assert chat_collection.count() == 10
+    assert get_archive_collection(client, chat_collection.name) is None
+
+
+def test_group_by_archives_whole_sessions(client):
+    collection = client.create_collection(name=f"thoughts-{uuid.uuid4().hex[:8]}", embedding_function=None)
+    collection.add(
+        ids=["old-1", "old-2", "mixed-1", "mixed-2"],
+        embeddings=[[0.0, 1.0], [1.0, 0.0], [1.0, 1.0], [0.5, 0.5]],
+        metadatas=[
+            {"session_id": "old", "timestamp": int(NOW - 400 * DAY)},
+            {"session_id": "old", "timestamp": int(NOW - 300 * DAY)},
+            {"session_id": "mixed", "timestamp": int(NOW - 400 * DAY)},
+            {"session_id": "mixed", "timestamp": int(NOW - 1 * DAY)},
+        ],
+    )
+    policy = RetentionPolicy(collection.name, max_age_days=180, group_by="session_id")
+
+    scanned, ids = select_archivable(client, collection, policy, now=NOW)
+
+    assert scanned == 4
+    assert sorted(ids) == ["old-1", "old-2"]
+
+
+def test_orphaned_summaries_follow_archived_thoughts(client):
+    thoughts = client.create_collection(name=f"thoughts-{uuid.uuid4().hex[:8]}", embedding_function=None)
+    thoughts.add(ids=["t1"], embeddings=[[1.0, 0.0]], metadatas=[{"session_id": "live"}])
+    sessions = client.create_collection(name=f"sessions-{uuid.uuid4().hex[:8]}", embedding_function=None)
+    sessions.add(ids=["live", "gone"], embeddings=[[1.0, 0.0], [0.0, 1.0]], documents=["a", "b"])
+
+    result = apply_retention(client, RetentionPolicy(sessions.name, orphaned_in=thoughts.name), now=NOW)
+
+    assert result.archived_ids == ["gone"]
+    assert sessions.get()["ids"] == ["live"]
+
+
+def test_missing_collection_is_skipped(client):
+    result = apply_retention(client, RetentionPolicy("does-not-exist", max_age_days=1))
+    assert result.scanned == 0 and result.archived == 0
+
+
+def test_load_retention_policies_env_overrides(monkeypatch):
+    monkeypatch.setenv("CHROMA_RETENTION_CHAT_HISTORY_V1_MAX_AGE_DAYS", "30")
+    monkeypatch.setenv("CHROMA_RETENTION_CHAT_HISTORY_V1_STATUSES", "promoted, ignored")
+    monkeypatch.setenv("CHROMA_RETENTION_SEQUENTIAL_THOUGHTS_V1_MAX_AGE_DAYS", "none")
+
+    policies = {p.collection_name: p for p in load_retention_policies()}
+
+    assert policies["chat_history_v1"].max_age_days == 30
+    assert policies["chat_history_v1"].statuses == ["promoted", "ignored"]
+    assert policies["sequential_thoughts_v1"].max_age_days is None
+    assert policies["thinking_sessions"].orphaned_in == "sequential_thoughts_v1"
+
+
+def test_start_retention_task_requires_config_and_interval():
+    async def _start(config):
+        task = start_retention_task(config)
+        if task:
+            task.cancel()
+        return task
+
+    assert asyncio.run(_start(None)) is None
+    assert asyncio.run(_start(ChromaClientConfig())) is None
+    assert asyncio.run(_start(ChromaClientConfig(retention_interval_hours=1))) is not None
@@ -0,0 +1,163 @@
+"""Tests for src/chroma_mcp/utils/session_embeddings.py"""
+
+import uuid
+
+import chromadb
+import numpy as np
+import pytest
+from chromadb.api.client import SharedSystemClient
+from chromadb.api.types import EmbeddingFunction
+from chromadb.config import Settings
+
+from src.chroma_mcp.utils.session_embeddings import (
+    add_to_session_mean,
+    count_session_thoughts,
+    mark_session_dirty,
+    refresh_sessions,
+    stale_sessions,
+)
+from src.chroma_mcp.utils.session_index import reset_session_index
+
+
+class CountingEmbedding(EmbeddingFunction):
+    """Deterministic two-dimensional embedding that counts its calls."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, input):
+        self.calls += 1
+        return [np.array([len(text), text.count(" ") + 1], dtype=np.float32) for text in input]
+
+
+@pytest.fixture(scope="module")
+def client():
+    SharedSystemClient.clear_system_cache()
+    client = chromadb.EphemeralClient(settings=Settings(anonymized_telemetry=False))
+    yield client
+    SharedSystemClient.clear_system_cache()
+
+
+@pytest.fixture
+def collections(client):
+    reset_session_index()
+    ef = CountingEmbedding()
+    suffix = uuid.uuid4().hex[:8]
+    thoughts = client.create_collection(name=f"thoughts-{suffix}", embedding_function=ef)
+    sessions = client.create_collection(name=f"sessions-{suffix}", embedding_function=ef)
+    yield thoughts, sessions, ef
+    reset_session_index()
+
+
+def record(thoughts, sessions, session_id, number, text):
+    embedding = CountingEmbedding()([text])
+    thoughts.add(
+        ids=[f"{session_id}_{number}"],
+        documents=[text],
+        embeddings=embedding,
+        metadatas=[{"session_id": session_id, "thought_number": number}],
+    )
+    mark_session_dirty(sessions, session_id, text, embedding=embedding[0], first_thought=number == 1)
+
+
+def test_new_session_reuses_thought_embedding_and_later_thoughts_mark_dirty(collections):
+    thoughts, sessions, ef = collections
+
+    record(thoughts, sessions, "s1", 1, "plan the api")
+    assert ef.calls == 0  # The session entry reused the thought embedding
+    assert sessions.get(ids=["s1"], include=["metadatas"])["metadatas"] == [{"thought_count": 1, "dirty": False}]
+
+    record(thoughts, sessions, "s1", 2, "write the tests")
+    record(thoughts, sessions, "s2", 1, "unrelated")
+    assert sessions.get(where={"dirty": True})["ids"] == ["s1"]
+
+
+def test_refresh_re_embeds_dirty_sessions_in_one_batch(collections):
+    thoughts, sessions, ef = collections
+    for session_id in ("s1", "s2"):
+        record(thoughts, sessions, session_id, 1, f"first of {session_id}")
+        record(thoughts, sessions, session_id, 2, f"second of {session_id}")
+    calls_before = ef.calls
+
+    assert refresh_sessions(thoughts.name, thoughts, sessions) == 2
+
+    assert ef.calls == calls_before + 1
+    stored = sessions.get(ids=["s1"], include=["documents", "metadatas"])
+    assert stored["documents"] == ["first of s1 second of s1"]
+    assert stored["metadatas"] == [{"thought_count": 2, "dirty": False}]
+    assert refresh_sessions(thoughts.name, thoughts, sessions) == 0
+
+
+def test_stale_sessions_finds_sessions_without_entries(collections):
+    thoughts, sessions, _ = collections
+    record(thoughts, sessions, "s1", 1, "tracked")
+    # Recorded before entries were maintained
+    thoughts.add(ids=["old_1", "old_2"], documents=["a", "b"], metadatas=[{"session_id": "old"}] * 2)
+
+    counts = count_session_thoughts(thoughts, page_size=1)
+    stale = stale_sessions(sessions, counts)
+
+    assert counts == {"s1": 1, "old": 2}
+    assert stale == ["old"]
+    assert refresh_sessions(thoughts.name, thoughts, sessions, stale) == 1
+    assert sorted(sessions.get()["ids"]) == ["old", "s1"]
+
+
+def test_refresh_removes_sessions_without_thoughts(collections):
+    thoughts, sessions, _ = collections
+    record(thoughts, sessions, "s1", 1, "gone soon")
+    thoughts.delete(ids=["s1_1"])
+
+    assert refresh_sessions(thoughts.name, thoughts, sessions, ["s1"]) == 0
+    assert sessions.get()["ids"] == []
+
+
+def unit_mean(vectors):
+    mean = np.mean(np.asarray(vectors, dtype=np.float64), axis=0)
+    return mean / np.linalg.norm(mean)
+
+
+def test_running_mean_matches_mean_of_thought_embeddings(collections):
+    _, sessions, ef = collections
+    vectors = [[3.0, 4.0], [1.0, 0.0], [0.0, 2.0]]
+
+    for number, vector in enumerate(vectors, start=1):
+        add_to_session_mean(sessions, "s1", f"thought {number}", vector, first_thought=number == 1)
+
+    stored = sessions.get(ids=["s1"], include=["embeddings", "metadatas"])
+    assert np.allclose(stored["embeddings"][0], unit_mean(vectors), atol=1e-6)
+    assert stored["metadatas"][0] == {
+        "thought_count": 3,
+        "mean_norm": pytest.approx(np.linalg.norm(np.mean(vectors, axis=0))),
+        "dirty": False,
+    }
+    assert ef.calls == 0
+
+
+def test_mean_mode_refresh_averages_stored_thought_embeddings(collections):
+    thoughts, sessions, ef = collections
+    record(thoughts, sessions, "s1", 1, "plan the api")  # Text-mode entry, no mean_norm
+    record(thoughts, sessions, "s1", 2, "write the tests")
+    add_to_session_mean(sessions, "s1", "ship it", [1.0, 1.0])  # Marks the text-mode entry dirty
+    assert sessions.get(where={"dirty": True})["ids"] == ["s1"]
+
+    assert refresh_sessions(thoughts.name, thoughts, sessions, mode="mean") == 1
+
+    stored_thoughts = thoughts.get(include=["embeddings"])["embeddings"]
+    stored = sessions.get(ids=["s1"], include=["embeddings", "metadatas"])
+    assert np.allclose(stored["embeddings"][0], unit_mean(stored_thoughts), atol=1e-6)
+    assert stored["metadatas"][0]["mean_norm"] > 0 and stored["metadatas"][0]["dirty"] is False
+    assert ef.calls == 0
+
+
+def test_batched_mean_matches_one_thought_at_a_time(collections):
+    _, sessions, ef = collections
+    vectors = [[3.0, 4.0], [1.0, 0.0], [0.0, 2.0], [2.0, 2.0]]
+
+    add_to_session_mean(sessions, "s1", "first two", np.sum(vectors[:2], axis=0), first_thought=True, thought_count=2)
+    add_to_session_mean(sessions, "s1", "last two", np.sum(vectors[2:], axis=0), thought_count=2)
+
+    stored = sessions.get(ids=["s1"], include=["embeddings", "metadatas"])
+    assert np.allclose(stored["embeddings"][0], unit_mean(vectors), atol=1e-6)
+    assert stored["metadatas"][0]["thought_count"] == 4 and stored["metadatas"][0]["dirty"] is False
+    assert ef.calls == 0
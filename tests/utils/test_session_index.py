@@ -0,0 +1,141 @@
+"""Tests for src/chroma_mcp/utils/session_index.py"""
+
+import uuid
+
+import chromadb
+import pytest
+from chromadb.api.client import SharedSystemClient
+from chromadb.config import Settings
+
+from src.chroma_mcp.utils.collection_version import collection_version
+from src.chroma_mcp.utils.session_index import (
+    get_session_thoughts,
+    is_session_index_tracked,
+    previous_path_thoughts,
+    reset_session_index,
+    sync_session_thought,
+)
+
+NAME = "thoughts"
+
+
+@pytest.fixture(scope="module")
+def client():
+    SharedSystemClient.clear_system_cache()
+    client = chromadb.EphemeralClient(settings=Settings(anonymized_telemetry=False))
+    yield client
+    SharedSystemClient.clear_system_cache()
+
+
+@pytest.fixture
+def collection(client):
+    reset_session_index()
+    collection = client.create_collection(name=f"thoughts-{uuid.uuid4().hex[:8]}", embedding_function=None)
+    collection.add(
+        ids=["s1_1", "s1_2_branch_b", "s2_1"],
+        embeddings=[[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]],
+        documents=["one", "branch", "other session"],
+        metadatas=[
+            {"session_id": "s1", "thought_number": 1},
+            {"session_id": "s1", "thought_number": 2, "branch_id": "b"},
+            {"session_id": "s2", "thought_number": 1},
+        ],
+    )
+    yield collection
+    reset_session_index()
+
+
+def spy_gets(collection, monkeypatch):
+    calls = []
+    original = collection.get
+
+    def get(**kwargs):
+        calls.append(kwargs)
+        return original(**kwargs)
+
+    monkeypatch.setattr(collection, "get", get)
+    return calls
+
+
+def test_first_read_filters_by_session_then_uses_ids(collection, monkeypatch):
+    calls = spy_gets(collection, monkeypatch)
+
+    first = get_session_thoughts(NAME, collection, "s1", include_branches=False)
+    second = get_session_thoughts(NAME, collection, "s1")
+
+    assert first["ids"] == ["s1_1"] and first["documents"] == ["one"]
+    assert sorted(second["ids"]) == ["s1_1", "s1_2_branch_b"]
+    assert calls[0]["where"] == {"session_id": "s1"}
+    assert sorted(calls[1]["ids"]) == ["s1_1", "s1_2_branch_b"] and "where" not in calls[1]
+    assert is_session_index_tracked(NAME)
+
+
+def test_write_hook_keeps_index_current(collection, monkeypatch):
+    get_session_thoughts(NAME, collection, "s1")
+    before = collection_version(collection)
+    collection.add(ids=["s1_3"], embeddings=[[0.5, 0.5]], documents=["three"], metadatas=[{"session_id": "s1"}])
+    record = {"id": "s1_3", "content": "three", "metadata": {"session_id": "s1"}}
+    sync_session_thought(NAME, record, version_before=before, version_after=collection_version(collection))
+    calls = spy_gets(collection, monkeypatch)
+
+    result = get_session_thoughts(NAME, collection, "s1")
+
+    assert sorted(result["ids"]) == ["s1_1", "s1_2_branch_b", "s1_3"]
+    assert "ids" in calls[0]
+
+
+def test_external_write_falls_back_to_filter(collection, monkeypatch):
+    get_session_thoughts(NAME, collection, "s1")
+    # Written without the hook, e.g. by another process
+    collection.add(ids=["s1_3"], embeddings=[[0.5, 0.5]], documents=["three"], metadatas=[{"session_id": "s1"}])
+    calls = spy_gets(collection, monkeypatch)
+
+    result = get_session_thoughts(NAME, collection, "s1")
+
+    assert sorted(result["ids"]) == ["s1_1", "s1_2_branch_b", "s1_3"]
+    assert calls[0]["where"] == {"session_id": "s1"}
+
+
+def test_unknown_session_is_cached_empty(collection, monkeypatch):
+    assert get_session_thoughts(NAME, collection, "missing") == {"ids": [], "documents": [], "metadatas": []}
+    calls = spy_gets(collection, monkeypatch)
+
+    assert get_session_thoughts(NAME, collection, "missing")["ids"] == []
+    assert calls == []
+
+
+def record_thought(collection, thought_id, metadata):
+    before = collection_version(collection) if is_session_index_tracked(NAME) else None
+    collection.add(ids=[thought_id], embeddings=[[0.5, 0.5]], documents=[thought_id], metadatas=[metadata])
+    record = {"id": thought_id, "content": thought_id, "metadata": metadata}
+    after = collection_version(collection)
+    sync_session_thought(NAME, record, version_before=before, version_after=after)
+    return previous_path_thoughts(NAME, collection, record, after)
+
+
+def test_previous_thoughts_read_once_per_chain(collection, monkeypatch):
+    calls = spy_gets(collection, monkeypatch)
+
+    second = record_thought(collection, "s1_2", {"session_id": "s1", "thought_number": 2})
+    third = record_thought(collection, "s1_3", {"session_id": "s1", "thought_number": 3})
+    fourth = record_thought(collection, "s1_4", {"session_id": "s1", "thought_number": 4})
+
+    assert [t["id"] for t in second] == ["s1_1"]
+    assert [t["id"] for t in third] == ["s1_1", "s1_2"]
+    assert [t["id"] for t in fourth] == ["s1_1", "s1_2", "s1_3"]
+    assert len(calls) == 1
+    assert calls[0]["where"] == {"$and": [{"session_id": "s1"}, {"thought_number": {"$lt": 2}}]}
+
+
+def test_previous_thoughts_follow_branch_path(collection):
+    record_thought(collection, "s1_2", {"session_id": "s1", "thought_number": 2})
+    branch = {"session_id": "s1", "branch_id": "b", "branch_from_thought": 2}
+
+    third = record_thought(collection, "s1_3_branch_b", {**branch, "thought_number": 3})
+    trunk = record_thought(collection, "s1_3", {"session_id": "s1", "thought_number": 3})
+    fourth = record_thought(collection, "s1_4_branch_b", {**branch, "thought_number": 4})
+
+    # Branch "b" from thought 2: its own thoughts plus trunk thought 1
+    assert [t["id"] for t in third] == ["s1_1", "s1_2_branch_b"]
+    assert [t["id"] for t in trunk] == ["s1_1", "s1_2"]
+    assert [t["id"] for t in fourth] == ["s1_1", "s1_2_branch_b", "s1_3_branch_b"]
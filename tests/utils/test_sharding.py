@@ -0,0 +1,255 @@
+"""Tests for src/chroma_mcp/utils/sharding.py"""
+
+import asyncio
+import uuid
+from unittest.mock import patch
+
+import chromadb
+from chromadb.api.client import SharedSystemClient
+from chromadb.config import Settings
+import numpy as np
+import pytest
+from mcp.shared.exceptions import McpError
+
+from src.chroma_mcp.utils.chroma_client import resolve_collection
+from src.chroma_mcp.utils.collection_names import invalidate_collection_names
+from src.chroma_mcp.tools.collection_tools import (
+    DeleteCollectionInput,
+    GetCollectionInput,
+    PeekCollectionInput,
+    RenameCollectionInput,
+    _delete_collection_impl,
+    _get_collection_impl,
+    _peek_collection_impl,
+    _rename_collection_impl,
+)
+from src.chroma_mcp.utils.sharding import (
+    ShardedCollection,
+    create_sharded_collection,
+    delete_sharded_collection,
+    get_pages,
+    open_sharded_collection,
+    shard_name,
+)
+
+NUM_DOCS = 60
+
+
+@pytest.fixture(autouse=True)
+def clean_name_index():
+    invalidate_collection_names()
+    yield
+    invalidate_collection_names()
+
+
+@pytest.fixture(scope="module")
+def client():
+    """Ephemeral client with the server's settings; the shared Chroma system is reset afterwards."""
+    SharedSystemClient.clear_system_cache()
+    client = chromadb.EphemeralClient(settings=Settings(anonymized_telemetry=False))
+    yield client
+    SharedSystemClient.clear_system_cache()
+
+
+@pytest.fixture
+def corpus():
+    rng = np.random.default_rng(0)
+    ids = [f"doc{i}" for i in range(NUM_DOCS)]
+    embeddings = rng.normal(size=(NUM_DOCS, 8)).astype(np.float32)
+    metadatas = [{"file_path": f"src/file{i % 7}.py", "n": i} for i in range(NUM_DOCS)]
+    documents = [f"text {i}" for i in range(NUM_DOCS)]
+    return ids, embeddings, metadatas, documents
+
+
+@pytest.fixture
+def sharded(client, corpus):
+    name = f"sharded-{uuid.uuid4().hex[:8]}"
+    collection = create_sharded_collection(
+        client, name, 3, shard_key="file_path", metadata={"hnsw:space": "cosine"}, embedding_function=None
+    )
+    ids, embeddings, metadatas, documents = corpus
+    collection.add(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=documents)
+    return collection
+
+
+def test_writes_route_by_shard_key(sharded):
+    assert sharded.count() == NUM_DOCS
+    assert sum(1 for shard in sharded.shards if shard.count()) > 1
+    for shard in sharded.shards:
+        paths = {m["file_path"] for m in shard.get(include=["metadatas"])["metadatas"]}
+        for path in paths:
+            assert sharded.shard_index("any", {"file_path": path}) == sharded.shards.index(shard)
+
+
+def test_query_matches_single_collection(client, sharded, corpus):
+    ids, embeddings, metadatas, documents = corpus
+    plain = client.create_collection(
+        name=f"plain-{uuid.uuid4().hex[:8]}", metadata={"hnsw:space": "cosine"}, embedding_function=None
+    )
+    plain.add(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=documents)
+
+    queries = embeddings[:3] + 0.01
+    expected = plain.query(query_embeddings=queries, n_results=5)
+    result = sharded.query(query_embeddings=queries, n_results=5)
+
+    assert result["ids"] == expected["ids"]
+    np.testing.assert_allclose(result["distances"], expected["distances"], rtol=1e-5)
+    assert result["documents"] == expected["documents"]
+    assert result["metadatas"] == expected["metadatas"]
+
+    without_distances = sharded.query(query_embeddings=queries[:1], n_results=2, include=["documents"])
+    assert without_distances["distances"] is None
+    assert without_distances["ids"] == [expected["ids"][0][:2]]
+
+
+def test_query_with_where_filter(sharded, corpus):
+    _, embeddings, _, _ = corpus
+    result = sharded.query(query_embeddings=embeddings[:1], n_results=10, where={"file_path": "src/file3.py"})
+    assert result["ids"][0]
+    assert all(m["file_path"] == "src/file3.py" for m in result["metadatas"][0])
+
+
+def test_get_pagination_spans_shards(sharded):
+    everything = sharded.get()["ids"]
+    assert sorted(everything) == sorted(f"doc{i}" for i in range(NUM_DOCS))
+
+    pages = [sharded.get(limit=7, offset=o)["ids"] for o in range(0, NUM_DOCS, 7)]
+    assert [doc_id for page in pages for doc_id in page] == everything
+
+    filtered = sharded.get(where={"n": {"$gte": 30}}, limit=5, offset=10, include=["metadatas"])
+    assert len(filtered["ids"]) == 5
+    assert all(m["n"] >= 30 for m in filtered["metadatas"])
+    assert sharded.get(ids=["doc1", "doc2"])["ids"] in (["doc1", "doc2"], ["doc2", "doc1"])
+
+
+def test_get_pages_scans_each_shard_once(sharded):
+    where = {"n": {"$gte": 10}}
+    with patch.object(ShardedCollection, "get", side_effect=AssertionError("logical get")):
+        pages = list(get_pages(sharded, 7, where=where, include=["metadatas"]))
+
+    ids = [doc_id for page in pages for doc_id in page["ids"]]
+    assert sorted(ids) == sorted(f"doc{i}" for i in range(10, NUM_DOCS))
+    assert all(len(page["ids"]) <= 7 for page in pages)
+
+
+def test_upsert_update_delete_find_owning_shard(sharded):
+    sharded.upsert(ids=["doc1"], documents=["changed"], embeddings=[[0.0] * 8], metadatas=[{"n": 1}])
+    assert sharded.count() == NUM_DOCS  # Updated in place, not duplicated on another shard
+    assert sharded.get(ids=["doc1"])["documents"] == ["changed"]
+
+    sharded.update(ids=["doc2"], metadatas=[{"file_path": "src/file2.py", "n": 2, "tag": "x"}])
+    assert sharded.get(ids=["doc2"])["metadatas"] == [{"file_path": "src/file2.py", "n": 2, "tag": "x"}]
+
+    sharded.delete(where={"file_path": "src/file3.py"})
+    sharded.delete(ids=["doc0"])
+    remaining = sharded.get(include=["metadatas"])
+    assert "doc0" not in remaining["ids"]
+    assert all(m.get("file_path") != "src/file3.py" for m in remaining["metadatas"])
+
+
+def test_resolve_collection(client, sharded):
+    resolved = resolve_collection(client, name=sharded.name)
+    assert isinstance(resolved, ShardedCollection)
+    assert resolved.count() == NUM_DOCS
+    assert resolved.shard_key == "file_path"
+    assert resolved.metadata == {"hnsw:space": "cosine"}
+
+    plain = client.create_collection(name=f"plain-{uuid.uuid4().hex[:8]}")
+    assert resolve_collection(client, plain.name).id == plain.id
+    with pytest.raises(Exception, match="does not exist"):
+        resolve_collection(client, name=f"missing-{uuid.uuid4().hex[:8]}")
+
+
+def test_create_sharded_collection_validation(client, sharded):
+    with pytest.raises(ValueError):
+        create_sharded_collection(client, f"x-{uuid.uuid4().hex[:8]}", 0)
+    with pytest.raises(ValueError, match="already exists"):
+        create_sharded_collection(client, shard_name(sharded.name, 0), 2)
+
+
+def _shard_get_calls(collection):
+    """Patches every shard's get to count ID lookups."""
+    calls = []
+    for shard in collection.shards:
+        original = shard.get
+
+        def counting_get(*args, _original=original, **kwargs):
+            calls.append(kwargs.get("ids"))
+            return _original(*args, **kwargs)
+
+        object.__setattr__(shard, "get", counting_get)
+    return calls
+
+
+def test_writes_with_routing_value_skip_owner_lookup(sharded):
+    calls = _shard_get_calls(sharded)
+    sharded.upsert(
+        ids=["doc3"], embeddings=[[0.5] * 8], documents=["upserted"], metadatas=[{"file_path": "src/file3.py"}]
+    )
+    assert calls == []
+    assert sharded.count() == NUM_DOCS
+    assert sharded.get(ids=["doc3"])["documents"] == ["upserted"]
+
+
+def test_id_routed_collection_routes_deletes_and_queries(client, corpus):
+    ids, embeddings, metadatas, documents = corpus
+    collection = create_sharded_collection(client, f"byid-{uuid.uuid4().hex[:8]}", 3, embedding_function=None)
+    collection.add(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=documents)
+    calls = _shard_get_calls(collection)
+
+    with patch.object(type(collection.shards[0]), "delete", autospec=True) as shard_delete:
+        collection.delete(ids=["doc0", "doc1"])
+    deleted = sorted(i for c in shard_delete.call_args_list for i in c.kwargs["ids"])
+    assert deleted == ["doc0", "doc1"]
+    assert len(shard_delete.call_args_list) == len({collection.shard_index(i) for i in ["doc0", "doc1"]})
+
+    result = collection.query(query_embeddings=embeddings[:1], n_results=5, ids=["doc4", "doc5"])
+    assert sorted(result["ids"][0]) == ["doc4", "doc5"]
+    assert calls == []  # Owners follow from the IDs
+
+
+def test_query_with_ids_only_hits_owning_shards(sharded, corpus):
+    _, embeddings, _, _ = corpus
+    result = sharded.query(query_embeddings=embeddings[:2], n_results=10, ids=["doc1", "doc8", "missing"])
+    assert [sorted(row) for row in result["ids"]] == [["doc1", "doc8"], ["doc1", "doc8"]]
+
+    empty = sharded.query(query_embeddings=embeddings[:1], n_results=3, ids=["missing"])
+    assert empty["ids"] == [[]]
+
+
+def test_changed_layout_falls_back_to_lookup(client, corpus):
+    ids, embeddings, metadatas, documents = corpus
+    name = f"layout-{uuid.uuid4().hex[:8]}"
+    collection = create_sharded_collection(client, name, 2, embedding_function=None)
+    collection.add(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=documents)
+    # A third shard added later: hashes modulo 3 no longer locate the existing records
+    client.create_collection(
+        name=shard_name(name, 2), metadata={"shard:logical": name, "shard:count": 3}, embedding_function=None
+    )
+    shard0 = client.get_collection(shard_name(name, 0))
+    shard0.modify(metadata={**shard0.metadata, "shard:count": 3})
+    invalidate_collection_names()
+
+    reopened = open_sharded_collection(client, name)
+    assert reopened.routing_stable is False
+    reopened.delete(ids=ids[:10])
+    assert reopened.count() == NUM_DOCS - 10
+
+
+def test_collection_tools_are_shard_aware(client, sharded):
+    with patch("src.chroma_mcp.tools.collection_tools.get_chroma_client", return_value=client):
+        info = asyncio.run(_get_collection_impl(GetCollectionInput(collection_name=sharded.name)))
+        assert '"count": 60' in info[0].text
+        peek = asyncio.run(_peek_collection_impl(PeekCollectionInput(collection_name=sharded.name, limit=2)))
+        assert len(peek[0].text) > 0
+
+        with pytest.raises(McpError, match="sharded"):
+            asyncio.run(
+                _rename_collection_impl(RenameCollectionInput(collection_name=sharded.name, new_name="renamed-x"))
+            )
+
+        asyncio.run(_delete_collection_impl(DeleteCollectionInput(collection_name=sharded.name)))
+    invalidate_collection_names()
+    remaining = [c.name for c in client.list_collections()]
+    assert not any(n.startswith(f"{sharded.name}__shard") for n in remaining)
+    assert delete_sharded_collection(client, sharded.name) is False
@@ -0,0 +1,92 @@
+"""Tests for src/chroma_mcp/utils/socket_transport.py"""
+
+import asyncio
+import os
+import tempfile
+import uuid
+
+import pytest
+from mcp import ClientSession, types
+from mcp.server.lowlevel import NotificationOptions, Server
+
+from src.chroma_mcp.utils.socket_transport import (
+    default_socket_path,
+    serve_unix_socket,
+    socket_is_live,
+    unix_socket_client,
+    unix_sockets_supported,
+)
+
+pytestmark = pytest.mark.skipif(not unix_sockets_supported(), reason="Unix domain sockets not available")
+
+
+def echo_server() -> Server:
+    server = Server("echo")
+
+    @server.list_tools()
+    async def list_tools():
+        return [types.Tool(name="echo", description="Echo", inputSchema={"type": "object"})]
+
+    @server.call_tool()
+    async def call_tool(name, arguments):
+        return [types.TextContent(type="text", text=arguments["text"])]
+
+    return server
+
+
+@pytest.fixture
+def socket_path():
+    # Short path: Unix socket paths are limited to ~100 bytes
+    path = os.path.join(tempfile.gettempdir(), f"cmcp-{uuid.uuid4().hex[:8]}.sock")
+    yield path
+    if os.path.exists(path):
+        os.unlink(path)
+
+
+async def call_echo(socket_path, text):
+    async with unix_socket_client(socket_path) as (read_stream, write_stream):
+        async with ClientSession(read_stream, write_stream) as session:
+            await session.initialize()
+            result = await session.call_tool("echo", {"text": text})
+            return result.content[0].text
+
+
+async def wait_until_live(socket_path):
+    for _ in range(100):
+        if await socket_is_live(socket_path):
+            return
+        await asyncio.sleep(0.02)
+    raise AssertionError("socket server did not start")
+
+
+@pytest.mark.asyncio
+async def test_sessions_share_one_server_and_stop_when_idle(socket_path):
+    server = echo_server()
+    options = server.create_initialization_options(notification_options=NotificationOptions())
+    task = asyncio.create_task(serve_unix_socket(server, options, socket_path, idle_timeout=0.5))
+    await wait_until_live(socket_path)
+
+    assert await call_echo(socket_path, "one") == "one"
+    assert await call_echo(socket_path, "two") == "two"
+
+    await asyncio.wait_for(task, timeout=5)
+    assert not os.path.exists(socket_path)
+
+
+@pytest.mark.asyncio
+async def test_refuses_to_replace_a_live_server(socket_path):
+    server = echo_server()
+    options = server.create_initialization_options(notification_options=NotificationOptions())
+    task = asyncio.create_task(serve_unix_socket(server, options, socket_path, idle_timeout=0.5))
+    await wait_until_live(socket_path)
+
+    with pytest.raises(RuntimeError):
+        await serve_unix_socket(server, options, socket_path)
+    await asyncio.wait_for(task, timeout=5)
+
+
+def test_default_socket_path_depends_on_environment():
+    first = default_socket_path({"CHROMA_DATA_DIR": "/a"})
+
+    assert first == default_socket_path({"CHROMA_DATA_DIR": "/a"})
+    assert first != default_socket_path({"CHROMA_DATA_DIR": "/b"})